@@ -15,44 +15,50 @@ Usage:
 import os
 import sys
 import json
+import queue
 import subprocess
-import csv
-import io
 from datetime import date, datetime, timedelta
 from typing import Dict, List, Any, Optional
+from urllib.parse import urlencode
 
 from flask import Flask, jsonify, request, Response, send_from_directory
 from flask_cors import CORS
 from flask_session import Session
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
 
-# Export functionality imports
-try:
-    from reportlab.lib.pagesizes import letter, A4
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib import colors
-    from reportlab.lib.units import inch
-    REPORTLAB_AVAILABLE = True
-except ImportError:
-    REPORTLAB_AVAILABLE = False
-
-try:
-    import openpyxl
-    from openpyxl.styles import Font, PatternFill, Alignment
-    from openpyxl.utils import get_column_letter
-    OPENPYXL_AVAILABLE = True
-except ImportError:
-    OPENPYXL_AVAILABLE = False
-
 # Add the project root to Python path
 sys.path.insert(0, '/opt/es-inventory-hub')
 
-from collectors.checks.cross_vendor import run_cross_vendor_checks
+from collectors.checks.cross_vendor import DEVICE_EXCEPTION_TYPES, run_cross_vendor_checks
+from collectors.checks.reconciliation import RECONCILIATION_TYPES
+from collectors.jobs import COLLECTOR_JOBS
+from collectors.checks.variance_reports import (
+    add_read_time_status, build_reconciliation_report, data_status_for, get_collection_timestamps,
+    get_organization_breakdown, get_report_artifact, invalidate_report_artifacts, latest_matching_date
+)
+from common.exception_changes import record_changed_rows
+from common.hostname_index import search_hostname_index
+from common.report_archive import report_fingerprint
+from common.rollups import refresh_count_rollups
+from common.snapshot_state import record_snapshot_state
+from api.response_cache import archived_report, cached_response, invalidate as invalidate_response_cache
+from api import request_profiling, response_encoding
+from api.export_jobs import EXPORT_TYPES, export_available, export_jobs
+from api.job_queue import cancel_batch, cleanup_stale_jobs, enqueue_batch, job_queue
+from api.pagination import (
+    decode_cursor, keyset_condition, order_by_clause, page_params, parse_fields, split_page
+)
+from api.streaming import csv_response, file_response, format_sse, sse_response, stream_rows
+from common.job_events import JOB_EVENTS_KEEPALIVE_SECONDS, TERMINAL_STATUSES, job_events
 
 app = Flask(__name__)
 
+# orjson serialization (Decimal/date aware) and gzip/brotli compression
+response_encoding.init_app(app)
+# Per-request query counts, Server-Timing and N+1 warnings (SQL_PROFILING_ENABLED)
+request_profiling.init_app(app)
+
 # Configure Flask session for authentication
 app.config['SECRET_KEY'] = os.getenv('SESSION_SECRET_KEY')
 app.config['SESSION_TYPE'] = 'filesystem'
@@ -101,6 +107,10 @@ app.register_blueprint(m365_api)
 from api.veeam_api import veeam_api
 app.register_blueprint(veeam_api)
 
+# Import and register Prometheus metrics blueprint (/metrics, request latency)
+from api.metrics_api import metrics_api
+app.register_blueprint(metrics_api)
+
 # Prompts directory for AI-to-AI communication
 PROMPTS_DIR = '/opt/es-inventory-hub/prompts'
 
@@ -153,211 +163,43 @@ def _format_date_string(date_str):
 CORS(app, 
      origins=['https://dashboards.enersystems.com', 'http://localhost:3000', 'http://localhost:8080'],
      methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
-     allow_headers=['Content-Type', 'Authorization', 'X-Requested-With', 'X-API-Key', 'Cache-Control', 'Pragma'],
+     allow_headers=['Content-Type', 'Authorization', 'X-Requested-With', 'X-API-Key', 'Cache-Control', 'Pragma', 'If-None-Match'],
+     expose_headers=['ETag', 'X-Cache', 'Location', 'X-Next-Cursor', 'Link'],
      supports_credentials=True,
      max_age=86400)
 
-# Database connection
-from common.config import get_dsn
-DSN = get_dsn()
-engine = create_engine(DSN)
+# Database connection (shared pooled engine, see common.db)
+from common.db import get_engine, pool_stats
+engine = get_engine()
 Session = sessionmaker(bind=engine)
 
 def get_session():
     """Get database session."""
     return Session()
 
+@app.after_request
+def invalidate_cache_after_write(response):
+    """Drop cached reports after any successful write made through the API."""
+    # Queueing an export job reads data but writes nothing the caches depend on
+    if request.path.startswith('/api/exports'):
+        return response
+    if request.method in ('POST', 'PUT', 'DELETE') and response.status_code < 400:
+        if request.path.startswith('/api/exceptions'):
+            # Exception updates change the stored report artifacts
+            with get_session() as session:
+                invalidate_report_artifacts(session)
+                session.commit()
+        invalidate_response_cache()
+    return response
+
 def get_latest_matching_date() -> Optional[date]:
     """Get the latest date where both vendors have data."""
     with get_session() as session:
-        query = text("""
-            SELECT snapshot_date, COUNT(DISTINCT vendor_id) as vendor_count
-            FROM device_snapshot
-            WHERE snapshot_date >= CURRENT_DATE - INTERVAL '7 days'
-            GROUP BY snapshot_date
-            HAVING COUNT(DISTINCT vendor_id) = 2
-            ORDER BY snapshot_date DESC
-            LIMIT 1
-        """)
-        
-        result = session.execute(query).fetchone()
-        return result[0] if result else None
-
-def get_organization_breakdown(session, exceptions, report_date):
-    """Get detailed breakdown of exceptions by organization for each variance type."""
-    # Get organization data for each exception
-    org_query = text("""
-        SELECT 
-            e.id,
-            e.type,
-            e.hostname,
-            e.details,
-            e.resolved,
-            COALESCE(
-                ds_tl.organization_name,
-                ds_ninja.organization_name,
-                'Unknown'
-            ) as organization_name,
-            COALESCE(
-                ds_tl.display_name,
-                ds_ninja.display_name,
-                e.hostname
-            ) as display_name,
-            COALESCE(
-                ds_tl.device_status,
-                ds_ninja.device_status,
-                'Unknown'
-            ) as billing_status,
-            CASE 
-                WHEN v_tl.name = 'ThreatLocker' THEN 'ThreatLocker'
-                WHEN v_ninja.name = 'Ninja' THEN 'Ninja'
-                ELSE 'Unknown'
-            END as vendor
-        FROM exceptions e
-        LEFT JOIN device_snapshot ds_tl ON ds_tl.hostname = e.hostname 
-            AND ds_tl.snapshot_date = :report_date
-            AND ds_tl.vendor_id = (SELECT id FROM vendor WHERE name = 'ThreatLocker')
-        LEFT JOIN vendor v_tl ON ds_tl.vendor_id = v_tl.id
-        LEFT JOIN device_snapshot ds_ninja ON ds_ninja.hostname = e.hostname 
-            AND ds_ninja.snapshot_date = :report_date
-            AND ds_ninja.vendor_id = (SELECT id FROM vendor WHERE name = 'Ninja')
-        LEFT JOIN vendor v_ninja ON ds_ninja.vendor_id = v_ninja.id
-        WHERE e.date_found = :report_date
-        ORDER BY e.type, organization_name, e.hostname
-    """)
-    
-    org_results = session.execute(org_query, {'report_date': report_date}).fetchall()
-    
-    # Group by type and organization
-    by_organization = {}
-    
-    for row in org_results:
-        exc_id, exc_type, hostname, details, resolved, org_name, display_name, billing_status, vendor = row
-        
-        # Map exception types to dashboard format
-        dashboard_type = None
-        if exc_type == "MISSING_NINJA":
-            dashboard_type = "missing_in_ninja"
-        elif exc_type == "DUPLICATE_TL":
-            dashboard_type = "threatlocker_duplicates"
-        elif exc_type == "SPARE_MISMATCH":
-            dashboard_type = "devices_that_should_not_have_threatlocker"
-        elif exc_type == "DISPLAY_NAME_MISMATCH":
-            dashboard_type = "display_name_mismatches"
-        
-        if not dashboard_type:
-            continue
-            
-        if dashboard_type not in by_organization:
-            by_organization[dashboard_type] = {
-                "total_count": 0,
-                "by_organization": {}
-            }
-        
-        # For Missing in Ninja, ThreatLocker Duplicates, and DevicesThatShouldNotHaveThreatlocker, extract organization from details if not found in device_snapshot
-        if exc_type in ["MISSING_NINJA", "DUPLICATE_TL", "SPARE_MISMATCH"] and org_name == "Unknown" and details:
-            # Extract organization from the details JSONB field
-            details_dict = details if isinstance(details, dict) else {}
-            
-            # For SPARE_MISMATCH (DevicesThatShouldNotHaveThreatlocker), prefer ninja_org_name over tl_org_name
-            if exc_type == "SPARE_MISMATCH":
-                ninja_org = details_dict.get('ninja_org_name', '')
-                tl_org = details_dict.get('tl_org_name', '')
-                
-                # Use ninja_org if it exists and is not empty, otherwise use tl_org, otherwise 'Unknown'
-                if ninja_org and ninja_org.strip():
-                    org_name = ninja_org
-                    vendor = 'Ninja'
-                elif tl_org and tl_org.strip():
-                    org_name = tl_org
-                    vendor = 'ThreatLocker'
-                else:
-                    org_name = 'Unknown'
-            else:
-                # For MISSING_NINJA and DUPLICATE_TL, use tl_org_name
-                org_name = details_dict.get('tl_org_name', 'Unknown')
-                if details_dict.get('tl_org_name'):
-                    vendor = 'ThreatLocker'
-            
-            # Update display_name from site information
-            if details_dict.get('tl_site_name'):
-                display_name = f"{hostname} ({details_dict.get('tl_site_name')})"
-            elif details_dict.get('ninja_site'):
-                display_name = f"{hostname} ({details_dict.get('ninja_site')})"
-        
-        # For Display Name Mismatches, extract display name information from details
-        if exc_type == "DISPLAY_NAME_MISMATCH" and details:
-            details_dict = details if isinstance(details, dict) else {}
-            
-            # Extract organization from details (prefer ninja_org_name)
-            ninja_org = details_dict.get('ninja_org_name', '')
-            tl_org = details_dict.get('tl_org_name', '')
-            
-            if ninja_org and ninja_org.strip():
-                org_name = ninja_org
-                vendor = 'Ninja'
-            elif tl_org and tl_org.strip():
-                org_name = tl_org
-                vendor = 'ThreatLocker'
-            
-            # Use the Ninja display name as the primary display name for the modal
-            ninja_display = details_dict.get('ninja_display_name', '')
-            if ninja_display and ninja_display.strip():
-                display_name = ninja_display
-        
-        if org_name not in by_organization[dashboard_type]["by_organization"]:
-            by_organization[dashboard_type]["by_organization"][org_name] = []
-        
-        # Create device entry
-        device_entry = {
-            "hostname": hostname,
-            "vendor": vendor,
-            "display_name": display_name,
-            "organization": org_name,
-            "billing_status": billing_status,
-            "action": "Investigate"
-        }
-        
-        # For Display Name Mismatches, add specific display name information for the modal
-        if exc_type == "DISPLAY_NAME_MISMATCH" and details:
-            details_dict = details if isinstance(details, dict) else {}
-            device_entry.update({
-                "ninja_display_name": details_dict.get('ninja_display_name', ''),
-                "threatlocker_display_name": details_dict.get('tl_display_name', ''),
-                "ninja_hostname": details_dict.get('ninja_hostname', ''),
-                "threatlocker_hostname": details_dict.get('tl_hostname', '')
-            })
-        
-        by_organization[dashboard_type]["by_organization"][org_name].append(device_entry)
-        by_organization[dashboard_type]["total_count"] += 1
-    
-    return by_organization
+        return latest_matching_date(session)
 
 def get_data_status() -> Dict[str, Any]:
     """Determine the status of the data (current, stale, out_of_sync)."""
-    latest_date = get_latest_matching_date()
-    
-    if not latest_date:
-        return {
-            "status": "out_of_sync",
-            "message": "No matching data found between vendors",
-            "latest_date": None
-        }
-    
-    days_old = (date.today() - latest_date).days
-    
-    if days_old <= 1:
-        return {
-            "status": "current",
-            "message": "Data is current",
-            "latest_date": latest_date.isoformat()
-        }
-    else:
-        return {
-            "status": "stale_data",
-            "message": f"Data is {days_old} days old",
-            "latest_date": latest_date.isoformat()
-        }
+    return data_status_for(get_latest_matching_date())
 
 # API Endpoints
 
@@ -370,31 +212,31 @@ def health_check():
         "version": "1.0.0"
     })
 
+@app.route('/api/health/db-pool', methods=['GET'])
+def db_pool_health():
+    """Connection pool usage of the shared database engines."""
+    return jsonify({
+        "engines": pool_stats(),
+        "timestamp": datetime.now().isoformat()
+    })
+
 @app.route('/api/status', methods=['GET'])
+@cached_response
 def get_status():
     """Get overall system status with collector health and data freshness information."""
     data_status = get_data_status()
     
     with get_session() as session:
-        # Auto-cleanup stale jobs when status is checked
-        cleanup_stale_jobs(session)
-        
         # Get device counts and latest snapshot dates per vendor
-        # Only count devices from each vendor's latest snapshot date
+        # Counts are from each vendor's latest complete snapshot (vendor_snapshot_state)
         device_query = text("""
             SELECT 
                 v.name as vendor,
-                COUNT(ds.id) as count,
-                MAX(ds.snapshot_date) as latest_date
+                COALESCE(s.row_count, 0) as count,
+                s.snapshot_date as latest_date
             FROM vendor v
-            LEFT JOIN device_snapshot ds ON v.id = ds.vendor_id
-                AND ds.snapshot_date = (
-                    SELECT MAX(snapshot_date)
-                    FROM device_snapshot ds2
-                    WHERE ds2.vendor_id = v.id
-                )
+            LEFT JOIN vendor_snapshot_state s ON v.id = s.vendor_id
             WHERE v.name IN ('Ninja', 'ThreatLocker')
-            GROUP BY v.name
             ORDER BY v.name
         """)
         
@@ -499,16 +341,18 @@ def get_status():
             failed_collectors = [f['collector'] for f in recent_failures]
             warnings.append(f"Recent collector failures: {', '.join(set(failed_collectors))}")
         
-        # Get exception counts
+        # Get exception counts (device variances and seat reconciliations apart)
         exception_query = text("""
             SELECT type, COUNT(*) as count
             FROM exceptions
             WHERE resolved = FALSE
-            AND date_found = CURRENT_DATE
+            AND first_seen <= CURRENT_DATE AND last_seen >= CURRENT_DATE
             GROUP BY type
         """)
         
-        exception_counts = {row[0]: row[1] for row in session.execute(exception_query).fetchall()}
+        all_counts = {row[0]: row[1] for row in session.execute(exception_query).fetchall()}
+        exception_counts = {t: c for t, c in all_counts.items() if t in DEVICE_EXCEPTION_TYPES}
+        reconciliation_counts = {t: c for t, c in all_counts.items() if t in RECONCILIATION_TYPES}
     
     return jsonify({
         "data_status": data_status,
@@ -522,127 +366,33 @@ def get_status():
         "warnings": warnings if has_warnings else [],
         "has_warnings": has_warnings,
         "exception_counts": exception_counts,
-        "total_exceptions": sum(exception_counts.values())
+        "total_exceptions": sum(exception_counts.values()),
+        "reconciliation_counts": reconciliation_counts
     })
 
 @app.route('/api/variance-report/latest', methods=['GET'])
+@cached_response
 def get_latest_variance_report():
-    """Get the latest variance report."""
+    """Get the latest variance report (precomputed by the cross-vendor run)."""
     # Get query parameters
     include_resolved = request.args.get('include_resolved', 'false').lower() == 'true'
     
-    latest_date = get_latest_matching_date()
+    with get_session() as session:
+        report = get_report_artifact(session, 'latest_with_resolved' if include_resolved else 'latest')
+        if report is not None:
+            add_read_time_status(session, report, date.fromisoformat(report["report_date"]))
     
-    if not latest_date:
+    if report is None:
         return jsonify({
             "error": "No matching data found between vendors",
             "status": "out_of_sync"
         }), 400
     
-    with get_session() as session:
-        # Get exceptions for the latest date (filter resolved by default)
-        if include_resolved:
-            query = text("""
-                SELECT id, date_found, type, hostname, details, resolved
-                FROM exceptions
-                WHERE date_found = :report_date
-                ORDER BY type, hostname
-            """)
-        else:
-            query = text("""
-                SELECT id, date_found, type, hostname, details, resolved
-                FROM exceptions
-                WHERE date_found = :report_date
-                AND resolved = FALSE
-                ORDER BY type, hostname
-            """)
-        
-        exceptions = session.execute(query, {'report_date': latest_date}).fetchall()
-        
-        # Group by type
-        by_type = {}
-        for exc in exceptions:
-            exc_type = exc[2]
-            if exc_type not in by_type:
-                by_type[exc_type] = []
-            by_type[exc_type].append({
-                'id': exc[0],
-                'hostname': exc[3],
-                'details': exc[4],
-                'resolved': exc[5]
-            })
-        
-        # Calculate totals
-        total_exceptions = len(exceptions)
-        unresolved_count = sum(1 for exc in exceptions if not exc[5])
-        
-        # Create dashboard-compatible format
-        exception_counts = {exc_type: len(devices) for exc_type, devices in by_type.items()}
-        
-        # Map to dashboard expected format
-        dashboard_format = {
-            "missing_in_ninja": {
-                "total_count": exception_counts.get("MISSING_NINJA", 0)
-            },
-            "threatlocker_duplicates": {
-                "total_count": exception_counts.get("DUPLICATE_TL", 0)
-            },
-            "devices_that_should_not_have_threatlocker": {
-                "total_count": exception_counts.get("SPARE_MISMATCH", 0)
-            },
-            "display_name_mismatches": {
-                "total_count": exception_counts.get("DISPLAY_NAME_MISMATCH", 0)
-            }
-        }
-        
-        # Get collection timestamps
-        collection_info = _get_collection_timestamps(session, latest_date)
-        
-        # Get detailed organization breakdown
-        org_breakdown = get_organization_breakdown(session, exceptions, latest_date)
-        
-        # Update dashboard format with organization data
-        enhanced_dashboard_format = {
-            "missing_in_ninja": org_breakdown.get("missing_in_ninja", {
-                "total_count": exception_counts.get("MISSING_NINJA", 0),
-                "by_organization": {}
-            }),
-            "threatlocker_duplicates": org_breakdown.get("threatlocker_duplicates", {
-                "total_count": exception_counts.get("DUPLICATE_TL", 0),
-                "by_organization": {}
-            }),
-            "devices_that_should_not_have_threatlocker": org_breakdown.get("devices_that_should_not_have_threatlocker", {
-                "total_count": exception_counts.get("SPARE_MISMATCH", 0),
-                "by_organization": {}
-            }),
-            "display_name_mismatches": org_breakdown.get("display_name_mismatches", {
-                "total_count": exception_counts.get("DISPLAY_NAME_MISMATCH", 0),
-                "by_organization": {}
-            })
-        }
-        
-        return jsonify({
-            "report_date": latest_date.isoformat(),
-            "data_status": get_data_status(),
-            "summary": {
-                "total_exceptions": total_exceptions,
-                "unresolved_count": unresolved_count,
-                "resolved_count": total_exceptions - unresolved_count
-            },
-            "exceptions_by_type": by_type,
-            "exception_counts": exception_counts,
-            # Collection information
-            "collection_info": {
-                "ninja_collected": collection_info["ninja_collected"],
-                "threatlocker_collected": collection_info["threatlocker_collected"],
-                "last_collection": collection_info["last_collection"],
-                "data_freshness": collection_info["data_freshness"]
-            },
-            # Enhanced dashboard-compatible format with organization breakdown
-            **enhanced_dashboard_format
-        })
+    return jsonify(report)
 
 @app.route('/api/variance-report/<date_str>', methods=['GET'])
+@cached_response
+@archived_report('variance-report')
 def get_variance_report_by_date(date_str: str):
     """Get variance report for a specific date."""
     # Get query parameters
@@ -674,19 +424,21 @@ def get_variance_report_by_date(date_str: str):
             query = text("""
                 SELECT id, date_found, type, hostname, details, resolved
                 FROM exceptions
-                WHERE date_found = :report_date
+                WHERE first_seen <= :report_date AND last_seen >= :report_date
+                AND type = ANY(:device_types)
                 ORDER BY type, hostname
             """)
         else:
             query = text("""
                 SELECT id, date_found, type, hostname, details, resolved
                 FROM exceptions
-                WHERE date_found = :report_date
+                WHERE first_seen <= :report_date AND last_seen >= :report_date
+                AND type = ANY(:device_types)
                 AND resolved = FALSE
                 ORDER BY type, hostname
             """)
         
-        exceptions = session.execute(query, {'report_date': report_date}).fetchall()
+        exceptions = session.execute(query, {'report_date': report_date, 'device_types': list(DEVICE_EXCEPTION_TYPES)}).fetchall()
         
         # Group by type
         by_type = {}
@@ -702,7 +454,7 @@ def get_variance_report_by_date(date_str: str):
             })
         
         # Get collection timestamps
-        collection_info = _get_collection_timestamps(session, report_date)
+        collection_info = get_collection_timestamps(session, report_date)
         
         return jsonify({
             "report_date": report_date.isoformat(),
@@ -718,358 +470,46 @@ def get_variance_report_by_date(date_str: str):
 
 @app.route('/api/collectors/run', methods=['POST'])
 def run_collectors():
-    """Trigger collector runs with batch and job tracking."""
-    import uuid
-    from datetime import datetime, timedelta
+    """
+    Queue collector runs with batch and job tracking.
     
+    The collectors run concurrently on the API's job queue workers, followed
+    by cross-vendor checks and the Windows 11 24H2 assessment if at least one
+    collector succeeded. Poll /api/collectors/runs/batch/<batch_id> for progress, or
+    follow /api/collectors/events?batch_id=<batch_id>.
+    """
     data = request.get_json() or {}
     collectors = data.get('collectors', ['ninja', 'threatlocker'])
     priority = data.get('priority', 'normal')
     run_cross_vendor = data.get('run_cross_vendor', True)
     
-    # Generate unique IDs
-    batch_id = f"bc_{uuid.uuid4().hex[:8]}"
-    now = datetime.utcnow()
+    # Only actual collectors get jobs; analysis jobs are added below
+    job_names = [COLLECTOR_JOBS[c] for c in collectors if c in COLLECTOR_JOBS]
+    if run_cross_vendor:
+        job_names.append('cross-vendor-checks')
+    job_names.append('windows-11-24h2-assessment')
     
     try:
         with get_session() as session:
-            # Create batch record
-            batch_query = text("""
-                INSERT INTO job_batches (batch_id, created_at, status, priority, started_at, message)
-                VALUES (:batch_id, :created_at, :status, :priority, :started_at, :message)
-            """)
-            session.execute(batch_query, {
-                'batch_id': batch_id,
-                'created_at': now,
-                'status': 'queued',
-                'priority': priority,
-                'started_at': now,
-                'message': f"Starting collectors: {', '.join(collectors)}"
-            })
-            
-            # Create job records - only for actual collectors (ninja, threatlocker)
-            job_runs = []
-            for collector in collectors:
-                # Only create jobs for actual collectors, not analysis jobs
-                if collector in ['ninja', 'threatlocker']:
-                    job_id = f"{collector[:2]}_{uuid.uuid4().hex[:8]}"
-                    job_name = f"{collector}-collector"
-                    
-                    job_query = text("""
-                        INSERT INTO job_runs (job_id, batch_id, job_name, status, started_at, updated_at, message)
-                        VALUES (:job_id, :batch_id, :job_name, :status, :started_at, :updated_at, :message)
-                    """)
-                    session.execute(job_query, {
-                        'job_id': job_id,
-                        'batch_id': batch_id,
-                        'job_name': job_name,
-                        'status': 'queued',
-                        'started_at': now,
-                        'updated_at': now,
-                        'message': f"Queued {collector} collector"
-                    })
-                    
-                    job_runs.append({
-                        'job_name': job_name,
-                        'job_id': job_id,
-                        'status': 'queued',
-                        'started_at': now.isoformat() + 'Z'
-                    })
-            
-            # Add cross-vendor checks job if requested
-            if run_cross_vendor:
-                cross_vendor_job_id = f"cv_{uuid.uuid4().hex[:8]}"
-                cross_vendor_job_name = "cross-vendor-checks"
-                
-                job_query = text("""
-                    INSERT INTO job_runs (job_id, batch_id, job_name, status, started_at, updated_at, message)
-                    VALUES (:job_id, :batch_id, :job_name, :status, :started_at, :updated_at, :message)
-                """)
-                session.execute(job_query, {
-                    'job_id': cross_vendor_job_id,
-                    'batch_id': batch_id,
-                    'job_name': cross_vendor_job_name,
-                    'status': 'queued',
-                    'started_at': now,
-                    'updated_at': now,
-                    'message': "Queued cross-vendor consistency checks"
-                })
-                
-                job_runs.append({
-                    'job_name': cross_vendor_job_name,
-                    'job_id': cross_vendor_job_id,
-                    'status': 'queued',
-                    'started_at': now.isoformat() + 'Z'
-                })
-            
-            # Add Windows 11 24H2 assessment job
-            windows_24h2_job_id = f"w24_{uuid.uuid4().hex[:8]}"
-            windows_24h2_job_name = "windows-11-24h2-assessment"
-            
-            job_query = text("""
-                INSERT INTO job_runs (job_id, batch_id, job_name, status, started_at, updated_at, message)
-                VALUES (:job_id, :batch_id, :job_name, :status, :started_at, :updated_at, :message)
-            """)
-            session.execute(job_query, {
-                'job_id': windows_24h2_job_id,
-                'batch_id': batch_id,
-                'job_name': windows_24h2_job_name,
-                'status': 'queued',
-                'started_at': now,
-                'updated_at': now,
-                'message': "Queued Windows 11 24H2 assessment"
-            })
-            
-            job_runs.append({
-                'job_name': windows_24h2_job_name,
-                'job_id': windows_24h2_job_id,
-                'status': 'queued',
-                'started_at': now.isoformat() + 'Z'
-            })
-            
+            batch = enqueue_batch(session, job_names, priority,
+                                  message=f"Starting collectors: {', '.join(collectors)}")
             session.commit()
-            
-            # Execute collectors INDEPENDENTLY - don't cancel one if another fails
-            # Load environment variables from primary source for subprocess
-            import subprocess as sp_module
-            env = os.environ.copy()
-            
-            # Try to load from primary dashboard .env file (preferred)
-            primary_env_file = '/opt/dashboard-project/es-dashboards/.env'
-            local_env_file = '/opt/es-inventory-hub/.env'
-            
-            # Load environment variables into dict
-            env_vars = {}
-            for env_file in [primary_env_file, local_env_file]:
-                if os.path.exists(env_file):
-                    try:
-                        with open(env_file, 'r') as f:
-                            for line in f:
-                                line = line.strip()
-                                if line and not line.startswith('#') and '=' in line:
-                                    key, value = line.split('=', 1)
-                                    env_vars[key.strip()] = value.strip()
-                    except Exception as e:
-                        pass  # Continue if file can't be read
-            
-            # Merge loaded env vars into subprocess environment
-            env.update(env_vars)
-            
-            failed_jobs = []
-            successful_jobs = []
-            
-            # Only execute actual collectors (ninja, threatlocker)
-            actual_collectors = [c for c in collectors if c in ['ninja', 'threatlocker']]
-            
-            for collector in actual_collectors:
-                try:
-                    # Find the job for this collector
-                    current_job = None
-                    for job in job_runs:
-                        if job['job_name'] == f'{collector}-collector':
-                            current_job = job
-                            break
-                    
-                    if not current_job:
-                        continue
-                    
-                    # Update job to running
-                    from api.progress_tracker import update_job_progress
-                    update_job_progress(current_job['job_id'], 'running', 10, f'{collector.title()} collector started')
-                    
-                    # Execute collector with environment variables
-                    if collector == 'ninja':
-                        result = subprocess.run([
-                            '/opt/es-inventory-hub/.venv/bin/python', '-m', 'collectors.ninja.main'
-                        ], cwd='/opt/es-inventory-hub', capture_output=True, text=True, timeout=600, env=env)
-                    elif collector == 'threatlocker':
-                        result = subprocess.run([
-                            '/opt/es-inventory-hub/.venv/bin/python', '-m', 'collectors.threatlocker.main'
-                        ], cwd='/opt/es-inventory-hub', capture_output=True, text=True, timeout=600, env=env)
-                    else:
-                        raise ValueError(f"Unknown collector: {collector}")
-                    
-                    # Check result and update status
-                    if result.returncode == 0:
-                        update_job_progress(current_job['job_id'], 'completed', 100, f'{collector.title()} collector completed successfully')
-                        successful_jobs.append(f'{collector}-collector')
-                    else:
-                        error_msg = f'{collector.title()} collector failed: {result.stderr}'
-                        update_job_progress(current_job['job_id'], 'failed', 0, error_msg)
-                        failed_jobs.append(f'{collector}-collector')
-                        
-                except subprocess.TimeoutExpired:
-                    error_msg = f'{collector.title()} collector timed out after 10 minutes'
-                    update_job_progress(current_job['job_id'], 'failed', 0, error_msg)
-                    failed_jobs.append(f'{collector}-collector')
-                    
-                except Exception as e:
-                    error_msg = f'Error running {collector} collector: {str(e)}'
-                    update_job_progress(current_job['job_id'], 'failed', 0, error_msg)
-                    failed_jobs.append(f'{collector}-collector')
-            
-            # Determine if batch failed (all collectors failed)
-            batch_failed = len(successful_jobs) == 0 and len(failed_jobs) > 0
-            
-            # Execute cross-vendor checks if at least one collector succeeded
-            if run_cross_vendor and len(successful_jobs) > 0:
-                try:
-                    # Find the cross-vendor job
-                    cross_vendor_job = None
-                    for job in job_runs:
-                        if job['job_name'] == 'cross-vendor-checks':
-                            cross_vendor_job = job
-                            break
-                    
-                    if cross_vendor_job:
-                        # Update job to running
-                        from api.progress_tracker import update_job_progress
-                        update_job_progress(cross_vendor_job['job_id'], 'running', 10, 'Cross-vendor checks started')
-                        
-                        # Run cross-vendor checks
-                        python_code = """
-import sys
-sys.path.append('/opt/es-inventory-hub')
-from collectors.checks.cross_vendor import run_cross_vendor_checks
-from common.db import session_scope
-from datetime import date
-
-try:
-    with session_scope() as session:
-        results = run_cross_vendor_checks(session, date.today())
-        print(f'SUCCESS: {results}')
-except Exception as e:
-    print(f'ERROR: {e}')
-    sys.exit(1)
-"""
-                        
-                        result = subprocess.run([
-                            '/opt/es-inventory-hub/.venv/bin/python', '-c', python_code
-                        ], cwd='/opt/es-inventory-hub', capture_output=True, text=True, timeout=300)
-                        
-                        if result.returncode == 0:
-                            update_job_progress(cross_vendor_job['job_id'], 'completed', 100, 'Cross-vendor checks completed successfully')
-                        else:
-                            update_job_progress(cross_vendor_job['job_id'], 'failed', 0, f'Cross-vendor checks failed: {result.stderr}')
-                            batch_failed = True
-                            failed_jobs.append('cross-vendor-checks')
-                            
-                except Exception as e:
-                    # Update job to failed
-                    for job in job_runs:
-                        if job['job_name'] == 'cross-vendor-checks':
-                            from api.progress_tracker import update_job_progress
-                            update_job_progress(job['job_id'], 'failed', 0, f'Error starting cross-vendor checks: {str(e)}')
-                            batch_failed = True
-                            failed_jobs.append('cross-vendor-checks')
-                            break
-            elif run_cross_vendor and len(successful_jobs) == 0:
-                # Mark cross-vendor as cancelled (no collectors succeeded)
-                for job in job_runs:
-                    if job['job_name'] == 'cross-vendor-checks':
-                        from api.progress_tracker import update_job_progress
-                        update_job_progress(job['job_id'], 'cancelled', 0, 'Cancelled - no collectors succeeded')
-                        break
-            
-            # Execute Windows 11 24H2 assessment if at least one collector succeeded
-            if len(successful_jobs) > 0:
-                try:
-                    # Find the Windows 11 24H2 assessment job
-                    windows_24h2_job = None
-                    for job in job_runs:
-                        if job['job_name'] == 'windows-11-24h2-assessment':
-                            windows_24h2_job = job
-                            break
-                    
-                    if windows_24h2_job:
-                        # Update job to running
-                        from api.progress_tracker import update_job_progress
-                        update_job_progress(windows_24h2_job['job_id'], 'running', 10, 'Windows 11 24H2 assessment started')
-                        
-                        # Run Windows 11 24H2 assessment
-                        result = subprocess.run([
-                            '/opt/es-inventory-hub/.venv/bin/python', '/opt/es-inventory-hub/collectors/assessments/windows_11_24h2_assessment.py'
-                        ], cwd='/opt/es-inventory-hub', capture_output=True, text=True, timeout=300)
-                        
-                        if result.returncode == 0:
-                            update_job_progress(windows_24h2_job['job_id'], 'completed', 100, 'Windows 11 24H2 assessment completed successfully')
-                        else:
-                            update_job_progress(windows_24h2_job['job_id'], 'failed', 0, f'Windows 11 24H2 assessment failed: {result.stderr}')
-                            batch_failed = True
-                            failed_jobs.append('windows-11-24h2-assessment')
-                            
-                except Exception as e:
-                    # Update job to failed
-                    for job in job_runs:
-                        if job['job_name'] == 'windows-11-24h2-assessment':
-                            from api.progress_tracker import update_job_progress
-                            update_job_progress(job['job_id'], 'failed', 0, f'Error starting Windows 11 24H2 assessment: {str(e)}')
-                            batch_failed = True
-                            failed_jobs.append('windows-11-24h2-assessment')
-                            break
-            else:
-                # Mark Windows 11 24H2 assessment as cancelled (no collectors succeeded)
-                for job in job_runs:
-                    if job['job_name'] == 'windows-11-24h2-assessment':
-                        from api.progress_tracker import update_job_progress
-                        update_job_progress(job['job_id'], 'cancelled', 0, 'Cancelled - no collectors succeeded')
-                        break
-            
-            # Update batch status based on results
-            # Batch is successful if at least one collector succeeded
-            batch_status = 'completed' if len(successful_jobs) > 0 else 'failed'
-            if len(successful_jobs) > 0 and len(failed_jobs) > 0:
-                batch_message = f'Partial success: {len(successful_jobs)} collector(s) succeeded, {len(failed_jobs)} failed: {", ".join(failed_jobs)}'
-            elif len(successful_jobs) > 0:
-                batch_message = 'All collectors completed successfully'
-            else:
-                batch_message = f'All collectors failed: {", ".join(failed_jobs)}'
-            
-            # Update batch status in database
-            batch_update_query = text("""
-                UPDATE job_batches 
-                SET status = :status, message = :message, ended_at = :ended_at
-                WHERE batch_id = :batch_id
-            """)
-            session.execute(batch_update_query, {
-                'status': batch_status,
-                'message': batch_message,
-                'ended_at': datetime.utcnow(),
-                'batch_id': batch_id
-            })
-            session.commit()
-            
+        job_queue.notify()
+        
         return jsonify({
-                'batch_id': batch_id,
-                'status': batch_status,
-                'message': batch_message,
-                'failed_jobs': failed_jobs,
-                'collectors': job_runs
-            }), 201
+            'batch_id': batch['batch_id'],
+            'status': 'queued',
+            'message': f"Queued {len(batch['collectors'])} job(s)",
+            'failed_jobs': [],
+            'collectors': batch['collectors'],
+            'status_url': f"/api/collectors/runs/batch/{batch['batch_id']}"
+        }), 201
             
     except Exception as e:
-        # If we have a batch_id, mark it as failed
-        if 'batch_id' in locals():
-            try:
-                with get_session() as session:
-                    batch_update_query = text("""
-                        UPDATE job_batches 
-                        SET status = 'failed', message = :message, ended_at = :ended_at
-                        WHERE batch_id = :batch_id
-                    """)
-                    session.execute(batch_update_query, {
-                        'message': f'Batch failed due to system error: {str(e)}',
-                        'ended_at': datetime.utcnow(),
-                        'batch_id': batch_id
-                    })
-                    session.commit()
-            except:
-                pass  # Don't fail on cleanup errors
-        
         return jsonify({
             'success': False,
             'error': f'System error: {str(e)}',
-            'batch_id': batch_id if 'batch_id' in locals() else None
+            'batch_id': None
         }), 500
 
 @app.route('/api/collectors/status', methods=['GET'])
@@ -1182,86 +622,16 @@ def get_collection_history():
             'generated_at': datetime.now().isoformat()
         })
 
-def cleanup_stale_jobs(session):
-    """
-    Detect and clean up stale running jobs that have no active process.
-    Returns list of cleaned up job IDs.
-    """
-    cleaned_jobs = []
-    
-    # Find jobs that have been "running" for more than 10 minutes
-    stale_query = text("""
-        SELECT 
-            job_id,
-            job_name,
-            started_at,
-            EXTRACT(EPOCH FROM (NOW() - started_at))::int as seconds_running
-        FROM job_runs
-        WHERE status IN ('running', 'queued')
-        AND started_at < NOW() - INTERVAL '10 minutes'
-        AND job_name IN ('ninja-collector', 'threatlocker-collector')
-    """)
-    
-    stale_jobs = session.execute(stale_query).fetchall()
-    
-    for job_id, job_name, started_at, seconds_running in stale_jobs:
-        # Check if process is actually running
-        process_running = False
-        
-        # Check for Python collector process
-        try:
-            if job_name == 'ninja-collector':
-                proc_check = subprocess.run([
-                    'pgrep', '-f', 'collectors.ninja.main'
-                ], capture_output=True, text=True)
-            elif job_name == 'threatlocker-collector':
-                proc_check = subprocess.run([
-                    'pgrep', '-f', 'collectors.threatlocker.main'
-                ], capture_output=True, text=True)
-            else:
-                proc_check = None
-            
-            if proc_check and proc_check.returncode == 0:
-                process_running = True
-        except:
-            pass
-        
-        # If no process is running, mark job as failed
-        if not process_running:
-            update_query = text("""
-                UPDATE job_runs
-                SET status = 'failed',
-                    message = 'Job appears to have failed or was interrupted - no process found running',
-                    ended_at = NOW(),
-                    updated_at = NOW()
-                WHERE job_id = :job_id
-            """)
-            session.execute(update_query, {'job_id': job_id})
-            cleaned_jobs.append({
-                'job_id': job_id,
-                'job_name': job_name,
-                'started_at': started_at.isoformat() if started_at else None,
-                'seconds_running': seconds_running,
-                'reason': 'No active process found'
-            })
-    
-    if cleaned_jobs:
-        session.commit()
-    
-    return cleaned_jobs
-
 @app.route('/api/collectors/progress', methods=['GET'])
 def get_collection_progress():
     """
     Get real-time collection progress if collectors are currently running.
-    Automatically cleans up stale running jobs.
+    Stale runs are failed by the job queue's background sweeper, not here;
+    /api/collectors/events streams the same changes without polling.
     
     Returns progress information for active collection jobs.
     """
     with get_session() as session:
-        # Clean up stale jobs first
-        cleaned_jobs = cleanup_stale_jobs(session)
-        
         # Check for active collections
         query = text("""
             SELECT 
@@ -1269,7 +639,8 @@ def get_collection_progress():
                 job_name,
                 started_at,
                 status,
-                message
+                message,
+                claimed_by
             FROM job_runs
             WHERE job_name IN ('ninja-collector', 'threatlocker-collector')
             AND status IN ('running', 'queued')
@@ -1282,10 +653,10 @@ def get_collection_progress():
         # Check systemd service status for additional info
         active_collections = []
         for row in results:
-            job_id, job_name, started_at, status, message = row
+            job_id, job_name, started_at, status, message, claimed_by = row
             
-            # Check if process is actually running
-            process_running = False
+            # Check if process is actually running; queue jobs run inside an API worker
+            process_running = claimed_by is not None and status == 'running'
             try:
                 if job_name == 'ninja-collector':
                     proc_check = subprocess.run([
@@ -1338,7 +709,8 @@ def get_collection_progress():
         return jsonify({
             'active_collections': active_collections,
             'total_active': len(active_collections),
-            'cleaned_stale_jobs': cleaned_jobs,
+            # Kept for older dashboards; cleanup runs in the background now
+            'cleaned_stale_jobs': [],
             'generated_at': datetime.now().isoformat()
         })
 
@@ -1356,6 +728,7 @@ def cleanup_stale_jobs_endpoint():
     try:
         with get_session() as session:
             cleaned_jobs = cleanup_stale_jobs(session)
+            session.commit()
             
             return jsonify({
                 'success': True,
@@ -1369,66 +742,200 @@ def cleanup_stale_jobs_endpoint():
             'error': str(e)
         }), 500
 
+def _job_status(job) -> Dict[str, Any]:
+    """Format a job_runs row for the run tracking endpoints."""
+    return {
+        'job_name': job.job_name,
+        'job_id': job.job_id,
+        'status': job.status,
+        'started_at': job.started_at.isoformat() + 'Z' if job.started_at else None,
+        'updated_at': job.updated_at.isoformat() + 'Z' if job.updated_at else None,
+        'ended_at': job.ended_at.isoformat() + 'Z' if job.ended_at else None,
+        'progress_percent': job.progress_percent,
+        'message': job.message,
+        'error': job.error,
+        'duration_seconds': job.duration_seconds
+    }
+
+def _batch_status(session, batch_id: str) -> Optional[Dict[str, Any]]:
+    """Build the batch status document, or None if the batch does not exist."""
+    batch_query = text("""
+        SELECT batch_id, created_at, status, priority, started_at, ended_at, 
+               progress_percent, estimated_completion, message, error, duration_seconds
+        FROM job_batches 
+        WHERE batch_id = :batch_id
+    """)
+    batch_result = session.execute(batch_query, {'batch_id': batch_id}).fetchone()
+    
+    if not batch_result:
+        return None
+    
+    # Get job runs for this batch
+    jobs_query = text("""
+        SELECT job_id, job_name, status, started_at, updated_at, ended_at,
+               progress_percent, message, error, duration_seconds
+        FROM job_runs 
+        WHERE batch_id = :batch_id
+        ORDER BY started_at
+    """)
+    jobs_results = session.execute(jobs_query, {'batch_id': batch_id}).fetchall()
+    
+    return {
+        'batch_id': batch_result.batch_id,
+        'status': batch_result.status,
+        'progress_percent': batch_result.progress_percent,
+        'estimated_completion': batch_result.estimated_completion.isoformat() + 'Z' if batch_result.estimated_completion else None,
+        'started_at': batch_result.started_at.isoformat() + 'Z' if batch_result.started_at else None,
+        'updated_at': datetime.utcnow().isoformat() + 'Z',
+        'ended_at': batch_result.ended_at.isoformat() + 'Z' if batch_result.ended_at else None,
+        'message': batch_result.message,
+        'error': batch_result.error,
+        'collectors': [_job_status(job) for job in jobs_results],
+        'duration_seconds': batch_result.duration_seconds
+    }
+
 @app.route('/api/collectors/runs/batch/<batch_id>', methods=['GET', 'OPTIONS'])
 def get_batch_status(batch_id):
     """Get status of a specific batch run."""
     try:
         with get_session() as session:
-            # Get batch info
-            batch_query = text("""
-                SELECT batch_id, created_at, status, priority, started_at, ended_at, 
-                       progress_percent, estimated_completion, message, error, duration_seconds
-                FROM job_batches 
-                WHERE batch_id = :batch_id
-            """)
-            batch_result = session.execute(batch_query, {'batch_id': batch_id}).fetchone()
+            batch = _batch_status(session, batch_id)
+        
+        if batch is None:
+            return jsonify({'error': 'Batch not found'}), 404
+        
+        return jsonify(batch)
             
-            if not batch_result:
-                return jsonify({'error': 'Batch not found'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/collectors/events', methods=['GET'])
+def collector_events():
+    """
+    Stream collector job and batch changes as Server-Sent Events.
+    
+    Query params:
+        batch_id: Only this batch's events; the stream ends with the batch
+        collectors: Only these collectors' job events (e.g. 'ninja,threatlocker')
+    
+    The stream opens with a 'snapshot' event (the batch status document, or
+    all queued/running jobs) followed by 'job' and 'batch' events as rows
+    change. Another 'snapshot' follows whenever events may have been missed.
+    """
+    batch_id = request.args.get('batch_id')
+    collectors_param = request.args.get('collectors')
+    job_names = None
+    if collectors_param:
+        job_names = {f"{c.strip()}-collector" for c in collectors_param.split(',') if c.strip()}
+    
+    def snapshot() -> Optional[Dict[str, Any]]:
+        with get_session() as session:
+            if batch_id:
+                return _batch_status(session, batch_id)
             
-            # Get job runs for this batch
-            jobs_query = text("""
-                SELECT job_id, job_name, status, started_at, updated_at, ended_at,
+            jobs = session.execute(text("""
+                SELECT job_id, batch_id, job_name, status, started_at, updated_at, ended_at,
                        progress_percent, message, error, duration_seconds
-                FROM job_runs 
-                WHERE batch_id = :batch_id
+                FROM job_runs
+                WHERE status IN ('queued', 'running')
                 ORDER BY started_at
-            """)
-            jobs_results = session.execute(jobs_query, {'batch_id': batch_id}).fetchall()
-            
-            # Format response
-            collectors = []
-            for job in jobs_results:
-                collectors.append({
-                    'job_name': job.job_name,
-                    'job_id': job.job_id,
-                    'status': job.status,
-                    'started_at': job.started_at.isoformat() + 'Z' if job.started_at else None,
-                    'updated_at': job.updated_at.isoformat() + 'Z' if job.updated_at else None,
-                    'ended_at': job.ended_at.isoformat() + 'Z' if job.ended_at else None,
-                    'progress_percent': job.progress_percent,
-                    'message': job.message,
-                    'error': job.error,
-                    'duration_seconds': job.duration_seconds
-                })
+            """)).fetchall()
+            return {
+                'active_jobs': [
+                    dict(_job_status(job), batch_id=job.batch_id)
+                    for job in jobs if job_names is None or job.job_name in job_names
+                ],
+                'generated_at': datetime.now().isoformat()
+            }
+    
+    def wanted(event: Dict[str, Any]) -> bool:
+        if batch_id:
+            return event.get('batch_id') == batch_id
+        if job_names is not None:
+            return event['type'] == 'job' and event.get('job_name') in job_names
+        return True
+    
+    subscriber = job_events.subscribe()
+    if subscriber is None:
+        return jsonify({'error': 'Too many event stream clients; poll /api/collectors/runs instead'}), 503
+    
+    # Subscribed before reading the snapshot, so no change falls in between
+    try:
+        state = snapshot()
+    except Exception as e:
+        job_events.unsubscribe(subscriber)
+        return jsonify({'error': str(e)}), 500
+    if batch_id and state is None:
+        job_events.unsubscribe(subscriber)
+        return jsonify({'error': 'Batch not found'}), 404
+    
+    def generate():
+        yield format_sse('snapshot', state)
+        if batch_id and state['status'] in TERMINAL_STATUSES:
+            return
+        
+        while True:
+            try:
+                event = subscriber.get(timeout=JOB_EVENTS_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                yield ': keepalive\n\n'
+                continue
             
-            return jsonify({
-                'batch_id': batch_result.batch_id,
-                'status': batch_result.status,
-                'progress_percent': batch_result.progress_percent,
-                'estimated_completion': batch_result.estimated_completion.isoformat() + 'Z' if batch_result.estimated_completion else None,
-                'started_at': batch_result.started_at.isoformat() + 'Z' if batch_result.started_at else None,
-                'updated_at': datetime.utcnow().isoformat() + 'Z',
-                'ended_at': batch_result.ended_at.isoformat() + 'Z' if batch_result.ended_at else None,
-                'message': batch_result.message,
-                'error': batch_result.error,
-                'collectors': collectors,
-                'duration_seconds': batch_result.duration_seconds
-            })
+            if event['type'] == 'resync':
+                current = snapshot()
+                yield format_sse('snapshot', current)
+                if batch_id and (current is None or current['status'] in TERMINAL_STATUSES):
+                    return
+                continue
             
+            if not wanted(event):
+                continue
+            yield format_sse(event['type'], event)
+            if batch_id and event['type'] == 'batch' and event['status'] in TERMINAL_STATUSES:
+                return
+    
+    response = sse_response(generate())
+    # Runs whether or not the client read the stream to the end
+    response.call_on_close(lambda: job_events.unsubscribe(subscriber))
+    return response
+
+@app.route('/api/collectors/runs/batch/<batch_id>/cancel', methods=['POST'])
+def cancel_batch_run(batch_id):
+    """
+    Cancel a queued or running batch.
+    
+    Queued jobs are cancelled immediately. Running collectors stop at their
+    next stage boundary; the batch stays 'cancelling' until they have.
+    """
+    try:
+        with get_session() as session:
+            result = cancel_batch(session, batch_id)
+            session.commit()
+        
+        if result is None:
+            return jsonify({'error': 'Batch not found'}), 404
+        
+        return jsonify(result)
+        
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _queue_jobs(job_names: List[str], message: str, **extra):
+    """Queue a batch of jobs and build the 202 response for a run endpoint."""
+    with get_session() as session:
+        batch = enqueue_batch(session, job_names, 'high', message=message)
+        session.commit()
+    job_queue.notify()
+    
+    return jsonify({
+        'success': True,
+        'message': message,
+        'batch_id': batch['batch_id'],
+        'jobs': batch['collectors'],
+        'status_url': f"/api/collectors/runs/batch/{batch['batch_id']}",
+        **extra
+    }), 202
+
 @app.route('/api/collectors/runs/latest', methods=['GET', 'OPTIONS'])
 def get_latest_runs():
     """Get latest active or most recent terminal runs for specified collectors."""
@@ -1611,21 +1118,45 @@ def get_docs_index():
         "base_url": "https://db-api.enersystems.com:5400"
         })
 
+# Columns /api/exceptions can return (fields=); sort order for its keyset cursor
+EXCEPTION_FIELDS = ['id', 'date_found', 'type', 'hostname', 'details', 'resolved',
+                    'first_seen', 'last_seen', 'variance_status']
+EXCEPTION_DEFAULT_FIELDS = ['id', 'date_found', 'type', 'hostname', 'details', 'resolved']
+EXCEPTION_ORDER = [('last_seen', 'DESC'), ('type', 'ASC'), ('hostname', 'ASC'), ('id', 'ASC')]
+
 @app.route('/api/exceptions', methods=['GET'])
 def get_exceptions():
-    """Get exceptions with filtering options."""
+    """
+    Get exceptions with filtering options.
+    
+    Query parameters:
+    - type, resolved: Filters
+    - limit: Page size (default 100, max 1000)
+    - cursor: Next page, from the previous page's X-Next-Cursor header
+    - offset: Legacy offset paging (ignored with cursor)
+    - fields: Comma-separated columns to return (default: id, date_found,
+      type, hostname, details, resolved)
+    """
     # Parse query parameters
     exception_type = request.args.get('type')
     resolved = request.args.get('resolved')
-    limit = int(request.args.get('limit', 100))
-    offset = int(request.args.get('offset', 0))
+    try:
+        limit, cursor = page_params(100, 1000)
+        fields = parse_fields(EXCEPTION_FIELDS, EXCEPTION_DEFAULT_FIELDS)
+        offset = int(request.args.get('offset', 0))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # The sort columns are always read so the cursor can be built
+    sort_columns = [column for column, _ in EXCEPTION_ORDER]
+    columns = fields + [column for column in sort_columns if column not in fields]
     
     with get_session() as session:
-        query = text("""
-            SELECT id, date_found, type, hostname, details, resolved
+        query = f"""
+            SELECT {', '.join(columns)}
             FROM exceptions
             WHERE 1=1
-        """)
+        """
         
         params = {}
         
@@ -1637,21 +1168,42 @@ def get_exceptions():
             query += " AND resolved = :resolved"
             params['resolved'] = resolved.lower() == 'true'
         
-        query += " ORDER BY date_found DESC, type, hostname"
+        if cursor:
+            try:
+                condition, cursor_params = keyset_condition(
+                    EXCEPTION_ORDER, decode_cursor(cursor, len(EXCEPTION_ORDER))
+                )
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            query += f" AND {condition}"
+            params.update(cursor_params)
+            offset = 0
+        
+        query += f" ORDER BY {order_by_clause(EXCEPTION_ORDER)}"
         query += " LIMIT :limit OFFSET :offset"
-        params['limit'] = limit
+        params['limit'] = limit + 1
         params['offset'] = offset
         
-        exceptions = session.execute(query, params).fetchall()
-        
-        return jsonify([{
-            'id': exc[0],
-            'date_found': exc[1].isoformat(),
-            'type': exc[2],
-            'hostname': exc[3],
-            'details': exc[4],
-            'resolved': exc[5]
-        } for exc in exceptions])
+        rows = session.execute(text(query), params).mappings().fetchall()
+        rows, next_cursor = split_page(rows, limit, lambda row: [row[column] for column in sort_columns])
+        
+        exceptions = []
+        for row in rows:
+            item = {}
+            for field in fields:
+                value = row[field]
+                item[field] = value.isoformat() if isinstance(value, date) else value
+            exceptions.append(item)
+        
+        # The body stays a plain list; the cursor travels in headers
+        response = jsonify(exceptions)
+        if next_cursor:
+            next_args = request.args.to_dict()
+            next_args['cursor'] = next_cursor
+            next_args.pop('offset', None)
+            response.headers['X-Next-Cursor'] = next_cursor
+            response.headers['Link'] = f'<{request.path}?{urlencode(next_args)}>; rel="next"'
+        return response
 
 @app.route('/api/exceptions/<int:exception_id>/resolve', methods=['POST'])
 def resolve_exception(exception_id: int):
@@ -1665,16 +1217,18 @@ def resolve_exception(exception_id: int):
             UPDATE exceptions
             SET resolved = TRUE, resolved_date = CURRENT_DATE, resolved_by = :resolved_by
             WHERE id = :exception_id
+            RETURNING first_seen, last_seen
         """)
         
         result = session.execute(query, {
             'exception_id': exception_id,
             'resolved_by': resolved_by
         })
+        updated_count = record_changed_rows(session, result)
         
         session.commit()
         
-        if result.rowcount == 0:
+        if updated_count == 0:
             return jsonify({'error': 'Exception not found'}), 404
         
         return jsonify({'success': True, 'message': 'Exception resolved'})
@@ -1714,15 +1268,17 @@ def mark_exception_manually_fixed(exception_id: int):
                 new_value = :new_value,
                 variance_status = 'manually_fixed'
             WHERE id = :exception_id
+            RETURNING first_seen, last_seen
         """)
         
-        session.execute(update_query, {
+        updated = session.execute(update_query, {
             'exception_id': exception_id,
             'updated_by': updated_by,
             'update_type': update_type,
             'old_value': json.dumps(old_value),
             'new_value': json.dumps(new_value)
         })
+        record_changed_rows(session, updated)
         
         session.commit()
         
@@ -1767,7 +1323,7 @@ def mark_exception_fixed_by_hostname():
             FROM exceptions 
             WHERE hostname = :hostname 
             AND type = :exception_type
-            AND date_found = CURRENT_DATE
+            AND closed_date IS NULL
             ORDER BY id DESC
         """)
         
@@ -1803,7 +1359,8 @@ def mark_exception_fixed_by_hostname():
                 WHERE hostname = :hostname 
                 AND type = :exception_type
                 AND resolved = FALSE
-                AND date_found = CURRENT_DATE
+                AND closed_date IS NULL
+                RETURNING first_seen, last_seen
             """)
             
             result = session.execute(update_query, {
@@ -1814,15 +1371,16 @@ def mark_exception_fixed_by_hostname():
                 'old_value': json.dumps(old_value),
                 'new_value': json.dumps(new_value)
             })
+            updated_count = record_changed_rows(session, result)
             
             session.commit()
             
             return jsonify({
                 'success': True,
-                'message': f'Marked {result.rowcount} exceptions as manually fixed',
+                'message': f'Marked {updated_count} exceptions as manually fixed',
                 'hostname': hostname,
                 'type': exception_type,
-                'exceptions_updated': result.rowcount,
+                'exceptions_updated': updated_count,
                 'updated_by': updated_by,
                 'updated_at': datetime.now().isoformat(),
                 'status': 'updated'
@@ -1872,6 +1430,7 @@ def bulk_update_exceptions():
                     manually_updated_by = :updated_by,
                     variance_status = 'manually_fixed'
                 WHERE id = ANY(:exception_ids)
+                RETURNING first_seen, last_seen
             """)
         elif action == 'resolve':
             query = text("""
@@ -1881,6 +1440,7 @@ def bulk_update_exceptions():
                     resolved_date = CURRENT_DATE,
                     resolved_by = :updated_by
                 WHERE id = ANY(:exception_ids)
+                RETURNING first_seen, last_seen
             """)
         elif action == 'reset_status':
             query = text("""
@@ -1890,19 +1450,21 @@ def bulk_update_exceptions():
                     manually_updated_at = NULL,
                     manually_updated_by = NULL
                 WHERE id = ANY(:exception_ids)
+                RETURNING first_seen, last_seen
             """)
         
         result = session.execute(query, {
             'exception_ids': exception_ids,
             'updated_by': updated_by
         })
+        updated_count = record_changed_rows(session, result)
         
         session.commit()
         
         return jsonify({
             'success': True,
             'message': f'Bulk {action} completed',
-            'updated_count': result.rowcount,
+            'updated_count': updated_count,
             'exception_ids': exception_ids,
             'updated_by': updated_by
         })
@@ -1910,70 +1472,31 @@ def bulk_update_exceptions():
 @app.route('/api/collectors/threatlocker/run', methods=['POST'])
 def run_threatlocker_collector():
     """
-    Run the ThreatLocker collector script via API.
+    Queue a ThreatLocker collector run via API.
     
     This endpoint allows the dashboard to trigger the ThreatLocker collector
-    to refresh all device data from the ThreatLocker API.
+    to refresh all device data from the ThreatLocker API. The run is queued
+    on the job queue; poll the returned status_url for the outcome.
     """
     data = request.get_json() or {}
     force_refresh = data.get('force_refresh', False)
     organization_id = data.get('organization_id', None)
     
     try:
-        import subprocess
-        import sys
-        import os
-        
-        # Change to the project directory
-        project_dir = '/opt/es-inventory-hub'
-        
-        # Build the command
-        cmd = [sys.executable, '-m', 'collectors.threatlocker.main']
-        
-        # Add any additional parameters if needed
-        if organization_id:
-            cmd.extend(['--organization', organization_id])
-        
-        # Run the collector
-        result = subprocess.run(
-            cmd,
-            cwd=project_dir,
-            capture_output=True,
-            text=True,
-            timeout=300  # 5 minute timeout
+        return _queue_jobs(
+            ['threatlocker-collector'], 'ThreatLocker collector queued',
+            force_refresh=force_refresh, organization_id=organization_id
         )
-        
-        if result.returncode == 0:
-            return jsonify({
-                'success': True,
-                'message': 'ThreatLocker collector completed successfully',
-                'output': result.stdout,
-                'force_refresh': force_refresh,
-                'organization_id': organization_id
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'message': 'ThreatLocker collector failed',
-                'error': result.stderr,
-                'return_code': result.returncode
-            }), 500
-            
-    except subprocess.TimeoutExpired:
-        return jsonify({
-            'success': False,
-            'message': 'ThreatLocker collector timed out after 5 minutes'
-        }), 500
     except Exception as e:
         return jsonify({
             'success': False,
-            'message': f'Failed to run ThreatLocker collector: {str(e)}'
+            'message': f'Failed to queue ThreatLocker collector: {str(e)}'
         }), 500
 
 @app.route('/api/collectors/cross-vendor/run', methods=['POST'])
 def run_cross_vendor_checks():
     """
-    Run the cross-vendor consistency checks via API.
+    Queue the cross-vendor consistency checks via API.
     
     This endpoint allows the dashboard to trigger cross-vendor checks
     to update variance data after collector runs.
@@ -1982,177 +1505,38 @@ def run_cross_vendor_checks():
     force_refresh = data.get('force_refresh', False)
     
     try:
-        import sys
-        import os
-        
-        # Change to the project directory
-        project_dir = '/opt/es-inventory-hub'
-        
-        # Build the Python command to run cross-vendor checks
-        python_code = """
-import sys
-sys.path.append('/opt/es-inventory-hub')
-from collectors.checks.cross_vendor import run_cross_vendor_checks
-from common.db import session_scope
-from datetime import date
-
-try:
-    with session_scope() as session:
-        results = run_cross_vendor_checks(session, date.today())
-        print(f'SUCCESS: {results}')
-except Exception as e:
-    print(f'ERROR: {e}')
-    import traceback
-    traceback.print_exc()
-    sys.exit(1)
-"""
-        
-        # Run the cross-vendor checks
-        result = subprocess.run(
-            [sys.executable, '-c', python_code],
-            cwd=project_dir,
-            capture_output=True,
-            text=True,
-            timeout=120  # 2 minute timeout
+        return _queue_jobs(
+            ['cross-vendor-checks'], 'Cross-vendor checks queued',
+            force_refresh=force_refresh
         )
-        
-        if result.returncode == 0:
-            return jsonify({
-                'success': True,
-                'message': 'Cross-vendor checks completed successfully',
-                'output': result.stdout,
-                'force_refresh': force_refresh
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'message': 'Cross-vendor checks failed',
-                'error': result.stderr,
-                'return_code': result.returncode
-            }), 500
-            
-    except subprocess.TimeoutExpired:
-        return jsonify({
-            'success': False,
-            'message': 'Cross-vendor checks timed out after 2 minutes'
-        }), 500
     except Exception as e:
         return jsonify({
             'success': False,
-            'message': f'Failed to run cross-vendor checks: {str(e)}'
+            'message': f'Failed to queue cross-vendor checks: {str(e)}'
         }), 500
 
 @app.route('/api/collectors/sequence/run', methods=['POST'])
 def run_collector_sequence():
     """
-    Run the complete collector sequence in proper order via API.
+    Queue the complete collector sequence in proper order via API.
     
     This endpoint runs: ThreatLocker collector → cross-vendor checks
-    to ensure complete data refresh and variance update.
+    to ensure complete data refresh and variance update. The checks only
+    run if the collector succeeds.
     """
     data = request.get_json() or {}
     force_refresh = data.get('force_refresh', False)
     organization_id = data.get('organization_id', None)
     
     try:
-        import subprocess
-        import sys
-        import os
-        
-        # Change to the project directory
-        project_dir = '/opt/es-inventory-hub'
-        results = []
-        
-        # Step 1: Run ThreatLocker collector
-        cmd1 = [sys.executable, '-m', 'collectors.threatlocker.main']
-        if organization_id:
-            cmd1.extend(['--organization', organization_id])
-        
-        result1 = subprocess.run(
-            cmd1,
-            cwd=project_dir,
-            capture_output=True,
-            text=True,
-            timeout=300
-        )
-        
-        if result1.returncode != 0:
-            return jsonify({
-                'success': False,
-                'message': 'ThreatLocker collector failed in sequence',
-                'step': 'threatlocker_collector',
-                'error': result1.stderr,
-                'return_code': result1.returncode
-            }), 500
-        
-        results.append({
-            'step': 'threatlocker_collector',
-            'success': True,
-            'output': result1.stdout
-        })
-        
-        # Step 2: Run cross-vendor checks
-        python_code = """
-import sys
-sys.path.append('/opt/es-inventory-hub')
-from collectors.checks.cross_vendor import run_cross_vendor_checks
-from common.db import session_scope
-from datetime import date
-
-try:
-    with session_scope() as session:
-        results = run_cross_vendor_checks(session, date.today())
-        print(f'SUCCESS: {results}')
-except Exception as e:
-    print(f'ERROR: {e}')
-    import traceback
-    traceback.print_exc()
-    sys.exit(1)
-"""
-        
-        result2 = subprocess.run(
-            [sys.executable, '-c', python_code],
-            cwd=project_dir,
-            capture_output=True,
-            text=True,
-            timeout=120
+        return _queue_jobs(
+            ['threatlocker-collector', 'cross-vendor-checks'], 'Collector sequence queued',
+            force_refresh=force_refresh, organization_id=organization_id
         )
-        
-        if result2.returncode != 0:
-            return jsonify({
-                'success': False,
-                'message': 'Cross-vendor checks failed in sequence',
-                'step': 'cross_vendor_checks',
-                'error': result2.stderr,
-                'return_code': result2.returncode,
-                'completed_steps': results
-            }), 500
-        
-        results.append({
-            'step': 'cross_vendor_checks',
-            'success': True,
-            'output': result2.stdout
-        })
-        
-        return jsonify({
-            'success': True,
-            'message': 'Complete collector sequence completed successfully',
-            'steps': results,
-            'force_refresh': force_refresh,
-            'organization_id': organization_id
-        })
-        
-    except subprocess.TimeoutExpired as e:
-        return jsonify({
-            'success': False,
-            'message': f'Collector sequence timed out: {str(e)}',
-            'completed_steps': results
-        }), 500
     except Exception as e:
         return jsonify({
             'success': False,
-            'message': f'Failed to run collector sequence: {str(e)}',
-            'completed_steps': results
+            'message': f'Failed to queue collector sequence: {str(e)}'
         }), 500
 
 @app.route('/api/threatlocker/update-name', methods=['POST'])
@@ -2285,6 +1669,8 @@ def update_threatlocker_name():
                 device_identity_id=device_identity_id,
                 normalized=normalized
             )
+            refresh_count_rollups(session, vendor_id, snapshot_date)
+            record_snapshot_state(session, vendor_id, snapshot_date)
             
             session.commit()
             
@@ -2412,6 +1798,8 @@ def sync_threatlocker_device():
                 device_identity_id=device_identity_id,
                 normalized=normalized
             )
+            refresh_count_rollups(session, vendor_id, snapshot_date)
+            record_snapshot_state(session, vendor_id, snapshot_date)
             
             session.commit()
             
@@ -2434,6 +1822,7 @@ def sync_threatlocker_device():
         }), 500
 
 @app.route('/api/variance-report/filtered', methods=['GET'])
+@cached_response
 def get_filtered_variance_report():
     """
     Get filtered variance report for dashboard integration.
@@ -2441,251 +1830,20 @@ def get_filtered_variance_report():
     This endpoint provides the same data format as the Variances dashboard
     but uses Database AI's filtered exception data (only unresolved exceptions).
     This ensures both systems use the same authoritative data source.
+    The payload is precomputed at the end of each cross-vendor run.
     """
-    latest_date = get_latest_matching_date()
+    with get_session() as session:
+        report = get_report_artifact(session, 'filtered')
+        if report is not None:
+            add_read_time_status(session, report, date.fromisoformat(report["analysis_date"]))
     
-    if not latest_date:
+    if report is None:
         return jsonify({
             "error": "No matching data found between vendors",
             "status": "out_of_sync"
         }), 400
     
-    with get_session() as session:
-        # Get device counts by vendor
-        device_counts_query = text("""
-            SELECT v.name as vendor, COUNT(*) as count
-            FROM device_snapshot ds
-            JOIN vendor v ON ds.vendor_id = v.id
-            WHERE ds.snapshot_date = :report_date
-            GROUP BY v.name
-        """)
-        
-        device_counts = session.execute(device_counts_query, {'report_date': latest_date}).fetchall()
-        device_counts_dict = {row[0]: row[1] for row in device_counts}
-        
-        # Get only unresolved exceptions (filtered data)
-        exceptions_query = text("""
-            SELECT id, type, hostname, details
-            FROM exceptions
-            WHERE date_found = :report_date
-            AND resolved = FALSE
-            ORDER BY type, hostname
-        """)
-        
-        exceptions = session.execute(exceptions_query, {'report_date': latest_date}).fetchall()
-        
-        # Group exceptions by type and organization
-        by_type = {}
-        by_organization = {}
-        
-        for exc in exceptions:
-            exc_type = exc[1]
-            hostname = exc[2]
-            details = exc[3]
-            
-            # Initialize type group
-            if exc_type not in by_type:
-                by_type[exc_type] = []
-            
-            # Get organization from details
-            org_name = details.get('tl_org_name', details.get('ninja_org_name', 'Unknown'))
-            if org_name not in by_organization:
-                by_organization[org_name] = []
-            
-            # Format exception data for dashboard
-            exception_data = {
-                "hostname": hostname,
-                "details": details,
-                "action": _get_action_for_exception_type(exc_type)
-            }
-            
-            # Add type-specific fields
-            if exc_type == 'DISPLAY_NAME_MISMATCH':
-                exception_data.update({
-                    "ninja_display_name": details.get('ninja_display_name', ''),
-                    "threatlocker_computer_name": details.get('tl_display_name', ''),
-                    "organization": org_name
-                })
-            elif exc_type == 'MISSING_NINJA':
-                exception_data.update({
-                    "threatlocker_hostname": details.get('tl_hostname', ''),
-                    "organization": org_name
-                })
-            
-            by_type[exc_type].append(exception_data)
-            by_organization[org_name].append(exception_data)
-        
-        # Calculate totals
-        total_variances = len(exceptions)
-        
-        # Build response in dashboard format
-        response = {
-            "analysis_date": latest_date.isoformat(),
-            "total_devices": {
-                "ninja": device_counts_dict.get('Ninja', 0),
-                "threatlocker": device_counts_dict.get('ThreatLocker', 0)
-            },
-            "total_variances": total_variances,
-            "data_status": get_data_status(),
-            "status": "current"
-        }
-        
-        # Add exception data by type
-        if 'DISPLAY_NAME_MISMATCH' in by_type:
-            response["display_name_mismatches"] = {
-                "total_count": len(by_type['DISPLAY_NAME_MISMATCH']),
-                "by_organization": _group_by_organization(by_type['DISPLAY_NAME_MISMATCH'])
-            }
-        
-        if 'MISSING_NINJA' in by_type:
-            response["missing_in_ninja"] = {
-                "total_count": len(by_type['MISSING_NINJA']),
-                "by_organization": _group_by_organization(by_type['MISSING_NINJA'])
-            }
-        
-        if 'DUPLICATE_TL' in by_type:
-            response["threatlocker_duplicates"] = {
-                "total_count": len(by_type['DUPLICATE_TL']),
-                "devices": by_type['DUPLICATE_TL']
-            }
-        
-        if 'SPARE_MISMATCH' in by_type:
-            response["devices_that_should_not_have_threatlocker"] = {
-                "total_count": len(by_type['SPARE_MISMATCH']),
-                "by_organization": _group_by_organization(by_type['SPARE_MISMATCH'])
-            }
-        
-        # Add actionable insights
-        response["actionable_insights"] = _generate_actionable_insights(by_type)
-        
-        # Add collection info with timezone-aware timestamps
-        collection_info = _get_collection_timestamps(session, latest_date)
-        response["collection_info"] = collection_info
-        
-        # Add data quality indicators
-        response["data_quality"] = {
-            "total_exceptions": total_variances,
-            "exception_types": list(by_type.keys()),
-            "organizations_affected": len(by_organization)
-        }
-        
-        return jsonify(response)
-
-def _get_action_for_exception_type(exc_type: str) -> str:
-    """Get recommended action for exception type."""
-    actions = {
-        'DISPLAY_NAME_MISMATCH': 'Investigate - Reconcile naming differences',
-        'MISSING_NINJA': 'Add device to Ninja or remove from ThreatLocker',
-        'DUPLICATE_TL': 'Remove duplicate ThreatLocker entries',
-        'SPARE_MISMATCH': 'Remove ThreatLocker from spare devices or update billing status',
-        'SITE_MISMATCH': 'Reconcile site assignments between vendors'
-    }
-    return actions.get(exc_type, 'Investigate and resolve')
-
-def _group_by_organization(exceptions: list) -> dict:
-    """Group exceptions by organization."""
-    by_org = {}
-    for exc in exceptions:
-        org = exc.get('organization', 'Unknown')
-        if org not in by_org:
-            by_org[org] = []
-        by_org[org].append(exc)
-    return by_org
-
-def _generate_actionable_insights(by_type: dict) -> dict:
-    """Generate actionable insights based on exception data."""
-    insights = {
-        "priority_actions": [],
-        "summary": {}
-    }
-    
-    for exc_type, exceptions in by_type.items():
-        count = len(exceptions)
-        if count > 0:
-            insights["summary"][exc_type] = count
-            
-            if exc_type == 'DISPLAY_NAME_MISMATCH' and count > 50:
-                insights["priority_actions"].append(f"High priority: {count} display name mismatches need attention")
-            elif exc_type == 'MISSING_NINJA' and count > 20:
-                insights["priority_actions"].append(f"Critical: {count} devices missing from Ninja")
-    
-    return insights
-
-
-def _get_collection_timestamps(session, latest_date: date) -> dict:
-    """Get timezone-aware collection timestamps from JobRuns table."""
-    from sqlalchemy import text
-    
-    # Query for the most recent successful collection runs
-    collection_query = text("""
-        SELECT job_name, started_at, ended_at
-        FROM job_runs 
-        WHERE status = 'completed'
-        AND job_name IN ('ninja-collector', 'threatlocker-collector')
-        ORDER BY started_at DESC
-    """)
-    
-    results = session.execute(collection_query).fetchall()
-    
-    # Initialize timestamps
-    ninja_collected = None
-    threatlocker_collected = None
-    last_collection = None
-    
-    # Process results - take the most recent for each collector type
-    for job_name, started_at, ended_at in results:
-        # Use ended_at if available, otherwise started_at
-        timestamp = ended_at if ended_at else started_at
-        
-        # Format timestamp properly (ISO 8601 with Z suffix)
-        # Remove any existing timezone info and add Z for UTC
-        if timestamp.tzinfo is not None:
-            # Convert to UTC and format
-            utc_timestamp = timestamp.astimezone().replace(tzinfo=None)
-            formatted_timestamp = utc_timestamp.isoformat() + 'Z'
-        else:
-            # Already UTC, just add Z
-            formatted_timestamp = timestamp.isoformat() + 'Z'
-        
-        # Only set if we haven't found a timestamp for this collector yet
-        # (since results are ordered by started_at DESC, first occurrence is most recent)
-        if job_name == 'ninja-collector' and ninja_collected is None:
-            ninja_collected = formatted_timestamp
-        elif job_name == 'threatlocker-collector' and threatlocker_collected is None:
-            threatlocker_collected = formatted_timestamp
-    
-    # Determine the latest collection time
-    timestamps = [t for t in [ninja_collected, threatlocker_collected] if t]
-    if timestamps:
-        # Parse timestamps and find the latest
-        parsed_times = []
-        for ts in timestamps:
-            try:
-                # Remove Z suffix and parse as datetime
-                clean_ts = ts.replace('Z', '')
-                parsed_times.append(datetime.fromisoformat(clean_ts))
-            except:
-                continue
-        
-        if parsed_times:
-            last_collection = max(parsed_times).isoformat() + 'Z'
-    
-    # Fallback to date if no specific timestamps found
-    if not last_collection:
-        last_collection = latest_date.isoformat()
-    
-    # Determine data freshness
-    today = datetime.now().date()
-    days_old = (today - latest_date).days
-    data_freshness = "current" if days_old <= 1 else "stale"
-    
-    return {
-        "last_collection": last_collection,
-        "ninja_collected": ninja_collected,
-        "threatlocker_collected": threatlocker_collected,
-        "data_freshness": data_freshness
-    }
-
+    return jsonify(report)
 
 @app.route('/api/exceptions/count', methods=['GET'])
 def get_exceptions_count():
@@ -2702,7 +1860,7 @@ def get_exceptions_count():
             FROM exceptions 
             WHERE type = :exception_type
             AND resolved = FALSE
-            AND date_found = CURRENT_DATE
+            AND first_seen <= CURRENT_DATE AND last_seen >= CURRENT_DATE
         """)
         
         total_count = session.execute(count_query, {
@@ -2732,7 +1890,7 @@ def get_exceptions_status_summary():
                 COUNT(*) as count,
                 COUNT(CASE WHEN resolved = true THEN 1 END) as resolved_count
             FROM exceptions
-            WHERE date_found = CURRENT_DATE
+            WHERE first_seen <= CURRENT_DATE AND last_seen >= CURRENT_DATE
             GROUP BY type
             ORDER BY status, type
         """)
@@ -2773,6 +1931,10 @@ def get_exceptions_status_summary():
             'generated_at': datetime.now().isoformat()
         })
 
+# Device fields /api/devices/search can return (fields=)
+DEVICE_SEARCH_FIELDS = ['vendor', 'hostname', 'display_name', 'organization_name',
+                        'snapshot_date', 'canonical_key', 'is_truncated', 'match_type']
+
 @app.route('/api/devices/search', methods=['GET'])
 def search_devices():
     """
@@ -2784,85 +1946,38 @@ def search_devices():
     Query parameters:
     - q: Search term (hostname or partial hostname)
     - vendor: Optional vendor filter ('ninja' or 'threatlocker')
-    - limit: Maximum results (default 50)
+    - limit: Maximum results per page (default 50, max 200)
+    - cursor: Next page, from the previous response's next_cursor
+    - fields: Comma-separated device fields to return (default: all)
+    
+    Results come from hostname_match_index (latest snapshot per vendor) and are
+    ranked by match type: exact, truncated (15-char prefix), prefix, contains.
     """
     search_term = request.args.get('q', '').strip()
     vendor_filter = request.args.get('vendor', '').strip().lower()
-    limit = int(request.args.get('limit', 50))
     
     if not search_term:
         return jsonify({'error': 'Search term (q) is required'}), 400
     
-    if limit > 200:
-        limit = 200  # Cap at 200 for performance
+    try:
+        limit, cursor = page_params(50, 200)  # Cap at 200 for performance
+        fields = parse_fields(DEVICE_SEARCH_FIELDS)
+        after = decode_cursor(cursor, 4) if cursor else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    vendor_names = {'ninja': 'Ninja', 'threatlocker': 'ThreatLocker'}
     
     with get_session() as session:
-        # Build the search query with multiple matching strategies
-        query = text("""
-            SELECT 
-                v.name as vendor,
-                ds.hostname,
-                ds.display_name,
-                ds.organization_name,
-                ds.snapshot_date,
-                -- Show canonical key for debugging
-                CASE 
-                    WHEN v.name = 'ThreatLocker' THEN 
-                        LOWER(LEFT(SPLIT_PART(SPLIT_PART(ds.hostname,'|',1),'.',1),15))
-                    ELSE 
-                        LOWER(LEFT(SPLIT_PART(ds.hostname,'.',1),15))
-                END as canonical_key,
-                -- Indicate if hostname is truncated
-                CASE 
-                    WHEN LENGTH(ds.hostname) = 15 AND v.name = 'Ninja' THEN true
-                    ELSE false
-                END as is_truncated
-            FROM device_snapshot ds
-            JOIN vendor v ON ds.vendor_id = v.id
-            WHERE ds.snapshot_date = (
-                SELECT MAX(snapshot_date) FROM device_snapshot
-            )
-            AND ds.hostname IS NOT NULL
-        """)
-        
-        params = {}
-        
-        # Build the complete query with all conditions
-        query_str = str(query)
-        
-        # Add vendor filter if specified
-        if vendor_filter in ['ninja', 'threatlocker']:
-            query_str += " AND v.name = :vendor_filter"
-            params['vendor_filter'] = vendor_filter.title()
-        
-        # Add search conditions - multiple strategies to handle truncation
-        query_str += """
-            AND (
-                -- Exact match
-                ds.hostname ILIKE :search_term || '%'
-                -- Contains match
-                OR ds.hostname ILIKE '%' || :search_term || '%'
-                -- Canonical key match (handles truncation)
-                OR (
-                    CASE 
-                        WHEN v.name = 'ThreatLocker' THEN 
-                            LOWER(LEFT(SPLIT_PART(SPLIT_PART(ds.hostname,'|',1),'.',1),15))
-                        ELSE 
-                            LOWER(LEFT(SPLIT_PART(ds.hostname,'.',1),15))
-                    END = LOWER(LEFT(SPLIT_PART(:search_term,'.',1),15))
-                )
-                -- Prefix match for truncated hostnames
-                OR LEFT(ds.hostname, 15) = LEFT(:search_term, 15)
-            )
-            ORDER BY v.name, ds.hostname LIMIT :limit
-        """
-        
-        # Create final query
-        query = text(query_str)
-        params['search_term'] = search_term
-        params['limit'] = limit
-        
-        results = session.execute(query, params).fetchall()
+        # Resolve via the hostname match index (exact, 15-char truncated, prefix, contains)
+        results = search_hostname_index(
+            session,
+            search_term,
+            vendor_name=vendor_names.get(vendor_filter),
+            limit=limit + 1,
+            after=after
+        )
+        results, next_cursor = split_page(results, limit, lambda row: [row[8], row[0], row[1], row[9]])
         
         # Group results by canonical key to show cross-vendor matches
         grouped_results = {}
@@ -2871,15 +1986,17 @@ def search_devices():
             if canonical_key not in grouped_results:
                 grouped_results[canonical_key] = []
             
-            grouped_results[canonical_key].append({
+            device = {
                 'vendor': row[0],
                 'hostname': row[1],
                 'display_name': row[2],
                 'organization_name': row[3],
                 'snapshot_date': row[4].isoformat(),
                 'canonical_key': canonical_key,
-                'is_truncated': row[6]
-            })
+                'is_truncated': row[6],
+                'match_type': row[7]
+            }
+            grouped_results[canonical_key].append({field: device[field] for field in fields})
         
         # Calculate summary statistics
         total_devices = len(results)
@@ -2892,6 +2009,7 @@ def search_devices():
             'vendors_found': list(vendors_found),
             'truncated_hostnames': truncated_count,
             'grouped_by_canonical_key': grouped_results,
+            'next_cursor': next_cursor,
             'warning': 'Some hostnames may be truncated due to Ninja 15-character limit' if truncated_count > 0 else None
         })
 
@@ -2960,7 +2078,7 @@ def export_variances_csv():
                 e.old_value,
                 e.new_value
             FROM exceptions e
-            WHERE e.date_found = :report_date
+            WHERE e.first_seen <= :report_date AND e.last_seen >= :report_date
         """
         
         params = {'report_date': report_date}
@@ -2972,66 +2090,51 @@ def export_variances_csv():
         if exception_type:
             query_str += " AND e.type = :exception_type"
             params['exception_type'] = exception_type
+        else:
+            query_str += " AND e.type = ANY(:device_types)"
+            params['device_types'] = list(DEVICE_EXCEPTION_TYPES)
         
         query_str += " ORDER BY e.type, e.hostname"
-        
-        query = text(query_str)
-        
-        exceptions = session.execute(query, params).fetchall()
-        
-        # Generate CSV content
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow([
+    
+    def format_exception_row(exc) -> List[Any]:
+        details = exc[4] if exc[4] else {}
+        org_name = details.get('tl_org_name', details.get('ninja_org_name', 'Unknown'))
+        
+        return [
+            exc[0],  # ID
+            exc[1].isoformat() if exc[1] else '',  # Date Found
+            exc[2],  # Type
+            exc[3],  # Hostname
+            'Yes' if exc[5] else 'No',  # Resolved
+            exc[6].isoformat() if exc[6] else '',  # Resolved Date
+            exc[7] or '',  # Resolved By
+            exc[8].isoformat() if exc[8] else '',  # Manually Updated At
+            exc[9] or '',  # Manually Updated By
+            exc[10] or 'active',  # Variance Status
+            exc[11] or '',  # Update Type
+            org_name,  # Organization
+            json.dumps(details) if details else ''  # Details
+        ]
+    
+    # Generate filename
+    filename = f"variances-{report_date.isoformat()}.csv"
+    if exception_type:
+        filename = f"variances-{exception_type.lower()}-{report_date.isoformat()}.csv"
+    
+    # Rows are streamed from a server-side cursor as the client downloads
+    return csv_response(
+        [
             'ID', 'Date Found', 'Type', 'Hostname', 'Resolved', 'Resolved Date',
             'Resolved By', 'Manually Updated At', 'Manually Updated By',
             'Variance Status', 'Update Type', 'Organization', 'Details'
-        ])
-        
-        # Write data rows
-        for exc in exceptions:
-            details = exc[4] if exc[4] else {}
-            org_name = details.get('tl_org_name', details.get('ninja_org_name', 'Unknown'))
-            
-            writer.writerow([
-                exc[0],  # ID
-                exc[1].isoformat() if exc[1] else '',  # Date Found
-                exc[2],  # Type
-                exc[3],  # Hostname
-                'Yes' if exc[5] else 'No',  # Resolved
-                exc[6].isoformat() if exc[6] else '',  # Resolved Date
-                exc[7] or '',  # Resolved By
-                exc[8].isoformat() if exc[8] else '',  # Manually Updated At
-                exc[9] or '',  # Manually Updated By
-                exc[10] or 'active',  # Variance Status
-                exc[11] or '',  # Update Type
-                org_name,  # Organization
-                json.dumps(details) if details else ''  # Details
-            ])
-        
-        # Create response
-        csv_content = output.getvalue()
-        output.close()
-        
-        # Generate filename
-        filename = f"variances-{report_date.isoformat()}.csv"
-        if exception_type:
-            filename = f"variances-{exception_type.lower()}-{report_date.isoformat()}.csv"
-        
-        response = Response(
-            csv_content,
-            mimetype='text/csv',
-            headers={
-                'Content-Disposition': f'attachment; filename={filename}',
-                'Content-Type': 'text/csv; charset=utf-8'
-            }
-        )
-        
-        return response
+        ],
+        stream_rows(text(query_str), params),
+        filename,
+        format_exception_row
+    )
 
 @app.route('/api/variances/available-dates', methods=['GET'])
+@cached_response
 def get_available_dates():
     """
     Get available analysis dates where both vendors have data.
@@ -3039,42 +2142,24 @@ def get_available_dates():
     Returns list of dates with data quality status.
     """
     with get_session() as session:
-        # Get dates with both vendors
+        # One row per date with both vendors, maintained at snapshot and exception writes
         query = text("""
-            SELECT 
+            SELECT
                 snapshot_date,
-                COUNT(DISTINCT vendor_id) as vendor_count,
-                COUNT(DISTINCT CASE WHEN v.name = 'Ninja' THEN ds.vendor_id END) as ninja_count,
-                COUNT(DISTINCT CASE WHEN v.name = 'ThreatLocker' THEN ds.vendor_id END) as threatlocker_count
-            FROM device_snapshot ds
-            JOIN vendor v ON ds.vendor_id = v.id
+                ninja_devices,
+                threatlocker_devices,
+                total_exceptions,
+                unresolved_exceptions
+            FROM variance_date_summary
             WHERE snapshot_date >= CURRENT_DATE - INTERVAL '30 days'
-            GROUP BY snapshot_date
-            HAVING COUNT(DISTINCT vendor_id) = 2
             ORDER BY snapshot_date DESC
         """)
         
         results = session.execute(query).fetchall()
         
-        # Get exception counts for each date
         dates_with_exceptions = []
         for row in results:
             snapshot_date = row[0]
-            ninja_count = row[2]
-            threatlocker_count = row[3]
-            
-            # Get exception count for this date
-            exception_query = text("""
-                SELECT 
-                    COUNT(*) as total_exceptions,
-                    COUNT(CASE WHEN resolved = FALSE THEN 1 END) as unresolved_exceptions
-                FROM exceptions
-                WHERE date_found = :snapshot_date
-            """)
-            
-            exception_result = session.execute(exception_query, {'snapshot_date': snapshot_date}).fetchone()
-            total_exceptions = exception_result[0] if exception_result else 0
-            unresolved_exceptions = exception_result[1] if exception_result else 0
             
             # Determine data quality
             days_old = (date.today() - snapshot_date).days
@@ -3087,10 +2172,10 @@ def get_available_dates():
             
             dates_with_exceptions.append({
                 'date': snapshot_date.isoformat(),
-                'ninja_devices': ninja_count,
-                'threatlocker_devices': threatlocker_count,
-                'total_exceptions': total_exceptions,
-                'unresolved_exceptions': unresolved_exceptions,
+                'ninja_devices': row[1],
+                'threatlocker_devices': row[2],
+                'total_exceptions': row[3],
+                'unresolved_exceptions': row[4],
                 'data_quality': quality_status,
                 'days_old': days_old
             })
@@ -3104,7 +2189,41 @@ def get_available_dates():
             'total_dates': len(dates_with_exceptions)
         })
 
+@app.route('/api/variances/reconciliation', methods=['GET'])
+@cached_response
+def get_reconciliation_report():
+    """
+    Get the seat reconciliation findings (Duo, M365, Dropsuite, VadeSecure vs Ninja seats).
+    
+    These are per-organization count differences, so they are reported here
+    rather than with the device variances.
+    
+    Query Parameters:
+        date: Report date YYYY-MM-DD (default: latest date both vendors have data)
+        include_resolved: Include resolved findings (default: false)
+    """
+    include_resolved = request.args.get('include_resolved', 'false').lower() == 'true'
+    date_param = request.args.get('date')
+    
+    with get_session() as session:
+        if date_param:
+            try:
+                report_date = datetime.strptime(date_param, '%Y-%m-%d').date()
+            except ValueError:
+                return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+        else:
+            report_date = latest_matching_date(session)
+            if report_date is None:
+                return jsonify({
+                    "error": "No matching data found between vendors",
+                    "status": "out_of_sync"
+                }), 400
+        
+        return jsonify(build_reconciliation_report(session, report_date, include_resolved))
+
 @app.route('/api/variances/historical/<date_str>', methods=['GET'])
+@cached_response
+@archived_report('historical')
 def get_historical_variance_data(date_str: str):
     """
     Get variance data for a specific historical date.
@@ -3140,19 +2259,21 @@ def get_historical_variance_data(date_str: str):
             query = text("""
                 SELECT id, date_found, type, hostname, details, resolved
                 FROM exceptions
-                WHERE date_found = :report_date
+                WHERE first_seen <= :report_date AND last_seen >= :report_date
+                AND type = ANY(:device_types)
                 ORDER BY type, hostname
             """)
         else:
             query = text("""
                 SELECT id, date_found, type, hostname, details, resolved
                 FROM exceptions
-                WHERE date_found = :report_date
+                WHERE first_seen <= :report_date AND last_seen >= :report_date
+                AND type = ANY(:device_types)
                 AND resolved = FALSE
                 ORDER BY type, hostname
             """)
         
-        exceptions = session.execute(query, {'report_date': report_date}).fetchall()
+        exceptions = session.execute(query, {'report_date': report_date, 'device_types': list(DEVICE_EXCEPTION_TYPES)}).fetchall()
         
         # Group by type
         by_type = {}
@@ -3252,29 +2373,31 @@ def get_variance_trends():
     
     with get_session() as session:
         # Build trend query
-        query = text("""
+        # Exceptions are open over [first_seen, last_seen]; expand to one row per day
+        query = """
             SELECT 
-                date_found,
-                type,
+                d.day::date as date_found,
+                e.type,
                 COUNT(*) as total_count,
-                COUNT(CASE WHEN resolved = FALSE THEN 1 END) as unresolved_count,
-                COUNT(CASE WHEN resolved = TRUE THEN 1 END) as resolved_count
-            FROM exceptions
-            WHERE date_found BETWEEN :start_date AND :end_date
-        """)
+                COUNT(CASE WHEN e.resolved = FALSE THEN 1 END) as unresolved_count,
+                COUNT(CASE WHEN e.resolved = TRUE THEN 1 END) as resolved_count
+            FROM generate_series(CAST(:start_date AS date), CAST(:end_date AS date), INTERVAL '1 day') AS d(day)
+            JOIN exceptions e ON e.first_seen <= d.day::date AND e.last_seen >= d.day::date
+            WHERE 1=1
+        """
         
         params = {'start_date': start_date, 'end_date': end_date}
         
         if exception_type:
-            query += " AND type = :exception_type"
+            query += " AND e.type = :exception_type"
             params['exception_type'] = exception_type
         
         query += """
-            GROUP BY date_found, type
-            ORDER BY date_found DESC, type
+            GROUP BY d.day, e.type
+            ORDER BY d.day DESC, e.type
         """
         
-        results = session.execute(query, params).fetchall()
+        results = session.execute(text(query), params).fetchall()
         
         # Group by date and type
         trends_by_date = {}
@@ -3338,39 +2461,41 @@ def get_variance_trends():
 
 # Enhanced Export Endpoints
 
-@app.route('/api/variances/export/pdf', methods=['GET'])
-def export_variances_pdf():
+def _prepare_variance_export(export_type: str, args):
     """
-    Export variance data to PDF format.
+    Validate export parameters and get (or queue) the matching export job.
     
-    Query parameters:
-    - date: Specific date (YYYY-MM-DD) or 'latest' (default)
-    - include_resolved: Include resolved exceptions (default: false)
-    - variance_type: Filter by exception type (optional)
+    Returns:
+        tuple: (ExportJob, None) or (None, error response)
     """
-    if not REPORTLAB_AVAILABLE:
-        return jsonify({
-            "error": "PDF export not available. Install reportlab: pip install reportlab"
-        }), 500
+    if export_type not in EXPORT_TYPES:
+        return None, (jsonify({"error": f"Invalid export type. Use one of: {', '.join(EXPORT_TYPES)}"}), 400)
+    
+    if not export_available(export_type):
+        if export_type == 'pdf':
+            message = "PDF export not available. Install reportlab: pip install reportlab"
+        else:
+            message = "Excel export not available. Install openpyxl: pip install openpyxl"
+        return None, (jsonify({"error": message}), 500)
     
     # Get query parameters
-    date_param = request.args.get('date', 'latest')
-    include_resolved = request.args.get('include_resolved', 'false').lower() == 'true'
-    exception_type = request.args.get('variance_type', request.args.get('type', ''))
+    date_param = str(args.get('date', 'latest'))
+    include_resolved = str(args.get('include_resolved', 'false')).lower() == 'true'
+    exception_type = args.get('variance_type', args.get('type', '')) or ''
     
     # Determine report date
     if date_param == 'latest':
         report_date = get_latest_matching_date()
         if not report_date:
-            return jsonify({
+            return None, (jsonify({
                 "error": "No matching data found between vendors",
                 "status": "out_of_sync"
-            }), 400
+            }), 400)
     else:
         try:
             report_date = datetime.strptime(date_param, '%Y-%m-%d').date()
         except ValueError:
-            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+            return None, (jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400)
     
     with get_session() as session:
         # Check if data exists for this date
@@ -3383,347 +2508,113 @@ def export_variances_pdf():
         result = session.execute(check_query, {'report_date': report_date}).fetchone()
         
         if result[0] < 2:
-            return jsonify({
+            return None, (jsonify({
                 "error": f"Insufficient data for {date_param}. Found {result[0]} vendors, need 2.",
                 "status": "insufficient_data"
-            }), 400
-        
-        # Get exceptions data
-        query_str = """
-            SELECT 
-                e.id,
-                e.date_found,
-                e.type,
-                e.hostname,
-                e.details,
-                e.resolved,
-                e.resolved_date,
-                e.resolved_by,
-                e.manually_updated_at,
-                e.manually_updated_by,
-                e.variance_status
-            FROM exceptions e
-            WHERE e.date_found = :report_date
-        """
-        
-        params = {'report_date': report_date}
-        
-        # Add filters
-        if not include_resolved:
-            query_str += " AND e.resolved = FALSE"
-        
-        if exception_type:
-            query_str += " AND e.type = :exception_type"
-            params['exception_type'] = exception_type
-        
-        query_str += " ORDER BY e.type, e.hostname"
-        
-        query = text(query_str)
-        
-        exceptions = session.execute(query, params).fetchall()
-        
-        # Generate PDF
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        styles = getSampleStyleSheet()
-        story = []
+            }), 400)
         
-        # Title
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=16,
-            spaceAfter=30,
-            alignment=1  # Center
-        )
-        story.append(Paragraph(f"Variance Report - {report_date.isoformat()}", title_style))
-        story.append(Spacer(1, 12))
-        
-        # Summary
-        total_exceptions = len(exceptions)
-        unresolved_count = sum(1 for exc in exceptions if not exc[5])
-        resolved_count = total_exceptions - unresolved_count
-        
-        summary_data = [
-            ['Total Exceptions', str(total_exceptions)],
-            ['Unresolved', str(unresolved_count)],
-            ['Resolved', str(resolved_count)],
-            ['Report Date', report_date.isoformat()],
-            ['Generated', datetime.now().strftime('%Y-%m-%d %H:%M:%S')]
-        ]
-        
-        summary_table = Table(summary_data, colWidths=[2*inch, 1.5*inch])
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), colors.lightgrey),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(Paragraph("Summary", styles['Heading2']))
-        story.append(summary_table)
-        story.append(Spacer(1, 20))
-        
-        # Exceptions table
-        if exceptions:
-            story.append(Paragraph("Exception Details", styles['Heading2']))
-            
-            # Prepare table data
-            table_data = [['ID', 'Type', 'Hostname', 'Status', 'Organization']]
-            
-            for exc in exceptions:
-                details = exc[4] if exc[4] else {}
-                org_name = details.get('tl_org_name', details.get('ninja_org_name', 'Unknown'))
-                status = 'Resolved' if exc[5] else 'Active'
-                
-                table_data.append([
-                    str(exc[0]),
-                    exc[2],
-                    exc[3],
-                    status,
-                    org_name
-                ])
-            
-            # Create table
-            exceptions_table = Table(table_data, colWidths=[0.5*inch, 1.2*inch, 1.5*inch, 0.8*inch, 1.5*inch])
-            exceptions_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 8),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.beige, colors.white])
-            ]))
-            
-            story.append(exceptions_table)
-        else:
-            story.append(Paragraph("No exceptions found for the specified criteria.", styles['Normal']))
-        
-        # Build PDF
-        doc.build(story)
-        buffer.seek(0)
-        
-        # Generate filename
-        filename = f"variances-{report_date.isoformat()}.pdf"
-        if exception_type:
-            filename = f"variances-{exception_type.lower()}-{report_date.isoformat()}.pdf"
-        
-        return Response(
-            buffer.getvalue(),
-            mimetype='application/pdf',
-            headers={
-                'Content-Disposition': f'attachment; filename={filename}',
-                'Content-Type': 'application/pdf'
-            }
-        )
+        fingerprint = report_fingerprint(session, report_date)
+    
+    return export_jobs.submit(export_type, report_date, include_resolved, exception_type, fingerprint), None
+
+def _export_job_response(job):
+    """Serve a finished export, or report the job's status for polling."""
+    if job.status == 'completed':
+        return file_response(job.path, job.filename, job.mimetype, delete=False)
+    if job.status == 'failed':
+        return jsonify({"error": f"Export failed: {job.error}", "job": job.to_dict()}), 500
+    
+    response = jsonify(job.to_dict())
+    response.status_code = 202
+    response.headers['Location'] = job.to_dict()['status_url']
+    return response
+
+def _legacy_variance_export(export_type: str):
+    """Download an export, waiting briefly for its job before falling back to 202 + job id."""
+    job, error = _prepare_variance_export(export_type, request.args)
+    if error:
+        return error
+    
+    export_jobs.wait(job)
+    return _export_job_response(job)
+
+@app.route('/api/variances/export/pdf', methods=['GET'])
+def export_variances_pdf():
+    """
+    Export variance data to PDF format.
+    
+    Rendered by a background export job and cached; returns the file when it
+    is ready within EXPORT_SYNC_WAIT seconds, otherwise 202 with the job to poll.
+    
+    Query parameters:
+    - date: Specific date (YYYY-MM-DD) or 'latest' (default)
+    - include_resolved: Include resolved exceptions (default: false)
+    - variance_type: Filter by exception type (optional)
+    """
+    return _legacy_variance_export('pdf')
 
 @app.route('/api/variances/export/excel', methods=['GET'])
 def export_variances_excel():
     """
     Export variance data to Excel format with multiple sheets.
     
+    Rendered by a background export job and cached; returns the file when it
+    is ready within EXPORT_SYNC_WAIT seconds, otherwise 202 with the job to poll.
+    
     Query parameters:
     - date: Specific date (YYYY-MM-DD) or 'latest' (default)
     - include_resolved: Include resolved exceptions (default: false)
     - variance_type: Filter by exception type (optional)
     """
-    if not OPENPYXL_AVAILABLE:
-        return jsonify({
-            "error": "Excel export not available. Install openpyxl: pip install openpyxl"
-        }), 500
+    return _legacy_variance_export('excel')
+
+@app.route('/api/exports', methods=['POST'])
+def create_export_job():
+    """
+    Queue a variance export.
     
-    # Get query parameters
-    date_param = request.args.get('date', 'latest')
-    include_resolved = request.args.get('include_resolved', 'false').lower() == 'true'
-    exception_type = request.args.get('variance_type', request.args.get('type', ''))
+    JSON body:
+    - type: 'pdf' or 'excel'
+    - date: Specific date (YYYY-MM-DD) or 'latest' (default)
+    - include_resolved: Include resolved exceptions (default: false)
+    - variance_type: Filter by exception type (optional)
     
-    # Determine report date
-    if date_param == 'latest':
-        report_date = get_latest_matching_date()
-        if not report_date:
-            return jsonify({
-                "error": "No matching data found between vendors",
-                "status": "out_of_sync"
-            }), 400
-    else:
-        try:
-            report_date = datetime.strptime(date_param, '%Y-%m-%d').date()
-        except ValueError:
-            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+    Returns 202 with the job (200 if an identical export is already cached).
+    """
+    data = request.get_json(silent=True) or {}
     
-    with get_session() as session:
-        # Check if data exists for this date
-        check_query = text("""
-            SELECT COUNT(DISTINCT vendor_id) as vendor_count
-            FROM device_snapshot
-            WHERE snapshot_date = :report_date
-        """)
-        
-        result = session.execute(check_query, {'report_date': report_date}).fetchone()
-        
-        if result[0] < 2:
-            return jsonify({
-                "error": f"Insufficient data for {date_param}. Found {result[0]} vendors, need 2.",
-                "status": "insufficient_data"
-            }), 400
-        
-        # Get exceptions data
-        query_str = """
-            SELECT 
-                e.id,
-                e.date_found,
-                e.type,
-                e.hostname,
-                e.details,
-                e.resolved,
-                e.resolved_date,
-                e.resolved_by,
-                e.manually_updated_at,
-                e.manually_updated_by,
-                e.variance_status,
-                e.update_type
-            FROM exceptions e
-            WHERE e.date_found = :report_date
-        """
-        
-        params = {'report_date': report_date}
-        
-        # Add filters
-        if not include_resolved:
-            query_str += " AND e.resolved = FALSE"
-        
-        if exception_type:
-            query_str += " AND e.type = :exception_type"
-            params['exception_type'] = exception_type
-        
-        query_str += " ORDER BY e.type, e.hostname"
-        
-        query = text(query_str)
-        
-        exceptions = session.execute(query, params).fetchall()
-        
-        # Create Excel workbook
-        wb = openpyxl.Workbook()
-        
-        # Remove default sheet
-        wb.remove(wb.active)
-        
-        # Create Summary sheet
-        summary_ws = wb.create_sheet("Summary")
-        summary_ws.title = "Summary"
-        
-        # Summary data
-        total_exceptions = len(exceptions)
-        unresolved_count = sum(1 for exc in exceptions if not exc[5])
-        resolved_count = total_exceptions - unresolved_count
-        
-        summary_data = [
-            ['Variance Report Summary'],
-            [''],
-            ['Report Date', report_date.isoformat()],
-            ['Generated', datetime.now().strftime('%Y-%m-%d %H:%M:%S')],
-            [''],
-            ['Total Exceptions', total_exceptions],
-            ['Unresolved', unresolved_count],
-            ['Resolved', resolved_count],
-            [''],
-            ['Exception Types:']
-        ]
-        
-        # Add exception type breakdown
-        type_counts = {}
-        for exc in exceptions:
-            exc_type = exc[2]
-            type_counts[exc_type] = type_counts.get(exc_type, 0) + 1
-        
-        for exc_type, count in sorted(type_counts.items()):
-            summary_data.append([exc_type, count])
-        
-        # Write summary data
-        for row_idx, row_data in enumerate(summary_data, 1):
-            for col_idx, cell_value in enumerate(row_data, 1):
-                cell = summary_ws.cell(row=row_idx, column=col_idx, value=cell_value)
-                if row_idx == 1:  # Title
-                    cell.font = Font(bold=True, size=14)
-                elif row_idx in [3, 4, 6, 7, 8]:  # Data rows
-                    cell.font = Font(bold=True)
-        
-        # Create detailed exceptions sheet
-        details_ws = wb.create_sheet("Exceptions")
-        details_ws.title = "Exceptions"
-        
-        # Headers
-        headers = [
-            'ID', 'Date Found', 'Type', 'Hostname', 'Resolved',
-            'Resolved Date', 'Resolved By', 'Manually Updated At',
-            'Manually Updated By', 'Variance Status', 'Update Type', 'Organization'
-        ]
-        
-        for col_idx, header in enumerate(headers, 1):
-            cell = details_ws.cell(row=1, column=col_idx, value=header)
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-        
-        # Data rows
-        for row_idx, exc in enumerate(exceptions, 2):
-            details = exc[4] if exc[4] else {}
-            org_name = details.get('tl_org_name', details.get('ninja_org_name', 'Unknown'))
-            
-            row_data = [
-                exc[0],  # ID
-                exc[1].isoformat() if exc[1] else '',  # Date Found
-                exc[2],  # Type
-                exc[3],  # Hostname
-                'Yes' if exc[5] else 'No',  # Resolved
-                exc[6].isoformat() if exc[6] else '',  # Resolved Date
-                exc[7] or '',  # Resolved By
-                exc[8].isoformat() if exc[8] else '',  # Manually Updated At
-                exc[9] or '',  # Manually Updated By
-                exc[10] or 'active',  # Variance Status
-                exc[11] or '',  # Update Type
-                org_name  # Organization
-            ]
-            
-            for col_idx, value in enumerate(row_data, 1):
-                details_ws.cell(row=row_idx, column=col_idx, value=value)
-        
-        # Auto-adjust column widths
-        for ws in [summary_ws, details_ws]:
-            for column in ws.columns:
-                max_length = 0
-                column_letter = get_column_letter(column[0].column)
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Save to buffer
-        buffer = io.BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-        
-        # Generate filename
-        filename = f"variances-{report_date.isoformat()}.xlsx"
-        if exception_type:
-            filename = f"variances-{exception_type.lower()}-{report_date.isoformat()}.xlsx"
-        
-        return Response(
-            buffer.getvalue(),
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            headers={
-                'Content-Disposition': f'attachment; filename={filename}',
-                'Content-Type': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            }
-        )
+    job, error = _prepare_variance_export(data.get('type', ''), data)
+    if error:
+        return error
+    
+    response = jsonify(job.to_dict())
+    response.status_code = 200 if job.status == 'completed' else 202
+    response.headers['Location'] = job.to_dict()['status_url']
+    return response
+
+@app.route('/api/exports/<job_id>', methods=['GET'])
+def get_export_job(job_id: str):
+    """Get the status of an export job."""
+    job = export_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": f"Export job {job_id} not found"}), 404
+    
+    return jsonify(job.to_dict())
+
+@app.route('/api/exports/<job_id>/download', methods=['GET'])
+def download_export_job(job_id: str):
+    """Download the artifact of a finished export job."""
+    job = export_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": f"Export job {job_id} not found"}), 404
+    
+    if job.status != 'completed':
+        return jsonify({"error": f"Export job is {job.status}", "job": job.to_dict()}), 409
+    
+    if not os.path.exists(job.path):
+        return jsonify({"error": "Export artifact has expired; request the export again"}), 410
+    
+    return file_response(job.path, job.filename, job.mimetype, delete=False)
 
 
 # Windows 11 24H2 Assessment Endpoints
@@ -3751,13 +2642,9 @@ def get_windows_11_24h2_status():
             FROM device_snapshot ds
             JOIN vendor v ON ds.vendor_id = v.id
             JOIN device_type dt ON ds.device_type_id = dt.id
+            JOIN vendor_snapshot_state s ON s.vendor_id = ds.vendor_id
+                AND s.snapshot_date = ds.snapshot_date
             WHERE v.name = 'Ninja' 
-            AND ds.snapshot_date = (
-                SELECT MAX(snapshot_date)
-                FROM device_snapshot ds2
-                JOIN vendor v2 ON ds2.vendor_id = v2.id
-                WHERE v2.name = 'Ninja'
-            )
             AND ds.os_name ILIKE '%windows%'
             AND ds.os_name NOT ILIKE '%server%'
             AND dt.code IN ('Desktop', 'Laptop', 'workstation')
@@ -3819,13 +2706,9 @@ def get_incompatible_devices():
                 ds.system_model
             FROM device_snapshot ds
             JOIN vendor v ON ds.vendor_id = v.id
+            JOIN vendor_snapshot_state s ON s.vendor_id = ds.vendor_id
+                AND s.snapshot_date = ds.snapshot_date
             WHERE v.name = 'Ninja'
-            AND ds.snapshot_date = (
-                SELECT MAX(snapshot_date)
-                FROM device_snapshot ds2
-                JOIN vendor v2 ON ds2.vendor_id = v2.id
-                WHERE v2.name = 'Ninja'
-            )
             AND ds.os_name ILIKE '%windows%'
             AND ds.os_name NOT ILIKE '%server%'
             AND ds.windows_11_24h2_capable IS NOT NULL
@@ -3911,13 +2794,9 @@ def get_compatible_devices():
                 ds.system_model
             FROM device_snapshot ds
             JOIN vendor v ON ds.vendor_id = v.id
+            JOIN vendor_snapshot_state s ON s.vendor_id = ds.vendor_id
+                AND s.snapshot_date = ds.snapshot_date
             WHERE v.name = 'Ninja'
-            AND ds.snapshot_date = (
-                SELECT MAX(snapshot_date)
-                FROM device_snapshot ds2
-                JOIN vendor v2 ON ds2.vendor_id = v2.id
-                WHERE v2.name = 'Ninja'
-            )
             AND ds.os_name ILIKE '%windows%'
             AND ds.os_name NOT ILIKE '%server%'
             AND ds.windows_11_24h2_capable IS NOT NULL
@@ -3980,38 +2859,12 @@ def get_compatible_devices():
 
 @app.route('/api/windows-11-24h2/run', methods=['POST'])
 def run_windows_11_24h2_assessment():
-    """Manually trigger Windows 11 24H2 assessment"""
+    """Manually trigger Windows 11 24H2 assessment (queued on the job queue)"""
     try:
-        import subprocess
-        import os
-        
-        # Run the assessment script
-        script_path = '/opt/es-inventory-hub/collectors/assessments/windows_11_24h2_assessment.py'
-        
-        if not os.path.exists(script_path):
-            return jsonify({"error": "Assessment script not found"}), 404
-        
-        # Execute the assessment script
-        result = subprocess.run([
-            '/opt/es-inventory-hub/.venv/bin/python3',
-            script_path
-        ], capture_output=True, text=True, cwd='/opt/es-inventory-hub')
-        
-        if result.returncode == 0:
-            return jsonify({
-                "status": "success",
-                "message": "Windows 11 24H2 assessment completed successfully",
-                "output": result.stdout,
-                "timestamp": datetime.utcnow().isoformat() + 'Z'
-            })
-        else:
-            return jsonify({
-                "status": "error",
-                "message": "Assessment failed",
-                "error": result.stderr,
-                "output": result.stdout
-            }), 500
-            
+        return _queue_jobs(
+            ['windows-11-24h2-assessment'], 'Windows 11 24H2 assessment queued',
+            status='queued', timestamp=datetime.utcnow().isoformat() + 'Z'
+        )
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -4138,19 +2991,21 @@ if __name__ == '__main__':
     print("  GET  /api/variance-report/latest - Latest variance report")
     print("  GET  /api/variance-report/{date} - Variance report for specific date")
     print("  GET  /api/variance-report/filtered - Filtered variance report for dashboard")
-    print("  POST /api/collectors/run - Trigger collector runs")
+    print("  POST /api/collectors/run - Queue collector runs")
     print("  GET  /api/collectors/status - Collector service status")
     print("  GET  /api/collectors/history - Collection history (last 10 runs)")
     print("  GET  /api/collectors/progress - Real-time collection progress")
+    print("  GET  /api/collectors/events - Collector job/batch changes (Server-Sent Events)")
+    print("  POST /api/collectors/runs/batch/{batch_id}/cancel - Cancel a queued collector batch")
     print("  GET  /api/exceptions - Get exceptions with filtering")
     print("  POST /api/exceptions/{id}/resolve - Resolve an exception")
     print("  POST /api/exceptions/{id}/mark-manually-fixed - Mark as manually fixed (NEW)")
     print("  POST /api/exceptions/mark-fixed-by-hostname - Mark exceptions fixed by hostname (NEW)")
     print("  POST /api/exceptions/bulk-update - Bulk exception operations (NEW)")
     print("  GET  /api/exceptions/status-summary - Exception status summary (NEW)")
-    print("  POST /api/collectors/threatlocker/run - Run ThreatLocker collector (NEW)")
-    print("  POST /api/collectors/cross-vendor/run - Run cross-vendor checks (NEW)")
-    print("  POST /api/collectors/sequence/run - Run complete collector sequence (NEW)")
+    print("  POST /api/collectors/threatlocker/run - Queue ThreatLocker collector (NEW)")
+    print("  POST /api/collectors/cross-vendor/run - Queue cross-vendor checks (NEW)")
+    print("  POST /api/collectors/sequence/run - Queue complete collector sequence (NEW)")
     print("  POST /api/threatlocker/update-name - Update ThreatLocker computer name (NEW)")
     print("  POST /api/threatlocker/sync-device - Sync ThreatLocker device to database (NEW)")
     print("  GET  /api/devices/search?q={hostname} - Search devices (handles hostname truncation)")
@@ -4159,6 +3014,9 @@ if __name__ == '__main__':
     print("  GET  /api/variances/export/csv - Export variance data to CSV")
     print("  GET  /api/variances/export/pdf - Export variance data to PDF")
     print("  GET  /api/variances/export/excel - Export variance data to Excel")
+    print("  POST /api/exports - Queue a PDF/Excel variance export job")
+    print("  GET  /api/exports/<job_id> - Export job status")
+    print("  GET  /api/exports/<job_id>/download - Download a finished export")
     print("  GET  /api/variances/available-dates - Get available analysis dates")
     print("  GET  /api/variances/historical/{date} - Get historical variance data")
     print("  GET  /api/variances/trends - Get variance trends over time")
@@ -4180,16 +3038,24 @@ if __name__ == '__main__':
     print("  HTTP:  http://localhost:5400 (development only)")
     print("  HTTPS: https://db-api.enersystems.com:5400 (production)")
     
+    # With the reloader on, this script also runs as a watcher parent that
+    # only restarts the serving child; every other process starts the job
+    # queue workers
+    use_reloader = os.getenv('API_USE_RELOADER', 'true').lower() == 'true'
+    if not use_reloader or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        job_queue.start()
+    
     # Check for SSL certificates
     ssl_cert = '/opt/es-inventory-hub/ssl/api.crt'
     ssl_key = '/opt/es-inventory-hub/ssl/api.key'
     
     if os.path.exists(ssl_cert) and os.path.exists(ssl_key):
         print(f"SSL certificates found. Starting HTTPS server...")
-        app.run(host='0.0.0.0', port=5400, debug=True, ssl_context=(ssl_cert, ssl_key))
+        app.run(host='0.0.0.0', port=5400, debug=True, ssl_context=(ssl_cert, ssl_key),
+                use_reloader=use_reloader)
     else:
         print(f"SSL certificates not found. Starting HTTP server...")
         print(f"To enable HTTPS, place SSL certificates at:")
         print(f"  Certificate: {ssl_cert}")
         print(f"  Private Key: {ssl_key}")
-        app.run(host='0.0.0.0', port=5400, debug=True)
+        app.run(host='0.0.0.0', port=5400, debug=True, use_reloader=use_reloader)
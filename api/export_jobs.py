@@ -0,0 +1,529 @@
+"""
+Background export jobs for the variance PDF and Excel exports.
+
+Rendering a PDF (reportlab) or workbook (openpyxl) for a few thousand
+exceptions takes seconds and used to run inside the request, repeated for
+identical parameters. Exports are now jobs keyed by (type, date, filters,
+data fingerprint): a small worker pool renders each job once into
+EXPORT_CACHE_DIR, identical requests share the job or its finished artifact,
+and clients poll the job status instead of holding a request thread.
+
+The fingerprint is the report date's data fingerprint
+(common.report_archive.report_fingerprint), so any change to the exceptions
+open on that date or to its device snapshots produces a new job rather
+than a stale file.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import text
+
+from api.streaming import STREAM_BATCH_SIZE
+from collectors.checks.cross_vendor import DEVICE_EXCEPTION_TYPES
+
+# Export functionality imports
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib import colors
+    from reportlab.lib.units import inch
+    REPORTLAB_AVAILABLE = True
+except ImportError:
+    REPORTLAB_AVAILABLE = False
+
+try:
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill
+    from openpyxl.utils import get_column_letter
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CACHE_DIR = os.getenv('EXPORT_CACHE_DIR', '/opt/es-inventory-hub/cache/exports')
+EXPORT_WORKERS = int(os.getenv('EXPORT_WORKERS', '2'))
+EXPORT_SYNC_WAIT_SECONDS = float(os.getenv('EXPORT_SYNC_WAIT', '20'))
+EXPORT_MAX_AGE_SECONDS = int(os.getenv('EXPORT_MAX_AGE_HOURS', '24')) * 3600
+
+
+def variance_exceptions_query(report_date: date, include_resolved: bool,
+                              exception_type: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    SQL and parameters for the exceptions in a variance export.
+
+    Args:
+        report_date: Report date
+        include_resolved: Include resolved exceptions
+        exception_type: Exception type filter ('' for all device variance types)
+
+    Returns:
+        tuple: (query string, bound parameters)
+    """
+    query_str = """
+        SELECT
+            e.id,
+            e.date_found,
+            e.type,
+            e.hostname,
+            e.details,
+            e.resolved,
+            e.resolved_date,
+            e.resolved_by,
+            e.manually_updated_at,
+            e.manually_updated_by,
+            e.variance_status,
+            e.update_type
+        FROM exceptions e
+        WHERE e.first_seen <= :report_date AND e.last_seen >= :report_date
+    """
+
+    params = {'report_date': report_date}
+
+    # Add filters
+    if not include_resolved:
+        query_str += " AND e.resolved = FALSE"
+
+    if exception_type:
+        query_str += " AND e.type = :exception_type"
+        params['exception_type'] = exception_type
+    else:
+        query_str += " AND e.type = ANY(:device_types)"
+        params['device_types'] = list(DEVICE_EXCEPTION_TYPES)
+
+    query_str += " ORDER BY e.type, e.hostname"
+    return query_str, params
+
+
+def render_variance_pdf(session, path: str, report_date: date, include_resolved: bool,
+                        exception_type: str) -> None:
+    """Render the variance PDF export to path."""
+    query_str, params = variance_exceptions_query(report_date, include_resolved, exception_type)
+    exceptions = session.execute(text(query_str), params).fetchall()
+
+    doc = SimpleDocTemplate(path, pagesize=A4)
+    styles = getSampleStyleSheet()
+    story = []
+
+    # Title
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        spaceAfter=30,
+        alignment=1  # Center
+    )
+    story.append(Paragraph(f"Variance Report - {report_date.isoformat()}", title_style))
+    story.append(Spacer(1, 12))
+
+    # Summary
+    total_exceptions = len(exceptions)
+    unresolved_count = sum(1 for exc in exceptions if not exc[5])
+    resolved_count = total_exceptions - unresolved_count
+
+    summary_data = [
+        ['Total Exceptions', str(total_exceptions)],
+        ['Unresolved', str(unresolved_count)],
+        ['Resolved', str(resolved_count)],
+        ['Report Date', report_date.isoformat()],
+        ['Generated', datetime.now().strftime('%Y-%m-%d %H:%M:%S')]
+    ]
+
+    summary_table = Table(summary_data, colWidths=[2*inch, 1.5*inch])
+    summary_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, -1), colors.lightgrey),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+
+    story.append(Paragraph("Summary", styles['Heading2']))
+    story.append(summary_table)
+    story.append(Spacer(1, 20))
+
+    # Exceptions table
+    if exceptions:
+        story.append(Paragraph("Exception Details", styles['Heading2']))
+
+        # Prepare table data
+        table_data = [['ID', 'Type', 'Hostname', 'Status', 'Organization']]
+
+        for exc in exceptions:
+            details = exc[4] if exc[4] else {}
+            org_name = details.get('tl_org_name', details.get('ninja_org_name', 'Unknown'))
+            status = 'Resolved' if exc[5] else 'Active'
+
+            table_data.append([
+                str(exc[0]),
+                exc[2],
+                exc[3],
+                status,
+                org_name
+            ])
+
+        # Create table
+        exceptions_table = Table(table_data, colWidths=[0.5*inch, 1.2*inch, 1.5*inch, 0.8*inch, 1.5*inch])
+        exceptions_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.beige, colors.white])
+        ]))
+
+        story.append(exceptions_table)
+    else:
+        story.append(Paragraph("No exceptions found for the specified criteria.", styles['Normal']))
+
+    # Build PDF
+    doc.build(story)
+
+
+def render_variance_excel(session, path: str, report_date: date, include_resolved: bool,
+                          exception_type: str) -> None:
+    """Render the variance Excel export to path with a write-only workbook."""
+    query_str, params = variance_exceptions_query(report_date, include_resolved, exception_type)
+
+    # The summary pass and the row stream run in one REPEATABLE READ
+    # transaction, so the counts and widths match the rows written
+    session.connection(execution_options={'isolation_level': 'REPEATABLE READ'})
+
+    # Counts and column widths come from one aggregate pass so the workbook
+    # can be written in a single streaming pass over the rows
+    stats_query = text(f"""
+        SELECT
+            stats.type,
+            COUNT(*),
+            COUNT(CASE WHEN NOT stats.resolved THEN 1 END),
+            MAX(LENGTH(stats.id::text)),
+            MAX(LENGTH(stats.hostname)),
+            MAX(LENGTH(stats.resolved_by)),
+            MAX(LENGTH(stats.manually_updated_by)),
+            MAX(LENGTH(COALESCE(stats.variance_status, 'active'))),
+            MAX(LENGTH(stats.update_type)),
+            MAX(LENGTH(COALESCE(stats.details->>'tl_org_name', stats.details->>'ninja_org_name', 'Unknown')))
+        FROM ({query_str}) stats
+        GROUP BY stats.type
+    """)
+
+    type_stats = session.execute(stats_query, params).fetchall()
+
+    total_exceptions = sum(row[1] for row in type_stats)
+    unresolved_count = sum(row[2] for row in type_stats)
+    resolved_count = total_exceptions - unresolved_count
+
+    def longest(index: int) -> int:
+        return max((row[index] or 0 for row in type_stats), default=0)
+
+    # Widest value per Exceptions column (dates are ISO strings of fixed length)
+    headers = [
+        'ID', 'Date Found', 'Type', 'Hostname', 'Resolved',
+        'Resolved Date', 'Resolved By', 'Manually Updated At',
+        'Manually Updated By', 'Variance Status', 'Update Type', 'Organization'
+    ]
+    value_lengths = [
+        longest(3), 10, max((len(row[0]) for row in type_stats), default=0), longest(4), 3,
+        10, longest(5), 32, longest(6), longest(7), longest(8), longest(9)
+    ]
+
+    summary_data = [
+        ['Variance Report Summary'],
+        [''],
+        ['Report Date', report_date.isoformat()],
+        ['Generated', datetime.now().strftime('%Y-%m-%d %H:%M:%S')],
+        [''],
+        ['Total Exceptions', total_exceptions],
+        ['Unresolved', unresolved_count],
+        ['Resolved', resolved_count],
+        [''],
+        ['Exception Types:']
+    ]
+
+    # Add exception type breakdown
+    for row in sorted(type_stats, key=lambda row: row[0]):
+        summary_data.append([row[0], row[1]])
+
+    # Write-only workbook: rows go straight to a temp file instead of a cell tree
+    wb = openpyxl.Workbook(write_only=True)
+    summary_ws = wb.create_sheet("Summary")
+    details_ws = wb.create_sheet("Exceptions")
+
+    # Column widths must be set before the first row of a write-only sheet
+    for col_idx in range(1, 3):
+        max_length = max(len(str(row[col_idx - 1])) for row in summary_data if len(row) >= col_idx)
+        summary_ws.column_dimensions[get_column_letter(col_idx)].width = min(max_length + 2, 50)
+    for col_idx, (header, value_length) in enumerate(zip(headers, value_lengths), 1):
+        details_ws.column_dimensions[get_column_letter(col_idx)].width = min(max(len(header), value_length) + 2, 50)
+
+    # Write summary data
+    for row_idx, row_data in enumerate(summary_data, 1):
+        cells = []
+        for cell_value in row_data:
+            cell = WriteOnlyCell(summary_ws, value=cell_value)
+            if row_idx == 1:  # Title
+                cell.font = Font(bold=True, size=14)
+            elif row_idx in [3, 4, 6, 7, 8]:  # Data rows
+                cell.font = Font(bold=True)
+            cells.append(cell)
+        summary_ws.append(cells)
+
+    # Headers
+    header_font = Font(bold=True)
+    header_fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(details_ws, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        header_cells.append(cell)
+    details_ws.append(header_cells)
+
+    # Data rows, streamed from a server-side cursor on the same transaction
+    rows = session.execute(text(query_str).execution_options(yield_per=STREAM_BATCH_SIZE), params)
+    for exc in rows:
+        details = exc[4] if exc[4] else {}
+        org_name = details.get('tl_org_name', details.get('ninja_org_name', 'Unknown'))
+
+        details_ws.append([
+            exc[0],  # ID
+            exc[1].isoformat() if exc[1] else '',  # Date Found
+            exc[2],  # Type
+            exc[3],  # Hostname
+            'Yes' if exc[5] else 'No',  # Resolved
+            exc[6].isoformat() if exc[6] else '',  # Resolved Date
+            exc[7] or '',  # Resolved By
+            exc[8].isoformat() if exc[8] else '',  # Manually Updated At
+            exc[9] or '',  # Manually Updated By
+            exc[10] or 'active',  # Variance Status
+            exc[11] or '',  # Update Type
+            org_name  # Organization
+        ])
+
+    wb.save(path)
+
+
+# Export type -> (renderer, file extension, mimetype)
+EXPORT_TYPES: Dict[str, Tuple[Callable[..., None], str, str]] = {
+    'pdf': (render_variance_pdf, 'pdf', 'application/pdf'),
+    'excel': (render_variance_excel, 'xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+def export_available(export_type: str) -> bool:
+    """Whether the library an export type needs is installed."""
+    if export_type == 'pdf':
+        return REPORTLAB_AVAILABLE
+    if export_type == 'excel':
+        return OPENPYXL_AVAILABLE
+    return False
+
+
+@dataclass
+class ExportJob:
+    """One export request and its rendered artifact."""
+    job_id: str
+    export_type: str
+    report_date: date
+    include_resolved: bool
+    exception_type: str
+    status: str = 'queued'  # queued, running, completed, failed
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    future: Optional[Future] = field(default=None, repr=False)
+
+    @property
+    def extension(self) -> str:
+        return EXPORT_TYPES[self.export_type][1]
+
+    @property
+    def mimetype(self) -> str:
+        return EXPORT_TYPES[self.export_type][2]
+
+    @property
+    def path(self) -> str:
+        return os.path.join(EXPORT_CACHE_DIR, f"{self.job_id}.{self.extension}")
+
+    @property
+    def filename(self) -> str:
+        if self.exception_type:
+            return f"variances-{self.exception_type.lower()}-{self.report_date.isoformat()}.{self.extension}"
+        return f"variances-{self.report_date.isoformat()}.{self.extension}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.job_id,
+            'type': self.export_type,
+            'status': self.status,
+            'date': self.report_date.isoformat(),
+            'include_resolved': self.include_resolved,
+            'variance_type': self.exception_type or None,
+            'filename': self.filename,
+            'created_at': self.created_at.isoformat() + 'Z',
+            'finished_at': self.finished_at.isoformat() + 'Z' if self.finished_at else None,
+            'error': self.error,
+            'status_url': f"/api/exports/{self.job_id}",
+            'download_url': f"/api/exports/{self.job_id}/download" if self.status == 'completed' else None
+        }
+
+
+class ExportJobManager:
+    """Deduplicating export job queue backed by a thread pool and a disk cache."""
+
+    def __init__(self, max_workers: int = EXPORT_WORKERS):
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._jobs: Dict[str, ExportJob] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def job_id_for(export_type: str, report_date: date, include_resolved: bool,
+                   exception_type: str, fingerprint: str) -> str:
+        """Deterministic job id: identical requests on unchanged data share it."""
+        key = repr((export_type, report_date.isoformat(), include_resolved, exception_type, fingerprint))
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+    def submit(self, export_type: str, report_date: date, include_resolved: bool,
+               exception_type: str, fingerprint: str) -> ExportJob:
+        """
+        Get the job for an export, queueing it unless it is running or cached.
+
+        Args:
+            export_type: One of EXPORT_TYPES
+            report_date: Report date
+            include_resolved: Include resolved exceptions
+            exception_type: Exception type filter ('' for all)
+            fingerprint: Data fingerprint of the report date
+
+        Returns:
+            ExportJob: Existing, cached or newly queued job
+        """
+        job_id = self.job_id_for(export_type, report_date, include_resolved, exception_type, fingerprint)
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.status in ('queued', 'running'):
+                return job
+            if job is not None and job.status == 'completed' and os.path.exists(job.path):
+                return job
+
+            job = ExportJob(job_id, export_type, report_date, include_resolved, exception_type)
+            self._jobs[job_id] = job
+
+            # Rendered by an earlier job (possibly before a restart)
+            if os.path.exists(job.path):
+                job.status = 'completed'
+                job.finished_at = datetime.utcfromtimestamp(os.path.getmtime(job.path))
+                return job
+
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='export')
+            job.future = self._executor.submit(self._run, job)
+
+        self.prune()
+        return job
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        """Look up a job by id."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait(self, job: ExportJob, timeout: float = EXPORT_SYNC_WAIT_SECONDS) -> bool:
+        """
+        Wait for a job to finish.
+
+        Args:
+            job: Job from submit()
+            timeout: Seconds to wait
+
+        Returns:
+            bool: True if the job finished (completed or failed) in time
+        """
+        if job.future is None:
+            return job.status in ('completed', 'failed')
+        try:
+            job.future.result(timeout=timeout)
+        except FutureTimeoutError:
+            return False
+        return True
+
+    def _run(self, job: ExportJob) -> None:
+        """Render one job into the cache directory."""
+        from api.api_server import get_session
+
+        renderer = EXPORT_TYPES[job.export_type][0]
+        job.status = 'running'
+        started = time.perf_counter()
+
+        os.makedirs(EXPORT_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=EXPORT_CACHE_DIR, suffix='.tmp')
+        os.close(fd)
+        try:
+            with get_session() as session:
+                renderer(session, tmp_path, job.report_date, job.include_resolved, job.exception_type)
+            os.replace(tmp_path, job.path)
+            job.status = 'completed'
+            logger.info(f"Export {job.job_id} ({job.export_type} {job.report_date}) "
+                        f"rendered in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+            logger.error(f"Export {job.job_id} ({job.export_type} {job.report_date}) failed: {e}")
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        finally:
+            job.finished_at = datetime.utcnow()
+
+    def prune(self, max_age_seconds: int = EXPORT_MAX_AGE_SECONDS) -> int:
+        """
+        Delete artifacts and forget finished jobs older than max_age_seconds.
+
+        Args:
+            max_age_seconds: Maximum artifact age
+
+        Returns:
+            int: Number of artifacts deleted
+        """
+        cutoff = time.time() - max_age_seconds
+        now = datetime.utcnow()
+
+        with self._lock:
+            for job_id, job in list(self._jobs.items()):
+                if job.finished_at and (now - job.finished_at).total_seconds() > max_age_seconds:
+                    del self._jobs[job_id]
+
+        if not os.path.isdir(EXPORT_CACHE_DIR):
+            return 0
+
+        removed = 0
+        for name in os.listdir(EXPORT_CACHE_DIR):
+            path = os.path.join(EXPORT_CACHE_DIR, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.unlink(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+
+# Process-wide export job manager
+export_jobs = ExportJobManager()
@@ -0,0 +1,723 @@
+"""
+Persistent job queue for API-triggered collector runs.
+
+/api/collectors/run used to run each collector in a subprocess, one after
+the other, inside the request. Runs are now queued in job_batches/job_runs
+and served by a pool of worker threads started with the API, which call the
+collectors in-process (collectors/jobs.py):
+
+- Jobs of a batch run in stage order: the collectors (stage 0) run
+  concurrently, then the checks that read their data (stage 1), which are
+  cancelled if no collector succeeded.
+- Workers claim jobs with SELECT ... FOR UPDATE SKIP LOCKED under an
+  advisory lock, so several API processes can share the queue and the same
+  job never runs twice at once.
+- Queued jobs live in the database and survive a restart. A running job
+  carries its worker's heartbeat; if the worker dies the job is requeued
+  (up to JOB_MAX_ATTEMPTS claims) once the heartbeat is JOB_STALE_SECONDS old.
+- Cancelling a batch cancels its queued jobs at once. Running jobs see the
+  cancel on their worker's next heartbeat and stop at their next stage
+  boundary (common.job_logging.mark_stage) before the batch is marked
+  cancelled.
+- A job still running after JOB_TIMEOUT_SECONDS is failed as timed out and
+  asked to stop; its heartbeat stops and a new worker thread takes its
+  place, so a hung collector neither holds the job as 'running' nor blocks
+  later runs of the same job.
+- Jobs with claimed_by already set when queued belong to a nightly pipeline
+  run (collectors/pipeline.py) and are left to it while it heartbeats.
+- The heartbeat thread also sweeps runs started outside the queue (CLI and
+  systemd collectors) that were left 'running' by a dead process, so the
+  read endpoints no longer clean up on every request.
+
+Every state change is announced on the job_events channel
+(common/job_events.py).
+"""
+
+import logging
+import os
+import socket
+import subprocess
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+from api.progress_tracker import update_job_progress
+from collectors.jobs import JOBS
+from common.job_events import notify_job_events
+from common.job_logging import JobRunStats, track_job
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUE_WORKERS = int(os.getenv('JOB_QUEUE_WORKERS', '3'))
+JOB_QUEUE_POLL_SECONDS = float(os.getenv('JOB_QUEUE_POLL_SECONDS', '5'))
+JOB_HEARTBEAT_SECONDS = float(os.getenv('JOB_HEARTBEAT_SECONDS', '30'))
+JOB_STALE_SECONDS = int(os.getenv('JOB_STALE_SECONDS', '180'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '2'))
+JOB_SWEEP_SECONDS = float(os.getenv('JOB_SWEEP_SECONDS', '60'))
+# Longest a job may run before it is failed as timed out
+JOB_TIMEOUT_SECONDS = int(os.getenv('JOB_TIMEOUT_SECONDS', '600'))
+
+# Loaded once when the pool starts, instead of on every request
+ENV_FILES = [
+    '/opt/es-inventory-hub/.env',
+    '/opt/dashboard-project/es-dashboards/.env',
+]
+
+# Advisory lock serializing job claims across processes
+CLAIM_LOCK_KEY = 7302
+
+CLAIM_QUERY = text("""
+    UPDATE job_runs
+    SET status = 'running',
+        claimed_by = :worker_id,
+        attempts = attempts + 1,
+        heartbeat_at = NOW(),
+        updated_at = NOW(),
+        progress_percent = 10
+    WHERE job_id = (
+        SELECT jr.job_id
+        FROM job_runs jr
+        JOIN job_batches jb ON jb.batch_id = jr.batch_id
+        WHERE jr.status = 'queued'
+          AND jr.claimed_by IS NULL
+          AND jr.job_name = ANY(:job_names)
+          AND jb.status IN ('queued', 'running')
+          -- Earlier stages of the batch have finished
+          AND NOT EXISTS (
+              SELECT 1 FROM job_runs prev
+              WHERE prev.batch_id = jr.batch_id
+                AND prev.stage < jr.stage
+                AND prev.status IN ('queued', 'running')
+          )
+          -- The same job is not already running for another batch
+          AND NOT EXISTS (
+              SELECT 1 FROM job_runs busy
+              WHERE busy.job_name = jr.job_name
+                AND busy.status = 'running'
+                AND busy.claimed_by IS NOT NULL
+          )
+        ORDER BY CASE jb.priority WHEN 'high' THEN 0 WHEN 'normal' THEN 1 ELSE 2 END,
+                 jr.started_at, jr.stage
+        LIMIT 1
+        FOR UPDATE OF jr SKIP LOCKED
+    )
+    RETURNING job_id, batch_id, job_name, stage
+""")
+
+
+def load_env_files() -> int:
+    """
+    Add collector credentials from the .env files to the process environment.
+
+    Variables already set in the environment win; the local file wins over
+    the dashboard file.
+
+    Returns:
+        int: Number of variables added
+    """
+    added = 0
+    for env_file in ENV_FILES:
+        if not os.path.exists(env_file):
+            continue
+        try:
+            with open(env_file, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith('#') and '=' in line:
+                        key, value = line.split('=', 1)
+                        if key.strip() not in os.environ:
+                            os.environ[key.strip()] = value.strip()
+                            added += 1
+        except OSError as e:
+            logger.warning(f"Could not read {env_file}: {e}")
+    return added
+
+
+def enqueue_batch(session, job_names: List[str], priority: str = 'normal',
+                  message: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Queue a batch of jobs.
+
+    Args:
+        session: Database session (caller commits, then calls job_queue.notify())
+        job_names: Names of jobs from collectors.jobs.JOBS
+        priority: Batch priority ('high', 'normal' or 'low')
+        message: Batch message
+
+    Returns:
+        dict: batch_id and the queued jobs in /api/collectors/run format
+    """
+    unknown = [name for name in job_names if name not in JOBS]
+    if unknown:
+        raise ValueError(f"Unknown jobs: {', '.join(unknown)}")
+
+    batch_id = f"bc_{uuid.uuid4().hex[:8]}"
+    now = datetime.utcnow()
+
+    session.execute(text("""
+        INSERT INTO job_batches (batch_id, created_at, status, priority, started_at, message)
+        VALUES (:batch_id, :created_at, 'queued', :priority, :started_at, :message)
+    """), {
+        'batch_id': batch_id,
+        'created_at': now,
+        'priority': priority,
+        'started_at': now,
+        'message': message or f"Queued jobs: {', '.join(job_names)}"
+    })
+
+    jobs = []
+    for name in job_names:
+        definition = JOBS[name]
+        job_id = f"{definition.id_prefix}_{uuid.uuid4().hex[:8]}"
+        session.execute(text("""
+            INSERT INTO job_runs (job_id, batch_id, job_name, status, stage, started_at, updated_at, message)
+            VALUES (:job_id, :batch_id, :job_name, 'queued', :stage, :started_at, :updated_at, :message)
+        """), {
+            'job_id': job_id,
+            'batch_id': batch_id,
+            'job_name': name,
+            'stage': definition.stage,
+            'started_at': now,
+            'updated_at': now,
+            'message': f"Queued {definition.label}"
+        })
+        jobs.append({
+            'job_name': name,
+            'job_id': job_id,
+            'status': 'queued',
+            'started_at': now.isoformat() + 'Z'
+        })
+
+    notify_job_events(session, job_ids=[job['job_id'] for job in jobs], batch_ids=[batch_id])
+    return {'batch_id': batch_id, 'collectors': jobs}
+
+
+def cancel_batch(session, batch_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Cancel a batch: its queued jobs are cancelled now, running jobs stop at
+    their next stage boundary (see JobQueueWorkerPool._heartbeat).
+
+    Args:
+        session: Database session (caller commits)
+        batch_id: Batch to cancel
+
+    Returns:
+        dict: Batch status and the cancelled/still-running job ids, or None if
+        the batch does not exist
+    """
+    batch = session.execute(text("""
+        SELECT status FROM job_batches WHERE batch_id = :batch_id FOR UPDATE
+    """), {'batch_id': batch_id}).fetchone()
+    if not batch:
+        return None
+    if batch.status in ('completed', 'failed', 'cancelled'):
+        return {'batch_id': batch_id, 'status': batch.status, 'cancelled_jobs': [], 'running_jobs': []}
+
+    cancelled = session.execute(text("""
+        UPDATE job_runs
+        SET status = 'cancelled', message = 'Cancelled by request',
+            ended_at = NOW(), updated_at = NOW(),
+            duration_seconds = EXTRACT(EPOCH FROM (NOW() - started_at))::INTEGER
+        WHERE batch_id = :batch_id AND status = 'queued'
+        RETURNING job_id
+    """), {'batch_id': batch_id}).scalars().all()
+
+    running = session.execute(text("""
+        SELECT job_id FROM job_runs WHERE batch_id = :batch_id AND status = 'running'
+    """), {'batch_id': batch_id}).scalars().all()
+
+    status = 'cancelling' if running else 'cancelled'
+    session.execute(text("""
+        UPDATE job_batches
+        SET status = :status,
+            message = :message,
+            ended_at = CASE WHEN :status = 'cancelled' THEN NOW() ELSE ended_at END,
+            duration_seconds = CASE WHEN :status = 'cancelled'
+                THEN EXTRACT(EPOCH FROM (NOW() - started_at))::INTEGER ELSE duration_seconds END
+        WHERE batch_id = :batch_id
+    """), {
+        'batch_id': batch_id,
+        'status': status,
+        'message': (f'Cancelling - waiting for {len(running)} running job(s) to stop' if running
+                    else 'Cancelled by request')
+    })
+    notify_job_events(session, job_ids=cancelled, batch_ids=[batch_id])
+
+    return {'batch_id': batch_id, 'status': status, 'cancelled_jobs': cancelled, 'running_jobs': running}
+
+
+def finish_batch(session, batch_id: str) -> Optional[str]:
+    """
+    Update a batch after one of its jobs ended; close it once no job is left.
+
+    A batch succeeds if at least one collector (stage 0 job) succeeded, or,
+    for batches without collectors, if any job succeeded.
+
+    Args:
+        session: Database session (caller commits)
+        batch_id: Batch to update
+
+    Returns:
+        str: Final batch status, or None while jobs are still queued or running
+    """
+    batch = session.execute(text("""
+        SELECT status FROM job_batches WHERE batch_id = :batch_id FOR UPDATE
+    """), {'batch_id': batch_id}).fetchone()
+    if not batch:
+        return None
+
+    jobs = session.execute(text("""
+        SELECT job_name, status, stage FROM job_runs WHERE batch_id = :batch_id
+    """), {'batch_id': batch_id}).fetchall()
+
+    pending = [job for job in jobs if job.status in ('queued', 'running')]
+    if pending:
+        done = len(jobs) - len(pending)
+        session.execute(text("""
+            UPDATE job_batches
+            SET status = CASE WHEN status = 'queued' THEN 'running' ELSE status END,
+                progress_percent = :progress
+            WHERE batch_id = :batch_id
+        """), {'batch_id': batch_id, 'progress': int(done * 100 / len(jobs))})
+        notify_job_events(session, batch_ids=[batch_id])
+        return None
+
+    first_stage = min(job.stage for job in jobs)
+    succeeded = [job.job_name for job in jobs if job.stage == first_stage and job.status == 'completed']
+    failed = [job.job_name for job in jobs if job.status == 'failed']
+
+    if batch.status == 'cancelling':
+        status, message = 'cancelled', 'Cancelled by request'
+    elif succeeded and failed:
+        status = 'completed'
+        message = f'Partial success: {len(succeeded)} collector(s) succeeded, {len(failed)} failed: {", ".join(failed)}'
+    elif succeeded:
+        status, message = 'completed', 'All collectors completed successfully'
+    else:
+        status, message = 'failed', f'All collectors failed: {", ".join(failed)}'
+
+    session.execute(text("""
+        UPDATE job_batches
+        SET status = :status, message = :message, progress_percent = 100,
+            ended_at = NOW(),
+            duration_seconds = EXTRACT(EPOCH FROM (NOW() - started_at))::INTEGER
+        WHERE batch_id = :batch_id
+    """), {'batch_id': batch_id, 'status': status, 'message': message})
+    notify_job_events(session, batch_ids=[batch_id])
+    return status
+
+
+def requeue_stale_jobs(session) -> List[str]:
+    """
+    Requeue running jobs whose worker stopped heartbeating (e.g. an API restart).
+
+    Jobs that already used JOB_MAX_ATTEMPTS claims are failed instead. Queued
+    jobs reserved by a nightly pipeline run (collectors/pipeline.py) that
+    stopped heartbeating are released to the workers.
+
+    Args:
+        session: Database session (caller commits)
+
+    Returns:
+        list: IDs of the recovered jobs
+    """
+    stale = session.execute(text("""
+        UPDATE job_runs jr
+        SET status = CASE
+                WHEN jb.status = 'cancelling' THEN 'cancelled'
+                WHEN jr.attempts < :max_attempts THEN 'queued'
+                ELSE 'failed' END,
+            message = CASE
+                WHEN jb.status = 'cancelling' THEN 'Cancelled by request'
+                WHEN jr.attempts < :max_attempts THEN 'Requeued - worker ' || jr.claimed_by || ' stopped responding'
+                ELSE 'Failed - worker ' || jr.claimed_by || ' stopped responding' END,
+            ended_at = CASE
+                WHEN jb.status <> 'cancelling' AND jr.attempts < :max_attempts THEN NULL
+                ELSE NOW() END,
+            duration_seconds = CASE
+                WHEN jb.status <> 'cancelling' AND jr.attempts < :max_attempts THEN NULL
+                ELSE EXTRACT(EPOCH FROM (NOW() - jr.started_at))::INTEGER END,
+            claimed_by = NULL,
+            progress_percent = 0,
+            updated_at = NOW()
+        FROM job_batches jb
+        WHERE jb.batch_id = jr.batch_id
+          AND jr.status = 'running'
+          AND jr.claimed_by IS NOT NULL
+          AND jr.heartbeat_at < NOW() - make_interval(secs => :stale_seconds)
+        RETURNING jr.job_id, jr.batch_id, jr.status
+    """), {'max_attempts': JOB_MAX_ATTEMPTS, 'stale_seconds': JOB_STALE_SECONDS}).fetchall()
+
+    for job_id, batch_id, status in stale:
+        logger.warning(f"Job {job_id} lost its worker; now {status}")
+        if status != 'queued':
+            finish_batch(session, batch_id)
+
+    # Jobs a nightly pipeline run reserved but never started go to the workers
+    released = session.execute(text("""
+        UPDATE job_runs
+        SET message = 'Released - runner ' || claimed_by || ' stopped responding',
+            claimed_by = NULL,
+            updated_at = NOW()
+        WHERE status = 'queued'
+          AND claimed_by IS NOT NULL
+          AND heartbeat_at < NOW() - make_interval(secs => :stale_seconds)
+        RETURNING job_id
+    """), {'stale_seconds': JOB_STALE_SECONDS}).scalars().all()
+
+    for job_id in released:
+        logger.warning(f"Job {job_id} lost its pipeline runner; released to the queue")
+
+    recovered = [job_id for job_id, _, _ in stale] + list(released)
+    notify_job_events(session, job_ids=recovered)
+    return recovered
+
+
+def cleanup_stale_jobs(session) -> List[Dict[str, Any]]:
+    """
+    Fail collector runs left 'running' by a process that no longer exists.
+
+    Only covers runs started outside the queue (CLI or systemd collectors,
+    claimed_by NULL); queue and pipeline jobs are recovered through their
+    heartbeat by requeue_stale_jobs().
+
+    Args:
+        session: Database session (caller commits)
+
+    Returns:
+        list: The failed jobs with the reason
+    """
+    cleaned_jobs = []
+
+    stale_jobs = session.execute(text("""
+        SELECT
+            job_id,
+            job_name,
+            started_at,
+            EXTRACT(EPOCH FROM (NOW() - started_at))::int as seconds_running
+        FROM job_runs
+        WHERE status = 'running'
+        AND claimed_by IS NULL
+        AND started_at < NOW() - INTERVAL '10 minutes'
+        AND job_name IN ('ninja-collector', 'threatlocker-collector')
+    """)).fetchall()
+
+    for job_id, job_name, started_at, seconds_running in stale_jobs:
+        # Check if the collector process is still running
+        pattern = {
+            'ninja-collector': 'collectors.ninja.main',
+            'threatlocker-collector': 'collectors.threatlocker.main',
+        }[job_name]
+        try:
+            process_running = subprocess.run(
+                ['pgrep', '-f', pattern], capture_output=True, text=True
+            ).returncode == 0
+        except OSError:
+            process_running = False
+
+        if process_running:
+            continue
+
+        session.execute(text("""
+            UPDATE job_runs
+            SET status = 'failed',
+                message = 'Job appears to have failed or was interrupted - no process found running',
+                ended_at = NOW(),
+                updated_at = NOW()
+            WHERE job_id = :job_id
+        """), {'job_id': job_id})
+        cleaned_jobs.append({
+            'job_id': job_id,
+            'job_name': job_name,
+            'started_at': started_at.isoformat() if started_at else None,
+            'seconds_running': seconds_running,
+            'reason': 'No active process found'
+        })
+
+    notify_job_events(session, job_ids=[job['job_id'] for job in cleaned_jobs])
+    return cleaned_jobs
+
+
+@dataclass
+class RunningJob:
+    """A job executing on one of the pool's worker threads."""
+
+    job: Any
+    # time.monotonic() after which the job is failed as timed out
+    deadline: float
+    run: Optional[JobRunStats] = None
+    stop_reason: Optional[str] = None
+    timed_out: bool = False
+
+    def request_stop(self, reason: str) -> None:
+        """Ask the job to stop at its next stage boundary (call with the pool lock held)."""
+        if self.stop_reason is None:
+            self.stop_reason = reason
+        if self.run is not None:
+            self.run.request_stop(self.stop_reason)
+
+
+class JobQueueWorkerPool:
+    """Worker threads serving the job_runs queue in this process."""
+
+    def __init__(self, workers: int = JOB_QUEUE_WORKERS,
+                 poll_seconds: float = JOB_QUEUE_POLL_SECONDS,
+                 timeout_seconds: int = JOB_TIMEOUT_SECONDS):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.timeout_seconds = timeout_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._threads: List[threading.Thread] = []
+        self._running: Dict[str, RunningJob] = {}
+        self._worker_count = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self) -> None:
+        """Load the collector environment, recover stale jobs and start the workers."""
+        with self._lock:
+            if self.running:
+                return
+
+            added = load_env_files()
+            logger.info(f"Job queue: loaded {added} variable(s) from env files")
+
+            self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+            self._stop.clear()
+            self._threads = [self._new_worker() for _ in range(self.workers)]
+            self._threads.append(
+                threading.Thread(target=self._heartbeat, name='job-queue-heartbeat', daemon=True)
+            )
+            for thread in self._threads:
+                thread.start()
+            logger.info(f"Job queue: {self.workers} worker(s) started as {self.worker_id}")
+
+    def stop(self) -> None:
+        """Ask the workers to exit after their current job."""
+        self._stop.set()
+        self._wake.set()
+
+    def notify(self) -> None:
+        """Wake idle workers (call after committing new jobs)."""
+        self._wake.set()
+
+    def _new_worker(self) -> threading.Thread:
+        """A worker thread, not yet started (call with the lock held)."""
+        self._worker_count += 1
+        return threading.Thread(target=self._work, name=f'job-queue-{self._worker_count - 1}', daemon=True)
+
+    def _replace_worker(self) -> None:
+        """Start a worker in place of one stuck in a timed-out job."""
+        with self._lock:
+            if self._stop.is_set():
+                return
+            thread = self._new_worker()
+            self._threads = [t for t in self._threads if t.is_alive()] + [thread]
+            thread.start()
+        logger.info(f"Job queue: started {thread.name} to replace a timed-out worker")
+
+    def _session(self):
+        from api.api_server import get_session
+        return get_session()
+
+    def _claim(self) -> Optional[Any]:
+        """Claim the next runnable job, or None if there is none."""
+        with self._session() as session:
+            session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': CLAIM_LOCK_KEY})
+            job = session.execute(CLAIM_QUERY, {
+                'worker_id': self.worker_id,
+                'job_names': list(JOBS)
+            }).fetchone()
+            if job:
+                session.execute(text("""
+                    UPDATE job_batches SET status = 'running'
+                    WHERE batch_id = :batch_id AND status = 'queued'
+                """), {'batch_id': job.batch_id})
+                notify_job_events(session, job_ids=[job.job_id], batch_ids=[job.batch_id])
+            session.commit()
+            return job
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self._claim()
+            except Exception as e:
+                logger.error(f"Job queue: claiming a job failed: {e}")
+                job = None
+
+            if job is None:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+                continue
+
+            if not self._execute(job):
+                # A replacement worker took this thread's place
+                return
+
+    def _execute(self, job) -> bool:
+        """
+        Run a claimed job and record its outcome.
+
+        Returns:
+            bool: False if the job ran past its deadline; the heartbeat already
+            failed it and replaced this worker, so the thread should exit
+        """
+        definition = JOBS[job.job_name]
+        entry = RunningJob(job, time.monotonic() + self.timeout_seconds)
+        with self._lock:
+            self._running[job.job_id] = entry
+
+        error = None
+        if job.stage > 0 and not self._earlier_stage_succeeded(job):
+            status, progress, message = 'cancelled', 0, 'Cancelled - no collectors succeeded'
+        else:
+            update_job_progress(job.job_id, 'running', 10, f'{definition.label} started')
+            try:
+                with track_job(job.job_name, job.job_id) as run:
+                    with self._lock:
+                        entry.run = run
+                        if entry.stop_reason is not None:
+                            run.request_stop(entry.stop_reason)
+                    message = definition.run()
+                status, progress = 'completed', 100
+            except (Exception, SystemExit) as e:
+                # SystemExit from collector code must not take the worker down
+                if entry.stop_reason is not None:
+                    logger.warning(f"Job {job.job_id} ({job.job_name}) stopped: {entry.stop_reason}")
+                    status, progress, message = 'cancelled', 0, entry.stop_reason
+                else:
+                    logger.error(f"Job {job.job_id} ({job.job_name}) failed: {e}")
+                    status, progress, message = 'failed', 0, f'{definition.label} failed: {e}'
+                    error = str(e)
+
+        with self._lock:
+            del self._running[job.job_id]
+        if entry.timed_out:
+            logger.warning(f"Job {job.job_id} ({job.job_name}) returned after timing out; "
+                           f"{threading.current_thread().name} exits")
+            return False
+
+        update_job_progress(job.job_id, status, progress, message, error=error)
+
+        try:
+            with self._session() as session:
+                finish_batch(session, job.batch_id)
+                session.commit()
+        except Exception as e:
+            logger.error(f"Job queue: updating batch {job.batch_id} failed: {e}")
+
+        from api.response_cache import invalidate as invalidate_response_cache
+        invalidate_response_cache()
+        return True
+
+    def _fail_overdue_jobs(self) -> List[str]:
+        """
+        Fail jobs running past their deadline and replace their workers.
+
+        The job is asked to stop at its next stage boundary, but its thread
+        may stay blocked (e.g. in an API call), so the job is failed now, the
+        heartbeat no longer covers it and a new worker takes its place.
+
+        Returns:
+            list: IDs of the jobs failed as timed out
+        """
+        now = time.monotonic()
+        with self._lock:
+            overdue = [entry for entry in self._running.values()
+                       if not entry.timed_out and entry.deadline <= now]
+            for entry in overdue:
+                entry.timed_out = True
+                entry.request_stop(f'Timed out after {self.timeout_seconds}s')
+
+        for entry in overdue:
+            job = entry.job
+            logger.error(f"Job {job.job_id} ({job.job_name}) ran past {self.timeout_seconds}s; failing it")
+            update_job_progress(job.job_id, 'failed', 0,
+                                f'{JOBS[job.job_name].label} timed out after {self.timeout_seconds}s',
+                                error='timeout')
+            try:
+                with self._session() as session:
+                    finish_batch(session, job.batch_id)
+                    session.commit()
+            except Exception as e:
+                logger.error(f"Job queue: updating batch {job.batch_id} failed: {e}")
+            self._replace_worker()
+
+        return [entry.job.job_id for entry in overdue]
+
+    def _stop_cancelled_jobs(self, job_ids: List[str]) -> None:
+        """Ask this worker's jobs in cancelled batches to stop at their next stage boundary."""
+        with self._lock:
+            for job_id in job_ids:
+                entry = self._running.get(job_id)
+                if entry is not None:
+                    entry.request_stop('Cancelled by request')
+
+    def _earlier_stage_succeeded(self, job) -> bool:
+        """Whether a stage-N job has data to work on: an earlier stage succeeded, or there is none."""
+        with self._session() as session:
+            row = session.execute(text("""
+                SELECT COUNT(*) AS earlier,
+                       COUNT(*) FILTER (WHERE status = 'completed') AS succeeded
+                FROM job_runs
+                WHERE batch_id = :batch_id AND stage < :stage
+            """), {'batch_id': job.batch_id, 'stage': job.stage}).fetchone()
+        return row.earlier == 0 or row.succeeded > 0
+
+    def _heartbeat(self) -> None:
+        """
+        Fail this worker's overdue jobs, keep its other running jobs alive and
+        stop those whose batch is being cancelled, recover other workers'
+        stale jobs and, every JOB_SWEEP_SECONDS, sweep dead runs started
+        outside the queue.
+        """
+        last_sweep = 0.0
+        while True:
+            try:
+                self._fail_overdue_jobs()
+                with self._lock:
+                    timed_out = [job_id for job_id, entry in self._running.items() if entry.timed_out]
+                with self._session() as session:
+                    alive = session.execute(text("""
+                        UPDATE job_runs jr SET heartbeat_at = NOW()
+                        FROM job_batches jb
+                        WHERE jb.batch_id = jr.batch_id
+                          AND jr.claimed_by = :worker_id
+                          AND jr.status = 'running'
+                          AND jr.job_id <> ALL(:timed_out)
+                        RETURNING jr.job_id, jb.status AS batch_status
+                    """), {'worker_id': self.worker_id, 'timed_out': timed_out}).fetchall()
+                    recovered = requeue_stale_jobs(session)
+                    session.commit()
+                self._stop_cancelled_jobs([row.job_id for row in alive if row.batch_status == 'cancelling'])
+                if recovered:
+                    self.notify()
+            except Exception as e:
+                logger.error(f"Job queue: heartbeat failed: {e}")
+
+            if time.monotonic() - last_sweep >= JOB_SWEEP_SECONDS:
+                last_sweep = time.monotonic()
+                try:
+                    with self._session() as session:
+                        cleaned = cleanup_stale_jobs(session)
+                        session.commit()
+                    for job in cleaned:
+                        logger.warning(f"Job {job['job_id']} ({job['job_name']}) has no process; marked failed")
+                except Exception as e:
+                    logger.error(f"Job queue: stale job sweep failed: {e}")
+
+            if self._stop.wait(JOB_HEARTBEAT_SECONDS):
+                break
+
+
+job_queue = JobQueueWorkerPool()
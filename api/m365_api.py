@@ -9,8 +9,6 @@ Provides REST API endpoints for:
 5. Export - Full dataset export (CSV/JSON)
 """
 
-import csv
-import io
 import re
 import sys
 from pathlib import Path
@@ -24,6 +22,12 @@ from sqlalchemy import text
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from api.pagination import (
+    decode_cursor, keyset_condition, order_by_clause, page_changes, page_params, parse_fields, split_page
+)
+from api.response_cache import cached_response
+from api.streaming import csv_response, stream_rows
+
 # Create Blueprint for M365 API
 m365_api = Blueprint('m365_api', __name__)
 
@@ -214,6 +218,7 @@ def find_m365_change_dates(session, changes_by_type: Dict[str, List[Dict]],
 
 
 @m365_api.route('/api/m365/usage-changes', methods=['GET'])
+@cached_response
 def get_m365_usage_changes():
     """
     Compare M365 user/license data between two dates.
@@ -228,6 +233,9 @@ def get_m365_usage_changes():
         start_date (required): Baseline date in YYYY-MM-DD format
         end_date (required): Comparison date in YYYY-MM-DD format
         detail_level (optional): "summary" (default) or "full"
+        limit (optional): Page size for the full-mode change details (max 1000);
+            without limit or cursor all details are returned
+        cursor (optional): Next page of change details, from next_cursor
         organization_name (optional): Filter by specific organization name
 
     Returns:
@@ -300,6 +308,20 @@ def get_m365_usage_changes():
             }
         }), 400
 
+    # Optional paging of the change details in full mode
+    paged = 'limit' in request.args or 'cursor' in request.args
+    try:
+        limit, cursor = page_params(500, 1000)
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": {
+                "code": "INVALID_PARAMETER",
+                "message": str(e),
+                "status": 400
+            }
+        }), 400
+
     with get_session() as session:
         # Check data availability for both dates
         if not check_m365_date_availability(session, start_date):
@@ -500,6 +522,21 @@ def get_m365_usage_changes():
         for org_name, org_data in by_organization.items():
             org_data['user_change'] = org_data['end_user_count'] - org_data['start_user_count']
 
+        # Page the user details before looking up their change dates
+        next_cursor = None
+        if detail_level == 'full' and paged:
+            try:
+                changes, next_cursor = page_changes(changes, limit, cursor)
+            except ValueError as e:
+                return jsonify({
+                    "success": False,
+                    "error": {
+                        "code": "INVALID_PARAMETER",
+                        "message": str(e),
+                        "status": 400
+                    }
+                }), 400
+
         # Find specific change dates (only in full mode)
         if detail_level == 'full':
             change_dates = find_m365_change_dates(session, changes, start_date, end_date)
@@ -543,6 +580,8 @@ def get_m365_usage_changes():
         # Add user details in full mode
         if detail_level == 'full':
             response_data['changes'] = changes
+            if paged:
+                response_data['next_cursor'] = next_cursor
 
         # Add organization filter info if used
         if org_filter:
@@ -856,6 +895,17 @@ def update_es_user_config(org_name: str):
         })
 
 
+# User fields /api/m365/users can return (fields=) and the columns each one reads
+M365_USER_FIELDS = {
+    'user_principal_name': ['username'],
+    'display_name': ['display_name'],
+    'licenses': ['licenses'],
+    'has_email_license': ['licenses'],
+}
+# Keyset order for paged /api/m365/users
+M365_USER_ORDER = [("COALESCE(display_name, '')", 'ASC'), ('username', 'ASC'), ('id', 'ASC')]
+
+
 @m365_api.route('/api/m365/users', methods=['GET'])
 def get_m365_users():
     """
@@ -863,6 +913,10 @@ def get_m365_users():
 
     Query Parameters:
         org (required): Organization name to filter by
+        limit (optional): Page size (max 1000); without limit or cursor all
+            users are returned
+        cursor (optional): Next page, from the previous response's next_cursor
+        fields (optional): Comma-separated user fields to return (default: all)
 
     Returns:
         JSON response with user details including has_email_license flag
@@ -877,6 +931,21 @@ def get_m365_users():
             "error": "Missing required parameter: org"
         }), 400
 
+    paged = 'limit' in request.args or 'cursor' in request.args
+    try:
+        limit, cursor = page_params(1000, 1000)
+        fields = parse_fields(list(M365_USER_FIELDS))
+        after = decode_cursor(cursor, len(M365_USER_ORDER)) if cursor else None
+    except ValueError as e:
+        return jsonify({
+            "status": "error",
+            "error": str(e)
+        }), 400
+
+    columns = ['id', 'username', 'display_name']
+    for field in fields:
+        columns += [column for column in M365_USER_FIELDS[field] if column not in columns]
+
     with get_session() as session:
         # Get the most recent snapshot date
         latest_date_result = session.execute(text("""
@@ -891,43 +960,70 @@ def get_m365_users():
             }), 404
 
         snapshot_date = latest_date_result.latest_date
+        params = {
+            'snapshot_date': snapshot_date,
+            'org_name': org_name
+        }
 
         # Get users for the specified organization
-        results = session.execute(text("""
-            SELECT
-                username,
-                display_name,
-                licenses
+        query = f"""
+            SELECT {', '.join(columns)}
             FROM m365_user_snapshot
             WHERE snapshot_date = :snapshot_date
               AND organization_name = :org_name
-            ORDER BY display_name
-        """), {
-            'snapshot_date': snapshot_date,
-            'org_name': org_name
-        }).fetchall()
-
-        if not results:
+        """
+        if after:
+            condition, cursor_params = keyset_condition(M365_USER_ORDER, after)
+            query += f" AND {condition}"
+            params.update(cursor_params)
+        query += f" ORDER BY {order_by_clause(M365_USER_ORDER)}"
+        if paged:
+            query += " LIMIT :limit"
+            params['limit'] = limit + 1
+
+        results = session.execute(text(query), params).fetchall()
+
+        if not results and not after:
             return jsonify({
                 "status": "error",
                 "error": f"No users found for organization: {org_name}"
             }), 404
 
+        next_cursor = None
+        if paged:
+            results, next_cursor = split_page(
+                results, limit, lambda row: [row.display_name or '', row.username, row.id]
+            )
+            total_users = session.execute(text("""
+                SELECT COUNT(*)
+                FROM m365_user_snapshot
+                WHERE snapshot_date = :snapshot_date
+                  AND organization_name = :org_name
+            """), {'snapshot_date': snapshot_date, 'org_name': org_name}).scalar()
+        else:
+            total_users = len(results)
+
         users = []
         for row in results:
-            users.append({
+            user = {
                 "user_principal_name": row.username,
                 "display_name": row.display_name,
-                "licenses": row.licenses or "",
-                "has_email_license": has_email_license(row.licenses)
-            })
+            }
+            if 'licenses' in fields:
+                user["licenses"] = row.licenses or ""
+            if 'has_email_license' in fields:
+                user["has_email_license"] = has_email_license(row.licenses)
+            users.append({field: user[field] for field in fields})
 
-        return jsonify({
+        response = {
             "status": "success",
             "organization": org_name,
             "users": users,
-            "total_users": len(users)
-        })
+            "total_users": total_users
+        }
+        if paged:
+            response["next_cursor"] = next_cursor
+        return jsonify(response)
 
 
 @m365_api.route('/api/m365/export', methods=['GET'])
@@ -986,8 +1082,7 @@ def export_m365_data():
         elif sort_field == 'display_name':
             sort_clause = "display_name, organization_name"
 
-        # Get all users from the latest snapshot
-        results = session.execute(text(f"""
+        users_query = text(f"""
             SELECT
                 organization_name,
                 username,
@@ -996,7 +1091,35 @@ def export_m365_data():
             FROM m365_user_snapshot
             WHERE snapshot_date = :snapshot_date
             ORDER BY {sort_clause}
-        """), {'snapshot_date': snapshot_date}).fetchall()
+        """)
+        params = {'snapshot_date': snapshot_date}
+
+        if export_format == 'csv':
+            # Stream users from a server-side cursor as the client downloads
+            def format_user_row(row) -> List[Any]:
+                return [
+                    row.organization_name,
+                    row.username,
+                    row.display_name,
+                    row.licenses or "",
+                    str(has_email_license(row.licenses)).lower()
+                ]
+
+            return csv_response(
+                [
+                    'organization_name',
+                    'user_principal_name',
+                    'display_name',
+                    'licenses',
+                    'has_email_license'
+                ],
+                stream_rows(users_query, params),
+                f"m365_users_{snapshot_date.isoformat()}.csv",
+                format_user_row
+            )
+
+        # Get all users from the latest snapshot
+        results = session.execute(users_query, params).fetchall()
 
         data = []
         for row in results:
@@ -1008,41 +1131,6 @@ def export_m365_data():
                 "has_email_license": has_email_license(row.licenses)
             })
 
-        if export_format == 'csv':
-            # Generate CSV response
-            output = io.StringIO()
-            writer = csv.writer(output)
-
-            # Write header
-            writer.writerow([
-                'organization_name',
-                'user_principal_name',
-                'display_name',
-                'licenses',
-                'has_email_license'
-            ])
-
-            # Write data
-            for record in data:
-                writer.writerow([
-                    record['organization_name'],
-                    record['user_principal_name'],
-                    record['display_name'],
-                    record['licenses'],
-                    str(record['has_email_license']).lower()
-                ])
-
-            csv_content = output.getvalue()
-            output.close()
-
-            return Response(
-                csv_content,
-                mimetype='text/csv',
-                headers={
-                    'Content-Disposition': f'attachment; filename=m365_users_{snapshot_date.isoformat()}.csv'
-                }
-            )
-
         # JSON format
         return jsonify({
             "status": "success",
@@ -0,0 +1,165 @@
+"""
+Prometheus Metrics Endpoint
+
+Provides:
+1. GET /metrics - every metric of this process in the Prometheus text format
+2. Request latency histograms per endpoint, recorded for every API request
+
+Besides the request metrics, /metrics reports database pool usage, the
+response cache's hit ratio and coalesced requests, job event stream
+subscribers, queued/running jobs, and the run, stage and vendor API
+metrics of collectors executed by the API job queue (common/job_logging.py,
+common/metrics.py). The job counts are read from job_runs at most every
+JOBS_REFRESH_SECONDS, so frequent scrapes do not each query the database.
+"""
+
+import os
+import threading
+import time
+
+from flask import Blueprint, Response, g, request
+from sqlalchemy import text
+
+from common.metrics import Counter, Gauge, Histogram, REGISTRY, render, serve_metrics
+
+metrics_api = Blueprint('metrics_api', __name__)
+
+REQUEST_LATENCY = Histogram(
+    'es_inventory_api_request_duration_seconds',
+    'API request duration by endpoint',
+    ['method', 'endpoint', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+DB_POOL_CONNECTIONS = Gauge(
+    'es_inventory_db_pool_connections',
+    'Pooled database connections by state (checked_in, checked_out, overflow) and pool size',
+    ['engine', 'state']
+)
+DB_POOL_EVENTS = Counter(
+    'es_inventory_db_pool_events_total',
+    'Connection pool events (connects, checkouts, checkins, invalidations)',
+    ['engine', 'event']
+)
+CACHE_LOOKUPS = Counter(
+    'es_inventory_api_cache_lookups_total',
+    'Response cache lookups by result',
+    ['result']
+)
+CACHE_ENTRIES = Gauge(
+    'es_inventory_api_cache_entries',
+    'Responses held in the response cache'
+)
+COALESCED_REQUESTS = Counter(
+    'es_inventory_api_coalesced_requests_total',
+    'Requests served from an identical in-flight request'
+)
+JOB_EVENT_SUBSCRIBERS = Gauge(
+    'es_inventory_job_event_subscribers',
+    'Clients connected to the collector event stream'
+)
+JOBS_ACTIVE = Gauge(
+    'es_inventory_jobs',
+    'Queued and running job_runs rows',
+    ['status']
+)
+
+JOBS_REFRESH_SECONDS = float(os.getenv('METRICS_JOBS_REFRESH_SECONDS', '30'))
+
+POOL_STATES = ('pool_size', 'checked_in', 'checked_out', 'overflow')
+POOL_EVENTS = ('connects', 'checkouts', 'checkins', 'invalidations')
+
+ACTIVE_JOBS_QUERY = text("""
+    SELECT status, COUNT(*) AS jobs
+    FROM job_runs
+    WHERE status IN ('queued', 'running')
+    GROUP BY status
+""")
+
+# Monotonic time JOBS_ACTIVE was last read from job_runs
+_jobs_refreshed_at = None
+_jobs_refresh_lock = threading.Lock()
+
+
+@metrics_api.before_app_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@metrics_api.after_app_request
+def observe_request(response):
+    started = g.get('request_started')
+    if started is not None:
+        # The route pattern keeps the label set bounded (no IDs or dates)
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - started,
+            method=request.method, endpoint=endpoint, status=response.status_code
+        )
+    return response
+
+
+def _collect_pool_stats():
+    from common.db import pool_stats
+
+    for engine_name, stats in pool_stats().items():
+        for state in POOL_STATES:
+            if state in stats:
+                DB_POOL_CONNECTIONS.set(stats[state], engine=engine_name, state=state)
+        for event in POOL_EVENTS:
+            DB_POOL_EVENTS.set_total(stats.get(event, 0), engine=engine_name, event=event)
+
+
+def _collect_cache_stats():
+    from api.response_cache import request_flights, response_cache
+
+    stats = response_cache.stats()
+    CACHE_LOOKUPS.set_total(stats['hits'], result='hit')
+    CACHE_LOOKUPS.set_total(stats['misses'], result='miss')
+    CACHE_ENTRIES.set(stats['entries'])
+    COALESCED_REQUESTS.set_total(request_flights.stats()['coalesced'])
+
+
+def _collect_job_stats():
+    from common.db import get_engine
+    from common.job_events import job_events
+
+    global _jobs_refreshed_at
+
+    JOB_EVENT_SUBSCRIBERS.set(job_events.subscriber_count)
+
+    # Concurrent scrapes serve the gauge as it is rather than wait for the query
+    if not _jobs_refresh_lock.acquire(blocking=False):
+        return
+    try:
+        now = time.monotonic()
+        if _jobs_refreshed_at is not None and now - _jobs_refreshed_at < JOBS_REFRESH_SECONDS:
+            return
+        # A failed query is retried at the next refresh, not on every scrape
+        _jobs_refreshed_at = now
+
+        counts = {'queued': 0, 'running': 0}
+        with get_engine().connect() as connection:
+            for row in connection.execute(ACTIVE_JOBS_QUERY):
+                counts[row.status] = row.jobs
+        for status, jobs in counts.items():
+            JOBS_ACTIVE.set(jobs, status=status)
+    finally:
+        _jobs_refresh_lock.release()
+
+
+REGISTRY.add_callback(_collect_pool_stats)
+REGISTRY.add_callback(_collect_cache_stats)
+REGISTRY.add_callback(_collect_job_stats)
+serve_metrics()
+
+
+@metrics_api.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Prometheus scrape endpoint.
+
+    Returns:
+        Text exposition format (version 0.0.4)
+    """
+    return Response(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
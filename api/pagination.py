@@ -0,0 +1,204 @@
+"""
+Keyset pagination and sparse fieldsets for list endpoints.
+
+List endpoints order their rows by indexed columns ending in a unique
+tie-breaker and hand out an opaque cursor holding the last row's sort
+values. The next page continues WHERE the sort columns come after the
+cursor instead of using OFFSET, so every page costs the same and rows
+added in between do not shift the pages.
+
+fields= names the columns a client needs; endpoints only select those
+(plus the sort columns the cursor needs) from the database.
+"""
+
+import base64
+import json
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from flask import request
+
+
+class PaginationError(ValueError):
+    """Invalid limit, cursor or fields parameter (reported as a 400)."""
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Encode a row's sort values as an opaque cursor.
+
+    Dates and datetimes are stored as ISO strings, which Postgres compares
+    against date and timestamp columns directly.
+
+    Args:
+        values: Sort values of the last row on a page
+
+    Returns:
+        str: URL-safe cursor
+    """
+    raw = json.dumps(list(values), default=lambda value: value.isoformat(), separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    Decode a cursor made by encode_cursor().
+
+    Args:
+        cursor: Cursor from a previous page
+        size: Number of sort values the endpoint expects
+
+    Returns:
+        list: The sort values
+
+    Raises:
+        PaginationError: If the cursor is malformed or from another endpoint
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        raise PaginationError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise PaginationError('Invalid cursor')
+    return values
+
+
+def page_params(default_limit: int, max_limit: int) -> Tuple[int, Optional[str]]:
+    """
+    Read limit and cursor from the request.
+
+    Args:
+        default_limit: Page size when limit is not given
+        max_limit: Largest page size allowed (larger limits are capped)
+
+    Returns:
+        tuple: (limit, cursor or None)
+
+    Raises:
+        PaginationError: If limit is not a positive integer
+    """
+    try:
+        limit = int(request.args.get('limit', default_limit))
+    except ValueError:
+        raise PaginationError('limit must be an integer')
+    if limit < 1:
+        raise PaginationError('limit must be at least 1')
+    return min(limit, max_limit), request.args.get('cursor') or None
+
+
+def parse_fields(available: Sequence[str], default: Optional[Sequence[str]] = None) -> List[str]:
+    """
+    Read the fields= parameter (comma-separated field names).
+
+    Args:
+        available: Fields the endpoint can return
+        default: Fields returned without fields= (defaults to all available)
+
+    Returns:
+        list: Requested fields, in the endpoint's order
+
+    Raises:
+        PaginationError: If an unknown field is requested
+    """
+    fields_param = request.args.get('fields')
+    if not fields_param:
+        return list(default if default is not None else available)
+
+    requested = {field.strip() for field in fields_param.split(',') if field.strip()}
+    unknown = sorted(requested - set(available))
+    if unknown:
+        raise PaginationError(
+            f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available)}"
+        )
+    return [field for field in available if field in requested]
+
+
+def order_by_clause(order_by: Sequence[Tuple[str, str]]) -> str:
+    """Render (expression, 'ASC'/'DESC') pairs as an ORDER BY list."""
+    return ', '.join(f"{expression} {direction}" for expression, direction in order_by)
+
+
+def keyset_condition(order_by: Sequence[Tuple[str, str]], values: Sequence[Any],
+                     prefix: str = 'cursor') -> Tuple[str, Dict[str, Any]]:
+    """
+    Build the WHERE condition selecting the rows after a cursor.
+
+    Args:
+        order_by: (SQL expression, 'ASC' or 'DESC') pairs ending with a unique
+            column; the expressions must not be NULL
+        values: The cursor's values for those expressions
+        prefix: Bind parameter name prefix
+
+    Returns:
+        tuple: (SQL condition, bind parameters)
+    """
+    params = {f"{prefix}_{i}": value for i, value in enumerate(values)}
+    alternatives = []
+    for i, (expression, direction) in enumerate(order_by):
+        operator = '<' if direction.upper() == 'DESC' else '>'
+        terms = [f"{order_by[j][0]} = :{prefix}_{j}" for j in range(i)]
+        terms.append(f"{expression} {operator} :{prefix}_{i}")
+        alternatives.append('(' + ' AND '.join(terms) + ')')
+    return '(' + ' OR '.join(alternatives) + ')', params
+
+
+def split_page(rows: Sequence[Any], limit: int,
+               sort_key: Callable[[Any], Sequence[Any]]) -> Tuple[List[Any], Optional[str]]:
+    """
+    Trim a query result fetched with LIMIT limit + 1 to one page.
+
+    Args:
+        rows: Up to limit + 1 rows in page order
+        limit: Page size
+        sort_key: Returns a row's sort values (the order_by expressions)
+
+    Returns:
+        tuple: (rows of this page, cursor of the next page or None)
+    """
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(sort_key(rows[-1]))
+
+
+def page_changes(changes: Dict[str, List[Dict[str, Any]]], limit: int,
+                 cursor: Optional[str]) -> Tuple[Dict[str, List[Dict[str, Any]]], Optional[str]]:
+    """
+    Cut one page out of a usage-changes 'changes' document.
+
+    Change lists compare two stored snapshots and come out of the query in a
+    fixed order, so the cursor is the change type and position to resume at.
+
+    Args:
+        changes: Change type -> detail list, in response order
+        limit: Page size (details across all change types)
+        cursor: Cursor from the previous page, or None for the first page
+
+    Returns:
+        tuple: (same change types with this page's details, next cursor or None)
+
+    Raises:
+        PaginationError: If the cursor is malformed
+    """
+    types = list(changes)
+    type_index, position = 0, 0
+    if cursor:
+        change_type, position = decode_cursor(cursor, 2)
+        if change_type not in types or not isinstance(position, int) or position < 0:
+            raise PaginationError('Invalid cursor')
+        type_index = types.index(change_type)
+
+    page = {change_type: [] for change_type in types}
+    remaining = limit
+    for change_type in types[type_index:]:
+        details = changes[change_type][position:]
+        page[change_type] = details[:remaining]
+        remaining -= len(page[change_type])
+        if remaining == 0:
+            end = position + len(page[change_type])
+            if end < len(changes[change_type]):
+                return page, encode_cursor([change_type, end])
+            following = [t for t in types[types.index(change_type) + 1:] if changes[t]]
+            return page, encode_cursor([following[0], 0]) if following else None
+        position = 0
+    return page, None
@@ -6,18 +6,23 @@ This module provides functions to update job progress in the database.
 import os
 import sys
 from datetime import datetime
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
 
+from common.job_events import notify_job_events
+
+_Session = None
+
 def get_db_connection():
-    """Get database connection using environment variables."""
-    db_dsn = os.getenv('DB_DSN')
-    if not db_dsn:
-        raise ValueError("DB_DSN environment variable not set")
-    
-    engine = create_engine(db_dsn)
-    Session = sessionmaker(bind=engine)
-    return Session()
+    """Get a database session on the shared pooled engine."""
+    global _Session
+    if _Session is None:
+        if not os.getenv('DB_DSN'):
+            raise ValueError("DB_DSN environment variable not set")
+        
+        from common.db import get_engine
+        _Session = sessionmaker(bind=get_engine())
+    return _Session()
 
 def update_job_progress(job_id, status, progress_percent=None, message=None, error=None):
     """
@@ -67,6 +72,7 @@ def update_job_progress(job_id, status, progress_percent=None, message=None, err
                     'ended_at': now
                 })
             
+            notify_job_events(session, job_ids=[job_id])
             session.commit()
             print(f"Updated job {job_id}: {status} - {message or ''}")
             
@@ -119,6 +125,7 @@ def update_batch_progress(batch_id, status, progress_percent=None, message=None,
                     'ended_at': now
                 })
             
+            notify_job_events(session, batch_ids=[batch_id])
             session.commit()
             print(f"Updated batch {batch_id}: {status} - {message or ''}")
             
@@ -23,6 +23,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # Import authentication decorator
 from api.auth_microsoft import require_auth
+from api.response_cache import conditional_response
 
 from storage.schema import (
     QBRMetricsMonthly,
@@ -31,8 +32,10 @@ from storage.schema import (
     QBRThresholds,
     QBRCollectionLog,
     Organization,
-    DeviceSnapshot,
-    Vendor
+    Vendor,
+    MonthEndCounts,
+    DeviceType,
+    BillingStatus
 )
 from collectors.qbr.smartnumbers import (
     SmartNumbersCalculator,
@@ -188,19 +191,13 @@ def period_to_months(period: str) -> List[str]:
     return [f"{year}-{month}" for month in quarters[quarter]]
 
 
-def decimal_to_float(obj):
-    """Convert Decimal objects to float for JSON serialization."""
-    if isinstance(obj, Decimal):
-        return float(obj)
-    raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
-
-
 # ============================================================================
 # GET /api/qbr/metrics/monthly
 # ============================================================================
 
 @qbr_api.route('/api/qbr/metrics/monthly', methods=['GET'])
 @require_auth
+@conditional_response
 def get_monthly_metrics():
     """
     Get monthly QBR metrics.
@@ -430,50 +427,43 @@ def get_devices_for_period(session, period: str, ninja_vendor_id: int, excluded_
         }
 
     else:
-        # Use live device_snapshot data
-        # Find the most recent snapshot date within this period
+        # Use live Ninja counts from the month_end_counts rollup, which holds
+        # the most recent snapshot within each month
         first_day, last_day = get_period_date_bounds(period)
 
-        # Query for the most recent snapshot date in the period
-        most_recent = session.query(
-            func.max(DeviceSnapshot.snapshot_date)
+        rollup_results = session.query(
+            MonthEndCounts.month_end_date,
+            MonthEndCounts.organization_name,
+            DeviceType.code.label('device_type'),
+            func.sum(MonthEndCounts.cnt).label('devices')
+        ).join(
+            BillingStatus, BillingStatus.id == MonthEndCounts.billing_status_id
+        ).outerjoin(
+            DeviceType, DeviceType.id == MonthEndCounts.device_type_id
         ).filter(
-            DeviceSnapshot.vendor_id == ninja_vendor_id,
-            DeviceSnapshot.snapshot_date >= first_day,
-            DeviceSnapshot.snapshot_date <= last_day
-        ).scalar()
-
-        if not most_recent:
+            MonthEndCounts.vendor_id == ninja_vendor_id,
+            MonthEndCounts.month_end_date >= first_day,
+            MonthEndCounts.month_end_date <= last_day,
+            BillingStatus.code == 'billable',
+            ~MonthEndCounts.organization_name.in_(excluded_orgs)
+        ).group_by(
+            MonthEndCounts.month_end_date,
+            MonthEndCounts.organization_name,
+            DeviceType.code
+        ).all()
+
+        if not rollup_results:
             return None
 
-        snapshot_date = most_recent
-
-        # Query ENDPOINTS (all billable devices, exclude internal orgs)
-        endpoint_results = session.query(
-            DeviceSnapshot.organization_name,
-            func.count().label('endpoints')
-        ).filter(
-            DeviceSnapshot.snapshot_date == snapshot_date,
-            DeviceSnapshot.vendor_id == ninja_vendor_id,
-            DeviceSnapshot.billable_status_name == 'billable',
-            ~DeviceSnapshot.organization_name.in_(excluded_orgs)
-        ).group_by(DeviceSnapshot.organization_name).all()
-
-        endpoints_by_client = {r.organization_name: r.endpoints for r in endpoint_results}
-
-        # Query SEATS (billable workstations only, exclude internal orgs)
-        seat_results = session.query(
-            DeviceSnapshot.organization_name,
-            func.count().label('seats')
-        ).filter(
-            DeviceSnapshot.snapshot_date == snapshot_date,
-            DeviceSnapshot.vendor_id == ninja_vendor_id,
-            DeviceSnapshot.device_type_name == 'workstation',
-            DeviceSnapshot.billable_status_name == 'billable',
-            ~DeviceSnapshot.organization_name.in_(excluded_orgs)
-        ).group_by(DeviceSnapshot.organization_name).all()
+        snapshot_date = rollup_results[0].month_end_date
 
-        seats_by_client = {r.organization_name: r.seats for r in seat_results}
+        # ENDPOINTS: all billable devices; SEATS: billable workstations only
+        endpoints_by_client = {}
+        seats_by_client = {}
+        for r in rollup_results:
+            endpoints_by_client[r.organization_name] = endpoints_by_client.get(r.organization_name, 0) + r.devices
+            if r.device_type == 'workstation':
+                seats_by_client[r.organization_name] = seats_by_client.get(r.organization_name, 0) + r.devices
 
         # Merge results (all clients that have either seats or endpoints)
         all_clients = set(endpoints_by_client.keys()) | set(seats_by_client.keys())
@@ -497,6 +487,7 @@ def get_devices_for_period(session, period: str, ninja_vendor_id: int, excluded_
 
 
 @qbr_api.route('/api/qbr/metrics/devices-by-client', methods=['GET'])
+@conditional_response
 def get_devices_by_client():
     """
     Get seat and endpoint counts by client for one or more months.
@@ -664,6 +655,7 @@ def get_devices_by_client():
 
 @qbr_api.route('/api/qbr/metrics/quarterly', methods=['GET'])
 @require_auth
+@conditional_response
 def get_quarterly_metrics():
     """
     Get quarterly QBR metrics with aggregation from monthly data.
@@ -818,6 +810,7 @@ def get_quarterly_metrics():
 
 @qbr_api.route('/api/qbr/smartnumbers', methods=['GET'])
 @require_auth
+@conditional_response
 def get_smartnumbers():
     """
     Calculate and return SmartNumbers/KPIs for a quarterly period.
@@ -0,0 +1,38 @@
+"""
+Per-request SQL profiling for the API (enabled by SQL_PROFILING_ENABLED).
+
+Each request is tracked with common.query_stats: the response gets a
+Server-Timing header splitting its time into database and application
+time, and slow requests and likely N+1 statement patterns are logged.
+Queries run while a streamed body is generated (CSV exports, the event
+stream) happen after the response is sent and are not counted.
+"""
+
+from flask import Flask, Response, g, request
+
+from common.query_stats import SQL_PROFILING_ENABLED, start_tracking, stop_tracking
+
+
+def _start() -> None:
+    g.query_stats = start_tracking(f"{request.method} {request.path}")
+
+
+def _report(response: Response) -> Response:
+    stats = g.get('query_stats')
+    if stats is not None:
+        response.headers.add('Server-Timing', stats.server_timing())
+        stats.log_report()
+    return response
+
+
+def _stop(exc=None) -> None:
+    stop_tracking(g.pop('query_stats', None))
+
+
+def init_app(app: Flask) -> None:
+    """Track SQL per request when profiling is enabled."""
+    if not SQL_PROFILING_ENABLED:
+        return
+    app.before_request(_start)
+    app.after_request(_report)
+    app.teardown_request(_stop)
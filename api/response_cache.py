@@ -0,0 +1,411 @@
+"""
+Snapshot-aware response cache for read-heavy API endpoints.
+
+Dashboard endpoints only change when a collector or cross-vendor run writes
+new data, so their JSON is cached in memory keyed on the request (path and
+query arguments) plus a data version: each vendor's latest snapshot_date, the
+latest entry in the exception change log (common/exception_changes.py) and
+the last job completion. When any of those
+move the version changes and old entries are simply never hit again; LRU and
+TTL eviction bound memory and staleness.
+
+The data version itself is re-read at most every API_CACHE_VERSION_TTL
+seconds, so a repeated dashboard load is a dictionary lookup. The same
+version is exposed as a weak ETag, letting clients revalidate with
+If-None-Match and get 304 Not Modified without any query. Writes made by
+this process (exception updates, API-triggered collector runs) call
+invalidate() to drop everything immediately.
+
+Identical requests arriving while one is still being computed (several
+dashboard tabs opening at once) are coalesced: the first runs the view and
+the others wait for its response instead of repeating the same queries, so
+database load grows with the number of distinct requests, not viewers.
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from flask import Response, current_app, request
+from sqlalchemy import text
+
+from common.report_archive import load_report, report_fingerprint, store_report
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENABLED = os.getenv('API_CACHE_ENABLED', 'true').lower() == 'true'
+CACHE_MAX_ENTRIES = int(os.getenv('API_CACHE_MAX_ENTRIES', '256'))
+CACHE_TTL_SECONDS = int(os.getenv('API_CACHE_TTL', '300'))
+VERSION_TTL_SECONDS = float(os.getenv('API_CACHE_VERSION_TTL', '5'))
+COALESCE_ENABLED = os.getenv('API_COALESCE_ENABLED', 'true').lower() == 'true'
+# Longest a request waits on an identical in-flight one before running the view itself
+COALESCE_WAIT_SECONDS = float(os.getenv('API_COALESCE_WAIT', '120'))
+
+# Everything a cached report can depend on, in one round trip
+DATA_VERSION_QUERY = text("""
+    SELECT
+        (SELECT string_agg(v.name || '=' || COALESCE(s.snapshot_date::text || ':' || s.row_count, '-'), ',' ORDER BY v.name)
+         FROM vendor v
+         LEFT JOIN vendor_snapshot_state s ON s.vendor_id = v.id) AS device_snapshots,
+        (SELECT MAX(snapshot_date) FROM m365_user_snapshot) AS m365_snapshot,
+        (SELECT MAX(snapshot_date) FROM vadesecure_snapshot) AS vadesecure_snapshot,
+        (SELECT MAX(snapshot_date) FROM veeam_snapshot) AS veeam_snapshot,
+        (SELECT MAX(id) FROM exception_changes) AS exceptions_version,
+        (SELECT MAX(ended_at) FROM job_runs) AS last_job_ended,
+        (SELECT MAX(updated_at) FROM qbr_metrics_monthly) AS qbr_monthly_updated,
+        (SELECT MAX(updated_at) FROM qbr_metrics_quarterly) AS qbr_quarterly_updated,
+        (SELECT MAX(updated_at) FROM qbr_smartnumbers) AS qbr_smartnumbers_updated,
+        (SELECT MAX(updated_at) FROM qbr_thresholds) AS qbr_thresholds_updated,
+        (SELECT MAX(created_at) FROM qbr_client_metrics) AS qbr_client_metrics_created
+""")
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with a per-entry TTL."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl_seconds: int = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        """Return a live entry and mark it most recently used, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Tuple, value: Any) -> None:
+        """Store an entry, evicting the least recently used beyond max_entries."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Entry count and hit/miss counters."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+response_cache = ResponseCache()
+
+
+class _Flight:
+    """One in-flight computation and its outcome."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Run one call per key at a time; concurrent callers with the key share its result."""
+
+    def __init__(self, wait_seconds: float = COALESCE_WAIT_SECONDS):
+        self.wait_seconds = wait_seconds
+        self._flights: Dict[Tuple, _Flight] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key: Tuple, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Call fn(), or wait for the call already running under key.
+
+        Args:
+            key: Identifies identical calls
+            fn: Computes the result; runs in the calling thread
+
+        Returns:
+            tuple: (result, True if it came from another caller's call)
+
+        Raises:
+            Exception: Whatever fn() raised, also in the callers that waited on it
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not flight.done.wait(self.wait_seconds):
+                logger.warning(f"Coalesced request gave up waiting after {self.wait_seconds}s: {key[0]}")
+                return fn(), False
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result, False
+
+    def stats(self) -> dict:
+        """In-flight key count and how many calls were coalesced."""
+        with self._lock:
+            return {'in_flight': len(self._flights), 'coalesced': self.coalesced}
+
+
+request_flights = SingleFlight()
+
+_version_lock = threading.Lock()
+_version = None
+_version_read_at = 0.0
+
+
+def get_data_version(force: bool = False) -> str:
+    """
+    Current data version, re-read from the database at most every VERSION_TTL_SECONDS.
+
+    Args:
+        force: Re-read even if the memoized version is still fresh
+
+    Returns:
+        str: Short hash of the latest snapshot dates, exception change log
+        entry, last job completion and QBR metric update times
+    """
+    global _version, _version_read_at
+
+    with _version_lock:
+        if not force and _version is not None and time.monotonic() - _version_read_at < VERSION_TTL_SECONDS:
+            return _version
+
+    from api.api_server import get_session
+
+    with get_session() as session:
+        row = session.execute(DATA_VERSION_QUERY).fetchone()
+
+    version = hashlib.sha1(repr(tuple(row)).encode('utf-8')).hexdigest()[:16]
+
+    with _version_lock:
+        _version = version
+        _version_read_at = time.monotonic()
+    return version
+
+
+def invalidate() -> None:
+    """Forget the data version and every cached response (call after writes)."""
+    global _version
+    with _version_lock:
+        _version = None
+    response_cache.clear()
+
+
+def _request_key(version: str) -> Tuple:
+    """Cache key for the current request under a data version."""
+    # Reports compute "days old" from today, so the day is part of the key
+    return (
+        request.path,
+        tuple(sorted(request.args.items(multi=True))),
+        version,
+        date.today()
+    )
+
+
+def _etag_for(key: Tuple) -> str:
+    """Opaque entity tag for a request key."""
+    return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:20]
+
+
+def _not_modified(etag: str) -> Response:
+    """Empty 304 response carrying the current entity tag."""
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _tag(response: Response, etag: str) -> Response:
+    """Attach the entity tag to a successful response."""
+    if response.status_code == 200:
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _render_once(key: Tuple, view: Callable, args: tuple, kwargs: dict, use_memory: bool) -> Response:
+    """Run a view, sharing the response with identical requests arriving meanwhile."""
+    own = []
+
+    def render():
+        response = current_app.make_response(view(*args, **kwargs))
+        own.append(response)
+        if response.direct_passthrough:
+            return None
+        body = response.get_data()
+        # Stored before the flight ends so later requests find it in the cache
+        if use_memory and response.status_code == 200:
+            response_cache.set(key, (body, response.mimetype))
+        return body, response.status_code, list(response.headers.items())
+
+    if not COALESCE_ENABLED:
+        render()
+        return own[0]
+
+    shared, _ = request_flights.do(key, render)
+    if own:
+        return own[0]
+    if shared is None:
+        # The other request's response was a file stream; it cannot be replayed
+        return current_app.make_response(view(*args, **kwargs))
+    body, status, headers = shared
+    return Response(body, status=status, headers=headers)
+
+
+def _serve(view: Callable, args: tuple, kwargs: dict, use_memory: bool):
+    """Run a GET view behind If-None-Match and, optionally, the memory cache."""
+    if request.method != 'GET':
+        return view(*args, **kwargs)
+
+    try:
+        version = get_data_version()
+    except Exception as e:
+        logger.warning(f"Response cache bypassed, data version unavailable: {e}")
+        return view(*args, **kwargs)
+
+    key = _request_key(version)
+    etag = _etag_for(key)
+
+    # Client already holds this version: answer without touching the database
+    if request.if_none_match.contains_weak(etag):
+        return _not_modified(etag)
+
+    if use_memory:
+        cached = response_cache.get(key)
+        if cached is not None:
+            body, mimetype = cached
+            response = Response(body, status=200, mimetype=mimetype)
+            response.headers['X-Cache'] = 'HIT'
+            return _tag(response, etag)
+
+    response = _render_once(key, view, args, kwargs, use_memory)
+    if use_memory:
+        response.headers['X-Cache'] = 'MISS'
+    return _tag(response, etag)
+
+
+def cached_response(view: Callable) -> Callable:
+    """
+    Cache a GET view's successful JSON responses by path, arguments and data version.
+
+    Apply below @route and any auth decorator so unauthorized requests are
+    never served from the cache. Only 200 responses are stored. Responses
+    carry X-Cache: HIT or MISS and an ETag (see conditional_response).
+    Identical requests made while the view is running wait for its response.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return _serve(view, args, kwargs, use_memory=CACHE_ENABLED)
+
+    return wrapper
+
+
+def conditional_response(view: Callable) -> Callable:
+    """
+    Add a data-version ETag to a GET view and honour If-None-Match.
+
+    A request whose If-None-Match matches the current data version gets
+    304 Not Modified without running the view. Identical requests made
+    while the view is running share its response. Apply below @route and
+    any auth decorator.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return _serve(view, args, kwargs, use_memory=False)
+
+    return wrapper
+
+
+def archived_report(kind: str) -> Callable:
+    """
+    Serve a past-date report view from the on-disk report archive.
+
+    The view must take a date_str argument (YYYY-MM-DD). Reports for dates
+    before yesterday are stored once per date, query arguments and per-date
+    data version; errors and reports for today and yesterday, whose
+    collection_info.data_freshness is still "current", always run the view.
+    Responses carry X-Report-Archive: HIT or MISS. Apply below
+    cached_response.
+
+    Args:
+        kind: Report name used in the artifact file name
+    """
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                report_date = datetime.strptime(kwargs.get('date_str', ''), '%Y-%m-%d').date()
+            except ValueError:
+                return view(*args, **kwargs)
+
+            if request.method != 'GET' or report_date >= date.today() - timedelta(days=1):
+                return view(*args, **kwargs)
+
+            variant = hashlib.sha1(
+                repr(sorted(request.args.items(multi=True))).encode('utf-8')
+            ).hexdigest()[:8]
+
+            from api.api_server import get_session
+
+            try:
+                with get_session() as session:
+                    fingerprint = report_fingerprint(session, report_date)
+                compressed = load_report(kind, report_date, variant, fingerprint)
+            except Exception as e:
+                logger.warning(f"Report archive bypassed for {kind} {report_date}: {e}")
+                return view(*args, **kwargs)
+
+            if compressed is not None:
+                response = Response(gzip.decompress(compressed), status=200, mimetype='application/json')
+                response.headers['X-Report-Archive'] = 'HIT'
+                return response
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.direct_passthrough:
+                try:
+                    store_report(kind, report_date, variant, fingerprint, response.get_data())
+                except OSError as e:
+                    logger.warning(f"Could not archive {kind} report for {report_date}: {e}")
+            response.headers['X-Report-Archive'] = 'MISS'
+            return response
+
+        return wrapper
+    return decorator
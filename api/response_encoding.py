@@ -0,0 +1,136 @@
+"""
+JSON serialization and compression for API responses.
+
+FastJSONProvider replaces Flask's json provider, so every jsonify() call
+serializes with orjson when it is installed. Decimal values become floats
+and dates/datetimes ISO 8601 strings, which is what the endpoints used to
+convert by hand. Responses are always compact, even when the server runs
+with debug=True.
+
+compress_response() gzip- or brotli-encodes JSON and text responses larger
+than API_COMPRESS_MIN_BYTES for clients that accept it. Streamed responses
+(CSV exports, file downloads, the collector event stream) are left alone.
+"""
+
+import gzip
+import json
+import os
+from datetime import date
+from decimal import Decimal
+from typing import Any
+
+from flask import Flask, Response, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESS_ENABLED = os.getenv('API_COMPRESS_ENABLED', 'true').lower() == 'true'
+COMPRESS_MIN_BYTES = int(os.getenv('API_COMPRESS_MIN_BYTES', '1024'))
+GZIP_LEVEL = 6
+# Brotli's higher qualities are too slow for per-request compression
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/html', 'text/plain', 'text/csv', 'application/xml')
+
+
+def _default(obj: Any) -> Any:
+    """Serialize types neither encoder handles itself."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, date):
+        return obj.isoformat()
+    return DefaultJSONProvider.default(obj)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider using orjson, falling back to the json module."""
+
+    compact = True
+
+    def _options(self) -> int:
+        # Integer keys (e.g. quarters) are turned into strings like json.dumps does
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if ORJSON_AVAILABLE and not kwargs:
+            return orjson.dumps(obj, default=_default, option=self._options()).decode('utf-8')
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        if ORJSON_AVAILABLE and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        if ORJSON_AVAILABLE:
+            body = orjson.dumps(obj, default=_default, option=self._options())
+        else:
+            body = json.dumps(obj, default=_default, ensure_ascii=self.ensure_ascii,
+                              sort_keys=self.sort_keys, separators=(',', ':'))
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def _choose_encoding() -> str:
+    """Best content coding the client accepts, or '' for none."""
+    offered = ['br', 'gzip'] if BROTLI_AVAILABLE else ['gzip']
+    return request.accept_encodings.best_match(offered) or ''
+
+
+def compress_response(response: Response) -> Response:
+    """
+    Compress a response body for clients that accept gzip or brotli (after_request hook).
+
+    Args:
+        response: Response about to be sent
+
+    Returns:
+        Response: The same response, encoded when worthwhile
+    """
+    if (not COMPRESS_ENABLED
+            or request.method == 'HEAD'
+            or response.status_code < 200 or response.status_code >= 300
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = _choose_encoding()
+    if encoding == 'br':
+        compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+    elif encoding == 'gzip':
+        compressed = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    else:
+        return response
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_app(app: Flask) -> None:
+    """Install the JSON provider and response compression on an app."""
+    app.json = FastJSONProvider(app)
+    app.after_request(compress_response)
@@ -0,0 +1,199 @@
+"""
+Streaming CSV, file and Server-Sent Events responses.
+
+Exports used to fetch the whole result set and build the CSV text in memory
+before responding. These helpers read rows through a server-side cursor
+(SQLAlchemy yield_per, a named cursor with psycopg2) and emit CSV in chunks,
+so a download starts immediately and the API worker's memory stays flat
+regardless of the export size.
+
+Views validate their parameters with a normal session first and only then
+return csv_response(); the generator opens its own session because it runs
+after the view has returned.
+
+sse_response() serves a text/event-stream of format_sse() messages, used
+to push job progress instead of having the dashboard poll.
+"""
+
+import csv
+import json
+import logging
+import os
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+from flask import Response, stream_with_context
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per server-side cursor round trip
+STREAM_BATCH_SIZE = 1000
+
+# Rows written per chunk sent to the client
+CSV_CHUNK_ROWS = 500
+
+
+class _LineBuffer:
+    """File-like sink that hands csv.writer output back instead of storing it."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_csv(header: List[str], rows: Iterable[List[Any]]) -> Iterator[str]:
+    """
+    Encode rows as CSV text chunks.
+
+    Args:
+        header: Column names for the first line
+        rows: Iterable of row value lists
+
+    Yields:
+        str: CSV text for up to CSV_CHUNK_ROWS rows
+    """
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(header)
+
+    chunk = []
+    for row in rows:
+        chunk.append(writer.writerow(row))
+        if len(chunk) >= CSV_CHUNK_ROWS:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def stream_rows(query, params: Optional[dict] = None,
+                batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Any]:
+    """
+    Iterate a text() query through a server-side cursor on its own session.
+
+    Args:
+        query: SQLAlchemy text() statement
+        params: Bound parameters
+        batch_size: Rows fetched per round trip
+
+    Yields:
+        Row: Result rows in query order
+    """
+    from api.api_server import get_session
+
+    with get_session() as session:
+        result = session.execute(query.execution_options(yield_per=batch_size), params or {})
+        for row in result:
+            yield row
+
+
+def csv_response(header: List[str], rows: Iterable[Any], filename: str,
+                 format_row: Callable[[Any], List[Any]] = list) -> Response:
+    """
+    Build a streaming CSV download.
+
+    Args:
+        header: Column names for the first line
+        rows: Lazy iterable of rows (e.g. stream_rows())
+        filename: Download filename for Content-Disposition
+        format_row: Converts one row to a list of CSV values
+
+    Returns:
+        Response: text/csv response streamed chunk by chunk
+    """
+    def generate() -> Iterator[str]:
+        try:
+            yield from iter_csv(header, (format_row(row) for row in rows))
+        except Exception as e:
+            # Headers are already sent; the client sees a truncated file
+            logger.error(f"CSV export {filename} failed mid-stream: {e}")
+            raise
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/csv',
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'Content-Type': 'text/csv; charset=utf-8'
+        }
+    )
+
+
+def file_response(path: str, filename: str, mimetype: str, delete: bool = True,
+                  chunk_size: int = 64 * 1024) -> Response:
+    """
+    Stream a file (typically a temporary export) back in chunks.
+
+    Args:
+        path: File to send
+        filename: Download filename for Content-Disposition
+        mimetype: Response content type
+        delete: Remove the file once it has been sent (or the client disconnects)
+        chunk_size: Bytes read per chunk
+
+    Returns:
+        Response: Streamed download with Content-Length set
+    """
+    def generate() -> Iterator[bytes]:
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def remove_file() -> None:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    response = Response(
+        generate(),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'Content-Length': str(os.path.getsize(path))
+        }
+    )
+    if delete:
+        # Runs when the server closes the response, even if it was never read
+        response.call_on_close(remove_file)
+    return response
+
+
+def format_sse(event: str, data: Any) -> str:
+    """
+    Encode one Server-Sent Events message.
+
+    Args:
+        event: Event name (the client's addEventListener type)
+        data: JSON-serializable payload
+
+    Returns:
+        str: The message, terminated by a blank line
+    """
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def sse_response(events: Iterable[str], retry_ms: int = 5000) -> Response:
+    """
+    Stream Server-Sent Events.
+
+    Args:
+        events: Iterable of format_sse() messages (or ': comment' keepalives)
+        retry_ms: Reconnect delay the browser uses if the stream drops
+
+    Returns:
+        Response: Unbuffered text/event-stream response
+    """
+    def generate() -> Iterator[str]:
+        yield f"retry: {retry_ms}\n\n"
+        yield from events
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            # nginx would otherwise buffer the stream
+            'X-Accel-Buffering': 'no'
+        }
+    )
@@ -10,23 +10,23 @@ Provides REST API endpoints for M365 Tenant Sweep security audit results:
 """
 
 import sys
-import csv
-import io
 import json
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 from urllib.parse import unquote
 
-from flask import Blueprint, jsonify, request, Response
+from flask import Blueprint, jsonify, request
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, desc
+from sqlalchemy import and_, func, desc, or_
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # Import authentication decorator
 from api.auth_microsoft import require_auth
+from api.pagination import decode_cursor, page_params, parse_fields, split_page
+from api.streaming import STREAM_BATCH_SIZE, csv_response
 
 from storage.schema import TenantSweepAudit, TenantSweepFinding
 
@@ -39,6 +39,10 @@ VALID_AUDIT_STATUSES = ['running', 'completed', 'failed']
 VALID_SEVERITIES = ['Critical', 'High', 'Medium', 'Low', 'Info']
 VALID_FINDING_STATUSES = ['pass', 'fail', 'warning', 'error']
 
+# Audit fields GET /api/tenantsweep/audits can return (fields=)
+AUDIT_FIELDS = ['id', 'tenant_name', 'tenant_id', 'status', 'started_at', 'completed_at',
+                'summary', 'error_message', 'initiated_by', 'created_at']
+
 
 def validate_severity(severity: str) -> bool:
     """Validate severity value (case-insensitive)."""
@@ -629,7 +633,9 @@ def list_audits():
         tenant_id (optional): Filter by exact tenant ID
         status (optional): Filter by audit status
         limit (optional): Maximum number of results (default: 50, max: 200)
-        offset (optional): Offset for pagination (default: 0)
+        cursor (optional): Next page, from the previous response's next_cursor
+        offset (optional): Legacy offset pagination (default: 0, ignored with cursor)
+        fields (optional): Comma-separated audit fields to return (default: all)
 
     Returns:
         JSON response with list of audits
@@ -639,8 +645,6 @@ def list_audits():
     tenant_name = request.args.get('tenant_name', '')
     tenant_id = request.args.get('tenant_id', '')
     status = request.args.get('status', '')
-    limit = min(int(request.args.get('limit', 50)), 200)
-    offset = int(request.args.get('offset', 0))
 
     if status and status not in VALID_AUDIT_STATUSES:
         return jsonify({
@@ -652,9 +656,27 @@ def list_audits():
             }
         }), 400
 
+    try:
+        limit, cursor = page_params(50, 200)
+        fields = parse_fields(AUDIT_FIELDS)
+        offset = int(request.args.get('offset', 0))
+        after = decode_cursor(cursor, 2) if cursor else None
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": {
+                "code": "INVALID_PARAMETER",
+                "message": str(e),
+                "status": 400
+            }
+        }), 400
+
+    # started_at and id are always read so the cursor can be built
+    columns = fields + [name for name in ('started_at', 'id') if name not in fields]
+
     try:
         with get_session() as session:
-            query = session.query(TenantSweepAudit)
+            query = session.query(*[getattr(TenantSweepAudit, name) for name in columns])
 
             # Apply filters
             if tenant_name:
@@ -667,20 +689,37 @@ def list_audits():
                 query = query.filter(TenantSweepAudit.status == status)
 
             # Get total count before pagination
-            total_count = query.count()
-
-            # Apply ordering and pagination
-            audits = query.order_by(
-                desc(TenantSweepAudit.started_at)
-            ).offset(offset).limit(limit).all()
+            total_count = query.order_by(None).count()
+
+            if after:
+                query = query.filter(or_(
+                    TenantSweepAudit.started_at < after[0],
+                    and_(TenantSweepAudit.started_at == after[0], TenantSweepAudit.id < after[1])
+                ))
+                offset = 0
+
+            # Apply ordering and pagination (newest first, id breaks ties)
+            rows = query.order_by(
+                desc(TenantSweepAudit.started_at), desc(TenantSweepAudit.id)
+            ).offset(offset).limit(limit + 1).all()
+            rows, next_cursor = split_page(rows, limit, lambda row: [row.started_at, row.id])
+
+            audits = []
+            for row in rows:
+                audit = {}
+                for name in fields:
+                    value = getattr(row, name)
+                    audit[name] = value.isoformat() if isinstance(value, datetime) else value
+                audits.append(audit)
 
             return jsonify({
                 "success": True,
                 "data": {
-                    "audits": [audit_to_dict(a) for a in audits],
+                    "audits": audits,
                     "total_count": total_count,
                     "limit": limit,
-                    "offset": offset
+                    "offset": offset,
+                    "next_cursor": next_cursor
                 }
             }), 200
 
@@ -780,6 +819,46 @@ def get_latest_audit_for_tenant(tenant_name: str):
 # GET /api/tenantsweep/audits/<audit_id>/export/csv - Export findings to CSV
 # ============================================================================
 
+def _stream_findings(audit_id: int, severity_filter: str):
+    """Yield an audit's findings through a server-side cursor on its own session."""
+    from api.api_server import get_session
+
+    with get_session() as session:
+        # Query findings with optional severity filter
+        findings_query = session.query(TenantSweepFinding).filter(
+            TenantSweepFinding.audit_id == audit_id
+        )
+
+        if severity_filter:
+            findings_query = findings_query.filter(
+                TenantSweepFinding.severity == normalize_severity(severity_filter)
+            )
+
+        yield from findings_query.order_by(
+            TenantSweepFinding.severity,
+            TenantSweepFinding.check_id
+        ).yield_per(STREAM_BATCH_SIZE)
+
+
+def _finding_csv_row(finding: TenantSweepFinding) -> List[Any]:
+    """CSV values for one finding."""
+    details_str = ''
+    if finding.details:
+        details_str = json.dumps(finding.details)
+
+    return [
+        finding.check_id,
+        finding.check_name,
+        finding.severity,
+        finding.status,
+        finding.current_value or '',
+        finding.expected_value or '',
+        finding.recommendation or '',
+        details_str,
+        finding.created_at.isoformat() if finding.created_at else ''
+    ]
+
+
 @tenantsweep_api.route('/api/tenantsweep/audits/<int:audit_id>/export/csv', methods=['GET'])
 @require_auth
 def export_findings_csv(audit_id: int):
@@ -822,63 +901,19 @@ def export_findings_csv(audit_id: int):
                     }
                 }), 404
 
-            # Query findings with optional severity filter
-            findings_query = session.query(TenantSweepFinding).filter(
-                TenantSweepFinding.audit_id == audit_id
-            )
-
-            if severity_filter:
-                findings_query = findings_query.filter(
-                    TenantSweepFinding.severity == normalize_severity(severity_filter)
-                )
-
-            findings = findings_query.order_by(
-                TenantSweepFinding.severity,
-                TenantSweepFinding.check_id
-            ).all()
-
-            # Generate CSV content
-            output = io.StringIO()
-            writer = csv.writer(output)
-
-            # Write header
-            writer.writerow([
-                'Check ID', 'Check Name', 'Severity', 'Status', 'Current Value',
-                'Expected Value', 'Recommendation', 'Details', 'Created At'
-            ])
-
-            # Write data rows
-            for finding in findings:
-                details_str = ''
-                if finding.details:
-                    details_str = json.dumps(finding.details)
-
-                writer.writerow([
-                    finding.check_id,
-                    finding.check_name,
-                    finding.severity,
-                    finding.status,
-                    finding.current_value or '',
-                    finding.expected_value or '',
-                    finding.recommendation or '',
-                    details_str,
-                    finding.created_at.isoformat() if finding.created_at else ''
-                ])
-
-            # Create response
-            output.seek(0)
             safe_tenant_name = audit.tenant_name.replace(' ', '_').replace('/', '-')
             date_str = audit.started_at.strftime('%Y%m%d') if audit.started_at else 'unknown'
             filename = f"tenantsweep_{safe_tenant_name}_{date_str}.csv"
 
-            return Response(
-                output.getvalue(),
-                mimetype='text/csv',
-                headers={
-                    'Content-Disposition': f'attachment; filename="{filename}"',
-                    'Content-Type': 'text/csv; charset=utf-8'
-                }
-            )
+        return csv_response(
+            [
+                'Check ID', 'Check Name', 'Severity', 'Status', 'Current Value',
+                'Expected Value', 'Recommendation', 'Details', 'Created At'
+            ],
+            _stream_findings(audit_id, severity_filter),
+            filename,
+            _finding_csv_row
+        )
 
     except Exception as e:
         return jsonify({
@@ -18,6 +18,9 @@ from sqlalchemy import text
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from api.pagination import page_changes, page_params
+from api.response_cache import cached_response
+
 # Create Blueprint for ThreatLocker API
 threatlocker_api = Blueprint('threatlocker_api', __name__)
 
@@ -130,6 +133,7 @@ def find_tl_change_dates(session, device_ids: Dict[str, List[int]], start_date:
 
 
 @threatlocker_api.route('/api/threatlocker/usage-changes', methods=['GET'])
+@cached_response
 def get_tl_usage_changes():
     """
     Compare ThreatLocker device inventory between two dates.
@@ -143,6 +147,9 @@ def get_tl_usage_changes():
         start_date (required): Baseline date in YYYY-MM-DD format
         end_date (required): Comparison date in YYYY-MM-DD format
         detail_level (optional): "summary" (default) or "full"
+        limit (optional): Page size for the full-mode change details (max 1000);
+            without limit or cursor all details are returned
+        cursor (optional): Next page of change details, from next_cursor
         organization_name (optional): Filter by specific organization
 
     Returns:
@@ -215,6 +222,20 @@ def get_tl_usage_changes():
             }
         }), 400
 
+    # Optional paging of the change details in full mode
+    paged = 'limit' in request.args or 'cursor' in request.args
+    try:
+        limit, cursor = page_params(500, 1000)
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": {
+                "code": "INVALID_PARAMETER",
+                "message": str(e),
+                "status": 400
+            }
+        }), 400
+
     with get_session() as session:
         # Check data availability for both dates
         if not check_tl_date_availability(session, start_date):
@@ -431,6 +452,25 @@ def get_tl_usage_changes():
 
                 changes[change_type].append(device_detail)
 
+        # Page the device details before looking up their change dates
+        next_cursor = None
+        if detail_level == 'full' and paged:
+            try:
+                changes, next_cursor = page_changes(changes, limit, cursor)
+            except ValueError as e:
+                return jsonify({
+                    "success": False,
+                    "error": {
+                        "code": "INVALID_PARAMETER",
+                        "message": str(e),
+                        "status": 400
+                    }
+                }), 400
+            device_ids_by_type = {
+                change_type: [device['device_identity_id'] for device in changes[change_type]]
+                for change_type in device_ids_by_type
+            }
+
         # Find specific change dates for each device (only in full mode)
         if detail_level == 'full':
             change_dates = find_tl_change_dates(
@@ -478,6 +518,8 @@ def get_tl_usage_changes():
         # Add device details in full mode
         if detail_level == 'full':
             response_data['changes'] = changes
+            if paged:
+                response_data['next_cursor'] = next_cursor
 
         # Add organization filter info if used
         if organization_filter:
@@ -18,6 +18,9 @@ from sqlalchemy import text
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from api.pagination import page_changes, page_params
+from api.response_cache import cached_response
+
 # Create Blueprint for Vade API
 vade_api = Blueprint('vade_api', __name__)
 
@@ -174,6 +177,7 @@ def find_vade_change_dates(session, customer_ids: Dict[str, List[str]], start_da
 
 
 @vade_api.route('/api/vade/usage-changes', methods=['GET'])
+@cached_response
 def get_vade_usage_changes():
     """
     Compare Vade customer/license data between two dates.
@@ -188,6 +192,9 @@ def get_vade_usage_changes():
         start_date (required): Baseline date in YYYY-MM-DD format
         end_date (required): Comparison date in YYYY-MM-DD format
         detail_level (optional): "summary" (default) or "full"
+        limit (optional): Page size for the full-mode change details (max 1000);
+            without limit or cursor all details are returned
+        cursor (optional): Next page of change details, from next_cursor
         customer_name (optional): Filter by specific customer name
 
     Returns:
@@ -260,6 +267,20 @@ def get_vade_usage_changes():
             }
         }), 400
 
+    # Optional paging of the change details in full mode
+    paged = 'limit' in request.args or 'cursor' in request.args
+    try:
+        limit, cursor = page_params(500, 1000)
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": {
+                "code": "INVALID_PARAMETER",
+                "message": str(e),
+                "status": 400
+            }
+        }), 400
+
     with get_session() as session:
         # Check data availability for both dates
         if not check_vade_date_availability(session, start_date):
@@ -480,6 +501,25 @@ def get_vade_usage_changes():
 
                 changes[change_type].append(customer_detail)
 
+        # Page the customer details before looking up their change dates
+        next_cursor = None
+        if detail_level == 'full' and paged:
+            try:
+                changes, next_cursor = page_changes(changes, limit, cursor)
+            except ValueError as e:
+                return jsonify({
+                    "success": False,
+                    "error": {
+                        "code": "INVALID_PARAMETER",
+                        "message": str(e),
+                        "status": 400
+                    }
+                }), 400
+            customer_ids_by_type = {
+                change_type: [customer['customer_id'] for customer in changes[change_type]]
+                for change_type in customer_ids_by_type
+            }
+
         # Find specific change dates for each customer (only in full mode)
         if detail_level == 'full':
             change_dates = find_vade_change_dates(
@@ -529,6 +569,8 @@ def get_vade_usage_changes():
         # Add customer details in full mode
         if detail_level == 'full':
             response_data['changes'] = changes
+            if paged:
+                response_data['next_cursor'] = next_cursor
 
         # Add customer filter info if used
         if customer_filter:
@@ -19,6 +19,9 @@ from sqlalchemy import text
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from api.pagination import page_changes, page_params
+from api.response_cache import cached_response
+
 # Create Blueprint for Veeam API
 veeam_api = Blueprint('veeam_api', __name__)
 
@@ -86,13 +89,6 @@ def get_veeam_available_dates(session, start_date: date, end_date: date) -> List
     return [row[0] for row in results]
 
 
-def decimal_to_float(val):
-    """Convert Decimal to float for JSON serialization."""
-    if isinstance(val, Decimal):
-        return float(val)
-    return val
-
-
 @veeam_api.route('/api/veeam/available-dates', methods=['GET'])
 def get_available_dates():
     """
@@ -138,6 +134,7 @@ def get_available_dates():
 
 
 @veeam_api.route('/api/veeam/usage-changes', methods=['GET'])
+@cached_response
 def get_veeam_usage_changes():
     """
     Compare Veeam cloud storage data between two dates.
@@ -153,6 +150,9 @@ def get_veeam_usage_changes():
         start_date (required): Baseline date in YYYY-MM-DD format
         end_date (required): Comparison date in YYYY-MM-DD format
         detail_level (optional): "summary" or "full" (default: "full")
+        limit (optional): Page size for the full-mode change details (max 1000);
+            without limit or cursor all details are returned
+        cursor (optional): Next page of change details, from next_cursor
 
     Returns:
         JSON response with change summary and organization details
@@ -223,6 +223,20 @@ def get_veeam_usage_changes():
             }
         }), 400
 
+    # Optional paging of the change details in full mode
+    paged = 'limit' in request.args or 'cursor' in request.args
+    try:
+        limit, cursor = page_params(500, 1000)
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": {
+                "code": "INVALID_PARAMETER",
+                "message": str(e),
+                "status": 400
+            }
+        }), 400
+
     with get_session() as session:
         # Check data availability for both dates
         if not check_veeam_date_availability(session, start_date):
@@ -343,25 +357,40 @@ def get_veeam_usage_changes():
             }
 
             if change_type == 'added':
-                org_detail['cloud_storage_used_gb'] = decimal_to_float(row.end_storage_gb)
-                org_detail['quota_gb'] = decimal_to_float(row.end_quota_gb)
+                org_detail['cloud_storage_used_gb'] = row.end_storage_gb
+                org_detail['quota_gb'] = row.end_quota_gb
             elif change_type == 'removed':
-                org_detail['cloud_storage_used_gb'] = decimal_to_float(row.start_storage_gb)
-                org_detail['quota_gb'] = decimal_to_float(row.start_quota_gb)
+                org_detail['cloud_storage_used_gb'] = row.start_storage_gb
+                org_detail['quota_gb'] = row.start_quota_gb
             elif change_type in ('increased', 'decreased'):
-                org_detail['start_gb'] = decimal_to_float(row.start_storage_gb)
-                org_detail['end_gb'] = decimal_to_float(row.end_storage_gb)
-                org_detail['change_gb'] = decimal_to_float(row.storage_change_gb)
+                org_detail['start_gb'] = row.start_storage_gb
+                org_detail['end_gb'] = row.end_storage_gb
+                org_detail['change_gb'] = row.storage_change_gb
                 if row.start_storage_gb and row.start_storage_gb > 0:
                     change_pct = (row.storage_change_gb / row.start_storage_gb) * 100
-                    org_detail['change_percent'] = round(decimal_to_float(change_pct), 2)
+                    org_detail['change_percent'] = round(change_pct, 2)
                 else:
                     org_detail['change_percent'] = None
             else:  # unchanged
-                org_detail['storage_gb'] = decimal_to_float(row.end_storage_gb)
+                org_detail['storage_gb'] = row.end_storage_gb
 
             changes[change_type].append(org_detail)
 
+        # Page the organization details
+        next_cursor = None
+        if detail_level == 'full' and paged:
+            try:
+                changes, next_cursor = page_changes(changes, limit, cursor)
+            except ValueError as e:
+                return jsonify({
+                    "success": False,
+                    "error": {
+                        "code": "INVALID_PARAMETER",
+                        "message": str(e),
+                        "status": 400
+                    }
+                }), 400
+
         # Calculate totals
         start_total_orgs = summary_counts['removed'] + summary_counts['increased'] + summary_counts['decreased'] + summary_counts['unchanged']
         end_total_orgs = summary_counts['added'] + summary_counts['increased'] + summary_counts['decreased'] + summary_counts['unchanged']
@@ -369,7 +398,7 @@ def get_veeam_usage_changes():
 
         # Calculate percent change
         if start_total_storage > 0:
-            storage_change_pct = round(decimal_to_float((total_storage_change / start_total_storage) * 100), 2)
+            storage_change_pct = round((total_storage_change / start_total_storage) * 100, 2)
         else:
             storage_change_pct = None
 
@@ -386,9 +415,9 @@ def get_veeam_usage_changes():
                 'total_organizations_end': end_total_orgs,
                 'organizations_added': summary_counts['added'],
                 'organizations_removed': summary_counts['removed'],
-                'total_storage_start_gb': round(decimal_to_float(start_total_storage), 2),
-                'total_storage_end_gb': round(decimal_to_float(end_total_storage), 2),
-                'total_storage_change_gb': round(decimal_to_float(total_storage_change), 2),
+                'total_storage_start_gb': round(start_total_storage, 2),
+                'total_storage_end_gb': round(end_total_storage, 2),
+                'total_storage_change_gb': round(total_storage_change, 2),
                 'total_storage_change_percent': storage_change_pct
             },
             'metadata': {
@@ -401,6 +430,8 @@ def get_veeam_usage_changes():
         # Add detailed changes in full mode
         if detail_level == 'full':
             response_data['changes'] = changes
+            if paged:
+                response_data['next_cursor'] = next_cursor
 
         return jsonify({
             'success': True,
@@ -34,13 +34,13 @@ from typing import Dict, Any, Tuple, List, Optional
 # Add the project root to the Python path
 sys.path.insert(0, '/opt/es-inventory-hub')
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
-from common.config import get_dsn
+from common.db import get_engine
+from common.snapshot_state import latest_snapshot_date
 
 # Database connection
-DSN = get_dsn()
-engine = create_engine(DSN)
+engine = get_engine()
 Session = sessionmaker(bind=engine)
 
 def get_session():
@@ -595,13 +595,9 @@ def get_windows_devices(session) -> List[Dict[str, Any]]:
         FROM device_snapshot ds
         JOIN vendor v ON ds.vendor_id = v.id
         JOIN device_type dt ON ds.device_type_id = dt.id
+        JOIN vendor_snapshot_state s ON s.vendor_id = ds.vendor_id
+            AND s.snapshot_date = ds.snapshot_date  -- latest complete snapshot
         WHERE v.name = 'Ninja'  -- NINJA ONLY - ThreatLocker explicitly excluded
-        AND ds.snapshot_date = (
-            SELECT MAX(snapshot_date)
-            FROM device_snapshot ds2
-            JOIN vendor v2 ON ds2.vendor_id = v2.id
-            WHERE v2.name = 'Ninja'  -- NINJA ONLY - ThreatLocker explicitly excluded
-        )
         AND ds.os_name ILIKE '%windows%'
         AND ds.os_name NOT ILIKE '%server%'
         AND dt.code IN ('Desktop', 'Laptop', 'workstation')
@@ -632,14 +628,7 @@ def get_windows_devices(session) -> List[Dict[str, Any]]:
             devices.append(device_data)
         
         # Get the snapshot date we're using (all devices are from the same date)
-        snapshot_query = text("""
-        SELECT MAX(snapshot_date) as latest_snapshot
-        FROM device_snapshot ds
-        JOIN vendor v ON ds.vendor_id = v.id
-        WHERE v.name = 'Ninja'
-        """)
-        snapshot_result = session.execute(snapshot_query).fetchone()
-        latest_snapshot = snapshot_result.latest_snapshot if snapshot_result else None
+        latest_snapshot = latest_snapshot_date(session, 'Ninja')
         
         if latest_snapshot:
             logger.info(f"Using snapshot data from: {latest_snapshot}")
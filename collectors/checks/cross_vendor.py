@@ -1,12 +1,18 @@
 """Cross-vendor consistency checks between Ninja and ThreatLocker."""
 
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
-from typing import Dict, List, Any, Optional, Tuple
-from sqlalchemy.orm import Session
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy import func, and_, or_
 
-from storage.schema import DeviceSnapshot, Vendor, Exceptions
+from common.hostname_index import hostname_prefix_key
+from common.query_stats import track_queries
+from storage.schema import DeviceSnapshot, Vendor
+from collectors.checks.exception_writer import Finding, sync_findings
+from collectors.checks.variance_management import verify_manual_fixes
 
 
 def to_base(hostname: str) -> str:
@@ -140,53 +146,7 @@ def get_vendor_ids(session: Session) -> Dict[str, int]:
     return {v.name: v.id for v in vendors}
 
 
-def clear_todays_exceptions(session: Session, snapshot_date: date) -> None:
-    """
-    Clear all exceptions for the given date to ensure idempotency.
-    
-    Args:
-        session: Database session
-        snapshot_date: Date to clear exceptions for
-    """
-    session.query(Exceptions).filter(
-        Exceptions.date_found == snapshot_date
-    ).delete()
-
-
-def insert_exception(
-    session: Session,
-    exception_type: str,
-    hostname: str,
-    details: Dict[str, Any],
-    snapshot_date: date
-) -> bool:
-    """
-    Insert an exception record.
-    
-    Args:
-        session: Database session
-        exception_type: Type of exception (MISSING_NINJA, DUPLICATE_TL, etc.)
-        hostname: Hostname for the exception
-        details: JSON details about the exception
-        snapshot_date: Date of the snapshot
-        
-    Returns:
-        bool: True if exception was inserted
-    """
-    # Insert new exception
-    exception = Exceptions(
-        date_found=snapshot_date,
-        type=exception_type,
-        hostname=hostname,
-        details=details,
-        resolved=False
-    )
-    
-    session.add(exception)
-    return True
-
-
-def check_missing_ninja(session: Session, vendor_ids: Dict[str, int], snapshot_date: date) -> int:
+def find_missing_ninja(session: Session, vendor_ids: Dict[str, int], snapshot_date: date) -> Optional[List[Finding]]:
     """
     Check for ThreatLocker hosts that have no matching Ninja host using robust anchors.
 
@@ -202,21 +162,13 @@ def check_missing_ninja(session: Session, vendor_ids: Dict[str, int], snapshot_d
         snapshot_date: Date to check
 
     Returns:
-        int: Number of exceptions inserted
+        list: (hostname, details) findings, or None if the check cannot run
     """
     if 'ThreatLocker' not in vendor_ids or 'Ninja' not in vendor_ids:
-        return 0
+        return None
     
     from sqlalchemy import text
     
-    # First, delete today's rows for type='MISSING_NINJA' to ensure idempotency
-    session.query(Exceptions).filter(
-        and_(
-            Exceptions.date_found == snapshot_date,
-            Exceptions.type == 'MISSING_NINJA'
-        )
-    ).delete()
-    
     # Use SQL to find ThreatLocker hosts with no matching Ninja host using robust anchors
     # Canonical TL key: LOWER(SPLIT_PART(hostname,'.',1)) - full hostname before dot
     # Canonical Ninja key: LOWER(SPLIT_PART(ds.hostname,'.',1)) - full hostname before dot
@@ -260,7 +212,7 @@ def check_missing_ninja(session: Session, vendor_ids: Dict[str, int], snapshot_d
         'ninja_vendor_id': vendor_ids['Ninja']
     })
     
-    exceptions_inserted = 0
+    findings = []
     
     for row in result:
         # Extract clean hostname from canonical key to avoid pipe symbols
@@ -296,16 +248,17 @@ def check_missing_ninja(session: Session, vendor_ids: Dict[str, int], snapshot_d
             'original_stored_hostname': row.hostname if data_quality_issue else None
         }
         
-        if insert_exception(session, 'MISSING_NINJA', clean_hostname, details, snapshot_date):
-            exceptions_inserted += 1
+        findings.append((clean_hostname, details))
     
-    # Log the inserted count
-    print(f"MISSING_NINJA: Inserted {exceptions_inserted} exceptions for {snapshot_date}")
-    
-    return exceptions_inserted
+    return findings
 
 
-def check_duplicate_tl(session: Session, vendor_ids: Dict[str, int], snapshot_date: date) -> int:
+def check_missing_ninja(session: Session, vendor_ids: Dict[str, int], snapshot_date: date) -> int:
+    """Run find_missing_ninja and sync its findings into the exceptions table."""
+    return sync_findings(session, 'MISSING_NINJA', find_missing_ninja(session, vendor_ids, snapshot_date), snapshot_date)
+
+
+def find_duplicate_tl(session: Session, vendor_ids: Dict[str, int], snapshot_date: date) -> Optional[List[Finding]]:
     """
     Check for duplicate ThreatLocker hosts (same hostname_base count > 1).
 
@@ -318,10 +271,10 @@ def check_duplicate_tl(session: Session, vendor_ids: Dict[str, int], snapshot_da
         snapshot_date: Date to check
 
     Returns:
-        int: Number of exceptions inserted
+        list: (hostname, details) findings, or None if the check cannot run
     """
     if 'ThreatLocker' not in vendor_ids:
-        return 0
+        return None
 
     # Query for duplicate hostname_base values in ThreatLocker data
     # Use full hostname before dot (no truncation)
@@ -340,7 +293,7 @@ def check_duplicate_tl(session: Session, vendor_ids: Dict[str, int], snapshot_da
         func.count() > 1
     ).all()
 
-    exceptions_inserted = 0
+    findings = []
 
     for duplicate in duplicates:
         hostname_base = duplicate.hostname_base
@@ -366,6 +319,9 @@ def check_duplicate_tl(session: Session, vendor_ids: Dict[str, int], snapshot_da
                 if host.organization_name:
                     organizations.append(host.organization_name)
         
+        # Snapshot row order changes daily; keep the representative hostname stable
+        clean_hostnames.sort(key=str.lower)
+        
         # Get the most common organization (or first one if all different)
         primary_org = organizations[0] if organizations else None
         
@@ -378,14 +334,19 @@ def check_duplicate_tl(session: Session, vendor_ids: Dict[str, int], snapshot_da
             'tl_org_name': primary_org  # Primary organization for API compatibility
         }
         
-        # Insert exception for the first clean hostname (representative)
-        if clean_hostnames and insert_exception(session, 'DUPLICATE_TL', clean_hostnames[0], details, snapshot_date):
-            exceptions_inserted += 1
+        # Record exception for the first clean hostname (representative)
+        if clean_hostnames:
+            findings.append((clean_hostnames[0], details))
     
-    return exceptions_inserted
+    return findings
 
 
-def check_site_mismatch(session: Session, vendor_ids: Dict[str, int], snapshot_date: date) -> int:
+def check_duplicate_tl(session: Session, vendor_ids: Dict[str, int], snapshot_date: date) -> int:
+    """Run find_duplicate_tl and sync its findings into the exceptions table."""
+    return sync_findings(session, 'DUPLICATE_TL', find_duplicate_tl(session, vendor_ids, snapshot_date), snapshot_date)
+
+
+def find_site_mismatch(session: Session, vendor_ids: Dict[str, int], snapshot_date: date) -> Optional[List[Finding]]:
     """
     Check for site/org mismatch between matching Ninja and ThreatLocker hosts.
     
@@ -395,10 +356,10 @@ def check_site_mismatch(session: Session, vendor_ids: Dict[str, int], snapshot_d
         snapshot_date: Date to check
         
     Returns:
-        int: Number of exceptions inserted
+        list: (hostname, details) findings, or None if the check cannot run
     """
     if 'ThreatLocker' not in vendor_ids or 'Ninja' not in vendor_ids:
-        return 0
+        return None
     
     # Get all ThreatLocker hosts for the snapshot date
     tl_hosts = session.query(DeviceSnapshot).filter(
@@ -417,30 +378,20 @@ def check_site_mismatch(session: Session, vendor_ids: Dict[str, int], snapshot_d
     ).all()
     
     # Create mapping of normalized hostname to Ninja host using SQL normalization
+    # Keyed on the 15-char canonical prefix, same key as hostname_match_index
     ninja_by_base = {}
     for ninja_host in ninja_hosts:
         if ninja_host.hostname:
-            # Use SQL normalization: LEFT(LOWER(SPLIT_PART(hostname, '.', 1)), 15)
-            normalized_hostname = session.query(
-                func.left(
-                    func.lower(func.split_part(DeviceSnapshot.hostname, '.', 1)), 15
-                )
-            ).filter(DeviceSnapshot.id == ninja_host.id).scalar()
-            ninja_by_base[normalized_hostname] = ninja_host
+            ninja_by_base[hostname_prefix_key(ninja_host.hostname)] = ninja_host
     
-    exceptions_inserted = 0
+    findings = []
     
     # Check each ThreatLocker host
     for tl_host in tl_hosts:
         if not tl_host.hostname:
             continue
             
-        # Use SQL normalization: LEFT(LOWER(SPLIT_PART(hostname, '.', 1)), 15)
-        tl_normalized = session.query(
-            func.left(
-                func.lower(func.split_part(DeviceSnapshot.hostname, '.', 1)), 15
-            )
-        ).filter(DeviceSnapshot.id == tl_host.id).scalar()
+        tl_normalized = hostname_prefix_key(tl_host.hostname)
         
         # If matching Ninja host found
         if tl_normalized in ninja_by_base:
@@ -466,13 +417,17 @@ def check_site_mismatch(session: Session, vendor_ids: Dict[str, int], snapshot_d
                     'ninja_org': ninja_host.organization_name
                 }
                 
-                if insert_exception(session, 'SITE_MISMATCH', tl_clean_hostname, details, snapshot_date):
-                    exceptions_inserted += 1
+                findings.append((tl_clean_hostname, details))
     
-    return exceptions_inserted
+    return findings
 
 
-def check_spare_mismatch(session: Session, vendor_ids: Dict[str, int], snapshot_date: date) -> int:
+def check_site_mismatch(session: Session, vendor_ids: Dict[str, int], snapshot_date: date) -> int:
+    """Run find_site_mismatch and sync its findings into the exceptions table."""
+    return sync_findings(session, 'SITE_MISMATCH', find_site_mismatch(session, vendor_ids, snapshot_date), snapshot_date)
+
+
+def find_spare_mismatch(session: Session, vendor_ids: Dict[str, int], snapshot_date: date) -> Optional[List[Finding]]:
     """
     Check for spare mismatch: ThreatLocker present but Ninja marks as spare.
     
@@ -487,10 +442,10 @@ def check_spare_mismatch(session: Session, vendor_ids: Dict[str, int], snapshot_
         snapshot_date: Date to check
         
     Returns:
-        int: Number of exceptions inserted
+        list: (hostname, details) findings, or None if the check cannot run
     """
     if 'ThreatLocker' not in vendor_ids or 'Ninja' not in vendor_ids:
-        return 0
+        return None
     
     # Get all ThreatLocker hosts for the snapshot date
     tl_hosts = session.query(DeviceSnapshot).filter(
@@ -509,30 +464,20 @@ def check_spare_mismatch(session: Session, vendor_ids: Dict[str, int], snapshot_
     ).all()
     
     # Create mapping of normalized hostname to Ninja host using SQL normalization
+    # Keyed on the 15-char canonical prefix, same key as hostname_match_index
     ninja_by_base = {}
     for ninja_host in ninja_hosts:
         if ninja_host.hostname:
-            # Use SQL normalization: LEFT(LOWER(SPLIT_PART(hostname, '.', 1)), 15)
-            normalized_hostname = session.query(
-                func.left(
-                    func.lower(func.split_part(DeviceSnapshot.hostname, '.', 1)), 15
-                )
-            ).filter(DeviceSnapshot.id == ninja_host.id).scalar()
-            ninja_by_base[normalized_hostname] = ninja_host
+            ninja_by_base[hostname_prefix_key(ninja_host.hostname)] = ninja_host
     
-    exceptions_inserted = 0
+    findings = []
     
     # Check each ThreatLocker host
     for tl_host in tl_hosts:
         if not tl_host.hostname:
             continue
             
-        # Use SQL normalization: LEFT(LOWER(SPLIT_PART(hostname, '.', 1)), 15)
-        tl_normalized = session.query(
-            func.left(
-                func.lower(func.split_part(DeviceSnapshot.hostname, '.', 1)), 15
-            )
-        ).filter(DeviceSnapshot.id == tl_host.id).scalar()
+        tl_normalized = hostname_prefix_key(tl_host.hostname)
         
         # If matching Ninja host found
         if tl_normalized in ninja_by_base:
@@ -565,13 +510,17 @@ def check_spare_mismatch(session: Session, vendor_ids: Dict[str, int], snapshot_
                     'note': 'Device marked as spare in Ninja - consider if ThreatLocker cleanup needed'
                 }
                 
-                if insert_exception(session, 'SPARE_MISMATCH', tl_clean_hostname, details, snapshot_date):
-                    exceptions_inserted += 1
+                findings.append((tl_clean_hostname, details))
     
-    return exceptions_inserted
+    return findings
 
 
-def check_display_name_mismatch(session: Session, vendor_ids: Dict[str, int], snapshot_date: date) -> int:
+def check_spare_mismatch(session: Session, vendor_ids: Dict[str, int], snapshot_date: date) -> int:
+    """Run find_spare_mismatch and sync its findings into the exceptions table."""
+    return sync_findings(session, 'SPARE_MISMATCH', find_spare_mismatch(session, vendor_ids, snapshot_date), snapshot_date)
+
+
+def find_display_name_mismatch(session: Session, vendor_ids: Dict[str, int], snapshot_date: date) -> Optional[List[Finding]]:
     """
     Check for devices that exist in both Ninja and ThreatLocker with the same hostname 
     but different display names.
@@ -592,11 +541,11 @@ def check_display_name_mismatch(session: Session, vendor_ids: Dict[str, int], sn
         snapshot_date: Date to check
         
     Returns:
-        int: Number of display name mismatch exceptions inserted
+        list: (hostname, details) findings, or None if the check cannot run
     """
     from sqlalchemy import text
     
-    exceptions_inserted = 0
+    findings = []
     
     # Get vendor IDs
     ninja_id = vendor_ids.get('Ninja')
@@ -604,7 +553,7 @@ def check_display_name_mismatch(session: Session, vendor_ids: Dict[str, int], sn
     
     if not ninja_id or not tl_id:
         print("Warning: Missing vendor IDs for display name mismatch check")
-        return 0
+        return None
     
     # Query to find devices with matching hostnames but different display names
     # SPECIAL CASE: Exclude cases where Ninja display_name is empty/blank AND 
@@ -677,35 +626,133 @@ def check_display_name_mismatch(session: Session, vendor_ids: Dict[str, int], sn
             'note': 'Device exists in both systems with same hostname but different display names - consider standardizing display names'
         }
         
-        # Insert exception
-        exception = Exceptions(
-            date_found=snapshot_date,
-            type='DISPLAY_NAME_MISMATCH',
-            hostname=clean_hostname,
-            details=details,
-            resolved=False
-        )
+        findings.append((clean_hostname, details))
+    
+    return findings
+
+
+def check_display_name_mismatch(session: Session, vendor_ids: Dict[str, int], snapshot_date: date) -> int:
+    """Run find_display_name_mismatch and sync its findings into the exceptions table."""
+    return sync_findings(session, 'DISPLAY_NAME_MISMATCH', find_display_name_mismatch(session, vendor_ids, snapshot_date), snapshot_date)
+
+
+# Independent checks: each reads device_snapshot and owns one exception type
+CROSS_VENDOR_CHECKS = [
+    ('MISSING_NINJA', check_missing_ninja),
+    ('DUPLICATE_TL', check_duplicate_tl),
+    ('SITE_MISMATCH', check_site_mismatch),
+    ('SPARE_MISMATCH', check_spare_mismatch),
+    ('DISPLAY_NAME_MISMATCH', check_display_name_mismatch),
+]
+
+# Device-level exception types; reports of Ninja/ThreatLocker variances read only these
+DEVICE_EXCEPTION_TYPES = tuple(exc_type for exc_type, _ in CROSS_VENDOR_CHECKS)
+
+# Read-only halves of the checks, for callers that sync findings themselves
+CROSS_VENDOR_FINDERS = [
+    ('MISSING_NINJA', find_missing_ninja),
+    ('DUPLICATE_TL', find_duplicate_tl),
+    ('SITE_MISMATCH', find_site_mismatch),
+    ('SPARE_MISMATCH', find_spare_mismatch),
+    ('DISPLAY_NAME_MISMATCH', find_display_name_mismatch),
+]
+
+# Worker threads for parallel checks (1 = always serial)
+CHECK_WORKERS = int(os.getenv('CROSS_VENDOR_CHECK_WORKERS', str(len(CROSS_VENDOR_CHECKS))))
+
+
+def _run_check_in_own_session(
+    session_factory: sessionmaker,
+    check_fn: Callable[[Session, Dict[str, int], date], int],
+    vendor_ids: Dict[str, int],
+    snapshot_date: date
+) -> int:
+    """
+    Run a single check on its own pooled connection and transaction.
+    
+    Args:
+        session_factory: Session factory bound to the caller's engine
+        check_fn: Check function to run
+        vendor_ids: Mapping of vendor names to IDs
+        snapshot_date: Date to check
         
-        session.add(exception)
-        exceptions_inserted += 1
+    Returns:
+        int: Number of exceptions open for the snapshot date
+    """
+    check_session = session_factory()
+    try:
+        with track_queries(f"check {check_fn.__name__}"):
+            count = check_fn(check_session, vendor_ids, snapshot_date)
+        check_session.commit()
+        return count
+    except Exception:
+        check_session.rollback()
+        raise
+    finally:
+        check_session.close()
+
+
+def run_checks_parallel(
+    session: Session,
+    vendor_ids: Dict[str, int],
+    snapshot_date: date,
+    max_workers: int = CHECK_WORKERS
+) -> Dict[str, int]:
+    """
+    Run the cross-vendor checks concurrently, one connection per check.
     
-    if exceptions_inserted > 0:
+    Each check commits its own exception type independently. Because every
+    check is idempotent per date, a failure in any of them falls back to
+    re-running all checks serially on the caller's session.
+    
+    Args:
+        session: Database session (its engine provides the pooled connections)
+        vendor_ids: Mapping of vendor names to IDs
+        snapshot_date: Date to check
+        max_workers: Maximum concurrent checks
+        
+    Returns:
+        dict: Count of open exceptions by type
+    """
+    if max_workers > 1:
+        # Release the caller's connection/locks before the workers write
         session.commit()
-        print(f"DISPLAY_NAME_MISMATCH: Inserted {exceptions_inserted} exceptions for {snapshot_date}")
+        session_factory = sessionmaker(bind=session.get_bind(), autoflush=False, expire_on_commit=False)
+        
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='cross-vendor') as executor:
+                futures = {
+                    exc_type: executor.submit(
+                        _run_check_in_own_session, session_factory, check_fn, vendor_ids, snapshot_date
+                    )
+                    for exc_type, check_fn in CROSS_VENDOR_CHECKS
+                }
+                return {exc_type: future.result() for exc_type, future in futures.items()}
+        except Exception as e:
+            print(f"WARNING: Parallel cross-vendor checks failed ({e}); re-running serially")
     
-    return exceptions_inserted
+    counts = {}
+    for exc_type, check_fn in CROSS_VENDOR_CHECKS:
+        with track_queries(f"check {check_fn.__name__}"):
+            counts[exc_type] = check_fn(session, vendor_ids, snapshot_date)
+    return counts
 
 
-def run_cross_vendor_checks(session: Session, snapshot_date: Optional[date] = None) -> Dict[str, int]:
+def run_cross_vendor_checks(
+    session: Session,
+    snapshot_date: Optional[date] = None,
+    max_workers: int = CHECK_WORKERS
+) -> Dict[str, int]:
     """
     Run all cross-vendor consistency checks between Ninja and ThreatLocker.
     
     Args:
         session: Database session
         snapshot_date: Date to check (defaults to today)
+        max_workers: Maximum concurrent checks (1 runs them serially)
         
     Returns:
-        dict: Count of exceptions inserted by type
+        dict: Count of open exceptions by type
     """
     if snapshot_date is None:
         snapshot_date = date.today()
@@ -721,17 +768,25 @@ def run_cross_vendor_checks(session: Session, snapshot_date: Optional[date] = No
         print(f"Data quality issues found: {data_quality_issues}")
         print("Consider re-running data collection to fix field mapping issues")
     
-    # Clear today's exceptions for idempotency
-    clear_todays_exceptions(session, snapshot_date)
-    
-    # Run all checks
-    results = {}
-    
-    results['MISSING_NINJA'] = check_missing_ninja(session, vendor_ids, snapshot_date)
-    results['DUPLICATE_TL'] = check_duplicate_tl(session, vendor_ids, snapshot_date)
-    results['SITE_MISMATCH'] = check_site_mismatch(session, vendor_ids, snapshot_date)
-    results['SPARE_MISMATCH'] = check_spare_mismatch(session, vendor_ids, snapshot_date)
-    results['DISPLAY_NAME_MISMATCH'] = check_display_name_mismatch(session, vendor_ids, snapshot_date)
+    # Run all checks; each one updates its open exceptions in place
+    results = run_checks_parallel(session, vendor_ids, snapshot_date, max_workers)
+    
+    # Per-organization seat reconciliations (Duo, M365, Dropsuite, VadeSecure vs Ninja)
+    from collectors.checks.reconciliation import run_reconciliations
+    results.update(run_reconciliations(session, snapshot_date))
+    
+    # Variances closed by this run confirm any manual fixes made on them
+    verification = verify_manual_fixes(session, snapshot_date)
+    print(f"Manual fix verification: {verification}")
+    
+    # Store the finished dashboard reports; a failure here must not undo the checks
+    from collectors.checks.variance_reports import write_report_artifacts
+    try:
+        with session.begin_nested():
+            report_date = write_report_artifacts(session)
+        print(f"Variance report artifacts written for {report_date}")
+    except Exception as e:
+        print(f"Warning: variance report artifacts not written ({e}); they will be rebuilt on first read")
     
     # Add data quality summary to results
     results['DATA_QUALITY_ISSUES'] = data_quality_issues
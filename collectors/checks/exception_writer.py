@@ -0,0 +1,277 @@
+"""Shared bulk writer for persistent exceptions.
+
+Every check (cross-vendor device checks and org-level reconciliations)
+produces findings for one exception type and date. The writer reconciles
+them with the persistent exception rows in a handful of set-based
+statements: each variance is a single row that stays open while it keeps
+being found (first_seen .. last_seen) and is closed on the first check
+date it is no longer found.
+
+The dates each check ran are kept in exception_check_dates, so any date
+can be re-checked on its own: the rows covering or touching that date are
+extended, split or closed in place, and rows for other dates (with their
+manual status fields) are left alone. A row is only open if no later date
+has been checked. The spans of dates whose open exceptions changed are
+logged in exception_changes (common/exception_changes.py).
+"""
+
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, false, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from common.exception_changes import Span, record_exception_changes
+from storage.schema import ExceptionCheckDates, Exceptions
+
+
+# A check result: (hostname or other subject key, details) for one variance
+Finding = Tuple[str, Dict[str, Any]]
+
+
+def _neighbour_check_dates(
+    session: Session,
+    exception_type: str,
+    snapshot_date: date
+) -> Tuple[Optional[date], Optional[date]]:
+    """
+    The check dates before and after snapshot_date for one exception type.
+
+    Returns:
+        tuple: (previous check date, next check date); None where there is none
+    """
+    previous = session.execute(
+        select(func.max(ExceptionCheckDates.check_date)).where(and_(
+            ExceptionCheckDates.exception_type == exception_type,
+            ExceptionCheckDates.check_date < snapshot_date
+        ))
+    ).scalar()
+    following = session.execute(
+        select(func.min(ExceptionCheckDates.check_date)).where(and_(
+            ExceptionCheckDates.exception_type == exception_type,
+            ExceptionCheckDates.check_date > snapshot_date
+        ))
+    ).scalar()
+    return previous, following
+
+
+def _record_check_date(session: Session, exception_type: str, snapshot_date: date) -> None:
+    """Remember that a check ran for snapshot_date."""
+    exists = session.execute(
+        select(ExceptionCheckDates.check_date).where(and_(
+            ExceptionCheckDates.exception_type == exception_type,
+            ExceptionCheckDates.check_date == snapshot_date
+        ))
+    ).first()
+    if exists is None:
+        session.execute(insert(ExceptionCheckDates).values(
+            exception_type=exception_type,
+            check_date=snapshot_date
+        ))
+
+
+def sync_exceptions(
+    session: Session,
+    exception_type: str,
+    findings: List[Finding],
+    snapshot_date: date
+) -> int:
+    """
+    Reconcile one check's findings with the persistent exception rows.
+
+    The date may be the newest check date or any earlier one; re-running a
+    date is idempotent. Rows keep the details of the newest date they were
+    found on.
+
+    Args:
+        session: Database session
+        exception_type: Type of exception (MISSING_NINJA, DUPLICATE_TL, etc.)
+        findings: (hostname, details) pairs found for the snapshot date
+        snapshot_date: Date of the snapshot
+
+    Returns:
+        int: Number of exceptions open for the snapshot date
+    """
+    # One variance per hostname (case-insensitive); last finding wins
+    found = {}
+    for hostname, details in findings:
+        found[hostname.lower()] = (hostname, details)
+
+    previous, following = _neighbour_check_dates(session, exception_type, snapshot_date)
+    _record_check_date(session, exception_type, snapshot_date)
+
+    # Rows covering the date, the row ending at the previous check date (or
+    # left open/closed on or after this date) and the row starting at the
+    # next check date
+    candidates = session.execute(
+        select(
+            Exceptions.id,
+            Exceptions.hostname,
+            Exceptions.details,
+            Exceptions.resolved,
+            Exceptions.first_seen,
+            Exceptions.last_seen,
+            Exceptions.closed_date
+        ).where(
+            and_(
+                Exceptions.type == exception_type,
+                or_(
+                    and_(
+                        Exceptions.first_seen <= snapshot_date,
+                        or_(
+                            Exceptions.last_seen >= (previous or snapshot_date),
+                            Exceptions.closed_date.is_(None),
+                            Exceptions.closed_date >= snapshot_date
+                        )
+                    ),
+                    and_(Exceptions.first_seen > snapshot_date, Exceptions.first_seen <= following)
+                    if following else false()
+                )
+            )
+        )
+    ).all()
+
+    rows_by_key: Dict[str, Dict[str, Any]] = {}
+    for row in candidates:
+        rows = rows_by_key.setdefault(row.hostname.lower(), {})
+        if row.first_seen <= snapshot_date <= row.last_seen:
+            rows['covering'] = row
+        elif row.last_seen < snapshot_date:
+            if row.closed_date is not None and row.closed_date < snapshot_date:
+                # Closed by a check before this date (check dates recorded before the row)
+                continue
+            if 'left' not in rows or row.last_seen > rows['left'].last_seen:
+                rows['left'] = row
+        elif 'right' not in rows or row.first_seen < rows['right'].first_seen:
+            rows['right'] = row
+
+    delete_ids = []
+    close_rows = []
+    start_rows = []
+    refresh_rows = []
+    extend_rows = []
+    new_rows = []
+    # Re-checked dates inside a row split it; the earlier part becomes a new closed row
+    split_rows = []
+    # Dates whose open exceptions (or what the reports show of them) changed
+    changed_spans: List[Span] = []
+
+    for key in set(found) | set(rows_by_key):
+        rows = rows_by_key.get(key, {})
+        covering = rows.get('covering')
+        left = rows.get('left')
+        right = rows.get('right')
+
+        if key in found:
+            hostname, details = found[key]
+            if covering is not None:
+                if covering.last_seen == snapshot_date and (hostname, details) != (covering.hostname, covering.details):
+                    refresh_rows.append({'id': covering.id, 'hostname': hostname, 'details': details})
+                    changed_spans.append((covering.first_seen, covering.last_seen))
+            elif left is not None and right is not None:
+                # The date joins two intervals; the later row carries on
+                start_rows.append({'id': right.id, 'first_seen': left.first_seen, 'date_found': left.first_seen})
+                delete_ids.append(left.id)
+                changed_spans.append((left.first_seen, right.last_seen))
+            elif left is not None:
+                resolved = left.resolved if following else False
+                if (hostname, details, resolved) != (left.hostname, left.details, left.resolved):
+                    # Reports of every date the row covers show its details and resolution
+                    changed_spans.append((left.first_seen, snapshot_date))
+                else:
+                    changed_spans.append((left.last_seen, snapshot_date))
+                extend_rows.append({
+                    'id': left.id,
+                    'hostname': hostname,
+                    'details': details,
+                    'last_seen': snapshot_date,
+                    'closed_date': following,
+                    # Still present on the newest date - any resolution did not hold
+                    'resolved': resolved
+                })
+            elif right is not None:
+                start_rows.append({'id': right.id, 'first_seen': snapshot_date, 'date_found': snapshot_date})
+                changed_spans.append((snapshot_date, right.first_seen))
+            else:
+                changed_spans.append((snapshot_date, snapshot_date))
+                new_rows.append({
+                    'date_found': snapshot_date,
+                    'first_seen': snapshot_date,
+                    'last_seen': snapshot_date,
+                    'closed_date': following,
+                    'type': exception_type,
+                    'hostname': hostname,
+                    'details': details,
+                    'resolved': False
+                })
+
+        elif covering is not None:
+            changed_spans.append((covering.first_seen, covering.last_seen))
+            has_earlier = covering.first_seen < snapshot_date
+            has_later = covering.last_seen > snapshot_date
+            earlier_end = previous if previous and previous >= covering.first_seen else covering.first_seen
+            later_start = following if following and following <= covering.last_seen \
+                else min(covering.last_seen, snapshot_date + timedelta(days=1))
+
+            if has_earlier and has_later:
+                start_rows.append({'id': covering.id, 'first_seen': later_start, 'date_found': later_start})
+                split_rows.append({
+                    'date_found': covering.first_seen,
+                    'first_seen': covering.first_seen,
+                    'last_seen': earlier_end,
+                    'closed_date': snapshot_date,
+                    'type': exception_type,
+                    'hostname': covering.hostname,
+                    'details': covering.details,
+                    'resolved': covering.resolved
+                })
+            elif has_earlier:
+                close_rows.append({'id': covering.id, 'last_seen': earlier_end, 'closed_date': snapshot_date})
+            elif has_later:
+                start_rows.append({'id': covering.id, 'first_seen': later_start, 'date_found': later_start})
+            else:
+                # Only ever seen on this date
+                delete_ids.append(covering.id)
+
+        elif left is not None and (left.closed_date is None or left.closed_date > snapshot_date):
+            close_rows.append({'id': left.id, 'last_seen': left.last_seen, 'closed_date': snapshot_date})
+
+    # Close and delete before opening or inserting so the open (type, hostname) index stays unique
+    if delete_ids:
+        session.execute(delete(Exceptions).where(Exceptions.id.in_(delete_ids)))
+    for batch in (close_rows, start_rows, refresh_rows, extend_rows):
+        if batch:
+            session.execute(update(Exceptions), batch)
+    for batch in (split_rows, new_rows):
+        if batch:
+            session.execute(insert(Exceptions), batch)
+    record_exception_changes(session, changed_spans)
+
+    print(f"{exception_type}: {len(found)} open for {snapshot_date} "
+          f"({len(new_rows)} new, {len(found) - len(new_rows)} continuing, "
+          f"{len(close_rows) + len(split_rows) + len(delete_ids)} closed)")
+
+    return len(found)
+
+
+def sync_findings(
+    session: Session,
+    exception_type: str,
+    findings: Optional[List[Finding]],
+    snapshot_date: date
+) -> int:
+    """
+    Sync a check's findings, leaving open exceptions untouched if it could not run.
+
+    Args:
+        session: Database session
+        exception_type: Type of exception
+        findings: Findings from a check, or None if the check was skipped
+        snapshot_date: Date of the snapshot
+
+    Returns:
+        int: Number of exceptions open for the snapshot date
+    """
+    if findings is None:
+        return 0
+    return sync_exceptions(session, exception_type, findings, snapshot_date)
@@ -0,0 +1,184 @@
+"""Cross-vendor checks CLI with date-range backfill."""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import sessionmaker
+
+from common.db import get_engine, session_scope
+from common.logging import get_logger
+from common.report_archive import invalidate_reports
+
+from .cross_vendor import CROSS_VENDOR_FINDERS, get_vendor_ids
+from .exception_writer import Finding, sync_findings
+from .reconciliation import RECONCILIATION_RULES, find_reconciliation_variances
+from .variance_management import verify_manual_fixes
+from .variance_reports import write_report_artifacts
+
+
+# Per-process session factory, created once by _init_worker
+_worker_session_factory = None
+
+
+def _init_worker() -> None:
+    """Give each worker process its own engine with a single connection."""
+    global _worker_session_factory
+    engine = get_engine('checks-worker', pool_size=1, max_overflow=0)
+    _worker_session_factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+
+def find_date(snapshot_date: date) -> Tuple[date, Optional[Dict[str, Optional[List[Finding]]]], float]:
+    """
+    Run the read-only half of every check for one date (worker process).
+
+    Args:
+        snapshot_date: Date to check
+
+    Returns:
+        tuple: (date, findings by exception type or None if the date has no
+        snapshots for both vendors, seconds spent)
+    """
+    from sqlalchemy import text
+
+    started = time.perf_counter()
+    session = _worker_session_factory()
+    try:
+        vendor_ids = get_vendor_ids(session)
+        vendor_count = session.execute(text("""
+            SELECT COUNT(DISTINCT vendor_id)
+            FROM device_snapshot
+            WHERE snapshot_date = :snapshot_date
+              AND vendor_id = ANY(:vendor_ids)
+        """), {
+            'snapshot_date': snapshot_date,
+            'vendor_ids': list(vendor_ids.values())
+        }).scalar()
+
+        if vendor_count < 2:
+            return snapshot_date, None, time.perf_counter() - started
+
+        findings = {
+            exc_type: find_fn(session, vendor_ids, snapshot_date)
+            for exc_type, find_fn in CROSS_VENDOR_FINDERS
+        }
+        for rule in RECONCILIATION_RULES:
+            findings[rule.exception_type] = find_reconciliation_variances(session, rule, snapshot_date)
+        return snapshot_date, findings, time.perf_counter() - started
+    finally:
+        session.close()
+
+
+def backfill(start_date: date, end_date: date, workers: int, logger) -> int:
+    """
+    Re-check every date from start_date to end_date.
+
+    Findings are computed in parallel (one process and connection per
+    worker) and applied in date order in the parent, one transaction per
+    date. Each date is re-checked in place (exception_writer.sync_exceptions):
+    rows are extended, split or closed around it, manual status fields are
+    kept, and dates outside the range are not touched. An interrupted run
+    leaves every date either fully re-checked or as it was, and re-running
+    the range gives the same result. Dates a vendor has no snapshots for
+    are skipped and keep their previous results.
+
+    Args:
+        start_date: First date to check
+        end_date: Last date to check
+        workers: Number of worker processes
+        logger: Logger instance
+
+    Returns:
+        int: Number of dates checked
+    """
+    dates = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+    checked = 0
+    total_started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        # map() yields in submission order, so dates are applied chronologically
+        for snapshot_date, findings, find_seconds in executor.map(find_date, dates):
+            if findings is None:
+                logger.info(f"{snapshot_date}: skipped (snapshots missing for a vendor)")
+                continue
+
+            sync_started = time.perf_counter()
+            with session_scope() as session:
+                counts = {
+                    exc_type: sync_findings(session, exc_type, type_findings, snapshot_date)
+                    for exc_type, type_findings in findings.items()
+                }
+                verify_manual_fixes(session, snapshot_date)
+            sync_seconds = time.perf_counter() - sync_started
+
+            checked += 1
+            logger.info(
+                f"{snapshot_date}: {sum(counts.values())} open exceptions "
+                f"(find {find_seconds:.1f}s, sync {sync_seconds:.1f}s) {counts}"
+            )
+
+    # Archived reports for the re-checked dates no longer match
+    removed = invalidate_reports(start_date, end_date)
+    logger.info(f"Invalidated archived reports for {removed} dates from {start_date} to {end_date}")
+    with session_scope() as session:
+        report_date = write_report_artifacts(session)
+    logger.info(f"Variance report artifacts written for {report_date}")
+
+    logger.info(
+        f"Checked {checked} of {len(dates)} dates in {time.perf_counter() - total_started:.1f}s"
+    )
+    return checked
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(description='Cross-vendor checks (Ninja vs ThreatLocker)')
+    parser.add_argument(
+        '--start',
+        type=str,
+        help='First date to check in YYYY-MM-DD format (default: --end)'
+    )
+    parser.add_argument(
+        '--end',
+        type=str,
+        default=date.today().strftime('%Y-%m-%d'),
+        help='Last date to check in YYYY-MM-DD format (default: today)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=min(4, os.cpu_count() or 1),
+        help='Worker processes (one database connection each)'
+    )
+
+    args = parser.parse_args()
+
+    # Set up logging
+    logger = get_logger(__name__)
+
+    try:
+        end_date = datetime.strptime(args.end, '%Y-%m-%d').date()
+        start_date = datetime.strptime(args.start, '%Y-%m-%d').date() if args.start else end_date
+    except ValueError as e:
+        logger.error(f"Invalid date: {e}")
+        sys.exit(2)
+
+    if start_date > end_date:
+        logger.error("--start must not be after --end")
+        sys.exit(2)
+
+    try:
+        logger.info(f"Running cross-vendor checks from {start_date} to {end_date} with {args.workers} workers")
+        backfill(start_date, end_date, max(1, args.workers), logger)
+    except Exception as e:
+        logger.error(f"Cross-vendor backfill failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+"""Declarative per-organization reconciliation between vendors.
+
+Each ReconciliationRule names two per-organization count sources (a vendor
+snapshot table and a reference, normally Ninja seats), the key they are
+joined on, the comparison rule and the exception type to raise. Both sides
+are aggregated per organization in SQL and hash-joined in one statement;
+findings go through the shared exception writer, so adding a variance type
+is a new rule entry rather than a new hand-written loop.
+"""
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from collectors.checks.exception_writer import Finding, sync_findings
+from collectors.qbr.ninja_collector import NinjaQBRCollector
+
+
+# Join key: organization name with case, spacing and punctuation removed
+ORG_NAME_KEY = "LOWER(REGEXP_REPLACE({column}, '[^A-Za-z0-9]+', '', 'g'))"
+
+
+@dataclass(frozen=True)
+class OrgCountSource:
+    """Per-organization count from one snapshot table (aliased as t)."""
+    vendor: str
+    from_clause: str
+    org_column: str
+    count_expr: str
+    where: str = 'TRUE'
+
+
+@dataclass(frozen=True)
+class ReconciliationRule:
+    """Compare a vendor's per-organization count against a reference count."""
+    exception_type: str
+    source: OrgCountSource
+    reference: OrgCountSource
+    compare: Callable[[int, Optional[int]], bool]
+    description: str
+    join_key: str = ORG_NAME_KEY
+
+
+def seat_count_differs(tolerance_pct: float = 10.0, tolerance_abs: int = 2) -> Callable[[int, Optional[int]], bool]:
+    """
+    Comparison rule: counts differ by more than the larger tolerance.
+
+    An organization missing from the reference always counts as a variance.
+
+    Args:
+        tolerance_pct: Allowed difference as a percentage of the reference count
+        tolerance_abs: Allowed absolute difference
+
+    Returns:
+        callable: compare(count, reference_count) -> True if variance
+    """
+    def compare(count: int, reference_count: Optional[int]) -> bool:
+        if reference_count is None:
+            return True
+        allowed = max(tolerance_abs, reference_count * tolerance_pct / 100.0)
+        return abs(count - reference_count) > allowed
+    return compare
+
+
+_excluded_orgs = ", ".join(f"'{org}'" for org in NinjaQBRCollector.EXCLUDED_ORGS)
+_excluded_node_classes = ", ".join(f"'{nc}'" for nc in NinjaQBRCollector.BHAG_EXCLUDED_NODE_CLASSES)
+
+# Ninja seats per organization - same exclusions as the BHAG seat count
+NINJA_SEATS = OrgCountSource(
+    vendor='Ninja',
+    from_clause="device_snapshot t JOIN vendor v ON v.id = t.vendor_id AND v.name = 'Ninja'",
+    org_column='t.organization_name',
+    count_expr='COUNT(DISTINCT t.device_identity_id)',
+    where=(
+        f"COALESCE(t.node_class, '') NOT IN ({_excluded_node_classes}) "
+        f"AND LOWER(COALESCE(t.display_name, '')) NOT LIKE '%spare%' "
+        f"AND LOWER(COALESCE(t.location_name, '')) NOT LIKE '%spare%' "
+        f"AND t.organization_name NOT IN ({_excluded_orgs})"
+    ),
+)
+
+RECONCILIATION_RULES = [
+    ReconciliationRule(
+        exception_type='DUO_SEAT_MISMATCH',
+        source=OrgCountSource(
+            vendor='Duo',
+            from_clause='duo_snapshot t',
+            org_column='t.organization_name',
+            count_expr='SUM(COALESCE(t.user_count, 0))',
+            where="COALESCE(t.status, 'active') = 'active'",
+        ),
+        reference=NINJA_SEATS,
+        compare=seat_count_differs(),
+        description='Duo users differ from Ninja seats',
+    ),
+    ReconciliationRule(
+        exception_type='M365_SEAT_MISMATCH',
+        source=OrgCountSource(
+            vendor='M365',
+            from_clause='m365_snapshot t',
+            org_column='t.organization_name',
+            count_expr='SUM(COALESCE(t.user_count, 0))',
+        ),
+        reference=NINJA_SEATS,
+        compare=seat_count_differs(),
+        description='M365 users differ from Ninja seats',
+    ),
+    ReconciliationRule(
+        exception_type='DROPSUITE_SEAT_MISMATCH',
+        source=OrgCountSource(
+            vendor='Dropsuite',
+            from_clause='dropsuite_snapshot t',
+            org_column='t.organization_name',
+            count_expr='SUM(COALESCE(t.seats_used, 0))',
+            where="t.status = 'Active'",
+        ),
+        reference=NINJA_SEATS,
+        compare=seat_count_differs(),
+        description='Dropsuite seats differ from Ninja seats',
+    ),
+    ReconciliationRule(
+        exception_type='VADESECURE_SEAT_MISMATCH',
+        source=OrgCountSource(
+            vendor='VadeSecure',
+            from_clause='vadesecure_snapshot t',
+            org_column='t.customer_name',
+            count_expr='SUM(COALESCE(t.usage_count, 0))',
+            where="t.license_status = 'active'",
+        ),
+        reference=NINJA_SEATS,
+        compare=seat_count_differs(),
+        description='VadeSecure users differ from Ninja seats',
+    ),
+]
+
+# Organization-level exception types, reported apart from device variances
+RECONCILIATION_TYPES = tuple(rule.exception_type for rule in RECONCILIATION_RULES)
+
+
+def _aggregate_sql(source: OrgCountSource, join_key: str) -> str:
+    """Per-organization aggregate for one source on :snapshot_date."""
+    return f"""
+        SELECT
+            {join_key.format(column=source.org_column)} AS org_key,
+            MIN({source.org_column}) AS org_name,
+            {source.count_expr} AS seat_count
+        FROM {source.from_clause}
+        WHERE t.snapshot_date = :snapshot_date
+          AND {source.org_column} IS NOT NULL
+          AND {source.where}
+        GROUP BY 1
+    """
+
+
+def find_reconciliation_variances(
+    session: Session,
+    rule: ReconciliationRule,
+    snapshot_date: date
+) -> Optional[List[Finding]]:
+    """
+    Join a rule's two per-organization aggregates and apply its comparison.
+
+    Args:
+        session: Database session
+        rule: Reconciliation rule
+        snapshot_date: Date to reconcile
+
+    Returns:
+        list: (organization name, details) findings, or None if either
+        side has no snapshot for the date
+    """
+    query = text(f"""
+        WITH src AS ({_aggregate_sql(rule.source, rule.join_key)}),
+        ref AS ({_aggregate_sql(rule.reference, rule.join_key)})
+        SELECT
+            src.org_name,
+            src.seat_count,
+            ref.org_name AS reference_org_name,
+            ref.seat_count AS reference_count,
+            (SELECT COUNT(*) FROM ref) AS reference_orgs
+        FROM src
+        LEFT JOIN ref ON ref.org_key = src.org_key
+        ORDER BY src.org_name
+    """)
+
+    rows = session.execute(query, {'snapshot_date': snapshot_date}).fetchall()
+
+    # Nothing to compare until both vendors have collected this date
+    if not rows or rows[0].reference_orgs == 0:
+        return None
+
+    findings = []
+    for row in rows:
+        count = int(row.seat_count or 0)
+        reference_count = int(row.reference_count) if row.reference_count is not None else None
+
+        if not rule.compare(count, reference_count):
+            continue
+
+        findings.append((row.org_name, {
+            'organization_name': row.org_name,
+            'vendor': rule.source.vendor,
+            'vendor_count': count,
+            'reference_vendor': rule.reference.vendor,
+            'reference_org_name': row.reference_org_name,
+            'reference_count': reference_count,
+            'difference': count - reference_count if reference_count is not None else None,
+            'note': rule.description if reference_count is not None
+                    else f'Organization not found in {rule.reference.vendor}'
+        }))
+
+    return findings
+
+
+def run_reconciliations(
+    session: Session,
+    snapshot_date: date,
+    vendors: Optional[Iterable[str]] = None,
+    rules: Optional[List[ReconciliationRule]] = None
+) -> Dict[str, int]:
+    """
+    Run reconciliation rules and sync their exceptions.
+
+    Args:
+        session: Database session (caller commits)
+        snapshot_date: Date to reconcile
+        vendors: Only run rules whose source vendor is listed (default: all)
+        rules: Rules to run (default: RECONCILIATION_RULES)
+
+    Returns:
+        dict: Count of open exceptions by type (rules that could not run are omitted)
+    """
+    if rules is None:
+        rules = RECONCILIATION_RULES
+    if vendors is not None:
+        vendors = set(vendors)
+        rules = [rule for rule in rules if rule.source.vendor in vendors]
+
+    results = {}
+    for rule in rules:
+        findings = find_reconciliation_variances(session, rule, snapshot_date)
+        if findings is None:
+            print(f"{rule.exception_type}: skipped, no {rule.source.vendor}/{rule.reference.vendor} data for {snapshot_date}")
+            continue
+        results[rule.exception_type] = sync_findings(session, rule.exception_type, findings, snapshot_date)
+
+    return results
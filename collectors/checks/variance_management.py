@@ -7,11 +7,11 @@ tracked and verified.
 """
 
 from datetime import date, datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, Any
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
-from storage.schema import Exceptions
+from common.exception_changes import record_changed_rows
 
 
 def reset_variance_status(session: Session, snapshot_date: date) -> int:
@@ -32,24 +32,27 @@ def reset_variance_status(session: Session, snapshot_date: date) -> int:
     query = text("""
         UPDATE exceptions 
         SET variance_status = 'active' 
-        WHERE date_found = :snapshot_date 
+        WHERE closed_date IS NULL
+        AND last_seen >= :snapshot_date
         AND variance_status IN ('manually_fixed', 'stale')
+        RETURNING first_seen, last_seen
     """)
     
     result = session.execute(query, {'snapshot_date': snapshot_date})
+    reset_count = record_changed_rows(session, result)
     session.commit()
     
-    return result.rowcount
+    return reset_count
 
 
 def verify_manual_fixes(session: Session, snapshot_date: date) -> Dict[str, int]:
     """
     Verify manually fixed exceptions against new collector data.
     
-    This function should be called after collector runs to check if
-    manually fixed exceptions are still present in the new data.
-    Updates status to 'collector_verified' if fix is confirmed,
-    or 'stale' if the issue persists.
+    This function should be called after the cross-vendor checks. Exceptions
+    are persistent rows, so the checks already decide whether a fix held:
+    a manually fixed exception that the checks closed is 'collector_verified',
+    one still seen on a date after the fix is 'stale'.
     
     Args:
         session: Database session
@@ -58,127 +61,37 @@ def verify_manual_fixes(session: Session, snapshot_date: date) -> Dict[str, int]
     Returns:
         dict: Count of exceptions by verification status
     """
-    # Get all manually fixed exceptions for this date
-    manual_fixes_query = text("""
-        SELECT 
-            e.id,
-            e.hostname,
-            e.type,
-            e.old_value,
-            e.new_value,
-            e.update_type
-        FROM exceptions e
-        WHERE e.date_found = :snapshot_date
-        AND e.variance_status = 'manually_fixed'
-    """)
-    
-    manual_fixes = session.execute(manual_fixes_query, {'snapshot_date': snapshot_date}).fetchall()
-    
-    verified_count = 0
-    stale_count = 0
-    
-    for fix in manual_fixes:
-        exception_id = fix[0]
-        hostname = fix[1]
-        exc_type = fix[2]
-        old_value = fix[3]
-        new_value = fix[4]
-        update_type = fix[5]
-        
-        # Check if the fix is still effective
-        is_verified = check_fix_effectiveness(
-            session, snapshot_date, hostname, exc_type, 
-            old_value, new_value, update_type
-        )
-        
-        if is_verified:
-            # Mark as collector verified
-            update_query = text("""
-                UPDATE exceptions 
-                SET variance_status = 'collector_verified'
-                WHERE id = :exception_id
-            """)
-            session.execute(update_query, {'exception_id': exception_id})
-            verified_count += 1
-        else:
-            # Mark as stale (issue persists)
-            update_query = text("""
-                UPDATE exceptions 
-                SET variance_status = 'stale'
-                WHERE id = :exception_id
-            """)
-            session.execute(update_query, {'exception_id': exception_id})
-            stale_count += 1
+    verified = session.execute(text("""
+        UPDATE exceptions
+        SET variance_status = 'collector_verified'
+        WHERE variance_status = 'manually_fixed'
+        AND closed_date IS NOT NULL
+        AND closed_date <= :snapshot_date
+        RETURNING first_seen, last_seen
+    """), {'snapshot_date': snapshot_date})
+    verified_count = record_changed_rows(session, verified)
+    
+    stale = session.execute(text("""
+        UPDATE exceptions
+        SET variance_status = 'stale',
+            resolved = FALSE
+        WHERE variance_status = 'manually_fixed'
+        AND closed_date IS NULL
+        AND last_seen = :snapshot_date
+        AND manually_updated_at::date < last_seen
+        RETURNING first_seen, last_seen
+    """), {'snapshot_date': snapshot_date})
+    stale_count = record_changed_rows(session, stale)
     
     session.commit()
     
     return {
         'verified': verified_count,
         'stale': stale_count,
-        'total_checked': len(manual_fixes)
+        'total_checked': verified_count + stale_count
     }
 
 
-def check_fix_effectiveness(
-    session: Session, 
-    snapshot_date: date, 
-    hostname: str, 
-    exc_type: str,
-    old_value: Dict[str, Any], 
-    new_value: Dict[str, Any], 
-    update_type: str
-) -> bool:
-    """
-    Check if a manual fix is still effective against current data.
-    
-    Args:
-        session: Database session
-        snapshot_date: Date of the snapshot
-        hostname: Device hostname
-        exc_type: Exception type
-        old_value: Old values before fix
-        new_value: New values after fix
-        update_type: Type of update performed
-        
-    Returns:
-        bool: True if fix is still effective, False if issue persists
-    """
-    # This is a simplified check - in practice, you'd want to implement
-    # specific logic for each exception type and update type
-    
-    if exc_type == 'MISSING_NINJA':
-        # Check if device now exists in Ninja
-        ninja_check = text("""
-            SELECT COUNT(*) 
-            FROM device_snapshot ds
-            JOIN vendor v ON ds.vendor_id = v.id
-            WHERE ds.snapshot_date = :snapshot_date
-            AND v.name = 'Ninja'
-            AND ds.hostname = :hostname
-        """)
-        
-        result = session.execute(ninja_check, {
-            'snapshot_date': snapshot_date,
-            'hostname': hostname
-        }).scalar()
-        
-        return result > 0
-    
-    elif exc_type == 'SITE_MISMATCH':
-        # Check if site mismatch is resolved
-        # Implementation would depend on specific site matching logic
-        return True  # Placeholder
-    
-    elif exc_type == 'SPARE_MISMATCH':
-        # Check if spare status is resolved
-        # Implementation would depend on specific spare status logic
-        return True  # Placeholder
-    
-    else:
-        # Default: assume fix is effective
-        return True
-
-
 def get_variance_status_summary(session: Session, snapshot_date: date) -> Dict[str, Any]:
     """
     Get summary of variance statuses for a given date.
@@ -197,7 +110,8 @@ def get_variance_status_summary(session: Session, snapshot_date: date) -> Dict[s
             COUNT(*) as count,
             COUNT(CASE WHEN resolved = true THEN 1 END) as resolved_count
         FROM exceptions
-        WHERE date_found = :snapshot_date
+        WHERE first_seen <= :snapshot_date
+        AND last_seen >= :snapshot_date
         GROUP BY variance_status, type
         ORDER BY status, type
     """)
@@ -237,14 +151,17 @@ def cleanup_stale_exceptions(session: Session, days_old: int = 30) -> int:
     query = text("""
         DELETE FROM exceptions
         WHERE variance_status = 'stale'
-        AND date_found < CURRENT_DATE - INTERVAL ':days_old days'
+        AND closed_date IS NOT NULL
+        AND last_seen < CURRENT_DATE - make_interval(days => :days_old)
         AND resolved = false
+        RETURNING first_seen, last_seen
     """)
     
     result = session.execute(query, {'days_old': days_old})
+    deleted_count = record_changed_rows(session, result)
     session.commit()
     
-    return result.rowcount
+    return deleted_count
 
 
 # Integration functions for collector workflow
@@ -0,0 +1,736 @@
+"""Variance report payloads and their precomputed artifacts.
+
+The dashboard variance reports (latest and filtered) are built here from the
+Ninja/ThreatLocker device exceptions open on the latest date both vendors
+have data. Seat reconciliation findings (collectors/checks/reconciliation.py)
+are organization-level and reported separately by build_reconciliation_report(). The cross-vendor
+pipeline writes the finished payloads to the variance_report table when it
+finishes, so the API serves them with a primary-key read; writes that change
+exceptions between runs delete the artifacts and the next read rebuilds them.
+"""
+
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from collectors.checks.cross_vendor import DEVICE_EXCEPTION_TYPES
+from collectors.checks.reconciliation import RECONCILIATION_TYPES
+from common.rollups import refresh_variance_date_summary
+from storage.schema import VarianceReport
+
+
+def latest_matching_date(session: Session) -> Optional[date]:
+    """Get the latest date where both vendors have complete data."""
+    # variance_date_summary lists the dates both vendors have data for; the
+    # latest one no later than either vendor's latest complete snapshot
+    query = text("""
+        SELECT MAX(vds.snapshot_date)
+        FROM variance_date_summary vds
+        WHERE vds.snapshot_date >= CURRENT_DATE - INTERVAL '7 days'
+        AND vds.snapshot_date <= (
+            SELECT MIN(s.snapshot_date)
+            FROM vendor_snapshot_state s
+            JOIN vendor v ON s.vendor_id = v.id
+            WHERE v.name IN ('Ninja', 'ThreatLocker')
+        )
+    """)
+
+    return session.execute(query).scalar()
+
+
+def data_status_for(latest_date: Optional[date]) -> Dict[str, Any]:
+    """Determine the status of the data (current, stale, out_of_sync) for a latest date."""
+    if not latest_date:
+        return {
+            "status": "out_of_sync",
+            "message": "No matching data found between vendors",
+            "latest_date": None
+        }
+
+    days_old = (date.today() - latest_date).days
+
+    if days_old <= 1:
+        return {
+            "status": "current",
+            "message": "Data is current",
+            "latest_date": latest_date.isoformat()
+        }
+    else:
+        return {
+            "status": "stale_data",
+            "message": f"Data is {days_old} days old",
+            "latest_date": latest_date.isoformat()
+        }
+
+
+def get_organization_breakdown(session, exceptions, report_date):
+    """Get detailed breakdown of exceptions by organization for each variance type."""
+    # Get organization data for each exception
+    org_query = text("""
+        SELECT 
+            e.id,
+            e.type,
+            e.hostname,
+            e.details,
+            e.resolved,
+            COALESCE(
+                ds_tl.organization_name,
+                ds_ninja.organization_name,
+                'Unknown'
+            ) as organization_name,
+            COALESCE(
+                ds_tl.display_name,
+                ds_ninja.display_name,
+                e.hostname
+            ) as display_name,
+            COALESCE(
+                ds_tl.device_status,
+                ds_ninja.device_status,
+                'Unknown'
+            ) as billing_status,
+            CASE 
+                WHEN v_tl.name = 'ThreatLocker' THEN 'ThreatLocker'
+                WHEN v_ninja.name = 'Ninja' THEN 'Ninja'
+                ELSE 'Unknown'
+            END as vendor
+        FROM exceptions e
+        LEFT JOIN device_snapshot ds_tl ON ds_tl.hostname = e.hostname 
+            AND ds_tl.snapshot_date = :report_date
+            AND ds_tl.vendor_id = (SELECT id FROM vendor WHERE name = 'ThreatLocker')
+        LEFT JOIN vendor v_tl ON ds_tl.vendor_id = v_tl.id
+        LEFT JOIN device_snapshot ds_ninja ON ds_ninja.hostname = e.hostname 
+            AND ds_ninja.snapshot_date = :report_date
+            AND ds_ninja.vendor_id = (SELECT id FROM vendor WHERE name = 'Ninja')
+        LEFT JOIN vendor v_ninja ON ds_ninja.vendor_id = v_ninja.id
+        WHERE e.first_seen <= :report_date AND e.last_seen >= :report_date
+        AND e.type = ANY(:device_types)
+        ORDER BY e.type, organization_name, e.hostname
+    """)
+    
+    org_results = session.execute(
+        org_query,
+        {'report_date': report_date, 'device_types': list(DEVICE_EXCEPTION_TYPES)}
+    ).fetchall()
+    
+    # Group by type and organization
+    by_organization = {}
+    
+    for row in org_results:
+        exc_id, exc_type, hostname, details, resolved, org_name, display_name, billing_status, vendor = row
+        
+        # Map exception types to dashboard format
+        dashboard_type = None
+        if exc_type == "MISSING_NINJA":
+            dashboard_type = "missing_in_ninja"
+        elif exc_type == "DUPLICATE_TL":
+            dashboard_type = "threatlocker_duplicates"
+        elif exc_type == "SPARE_MISMATCH":
+            dashboard_type = "devices_that_should_not_have_threatlocker"
+        elif exc_type == "DISPLAY_NAME_MISMATCH":
+            dashboard_type = "display_name_mismatches"
+        
+        if not dashboard_type:
+            continue
+            
+        if dashboard_type not in by_organization:
+            by_organization[dashboard_type] = {
+                "total_count": 0,
+                "by_organization": {}
+            }
+        
+        # For Missing in Ninja, ThreatLocker Duplicates, and DevicesThatShouldNotHaveThreatlocker, extract organization from details if not found in device_snapshot
+        if exc_type in ["MISSING_NINJA", "DUPLICATE_TL", "SPARE_MISMATCH"] and org_name == "Unknown" and details:
+            # Extract organization from the details JSONB field
+            details_dict = details if isinstance(details, dict) else {}
+            
+            # For SPARE_MISMATCH (DevicesThatShouldNotHaveThreatlocker), prefer ninja_org_name over tl_org_name
+            if exc_type == "SPARE_MISMATCH":
+                ninja_org = details_dict.get('ninja_org_name', '')
+                tl_org = details_dict.get('tl_org_name', '')
+                
+                # Use ninja_org if it exists and is not empty, otherwise use tl_org, otherwise 'Unknown'
+                if ninja_org and ninja_org.strip():
+                    org_name = ninja_org
+                    vendor = 'Ninja'
+                elif tl_org and tl_org.strip():
+                    org_name = tl_org
+                    vendor = 'ThreatLocker'
+                else:
+                    org_name = 'Unknown'
+            else:
+                # For MISSING_NINJA and DUPLICATE_TL, use tl_org_name
+                org_name = details_dict.get('tl_org_name', 'Unknown')
+                if details_dict.get('tl_org_name'):
+                    vendor = 'ThreatLocker'
+            
+            # Update display_name from site information
+            if details_dict.get('tl_site_name'):
+                display_name = f"{hostname} ({details_dict.get('tl_site_name')})"
+            elif details_dict.get('ninja_site'):
+                display_name = f"{hostname} ({details_dict.get('ninja_site')})"
+        
+        # For Display Name Mismatches, extract display name information from details
+        if exc_type == "DISPLAY_NAME_MISMATCH" and details:
+            details_dict = details if isinstance(details, dict) else {}
+            
+            # Extract organization from details (prefer ninja_org_name)
+            ninja_org = details_dict.get('ninja_org_name', '')
+            tl_org = details_dict.get('tl_org_name', '')
+            
+            if ninja_org and ninja_org.strip():
+                org_name = ninja_org
+                vendor = 'Ninja'
+            elif tl_org and tl_org.strip():
+                org_name = tl_org
+                vendor = 'ThreatLocker'
+            
+            # Use the Ninja display name as the primary display name for the modal
+            ninja_display = details_dict.get('ninja_display_name', '')
+            if ninja_display and ninja_display.strip():
+                display_name = ninja_display
+        
+        if org_name not in by_organization[dashboard_type]["by_organization"]:
+            by_organization[dashboard_type]["by_organization"][org_name] = []
+        
+        # Create device entry
+        device_entry = {
+            "hostname": hostname,
+            "vendor": vendor,
+            "display_name": display_name,
+            "organization": org_name,
+            "billing_status": billing_status,
+            "action": "Investigate"
+        }
+        
+        # For Display Name Mismatches, add specific display name information for the modal
+        if exc_type == "DISPLAY_NAME_MISMATCH" and details:
+            details_dict = details if isinstance(details, dict) else {}
+            device_entry.update({
+                "ninja_display_name": details_dict.get('ninja_display_name', ''),
+                "threatlocker_display_name": details_dict.get('tl_display_name', ''),
+                "ninja_hostname": details_dict.get('ninja_hostname', ''),
+                "threatlocker_hostname": details_dict.get('tl_hostname', '')
+            })
+        
+        by_organization[dashboard_type]["by_organization"][org_name].append(device_entry)
+        by_organization[dashboard_type]["total_count"] += 1
+    
+    return by_organization
+
+
+def get_action_for_exception_type(exc_type: str) -> str:
+    """Get recommended action for exception type."""
+    actions = {
+        'DISPLAY_NAME_MISMATCH': 'Investigate - Reconcile naming differences',
+        'MISSING_NINJA': 'Add device to Ninja or remove from ThreatLocker',
+        'DUPLICATE_TL': 'Remove duplicate ThreatLocker entries',
+        'SPARE_MISMATCH': 'Remove ThreatLocker from spare devices or update billing status',
+        'SITE_MISMATCH': 'Reconcile site assignments between vendors'
+    }
+    return actions.get(exc_type, 'Investigate and resolve')
+
+
+def group_by_organization(exceptions: list) -> dict:
+    """Group exceptions by organization."""
+    by_org = {}
+    for exc in exceptions:
+        org = exc.get('organization', 'Unknown')
+        if org not in by_org:
+            by_org[org] = []
+        by_org[org].append(exc)
+    return by_org
+
+
+def generate_actionable_insights(by_type: dict) -> dict:
+    """Generate actionable insights based on exception data."""
+    insights = {
+        "priority_actions": [],
+        "summary": {}
+    }
+    
+    for exc_type, exceptions in by_type.items():
+        count = len(exceptions)
+        if count > 0:
+            insights["summary"][exc_type] = count
+            
+            if exc_type == 'DISPLAY_NAME_MISMATCH' and count > 50:
+                insights["priority_actions"].append(f"High priority: {count} display name mismatches need attention")
+            elif exc_type == 'MISSING_NINJA' and count > 20:
+                insights["priority_actions"].append(f"Critical: {count} devices missing from Ninja")
+    
+    return insights
+
+
+def get_collection_timestamps(session, latest_date: date) -> dict:
+    """Get timezone-aware collection timestamps from JobRuns table."""
+    # Query for the most recent successful collection runs
+    collection_query = text("""
+        SELECT job_name, started_at, ended_at
+        FROM job_runs 
+        WHERE status = 'completed'
+        AND job_name IN ('ninja-collector', 'threatlocker-collector')
+        ORDER BY started_at DESC
+    """)
+    
+    results = session.execute(collection_query).fetchall()
+    
+    # Initialize timestamps
+    ninja_collected = None
+    threatlocker_collected = None
+    last_collection = None
+    
+    # Process results - take the most recent for each collector type
+    for job_name, started_at, ended_at in results:
+        # Use ended_at if available, otherwise started_at
+        timestamp = ended_at if ended_at else started_at
+        
+        # Format timestamp properly (ISO 8601 with Z suffix)
+        # Remove any existing timezone info and add Z for UTC
+        if timestamp.tzinfo is not None:
+            # Convert to UTC and format
+            utc_timestamp = timestamp.astimezone().replace(tzinfo=None)
+            formatted_timestamp = utc_timestamp.isoformat() + 'Z'
+        else:
+            # Already UTC, just add Z
+            formatted_timestamp = timestamp.isoformat() + 'Z'
+        
+        # Only set if we haven't found a timestamp for this collector yet
+        # (since results are ordered by started_at DESC, first occurrence is most recent)
+        if job_name == 'ninja-collector' and ninja_collected is None:
+            ninja_collected = formatted_timestamp
+        elif job_name == 'threatlocker-collector' and threatlocker_collected is None:
+            threatlocker_collected = formatted_timestamp
+    
+    # Determine the latest collection time
+    timestamps = [t for t in [ninja_collected, threatlocker_collected] if t]
+    if timestamps:
+        # Parse timestamps and find the latest
+        parsed_times = []
+        for ts in timestamps:
+            try:
+                # Remove Z suffix and parse as datetime
+                clean_ts = ts.replace('Z', '')
+                parsed_times.append(datetime.fromisoformat(clean_ts))
+            except:
+                continue
+        
+        if parsed_times:
+            last_collection = max(parsed_times).isoformat() + 'Z'
+    
+    # Fallback to date if no specific timestamps found
+    if not last_collection:
+        last_collection = latest_date.isoformat()
+    
+    # Determine data freshness
+    today = datetime.now().date()
+    days_old = (today - latest_date).days
+    data_freshness = "current" if days_old <= 1 else "stale"
+    
+    return {
+        "last_collection": last_collection,
+        "ninja_collected": ninja_collected,
+        "threatlocker_collected": threatlocker_collected,
+        "data_freshness": data_freshness
+    }
+
+
+def build_latest_report(session: Session, report_date: date, include_resolved: bool = False) -> Dict[str, Any]:
+    """
+    Build the /api/variance-report/latest payload for a date.
+
+    The time-dependent data_status and collection_info are added at read
+    time (add_read_time_status).
+
+    Args:
+        session: Database session
+        report_date: Latest date both vendors have data
+        include_resolved: Include resolved exceptions
+
+    Returns:
+        dict: Report payload
+    """
+    # Get exceptions for the latest date (filter resolved by default)
+    if include_resolved:
+        query = text("""
+            SELECT id, date_found, type, hostname, details, resolved
+            FROM exceptions
+            WHERE first_seen <= :report_date AND last_seen >= :report_date
+            AND type = ANY(:device_types)
+            ORDER BY type, hostname
+        """)
+    else:
+        query = text("""
+            SELECT id, date_found, type, hostname, details, resolved
+            FROM exceptions
+            WHERE first_seen <= :report_date AND last_seen >= :report_date
+            AND type = ANY(:device_types)
+            AND resolved = FALSE
+            ORDER BY type, hostname
+        """)
+
+    exceptions = session.execute(query, {'report_date': report_date, 'device_types': list(DEVICE_EXCEPTION_TYPES)}).fetchall()
+
+    # Group by type
+    by_type = {}
+    for exc in exceptions:
+        exc_type = exc[2]
+        if exc_type not in by_type:
+            by_type[exc_type] = []
+        by_type[exc_type].append({
+            'id': exc[0],
+            'hostname': exc[3],
+            'details': exc[4],
+            'resolved': exc[5]
+        })
+
+    # Calculate totals
+    total_exceptions = len(exceptions)
+    unresolved_count = sum(1 for exc in exceptions if not exc[5])
+
+    exception_counts = {exc_type: len(devices) for exc_type, devices in by_type.items()}
+
+    # Get detailed organization breakdown
+    org_breakdown = get_organization_breakdown(session, exceptions, report_date)
+
+    # Dashboard-compatible format with organization breakdown
+    enhanced_dashboard_format = {
+        "missing_in_ninja": org_breakdown.get("missing_in_ninja", {
+            "total_count": exception_counts.get("MISSING_NINJA", 0),
+            "by_organization": {}
+        }),
+        "threatlocker_duplicates": org_breakdown.get("threatlocker_duplicates", {
+            "total_count": exception_counts.get("DUPLICATE_TL", 0),
+            "by_organization": {}
+        }),
+        "devices_that_should_not_have_threatlocker": org_breakdown.get("devices_that_should_not_have_threatlocker", {
+            "total_count": exception_counts.get("SPARE_MISMATCH", 0),
+            "by_organization": {}
+        }),
+        "display_name_mismatches": org_breakdown.get("display_name_mismatches", {
+            "total_count": exception_counts.get("DISPLAY_NAME_MISMATCH", 0),
+            "by_organization": {}
+        })
+    }
+
+    return {
+        "report_date": report_date.isoformat(),
+        "summary": {
+            "total_exceptions": total_exceptions,
+            "unresolved_count": unresolved_count,
+            "resolved_count": total_exceptions - unresolved_count
+        },
+        "exceptions_by_type": by_type,
+        "exception_counts": exception_counts,
+        **enhanced_dashboard_format
+    }
+
+
+def build_latest_report_with_resolved(session: Session, report_date: date) -> Dict[str, Any]:
+    """Latest report including resolved exceptions (include_resolved=true)."""
+    return build_latest_report(session, report_date, include_resolved=True)
+
+
+def build_filtered_report(session: Session, report_date: date) -> Dict[str, Any]:
+    """
+    Build the /api/variance-report/filtered payload for a date.
+
+    Only unresolved exceptions are included. The time-dependent data_status
+    and collection_info are added at read time (add_read_time_status).
+
+    Args:
+        session: Database session
+        report_date: Latest date both vendors have data
+
+    Returns:
+        dict: Report payload
+    """
+    # Get device counts by vendor
+    device_counts_query = text("""
+        SELECT v.name as vendor, COUNT(*) as count
+        FROM device_snapshot ds
+        JOIN vendor v ON ds.vendor_id = v.id
+        WHERE ds.snapshot_date = :report_date
+        GROUP BY v.name
+    """)
+
+    device_counts = session.execute(device_counts_query, {'report_date': report_date}).fetchall()
+    device_counts_dict = {row[0]: row[1] for row in device_counts}
+
+    # Get only unresolved exceptions (filtered data)
+    exceptions_query = text("""
+        SELECT id, type, hostname, details
+        FROM exceptions
+        WHERE first_seen <= :report_date AND last_seen >= :report_date
+        AND type = ANY(:device_types)
+        AND resolved = FALSE
+        ORDER BY type, hostname
+    """)
+
+    exceptions = session.execute(
+        exceptions_query,
+        {'report_date': report_date, 'device_types': list(DEVICE_EXCEPTION_TYPES)}
+    ).fetchall()
+
+    # Group exceptions by type and organization
+    by_type = {}
+    by_organization = {}
+
+    for exc in exceptions:
+        exc_type = exc[1]
+        hostname = exc[2]
+        details = exc[3]
+
+        # Initialize type group
+        if exc_type not in by_type:
+            by_type[exc_type] = []
+
+        # Get organization from details
+        org_name = details.get('tl_org_name', details.get('ninja_org_name', 'Unknown'))
+        if org_name not in by_organization:
+            by_organization[org_name] = []
+
+        # Format exception data for dashboard
+        exception_data = {
+            "hostname": hostname,
+            "details": details,
+            "action": get_action_for_exception_type(exc_type)
+        }
+
+        # Add type-specific fields
+        if exc_type == 'DISPLAY_NAME_MISMATCH':
+            exception_data.update({
+                "ninja_display_name": details.get('ninja_display_name', ''),
+                "threatlocker_computer_name": details.get('tl_display_name', ''),
+                "organization": org_name
+            })
+        elif exc_type == 'MISSING_NINJA':
+            exception_data.update({
+                "threatlocker_hostname": details.get('tl_hostname', ''),
+                "organization": org_name
+            })
+
+        by_type[exc_type].append(exception_data)
+        by_organization[org_name].append(exception_data)
+
+    # Calculate totals
+    total_variances = len(exceptions)
+
+    # Build response in dashboard format
+    response = {
+        "analysis_date": report_date.isoformat(),
+        "total_devices": {
+            "ninja": device_counts_dict.get('Ninja', 0),
+            "threatlocker": device_counts_dict.get('ThreatLocker', 0)
+        },
+        "total_variances": total_variances,
+        "status": "current"
+    }
+
+    # Add exception data by type
+    if 'DISPLAY_NAME_MISMATCH' in by_type:
+        response["display_name_mismatches"] = {
+            "total_count": len(by_type['DISPLAY_NAME_MISMATCH']),
+            "by_organization": group_by_organization(by_type['DISPLAY_NAME_MISMATCH'])
+        }
+
+    if 'MISSING_NINJA' in by_type:
+        response["missing_in_ninja"] = {
+            "total_count": len(by_type['MISSING_NINJA']),
+            "by_organization": group_by_organization(by_type['MISSING_NINJA'])
+        }
+
+    if 'DUPLICATE_TL' in by_type:
+        response["threatlocker_duplicates"] = {
+            "total_count": len(by_type['DUPLICATE_TL']),
+            "devices": by_type['DUPLICATE_TL']
+        }
+
+    if 'SPARE_MISMATCH' in by_type:
+        response["devices_that_should_not_have_threatlocker"] = {
+            "total_count": len(by_type['SPARE_MISMATCH']),
+            "by_organization": group_by_organization(by_type['SPARE_MISMATCH'])
+        }
+
+    # Add actionable insights
+    response["actionable_insights"] = generate_actionable_insights(by_type)
+
+    # Add data quality indicators
+    response["data_quality"] = {
+        "total_exceptions": total_variances,
+        "exception_types": list(by_type.keys()),
+        "organizations_affected": len(by_organization)
+    }
+
+    return response
+
+
+def build_reconciliation_report(session: Session, report_date: date, include_resolved: bool = False) -> Dict[str, Any]:
+    """
+    Build the /api/variances/reconciliation payload for a date.
+
+    Seat reconciliation findings compare per-organization counts, so they
+    are keyed by organization rather than hostname and are kept out of the
+    device variance reports.
+
+    Args:
+        session: Database session
+        report_date: Date to report
+        include_resolved: Include resolved exceptions
+
+    Returns:
+        dict: Report payload
+    """
+    query = text("""
+        SELECT id, type, hostname, details, resolved
+        FROM exceptions
+        WHERE first_seen <= :report_date AND last_seen >= :report_date
+        AND type = ANY(:reconciliation_types)
+        AND (:include_resolved OR resolved = FALSE)
+        ORDER BY type, hostname
+    """)
+
+    findings = session.execute(query, {
+        'report_date': report_date,
+        'reconciliation_types': list(RECONCILIATION_TYPES),
+        'include_resolved': include_resolved
+    }).fetchall()
+
+    by_type = {}
+    for row in findings:
+        by_type.setdefault(row.type, []).append({
+            'id': row.id,
+            'organization_name': row.hostname,
+            'details': row.details,
+            'resolved': row.resolved
+        })
+
+    unresolved_count = sum(1 for row in findings if not row.resolved)
+    return {
+        "report_date": report_date.isoformat(),
+        "summary": {
+            "total_exceptions": len(findings),
+            "unresolved_count": unresolved_count,
+            "resolved_count": len(findings) - unresolved_count
+        },
+        "exceptions_by_type": by_type,
+        "exception_counts": {exc_type: len(orgs) for exc_type, orgs in by_type.items()}
+    }
+
+
+# Report kind -> builder(session, report_date)
+REPORT_BUILDERS: Dict[str, Callable[[Session, date], Dict[str, Any]]] = {
+    'latest': build_latest_report,
+    'latest_with_resolved': build_latest_report_with_resolved,
+    'filtered': build_filtered_report,
+}
+
+
+def _store_artifact(session: Session, report_kind: str, report_date: date, payload: Dict[str, Any]) -> None:
+    """Upsert one report artifact."""
+    statement = insert(VarianceReport).values(
+        report_kind=report_kind,
+        report_date=report_date,
+        payload=payload,
+        generated_at=datetime.utcnow()
+    )
+    session.execute(statement.on_conflict_do_update(
+        index_elements=[VarianceReport.report_kind],
+        set_={
+            'report_date': statement.excluded.report_date,
+            'payload': statement.excluded.payload,
+            'generated_at': statement.excluded.generated_at
+        }
+    ))
+
+
+def write_report_artifacts(session: Session) -> Optional[date]:
+    """
+    Build every report for the latest matching date and store the payloads,
+    and refresh the per-date summary.
+
+    Called at the end of cross-vendor runs, in the same transaction as the
+    exception changes, so the artifacts always match the committed data.
+
+    Args:
+        session: Database session (caller commits)
+
+    Returns:
+        date: Report date, or None if no date has data for both vendors
+    """
+    report_date = latest_matching_date(session)
+    if not report_date:
+        invalidate_report_artifacts(session)
+        return None
+
+    refresh_variance_date_summary(session)
+
+    for report_kind, builder in REPORT_BUILDERS.items():
+        _store_artifact(session, report_kind, report_date, builder(session, report_date))
+
+    return report_date
+
+
+def add_read_time_status(session: Session, payload: Dict[str, Any], report_date: date) -> Dict[str, Any]:
+    """
+    Add the fields that depend on when a stored report is read.
+
+    data_status and collection_info.data_freshness age with the current
+    date, and the collection timestamps with later collector runs, so they
+    are never stored in an artifact.
+
+    Args:
+        session: Database session
+        payload: Report payload from get_report_artifact()
+        report_date: The report's date
+
+    Returns:
+        dict: The same payload
+    """
+    payload["collection_info"] = get_collection_timestamps(session, report_date)
+    payload["data_status"] = data_status_for(report_date)
+    return payload
+
+
+def get_report_artifact(session: Session, report_kind: str) -> Optional[Dict[str, Any]]:
+    """
+    Read a report payload, rebuilding and storing it if it is missing.
+
+    Args:
+        session: Database session (committed here when an artifact is rebuilt)
+        report_kind: One of REPORT_BUILDERS
+
+    Returns:
+        dict: Report payload, or None if no date has data for both vendors
+    """
+    artifact = session.get(VarianceReport, report_kind)
+    if artifact is not None:
+        return artifact.payload
+
+    report_date = latest_matching_date(session)
+    if not report_date:
+        return None
+
+    payload = REPORT_BUILDERS[report_kind](session, report_date)
+    _store_artifact(session, report_kind, report_date, payload)
+    session.commit()
+    return payload
+
+
+def invalidate_report_artifacts(session: Session) -> int:
+    """
+    Delete stored report artifacts so the next read rebuilds them.
+
+    Callers have changed exceptions, so the per-date summary behind
+    /api/variances/available-dates is refreshed here as well.
+
+    Args:
+        session: Database session (caller commits)
+
+    Returns:
+        int: Number of artifacts deleted
+    """
+    refresh_variance_date_summary(session)
+    return session.execute(text("DELETE FROM variance_report")).rowcount
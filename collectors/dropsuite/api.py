@@ -7,6 +7,7 @@ from typing import List, Dict, Any, Optional, Generator
 from dotenv import load_dotenv
 
 from common.logging import get_logger
+from common.metrics import count_vendor_retry, instrument_session
 
 # Load environment variables from .env file
 load_dotenv()
@@ -29,7 +30,7 @@ class DropsuiteAPI:
             raise ValueError("Missing required DROPSUITE_AUTHENTICATION_TOKEN environment variable")
 
         # Initialize session
-        self.session = requests.Session()
+        self.session = instrument_session(requests.Session(), 'dropsuite')
         self.session.headers.update({
             "Content-Type": "application/json",
             "Accept": "application/json",
@@ -74,6 +75,7 @@ class DropsuiteAPI:
             if response.status_code == 429:
                 retry_after = int(response.headers.get('Retry-After', 60))
                 self.logger.warning(f"Rate limited, waiting {retry_after}s")
+                count_vendor_retry('dropsuite')
                 time.sleep(retry_after)
                 return self._make_request(endpoint, access_token, params)
 
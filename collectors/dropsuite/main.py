@@ -7,7 +7,7 @@ from datetime import datetime, date
 from typing import Optional
 
 from common.logging import get_logger
-from common.job_logging import log_job_start, log_job_completion, log_job_failure
+from common.job_logging import log_job_start, log_job_completion, log_job_failure, mark_stage, timed_iter
 
 from .api import DropsuiteAPI
 from .mapping import normalize_dropsuite_user
@@ -148,6 +148,7 @@ def run_collection(api: DropsuiteAPI, snapshot_date: date, limit: Optional[int],
             logger.info("Created Dropsuite vendor record")
 
         # Delete existing snapshots for this date to ensure clean daily data
+        mark_stage('write')
         logger.info(f"Deleting existing Dropsuite snapshots for {snapshot_date}")
         deleted_count = session.query(DropsuiteSnapshot).filter(
             DropsuiteSnapshot.snapshot_date == snapshot_date
@@ -155,7 +156,7 @@ def run_collection(api: DropsuiteAPI, snapshot_date: date, limit: Optional[int],
         session.commit()
         logger.info(f"Deleted {deleted_count} existing snapshots for {snapshot_date}")
 
-        for raw_user in api.list_users():
+        for raw_user in timed_iter(api.list_users()):
             org_count += 1
 
             if limit and org_count > limit:
@@ -166,6 +167,7 @@ def run_collection(api: DropsuiteAPI, snapshot_date: date, limit: Optional[int],
                 logger.info(f"Processing organization {org_count}: {org_name}")
 
                 # Fetch accounts for this organization
+                mark_stage('fetch')
                 auth_token = raw_user.get('authentication_token')
                 accounts = []
                 if auth_token:
@@ -173,6 +175,7 @@ def run_collection(api: DropsuiteAPI, snapshot_date: date, limit: Optional[int],
                     logger.debug(f"  Retrieved {len(accounts)} accounts")
 
                 # Normalize the data
+                mark_stage('normalize')
                 normalized = normalize_dropsuite_user(raw_user, accounts)
 
                 if not normalized['user_id']:
@@ -180,6 +183,7 @@ def run_collection(api: DropsuiteAPI, snapshot_date: date, limit: Optional[int],
                     continue
 
                 # Use upsert to handle duplicate (snapshot_date, user_id)
+                mark_stage('write')
                 stmt = insert(DropsuiteSnapshot).values(
                     snapshot_date=snapshot_date,
                     user_id=normalized['user_id'],
@@ -232,6 +236,19 @@ def run_collection(api: DropsuiteAPI, snapshot_date: date, limit: Optional[int],
         # Commit all changes
         session.commit()
 
+        # Reconcile per-organization counts against Ninja seats
+        mark_stage('post_process')
+        try:
+            from collectors.checks.reconciliation import run_reconciliations
+            from collectors.checks.variance_reports import invalidate_report_artifacts
+            reconciled = run_reconciliations(session, snapshot_date, vendors=['Dropsuite'])
+            invalidate_report_artifacts(session)
+            session.commit()
+            logger.info(f"Seat reconciliation: {reconciled}")
+        except Exception as e:
+            session.rollback()
+            logger.warning(f"Seat reconciliation failed: {e}")
+
     logger.info(f"Collection completed. Processed: {org_count}, "
                 f"Saved: {saved_count}, Errors: {error_count}")
 
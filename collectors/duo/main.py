@@ -7,7 +7,7 @@ from datetime import datetime, date
 from typing import Optional
 
 from common.logging import get_logger
-from common.job_logging import log_job_start, log_job_completion, log_job_failure
+from common.job_logging import log_job_start, log_job_completion, log_job_failure, mark_stage
 
 from .api import DuoAPI
 from .mapping import normalize_duo_account, normalize_duo_users
@@ -151,6 +151,7 @@ def run_collection(api: DuoAPI, snapshot_date: date, limit: Optional[int], logge
         raise
 
     # Get list of child accounts
+    mark_stage('fetch')
     accounts = api.list_accounts()
     logger.info(f"Found {len(accounts)} child accounts")
 
@@ -170,6 +171,7 @@ def run_collection(api: DuoAPI, snapshot_date: date, limit: Optional[int], logge
             logger.info("Created Duo vendor record")
 
         # Delete existing snapshots for this date to ensure clean daily data
+        mark_stage('write')
         logger.info(f"Deleting existing Duo snapshots for {snapshot_date}")
         deleted_count = session.query(DuoSnapshot).filter(
             DuoSnapshot.snapshot_date == snapshot_date
@@ -192,6 +194,7 @@ def run_collection(api: DuoAPI, snapshot_date: date, limit: Optional[int], logge
                 logger.info(f"Processing account {account_count}: {org_name}")
 
                 # Fetch all data for this account
+                mark_stage('fetch')
                 users = api.get_users(account_id)
                 phones = api.get_phones(account_id)
                 groups = api.get_groups(account_id)
@@ -206,6 +209,7 @@ def run_collection(api: DuoAPI, snapshot_date: date, limit: Optional[int], logge
                            f"Groups: {len(groups)}, Integrations: {len(integrations)}")
 
                 # Normalize the data
+                mark_stage('normalize')
                 normalized = normalize_duo_account(
                     account, users, phones, groups, integrations,
                     webauthn, settings, info, auth_logs, telephony_logs
@@ -216,6 +220,7 @@ def run_collection(api: DuoAPI, snapshot_date: date, limit: Optional[int], logge
                     continue
 
                 # Use upsert to handle duplicate (snapshot_date, account_id)
+                mark_stage('write')
                 stmt = insert(DuoSnapshot).values(
                     snapshot_date=snapshot_date,
                     account_id=normalized['account_id'],
@@ -321,6 +326,19 @@ def run_collection(api: DuoAPI, snapshot_date: date, limit: Optional[int], logge
         # Commit all changes
         session.commit()
 
+        # Reconcile per-organization counts against Ninja seats
+        mark_stage('post_process')
+        try:
+            from collectors.checks.reconciliation import run_reconciliations
+            from collectors.checks.variance_reports import invalidate_report_artifacts
+            reconciled = run_reconciliations(session, snapshot_date, vendors=['Duo'])
+            invalidate_report_artifacts(session)
+            session.commit()
+            logger.info(f"Seat reconciliation: {reconciled}")
+        except Exception as e:
+            session.rollback()
+            logger.warning(f"Seat reconciliation failed: {e}")
+
     logger.info(f"Collection completed. Processed: {account_count}, "
                 f"Saved: {saved_count} accounts, {user_saved_count} users, Errors: {error_count}")
 
@@ -0,0 +1,159 @@
+"""In-process entry points for collector and check jobs.
+
+Each job does what its CLI does, minus argument parsing, legacy job_runs
+logging and sys.exit, so the API job queue and the nightly pipeline
+(collectors/pipeline.py) can call it in-process instead of starting a
+Python subprocess. A job returns a short result
+message and raises on failure.
+"""
+
+import importlib
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, Dict, Optional
+
+
+def run_ninja_collector() -> str:
+    """Collect today's Ninja device snapshot."""
+    from common.logging import get_logger
+    from collectors.ninja.api import NinjaAPI
+    from collectors.ninja.main import run_collection
+    from collectors.ninja.ninja_api import NinjaRMMAPI
+
+    logger = get_logger('collectors.ninja.main')
+
+    try:
+        ninja_rmm_api = NinjaRMMAPI()
+    except Exception as e:
+        logger.warning(f"Enhanced NinjaRMM API not available: {e}")
+        ninja_rmm_api = None
+
+    run_collection(NinjaAPI(), ninja_rmm_api, date.today(), None, logger)
+    return 'Ninja collector completed successfully'
+
+
+def run_threatlocker_collector() -> str:
+    """Collect today's ThreatLocker device snapshot."""
+    from collectors.threatlocker.api import fetch_devices
+    from collectors.threatlocker.main import get_session, run_collection
+    from common.job_logging import mark_stage
+
+    with get_session() as session:
+        mark_stage('fetch')
+        counts = run_collection(session, fetch_devices(), date.today())
+
+    return (f"ThreatLocker collector completed successfully: {counts['processed']} processed, "
+            f"{counts['inserted']} inserted, {counts['skipped']} skipped")
+
+
+def _run_saas_collector(package: str, api_class: str, label: str) -> str:
+    """Collect today's snapshot with a SaaS collector's run_collection()."""
+    from common.logging import get_logger
+
+    main = importlib.import_module(f'collectors.{package}.main')
+    api = getattr(importlib.import_module(f'collectors.{package}.api'), api_class)
+    logger = get_logger(f'collectors.{package}.main')
+
+    main.run_collection(api(), date.today(), None, logger)
+    return f'{label} completed successfully'
+
+
+def run_m365_collector() -> str:
+    """Collect today's Microsoft 365 snapshot."""
+    return _run_saas_collector('m365', 'M365API', 'M365 collector')
+
+
+def run_duo_collector() -> str:
+    """Collect today's Duo snapshot."""
+    return _run_saas_collector('duo', 'DuoAPI', 'Duo collector')
+
+
+def run_vadesecure_collector() -> str:
+    """Collect today's VadeSecure snapshot."""
+    return _run_saas_collector('vadesecure', 'VadeSecureAPI', 'VadeSecure collector')
+
+
+def run_dropsuite_collector() -> str:
+    """Collect today's Dropsuite snapshot."""
+    return _run_saas_collector('dropsuite', 'DropsuiteAPI', 'Dropsuite collector')
+
+
+def run_veeam_collector() -> str:
+    """Collect today's Veeam VSPC snapshot."""
+    from common.logging import get_logger
+    from collectors.veeam.api import VeeamAPI
+    from collectors.veeam.main import run_collection
+    from collectors.veeam.mapping import normalize_veeam_data
+    from common.job_logging import mark_stage
+
+    logger = get_logger('collectors.veeam.main')
+
+    api = VeeamAPI()
+    mark_stage('fetch')
+    companies, usage_data, quota_data = api.get_companies(), api.get_cloud_usage(), api.get_quota_data()
+    mark_stage('normalize')
+    normalized = normalize_veeam_data(companies, usage_data, quota_data)
+    run_collection(normalized, date.today(), logger)
+    return 'Veeam collector completed successfully'
+
+
+def run_cross_vendor() -> str:
+    """Run today's cross-vendor consistency checks."""
+    from collectors.checks.cross_vendor import run_cross_vendor_checks
+    from common.db import session_scope
+
+    with session_scope() as session:
+        results = run_cross_vendor_checks(session, date.today())
+
+    open_count = sum(v for k, v in results.items() if isinstance(v, int))
+    return f'Cross-vendor checks completed successfully ({open_count} open exceptions)'
+
+
+def run_windows_11_assessment() -> str:
+    """Assess Ninja Windows devices for Windows 11 24H2 compatibility."""
+    from collectors.assessments import windows_11_24h2_assessment
+
+    try:
+        windows_11_24h2_assessment.main()
+    except SystemExit as e:
+        # main() reports failure by exiting; the details are in its log
+        if e.code:
+            raise RuntimeError(f'Windows 11 24H2 assessment exited with status {e.code}')
+
+    return 'Windows 11 24H2 assessment completed successfully'
+
+
+@dataclass(frozen=True)
+class JobDefinition:
+    """A job that can be queued in job_runs."""
+
+    name: str
+    id_prefix: str
+    stage: int
+    label: str
+    run: Callable[[], str]
+    # External API the job calls (None for database-only jobs)
+    vendor: Optional[str] = None
+
+
+# Stage 0 collects data; stage 1 jobs read it and only run if a collector
+# in the same batch succeeded
+JOBS: Dict[str, JobDefinition] = {
+    job.name: job for job in (
+        JobDefinition('ninja-collector', 'ni', 0, 'Ninja collector', run_ninja_collector, 'ninja'),
+        JobDefinition('threatlocker-collector', 'th', 0, 'ThreatLocker collector', run_threatlocker_collector, 'threatlocker'),
+        JobDefinition('m365-collector', 'm365', 0, 'M365 collector', run_m365_collector, 'm365'),
+        JobDefinition('duo-collector', 'duo', 0, 'Duo collector', run_duo_collector, 'duo'),
+        JobDefinition('vadesecure-collector', 'vs', 0, 'VadeSecure collector', run_vadesecure_collector, 'vadesecure'),
+        JobDefinition('dropsuite-collector', 'ds', 0, 'Dropsuite collector', run_dropsuite_collector, 'dropsuite'),
+        JobDefinition('veeam-collector', 've', 0, 'Veeam collector', run_veeam_collector, 'veeam'),
+        JobDefinition('cross-vendor-checks', 'cv', 1, 'Cross-vendor checks', run_cross_vendor),
+        JobDefinition('windows-11-24h2-assessment', 'w24', 1, 'Windows 11 24H2 assessment', run_windows_11_assessment),
+    )
+}
+
+# Collector names accepted by /api/collectors/run
+COLLECTOR_JOBS = {
+    'ninja': 'ninja-collector',
+    'threatlocker': 'threatlocker-collector',
+}
@@ -7,6 +7,7 @@ from typing import List, Dict, Any, Optional, Iterator
 from datetime import datetime, timedelta
 
 from common.logging import get_logger
+from common.metrics import instrument_session
 
 logger = get_logger(__name__)
 
@@ -22,6 +23,7 @@ class M365API:
         """Initialize by loading all tenant credentials from environment."""
         self.tenants = self._load_tenants_from_env()
         self._token_cache = {}  # tenant_id -> (token, expiry)
+        self.session = instrument_session(requests.Session(), 'm365')
 
         if not self.tenants:
             raise ValueError("No M365 tenant credentials found in environment")
@@ -89,7 +91,7 @@ class M365API:
         }
 
         try:
-            response = requests.post(url, data=data, timeout=30)
+            response = self.session.post(url, data=data, timeout=30)
             response.raise_for_status()
             result = response.json()
 
@@ -124,7 +126,7 @@ class M365API:
         }
 
         try:
-            response = requests.get(url, headers=headers, params=params, timeout=60)
+            response = self.session.get(url, headers=headers, params=params, timeout=60)
             response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
@@ -152,7 +154,7 @@ class M365API:
 
         while url:
             try:
-                response = requests.get(url, headers=headers, params=params, timeout=60)
+                response = self.session.get(url, headers=headers, params=params, timeout=60)
                 response.raise_for_status()
                 data = response.json()
 
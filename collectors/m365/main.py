@@ -7,7 +7,7 @@ from datetime import datetime, date
 from typing import Optional
 
 from common.logging import get_logger
-from common.job_logging import log_job_start, log_job_completion, log_job_failure
+from common.job_logging import log_job_start, log_job_completion, log_job_failure, mark_stage
 
 from .api import M365API
 from .mapping import normalize_m365_tenant
@@ -142,6 +142,7 @@ def run_collection(api: M365API, snapshot_date: date, limit: Optional[int], logg
         logger.error(f"Database configuration error: {e}")
         raise
 
+    mark_stage('fetch')
     tenants = api.list_tenants()
     logger.info(f"Found {len(tenants)} configured tenants")
 
@@ -161,6 +162,7 @@ def run_collection(api: M365API, snapshot_date: date, limit: Optional[int], logg
             logger.info("Created M365 vendor record")
 
         # Delete existing snapshots for this date to ensure clean daily data
+        mark_stage('write')
         logger.info(f"Deleting existing M365 snapshots for {snapshot_date}")
         deleted_count = session.query(M365Snapshot).filter(
             M365Snapshot.snapshot_date == snapshot_date
@@ -182,18 +184,21 @@ def run_collection(api: M365API, snapshot_date: date, limit: Optional[int], logg
                 logger.info(f"Processing tenant {tenant_count}: {tenant_name}")
 
                 # Fetch users for this tenant
+                mark_stage('fetch')
                 users = api.get_users(tenant)
                 organization = api.get_organization(tenant)
 
                 logger.info(f"  Raw users: {len(users)}")
 
                 # Normalize the data
+                mark_stage('normalize')
                 normalized = normalize_m365_tenant(tenant, users, organization)
 
                 logger.info(f"  Filtered users: {normalized['user_count']}")
                 total_users += normalized['user_count']
 
                 # Use upsert to handle duplicate (snapshot_date, tenant_id)
+                mark_stage('write')
                 stmt = insert(M365Snapshot).values(
                     snapshot_date=snapshot_date,
                     tenant_id=normalized['tenant_id'],
@@ -255,6 +260,19 @@ def run_collection(api: M365API, snapshot_date: date, limit: Optional[int], logg
         # Commit all changes
         session.commit()
 
+        # Reconcile per-organization counts against Ninja seats
+        mark_stage('post_process')
+        try:
+            from collectors.checks.reconciliation import run_reconciliations
+            from collectors.checks.variance_reports import invalidate_report_artifacts
+            reconciled = run_reconciliations(session, snapshot_date, vendors=['M365'])
+            invalidate_report_artifacts(session)
+            session.commit()
+            logger.info(f"Seat reconciliation: {reconciled}")
+        except Exception as e:
+            session.rollback()
+            logger.warning(f"Seat reconciliation failed: {e}")
+
     logger.info(f"Collection completed. Processed: {tenant_count}, "
                 f"Saved: {saved_count}, Errors: {error_count}, Total users: {total_users}")
 
@@ -4,6 +4,7 @@ import requests
 from typing import Generator, Dict, Any, Optional
 
 from collectors.ninja.token_manager import get_access_token, get_credentials
+from common.metrics import instrument_session
 
 
 class NinjaAPI:
@@ -30,7 +31,7 @@ class NinjaAPI:
         self.base_url = creds['base_url']
 
         # Initialize session
-        self.session = requests.Session()
+        self.session = instrument_session(requests.Session(), 'ninja')
         self.session.headers.update({"Accept": "application/json"})
 
     def _get_access_token(self) -> str:
@@ -8,7 +8,7 @@ from typing import Optional
 
 from common.logging import get_logger
 from common.util import utcnow, sha256_json, upsert_device_identity, insert_snapshot
-from common.job_logging import log_job_start, log_job_completion, log_job_failure
+from common.job_logging import log_job_start, log_job_completion, log_job_failure, mark_stage, timed_iter
 
 from .api import NinjaAPI
 from .mapping import normalize_ninja_device
@@ -150,6 +150,7 @@ def run_collection(ninja_api: NinjaAPI, ninja_rmm_api: Optional[NinjaRMMAPI], sn
         _ensure_reference_data(session, logger)
         
         # Delete existing snapshots for this date to ensure clean daily data
+        mark_stage('write')
         logger.info(f"Deleting existing snapshots for {snapshot_date}")
         from storage.schema import DeviceSnapshot
         deleted_count = session.query(DeviceSnapshot).filter(
@@ -162,6 +163,7 @@ def run_collection(ninja_api: NinjaAPI, ninja_rmm_api: Optional[NinjaRMMAPI], sn
         # Get organization and location mappings if enhanced API is available
         org_map = {}
         loc_map = {}
+        mark_stage('fetch')
         if ninja_rmm_api:
             try:
                 logger.info("Fetching organization and location mappings")
@@ -173,7 +175,7 @@ def run_collection(ninja_api: NinjaAPI, ninja_rmm_api: Optional[NinjaRMMAPI], sn
             except Exception as e:
                 logger.warning(f"Could not fetch organization/location mappings: {e}")
         
-        for raw_device in ninja_api.list_devices(limit=limit):
+        for raw_device in timed_iter(ninja_api.list_devices(limit=limit)):
             device_count += 1
             device_name = raw_device.get('systemName', f'Device-{device_count}')
             
@@ -188,9 +190,11 @@ def run_collection(ninja_api: NinjaAPI, ninja_rmm_api: Optional[NinjaRMMAPI], sn
                 logger.info(f"Processing device {device_count}: {device_name}")
                 
                 # Normalize the device with organization/location mappings
+                mark_stage('normalize')
                 normalized = normalize_ninja_device(raw_device, ninja_api, org_map, loc_map)
                 
                 # Upsert device identity
+                mark_stage('write')
                 device_identity_id = upsert_device_identity(
                     session=session,
                     vendor_id=vendor_id,
@@ -232,6 +236,22 @@ def run_collection(ninja_api: NinjaAPI, ninja_rmm_api: Optional[NinjaRMMAPI], sn
                 
                 # Continue processing other devices
                 continue
+        
+        # Refresh the hostname match index used by search and cross-vendor matching
+        mark_stage('post_process')
+        from common.hostname_index import refresh_hostname_index
+        indexed = refresh_hostname_index(session, vendor_id, snapshot_date)
+        logger.info(f"Refreshed hostname match index with {indexed} Ninja hostnames")
+        
+        # Device count rollups, committed with the snapshot
+        from common.rollups import refresh_count_rollups
+        groups = refresh_count_rollups(session, vendor_id, snapshot_date)
+        logger.info(f"Refreshed device count rollups ({groups} groups) for {snapshot_date}")
+        
+        # Mark the day complete; it becomes "latest" when this transaction commits
+        from common.snapshot_state import record_snapshot_state
+        if record_snapshot_state(session, vendor_id, snapshot_date):
+            logger.info(f"Latest complete Ninja snapshot is now {snapshot_date}")
     
     logger.info(f"Collection completed. Processed: {device_count}, "
                f"Saved: {saved_count}, Errors: {error_count}")
@@ -6,6 +6,7 @@ from typing import Dict, Any, List, Optional
 from datetime import datetime
 
 from collectors.ninja.token_manager import get_access_token, get_credentials
+from common.metrics import instrument_session
 
 
 class NinjaRMMAPI:
@@ -32,7 +33,7 @@ class NinjaRMMAPI:
         self.base_url = creds['base_url']
 
         # Initialize session
-        self.session = requests.Session()
+        self.session = instrument_session(requests.Session(), 'ninja')
         self.session.headers.update({"Accept": "application/json"})
 
     def _get_access_token(self) -> str:
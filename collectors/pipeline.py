@@ -0,0 +1,435 @@
+"""Nightly collection pipeline.
+
+Runs every nightly job as one dependency graph instead of systemd timers on
+fixed offsets: the Ninja, ThreatLocker and SaaS collectors start together,
+the cross-vendor checks start as soon as both device collectors have
+finished and the Windows 11 24H2 assessment as soon as Ninja has. A node
+runs once all of its dependencies have finished and at least one of them
+succeeded; otherwise it is cancelled. At most PIPELINE_VENDOR_LIMIT jobs
+per vendor API (and PIPELINE_WORKERS overall) run at a time.
+
+Each run is a job_batches row with one job_runs row per node, so the
+dashboard's run tracking endpoints show the nightly run and its per-node
+start, end and duration. The rows are reserved for this process
+(claimed_by) and kept alive with a heartbeat; if the runner dies, the API
+job queue (api/job_queue.py) takes over the nodes it had not started.
+When the run ends its metrics (per-job durations, stage times, rows
+written, vendor API calls) are written to METRICS_TEXTFILE_DIR.
+
+Usage:
+    python -m collectors.pipeline
+    python -m collectors.pipeline --only ninja-collector,cross-vendor-checks
+    python -m collectors.pipeline --plan
+"""
+
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from common.db import session_scope
+from common.job_events import notify_job_events
+from common.job_logging import track_job
+from common.logging import get_logger
+from common.metrics import write_textfile
+
+from .jobs import JOBS
+
+
+# Node -> nodes it depends on
+NIGHTLY_PIPELINE: Dict[str, List[str]] = {
+    'ninja-collector': [],
+    'threatlocker-collector': [],
+    'm365-collector': [],
+    'duo-collector': [],
+    'vadesecure-collector': [],
+    'dropsuite-collector': [],
+    'veeam-collector': [],
+    'cross-vendor-checks': ['ninja-collector', 'threatlocker-collector'],
+    'windows-11-24h2-assessment': ['ninja-collector'],
+}
+
+PIPELINE_WORKERS = int(os.getenv('PIPELINE_WORKERS', '6'))
+PIPELINE_VENDOR_LIMIT = int(os.getenv('PIPELINE_VENDOR_LIMIT', '1'))
+HEARTBEAT_SECONDS = float(os.getenv('JOB_HEARTBEAT_SECONDS', '30'))
+
+
+def select_nodes(graph: Dict[str, List[str]], only: Optional[List[str]] = None,
+                 skip: Optional[List[str]] = None) -> Dict[str, List[str]]:
+    """
+    Restrict the graph to the selected nodes.
+
+    Dependencies on nodes that are not selected are dropped, so a node can
+    be re-run on its own against data already collected.
+
+    Args:
+        graph: Node -> dependencies
+        only: Nodes to keep (default: all)
+        skip: Nodes to drop
+
+    Returns:
+        dict: Selected node -> selected dependencies
+    """
+    unknown = [name for name in (only or []) + (skip or []) if name not in graph]
+    if unknown:
+        raise ValueError(f"Unknown pipeline nodes: {', '.join(unknown)}")
+
+    selected = [name for name in graph
+                if (not only or name in only) and name not in (skip or [])]
+    return {name: [dep for dep in graph[name] if dep in selected] for name in selected}
+
+
+def critical_path(graph: Dict[str, List[str]],
+                  timings: Dict[str, Tuple[datetime, datetime]]) -> List[str]:
+    """
+    The chain of nodes that determined when the run finished.
+
+    Starting from the node that finished last, follow the dependency that
+    finished last.
+
+    Args:
+        graph: Node -> dependencies
+        timings: Node -> (started, ended) for nodes that ran
+
+    Returns:
+        list: Node names from the first to the last node of the chain
+    """
+    if not timings:
+        return []
+
+    node = max(timings, key=lambda name: timings[name][1])
+    path = [node]
+    while True:
+        deps = [dep for dep in graph.get(node, []) if dep in timings]
+        if not deps:
+            break
+        node = max(deps, key=lambda name: timings[name][1])
+        path.append(node)
+    return list(reversed(path))
+
+
+class PipelineRun:
+    """One execution of the pipeline graph, tracked in job_batches/job_runs."""
+
+    def __init__(self, graph: Dict[str, List[str]], workers: int = PIPELINE_WORKERS,
+                 vendor_limit: int = PIPELINE_VENDOR_LIMIT, logger=None):
+        self.graph = graph
+        self.workers = workers
+        self.vendor_limit = vendor_limit
+        self.logger = logger or get_logger(__name__)
+        self.runner_id = f"pipeline@{socket.gethostname()}:{os.getpid()}"
+        self.batch_id = f"nb_{uuid.uuid4().hex[:8]}"
+        self.job_ids: Dict[str, str] = {}
+        self.status: Dict[str, str] = {}
+        self.timings: Dict[str, Tuple[datetime, datetime]] = {}
+        self._stop = threading.Event()
+
+    def create_rows(self) -> None:
+        """Record the batch and reserve one queued job row per node."""
+        now = datetime.utcnow()
+        with session_scope() as session:
+            session.execute(text("""
+                INSERT INTO job_batches (batch_id, created_at, status, priority, started_at, message)
+                VALUES (:batch_id, :now, 'running', 'normal', :now, :message)
+            """), {
+                'batch_id': self.batch_id,
+                'now': now,
+                'message': f"Nightly pipeline: {len(self.graph)} jobs"
+            })
+
+            for name in self.graph:
+                definition = JOBS[name]
+                job_id = f"{definition.id_prefix}_{uuid.uuid4().hex[:8]}"
+                waiting_on = ', '.join(self.graph[name])
+                session.execute(text("""
+                    INSERT INTO job_runs (job_id, batch_id, job_name, status, stage, started_at,
+                                          updated_at, message, claimed_by, heartbeat_at)
+                    VALUES (:job_id, :batch_id, :job_name, 'queued', :stage, :now,
+                            :now, :message, :runner_id, NOW())
+                """), {
+                    'job_id': job_id,
+                    'batch_id': self.batch_id,
+                    'job_name': name,
+                    'stage': definition.stage,
+                    'now': now,
+                    'message': f"Waiting for {waiting_on}" if waiting_on else f"Queued {definition.label}",
+                    'runner_id': self.runner_id
+                })
+                self.job_ids[name] = job_id
+
+            notify_job_events(session, job_ids=self.job_ids.values(), batch_ids=[self.batch_id])
+
+    def _start_node(self, name: str) -> bool:
+        """Mark a node running; False if it was cancelled (or taken over) meanwhile."""
+        with session_scope() as session:
+            started = session.execute(text("""
+                UPDATE job_runs
+                SET status = 'running', started_at = NOW(), updated_at = NOW(),
+                    heartbeat_at = NOW(), attempts = attempts + 1,
+                    progress_percent = 10, message = :message
+                WHERE job_id = :job_id AND status = 'queued' AND claimed_by = :runner_id
+                RETURNING job_id
+            """), {
+                'job_id': self.job_ids[name],
+                'runner_id': self.runner_id,
+                'message': f"{JOBS[name].label} started"
+            }).fetchone()
+            notify_job_events(session, job_ids=[self.job_ids[name]])
+        return started is not None
+
+    def _end_node(self, name: str, status: str, message: str, error: Optional[str] = None) -> None:
+        """Record a node's outcome and duration."""
+        with session_scope() as session:
+            session.execute(text("""
+                UPDATE job_runs
+                SET status = :status, message = :message, error = :error,
+                    progress_percent = CASE WHEN :status = 'completed' THEN 100 ELSE 0 END,
+                    ended_at = NOW(), updated_at = NOW(),
+                    duration_seconds = EXTRACT(EPOCH FROM (NOW() - started_at))::INTEGER
+                WHERE job_id = :job_id AND status IN ('queued', 'running')
+            """), {
+                'job_id': self.job_ids[name],
+                'status': status,
+                'message': message,
+                'error': error
+            })
+            notify_job_events(session, job_ids=[self.job_ids[name]])
+
+    def _run_node(self, name: str) -> Tuple[str, str, Optional[str]]:
+        """Run one node in a worker thread; returns (status, message, error)."""
+        try:
+            with track_job(name, self.job_ids[name]):
+                message = JOBS[name].run()
+            return 'completed', message, None
+        except (Exception, SystemExit) as e:
+            return 'failed', f"{JOBS[name].label} failed: {e}", str(e)
+
+    def _heartbeat(self) -> None:
+        """Keep this run's reserved and running rows from being taken over."""
+        while not self._stop.wait(HEARTBEAT_SECONDS):
+            try:
+                with session_scope() as session:
+                    session.execute(text("""
+                        UPDATE job_runs SET heartbeat_at = NOW()
+                        WHERE claimed_by = :runner_id AND status IN ('queued', 'running')
+                    """), {'runner_id': self.runner_id})
+            except Exception as e:
+                self.logger.warning(f"Pipeline heartbeat failed: {e}")
+
+    def _runnable(self, name: str, running: Dict[Future, str]) -> Optional[bool]:
+        """
+        Decide whether a pending node can start.
+
+        Returns:
+            bool: True to start, False to cancel, None to keep waiting
+        """
+        deps = self.graph[name]
+        if any(dep not in self.status for dep in deps):
+            return None
+        if deps and not any(self.status[dep] == 'completed' for dep in deps):
+            return False
+
+        vendor = JOBS[name].vendor
+        if vendor is not None:
+            busy = sum(1 for other in running.values() if JOBS[other].vendor == vendor)
+            if busy >= self.vendor_limit:
+                return None
+        return True
+
+    def execute(self) -> Dict[str, str]:
+        """
+        Run the graph to completion.
+
+        Returns:
+            dict: Node -> final status
+        """
+        self.create_rows()
+        self.logger.info(f"Pipeline batch {self.batch_id}: {len(self.graph)} jobs as {self.runner_id}")
+
+        heartbeat = threading.Thread(target=self._heartbeat, name='pipeline-heartbeat', daemon=True)
+        heartbeat.start()
+
+        pending = list(self.graph)
+        running: Dict[Future, str] = {}
+        started_at: Dict[str, datetime] = {}
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='pipeline') as executor:
+                while pending or running:
+                    for name in list(pending):
+                        if len(running) >= self.workers:
+                            break
+                        decision = self._runnable(name, running)
+                        if decision is None:
+                            continue
+                        pending.remove(name)
+
+                        if decision is False:
+                            self.status[name] = 'cancelled'
+                            self._end_node(name, 'cancelled', 'Cancelled - no dependency succeeded')
+                            self.logger.warning(f"{name}: cancelled, no dependency succeeded")
+                        elif not self._start_node(name):
+                            self.status[name] = 'cancelled'
+                            self.logger.warning(f"{name}: cancelled before it started")
+                        else:
+                            started_at[name] = datetime.utcnow()
+                            running[executor.submit(self._run_node, name)] = name
+                            self.logger.info(f"{name}: started")
+
+                    if not running:
+                        # Everything left waits on nodes that were cancelled above
+                        continue
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        status, message, error = future.result()
+                        self.status[name] = status
+                        self.timings[name] = (started_at[name], datetime.utcnow())
+                        self._end_node(name, status, message, error)
+                        seconds = (self.timings[name][1] - self.timings[name][0]).total_seconds()
+                        self.logger.info(f"{name}: {status} in {seconds:.0f}s")
+        finally:
+            self._stop.set()
+
+        self._finish_batch()
+        return self.status
+
+    def _finish_batch(self) -> None:
+        """Close the batch with a summary of the run."""
+        completed = [name for name, status in self.status.items() if status == 'completed']
+        failed = [name for name, status in self.status.items() if status == 'failed']
+        cancelled = [name for name, status in self.status.items() if status == 'cancelled']
+
+        path = critical_path(self.graph, self.timings)
+        message = (f"Nightly pipeline: {len(completed)} completed, {len(failed)} failed, "
+                   f"{len(cancelled)} cancelled; critical path {' -> '.join(path) or '-'}")
+        if failed:
+            message += f"; failed: {', '.join(failed)}"
+
+        with session_scope() as session:
+            session.execute(text("""
+                UPDATE job_batches
+                SET status = CASE
+                        WHEN status = 'cancelling' THEN 'cancelled'
+                        WHEN :succeeded THEN 'completed'
+                        ELSE 'failed' END,
+                    message = :message,
+                    progress_percent = 100,
+                    ended_at = NOW(),
+                    duration_seconds = EXTRACT(EPOCH FROM (NOW() - started_at))::INTEGER
+                WHERE batch_id = :batch_id
+            """), {'batch_id': self.batch_id, 'succeeded': bool(completed), 'message': message})
+            notify_job_events(session, batch_ids=[self.batch_id])
+
+        self.logger.info(message)
+
+    def print_summary(self) -> None:
+        """Print per-node timing relative to the start of the run."""
+        if not self.timings:
+            return
+        origin = min(started for started, _ in self.timings.values())
+        path = set(critical_path(self.graph, self.timings))
+
+        print(f"\n{'Job':<30} {'Status':<10} {'Start':>7} {'Duration':>9}")
+        for name in self.graph:
+            status = self.status.get(name, '-')
+            if name in self.timings:
+                started, ended = self.timings[name]
+                marker = ' *' if name in path else ''
+                print(f"{name:<30} {status:<10} {(started - origin).total_seconds():>6.0f}s "
+                      f"{(ended - started).total_seconds():>8.0f}s{marker}")
+            else:
+                print(f"{name:<30} {status:<10} {'-':>7} {'-':>9}")
+        print("* critical path")
+
+
+def plan_levels(graph: Dict[str, List[str]]) -> Dict[str, int]:
+    """Depth of each node: 0 for nodes without dependencies, else 1 + deepest dependency."""
+    levels: Dict[str, int] = {}
+
+    def level(node: str) -> int:
+        if node not in levels:
+            levels[node] = 1 + max((level(dep) for dep in graph[node]), default=-1)
+        return levels[node]
+
+    for name in graph:
+        level(name)
+    return levels
+
+
+def print_plan(graph: Dict[str, List[str]]) -> None:
+    """Print the graph in the order nodes can start."""
+    levels = plan_levels(graph)
+    order = list(graph)
+    for name in sorted(graph, key=lambda node: (levels[node], order.index(node))):
+        deps = ', '.join(graph[name]) or '-'
+        vendor = JOBS[name].vendor or '-'
+        print(f"{levels[name]}  {name:<30} vendor={vendor:<14} after: {deps}")
+
+
+def _job_list(value: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated job list argument."""
+    if not value:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(description='Nightly collection pipeline')
+    parser.add_argument(
+        '--only',
+        type=str,
+        help='Comma-separated jobs to run (dependencies outside the list are not waited for)'
+    )
+    parser.add_argument(
+        '--skip',
+        type=str,
+        help='Comma-separated jobs to leave out'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=PIPELINE_WORKERS,
+        help=f'Maximum concurrent jobs (default: {PIPELINE_WORKERS})'
+    )
+    parser.add_argument(
+        '--plan',
+        action='store_true',
+        help='Print the job graph and exit without running anything'
+    )
+
+    args = parser.parse_args()
+    logger = get_logger(__name__)
+
+    try:
+        graph = select_nodes(NIGHTLY_PIPELINE, _job_list(args.only), _job_list(args.skip))
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.plan:
+        print_plan(graph)
+        return
+
+    run = PipelineRun(graph, workers=args.workers, logger=logger)
+    start = time.monotonic()
+    statuses = run.execute()
+    run.print_summary()
+    logger.info(f"Pipeline finished in {time.monotonic() - start:.0f}s")
+    write_textfile('nightly-pipeline')
+
+    if any(status == 'failed' for status in statuses.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
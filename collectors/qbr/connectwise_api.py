@@ -7,6 +7,7 @@ from typing import List, Dict, Any, Optional
 import requests
 
 from common.logging import get_logger
+from common.metrics import count_vendor_retry, instrument_session
 
 
 class ConnectWiseAPI:
@@ -56,7 +57,7 @@ class ConnectWiseAPI:
             )
 
         # Create session for connection pooling
-        self.session = requests.Session()
+        self.session = instrument_session(requests.Session(), 'connectwise')
         self.session.headers.update(self._get_auth_headers())
 
     def _get_auth_headers(self) -> Dict[str, str]:
@@ -133,6 +134,7 @@ class ConnectWiseAPI:
                     if attempt < max_retries:
                         wait_time = 2 ** attempt
                         self.logger.info(f"Retrying in {wait_time} seconds...")
+                        count_vendor_retry('connectwise')
                         time.sleep(wait_time)
                     else:
                         raise
@@ -196,6 +198,7 @@ class ConnectWiseAPI:
                     if attempt < max_retries:
                         wait_time = 2 ** attempt
                         self.logger.info(f"Retrying in {wait_time} seconds...")
+                        count_vendor_retry('connectwise')
                         time.sleep(wait_time)
                     else:
                         raise
@@ -7,7 +7,7 @@ from sqlalchemy import func, and_, or_
 from sqlalchemy.orm import Session
 
 from common.db import session_scope
-from storage.schema import DeviceSnapshot
+from storage.schema import DailyCounts, DeviceSnapshot, MonthEndCounts
 from .base_collector import BaseQBRCollector
 from .utils import get_period_boundaries, get_previous_period
 
@@ -121,10 +121,11 @@ class NinjaQBRCollector(BaseQBRCollector):
 
         self.logger.info(f"QBR period {period} will use snapshot from {previous_period} ({first_day} to {last_day})")
 
-        latest_date = session.query(func.max(DeviceSnapshot.snapshot_date)).filter(
-            DeviceSnapshot.vendor_id == 2,  # Ninja vendor ID
-            DeviceSnapshot.snapshot_date >= first_day,
-            DeviceSnapshot.snapshot_date <= last_day
+        # month_end_counts holds each vendor's latest complete snapshot of the month
+        latest_date = session.query(func.max(MonthEndCounts.month_end_date)).filter(
+            MonthEndCounts.vendor_id == 2,  # Ninja vendor ID
+            MonthEndCounts.month_end_date >= first_day,
+            MonthEndCounts.month_end_date <= last_day
         ).scalar()
 
         return latest_date
@@ -150,11 +151,12 @@ class NinjaQBRCollector(BaseQBRCollector):
         Returns:
             int: Count of billable endpoints
         """
-        count = session.query(func.count(func.distinct(DeviceSnapshot.device_identity_id))).filter(
-            DeviceSnapshot.vendor_id == 2,  # Ninja
-            DeviceSnapshot.snapshot_date == snapshot_date,
-            DeviceSnapshot.billing_status_id == 1,  # billable status ID
-            ~DeviceSnapshot.organization_name.in_(self.EXCLUDED_ORGS)
+        # daily_counts holds one row per device group of the snapshot
+        count = session.query(func.sum(DailyCounts.cnt)).filter(
+            DailyCounts.vendor_id == 2,  # Ninja
+            DailyCounts.snapshot_date == snapshot_date,
+            DailyCounts.billing_status_id == 1,  # billable status ID
+            ~DailyCounts.organization_name.in_(self.EXCLUDED_ORGS)
         ).scalar()
 
         return count or 0
@@ -5,6 +5,8 @@ import json
 import requests
 from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
+
+from common.metrics import instrument_session
 from .log import get_logger
 
 # Load environment variables from shared secrets and project .env
@@ -54,7 +56,7 @@ class ThreatLockerAPI:
             )
         
         # Initialize session with headers (matching working dashboard)
-        self.session = requests.Session()
+        self.session = instrument_session(requests.Session(), 'threatlocker')
         self.session.headers.update({
             "authorization": self.api_key,
             "content-type": "application/json",
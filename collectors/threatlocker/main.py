@@ -8,7 +8,7 @@ from .log import get_logger
 from .api import fetch_devices
 from .mapping import normalize_threatlocker_device
 from common.util import insert_snapshot, upsert_device_identity
-from common.job_logging import log_job_start, log_job_completion, log_job_failure
+from common.job_logging import log_job_start, log_job_completion, log_job_failure, mark_stage
 from datetime import date
 
 
@@ -81,6 +81,7 @@ def run_collection(session: Any, devices: list, snapshot_date: date) -> Dict[str
     from common.logging import get_logger
     logger = get_logger(__name__)
     
+    mark_stage('write')
     deleted_count = session.query(DeviceSnapshot).filter(
         DeviceSnapshot.snapshot_date == snapshot_date,
         DeviceSnapshot.vendor_id == vendor_id
@@ -93,9 +94,11 @@ def run_collection(session: Any, devices: list, snapshot_date: date) -> Dict[str
         
         try:
             # Normalize the device data
+            mark_stage('normalize')
             normalized = normalize_threatlocker_device(device)
             
             # Create device identity for this device
+            mark_stage('write')
             device_identity_id = upsert_device_identity(
                 session=session,
                 vendor_id=vendor_id,
@@ -123,6 +126,22 @@ def run_collection(session: Any, devices: list, snapshot_date: date) -> Dict[str
             else:
                 raise
     
+    # Refresh the hostname match index used by search and cross-vendor matching
+    mark_stage('post_process')
+    from common.hostname_index import refresh_hostname_index
+    indexed = refresh_hostname_index(session, vendor_id, snapshot_date)
+    logger.info(f"Refreshed hostname match index with {indexed} ThreatLocker hostnames")
+    
+    # Device count rollups, committed with the snapshot
+    from common.rollups import refresh_count_rollups
+    groups = refresh_count_rollups(session, vendor_id, snapshot_date)
+    logger.info(f"Refreshed device count rollups ({groups} groups) for {snapshot_date}")
+    
+    # Mark the day complete; it becomes "latest" when this transaction commits
+    from common.snapshot_state import record_snapshot_state
+    if record_snapshot_state(session, vendor_id, snapshot_date):
+        logger.info(f"Latest complete ThreatLocker snapshot is now {snapshot_date}")
+    
     return {
         "processed": processed,
         "inserted": inserted,
@@ -176,6 +195,7 @@ def main():
         with get_session() as session:
             # Fetch devices from ThreatLocker API
             logger.info("Fetching devices from ThreatLocker API")
+            mark_stage('fetch')
             devices = fetch_devices(limit=args.limit, since=args.since)
             logger.info(f"Fetched {len(devices)} devices")
             
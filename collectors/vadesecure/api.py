@@ -6,6 +6,7 @@ from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
 
 from common.logging import get_logger
+from common.metrics import instrument_session
 
 # Load environment variables from .env file
 load_dotenv()
@@ -33,7 +34,7 @@ class VadeSecureAPI:
             )
 
         # Initialize session
-        self.session = requests.Session()
+        self.session = instrument_session(requests.Session(), 'vadesecure')
         self.session.headers.update({
             "Content-Type": "application/json",
             "Accept": "application/json"
@@ -7,7 +7,7 @@ from datetime import datetime, date
 from typing import Optional
 
 from common.logging import get_logger
-from common.job_logging import log_job_start, log_job_completion, log_job_failure
+from common.job_logging import log_job_start, log_job_completion, log_job_failure, mark_stage
 
 from .api import VadeSecureAPI
 from .mapping import normalize_vadesecure_customer
@@ -127,6 +127,7 @@ def run_collection(api: VadeSecureAPI, snapshot_date: date, limit: Optional[int]
         raise
 
     # Fetch customers
+    mark_stage('fetch')
     customers = api.list_customers()
     customer_count = 0
     saved_count = 0
@@ -143,6 +144,7 @@ def run_collection(api: VadeSecureAPI, snapshot_date: date, limit: Optional[int]
             logger.info("Created VadeSecure vendor record")
 
         # Delete existing snapshots for this date to ensure clean daily data
+        mark_stage('write')
         logger.info(f"Deleting existing VadeSecure snapshots for {snapshot_date}")
         deleted_count = session.query(VadeSecureSnapshot).filter(
             VadeSecureSnapshot.snapshot_date == snapshot_date
@@ -161,6 +163,7 @@ def run_collection(api: VadeSecureAPI, snapshot_date: date, limit: Optional[int]
                 logger.info(f"Processing customer {customer_count}: {customer_name}")
 
                 # Normalize the customer
+                mark_stage('normalize')
                 normalized = normalize_vadesecure_customer(raw_customer)
 
                 if not normalized['customer_id']:
@@ -168,6 +171,7 @@ def run_collection(api: VadeSecureAPI, snapshot_date: date, limit: Optional[int]
                     continue
 
                 # Use upsert to handle duplicate (snapshot_date, customer_id)
+                mark_stage('write')
                 stmt = insert(VadeSecureSnapshot).values(
                     snapshot_date=snapshot_date,
                     customer_id=normalized['customer_id'],
@@ -238,6 +242,19 @@ def run_collection(api: VadeSecureAPI, snapshot_date: date, limit: Optional[int]
         # Commit all changes
         session.commit()
 
+        # Reconcile per-organization counts against Ninja seats
+        mark_stage('post_process')
+        try:
+            from collectors.checks.reconciliation import run_reconciliations
+            from collectors.checks.variance_reports import invalidate_report_artifacts
+            reconciled = run_reconciliations(session, snapshot_date, vendors=['VadeSecure'])
+            invalidate_report_artifacts(session)
+            session.commit()
+            logger.info(f"Seat reconciliation: {reconciled}")
+        except Exception as e:
+            session.rollback()
+            logger.warning(f"Seat reconciliation failed: {e}")
+
     logger.info(f"Collection completed. Processed: {customer_count}, "
                 f"Saved: {saved_count}, Errors: {error_count}")
 
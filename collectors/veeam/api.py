@@ -6,6 +6,7 @@ from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 
 from common.logging import get_logger
+from common.metrics import instrument_session
 
 logger = get_logger(__name__)
 
@@ -30,6 +31,7 @@ class VeeamAPI:
 
         self._token: Optional[str] = None
         self._token_expires: Optional[datetime] = None
+        self.session = instrument_session(requests.Session(), 'veeam')
 
         logger.info(f"Initialized VSPC API client for {self.server}:{self.port}")
 
@@ -47,7 +49,7 @@ class VeeamAPI:
             'password': self.password,
         }
 
-        response = requests.post(
+        response = self.session.post(
             self.token_url,
             data=data,
             verify=True,
@@ -76,7 +78,7 @@ class VeeamAPI:
         """Make authenticated GET request to VSPC API."""
         url = f"{self.base_url}{endpoint}"
 
-        response = requests.get(
+        response = self.session.get(
             url,
             headers=self._get_headers(),
             params=params,
@@ -5,7 +5,7 @@ import sys
 from datetime import datetime, date
 
 from common.logging import get_logger
-from common.job_logging import log_job_start, log_job_completion, log_job_failure
+from common.job_logging import log_job_start, log_job_completion, log_job_failure, mark_stage
 
 from .api import VeeamAPI
 from .mapping import normalize_veeam_data
@@ -49,12 +49,14 @@ def main():
         api = VeeamAPI()
 
         # Fetch data from VSPC
+        mark_stage('fetch')
         logger.info("Fetching data from VSPC...")
         companies = api.get_companies()
         usage_data = api.get_cloud_usage()
         quota_data = api.get_quota_data()
 
         # Normalize data
+        mark_stage('normalize')
         logger.info("Normalizing data...")
         normalized = normalize_veeam_data(companies, usage_data, quota_data)
 
@@ -155,6 +157,7 @@ def run_collection(normalized: list, snapshot_date: date, logger) -> None:
             logger.info("Created Veeam vendor record")
 
         # Delete existing snapshots for this date
+        mark_stage('write')
         logger.info(f"Deleting existing Veeam snapshots for {snapshot_date}")
         deleted_count = session.query(VeeamSnapshot).filter(
             VeeamSnapshot.snapshot_date == snapshot_date
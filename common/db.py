@@ -1,22 +1,127 @@
-"""Database utilities for es-inventory-hub."""
+"""Database utilities for es-inventory-hub.
 
+Every module gets its engine from get_engine(), so a process holds one
+connection pool per purpose instead of one per module (or, for progress
+updates, one per call). Pool sizing comes from the environment:
+
+    DB_POOL_SIZE       persistent connections per engine (default 5)
+    DB_MAX_OVERFLOW    extra connections under load (default 10)
+    DB_POOL_RECYCLE    seconds before a connection is replaced (default 1800)
+    DB_POOL_TIMEOUT    seconds to wait for a free connection (default 30)
+
+pool_stats() reports checkouts and connection churn for each engine.
+"""
+
+import os
+import threading
 from contextlib import contextmanager
-from typing import Generator
+from typing import Any, Dict, Generator
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, Session
 
 from .config import get_dsn
 
 
+POOL_SETTINGS = {
+    'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+    'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+    'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+    'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '30')),
+}
+
+_engines: Dict[str, Engine] = {}
+_pool_counters: Dict[str, Dict[str, int]] = {}
+_registry_lock = threading.Lock()
+_registry_pid = os.getpid()
+
+
+def _track_pool(name: str, new_engine: Engine) -> None:
+    """Count connection lifecycle events for pool_stats()."""
+    counters = _pool_counters.setdefault(name, {
+        'connects': 0, 'checkouts': 0, 'checkins': 0, 'invalidations': 0
+    })
+
+    def count(key):
+        def listener(*args):
+            counters[key] += 1
+        return listener
+
+    event.listen(new_engine, 'connect', count('connects'))
+    event.listen(new_engine, 'checkout', count('checkouts'))
+    event.listen(new_engine, 'checkin', count('checkins'))
+    event.listen(new_engine, 'invalidate', count('invalidations'))
+
+
+def get_engine(name: str = 'default', **overrides: Any) -> Engine:
+    """
+    Get a shared engine from the registry, creating it on first use.
+
+    Args:
+        name: Registry key; modules needing different pool settings (e.g. a
+            single-connection worker engine) use their own name
+        **overrides: create_engine() keyword arguments replacing POOL_SETTINGS,
+            applied only when the engine is first created
+
+    Returns:
+        Engine: Pooled engine for the configured DSN
+    """
+    global _registry_pid
+
+    with _registry_lock:
+        # A forked child must not reuse the parent's pooled connections
+        if os.getpid() != _registry_pid:
+            for inherited in _engines.values():
+                inherited.dispose(close=False)
+            _engines.clear()
+            _pool_counters.clear()
+            _registry_pid = os.getpid()
+
+        existing = _engines.get(name)
+        if existing is not None:
+            return existing
+
+        settings = dict(POOL_SETTINGS, pool_pre_ping=True, future=True)
+        settings.update(overrides)
+        new_engine = create_engine(get_dsn(), **settings)
+        _track_pool(name, new_engine)
+        _engines[name] = new_engine
+        return new_engine
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Report pool usage for every engine in the registry.
+
+    Returns:
+        dict: Per engine name: pool size, checked-in/out and overflow
+        connections, and lifetime connect/checkout/checkin/invalidation counts
+    """
+    with _registry_lock:
+        stats = {}
+        for name, registered in _engines.items():
+            pool = registered.pool
+            entry = dict(_pool_counters.get(name, {}))
+            if hasattr(pool, 'checkedout'):
+                entry.update({
+                    'pool_size': pool.size(),
+                    'checked_in': pool.checkedin(),
+                    'checked_out': pool.checkedout(),
+                    'overflow': pool.overflow(),
+                })
+            stats[name] = entry
+        return stats
+
+
 # Create SQLAlchemy engine
-engine = create_engine(get_dsn(), pool_pre_ping=True, future=True)
+engine = get_engine()
 
 # Create session factory
 SessionLocal = sessionmaker(
-    bind=engine, 
-    autoflush=False, 
-    autocommit=False, 
+    bind=engine,
+    autoflush=False,
+    autocommit=False,
     expire_on_commit=False
 )
 
@@ -25,10 +130,10 @@ SessionLocal = sessionmaker(
 def session_scope() -> Generator[Session, None, None]:
     """
     Provide a transactional scope around a series of operations.
-    
+
     Yields:
         Session: SQLAlchemy session
-        
+
     The session will be committed if no exceptions occur,
     otherwise it will be rolled back.
     """
@@ -0,0 +1,82 @@
+"""Log of the dates whose open exceptions changed.
+
+Every write to the exceptions table (the check writer, manual status
+updates through the API and CLI, variance verification and cleanup)
+records the first_seen .. last_seen span of the rows it changed in
+exception_changes, in the same transaction. Readers get cheap versions
+from it instead of scanning exceptions:
+
+- MAX(id) moves on any change (the API response cache's data version)
+- the latest change covering a date moves only when that date's open
+  exceptions change (the archived per-date reports, common/report_archive.py)
+
+Writes made outside these paths (psql fixes) should log their span with
+record_exception_changes() or clear the report archive.
+"""
+
+from datetime import date, timedelta
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from storage.schema import ExceptionChanges
+
+
+# (first date, last date), both inclusive
+Span = Tuple[date, date]
+
+
+def merge_spans(spans: Iterable[Span]) -> List[Span]:
+    """
+    Merge overlapping and adjacent spans.
+
+    Args:
+        spans: (start_date, end_date) pairs in any order
+
+    Returns:
+        list: Disjoint spans, oldest first
+    """
+    merged: List[Span] = []
+    for start_date, end_date in sorted(spans):
+        if merged and start_date <= merged[-1][1] + timedelta(days=1):
+            if end_date > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end_date)
+        else:
+            merged.append((start_date, end_date))
+    return merged
+
+
+def record_exception_changes(session: Session, spans: Iterable[Span]) -> int:
+    """
+    Log the date spans whose open exceptions changed.
+
+    Args:
+        session: Database session (caller commits with the exception writes)
+        spans: (start_date, end_date) pairs
+
+    Returns:
+        int: Number of change rows logged
+    """
+    merged = merge_spans(spans)
+    if merged:
+        session.execute(insert(ExceptionChanges), [
+            {'start_date': start_date, 'end_date': end_date} for start_date, end_date in merged
+        ])
+    return len(merged)
+
+
+def record_changed_rows(session: Session, rows: Iterable) -> int:
+    """
+    Log the spans of exception rows returned by UPDATE/DELETE ... RETURNING first_seen, last_seen.
+
+    Args:
+        session: Database session
+        rows: Result rows with first_seen and last_seen
+
+    Returns:
+        int: Number of exception rows changed
+    """
+    rows = list(rows)
+    record_exception_changes(session, [(row.first_seen, row.last_seen) for row in rows])
+    return len(rows)
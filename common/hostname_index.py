@@ -0,0 +1,205 @@
+"""Truncation-aware hostname match index for es-inventory-hub.
+
+Ninja reports NetBIOS-style hostnames that may be cut at 15 characters while
+ThreatLocker stores full hostnames. The hostname_match_index table keeps the
+canonical key and its 15-character prefix for each vendor's latest snapshot
+so lookups resolve truncated names with index scans.
+"""
+
+from datetime import date
+from typing import Any, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+
+# NetBIOS computer names are limited to 15 characters
+NETBIOS_LENGTH = 15
+
+# Match types in rank order (best first)
+MATCH_TYPES = ('exact', 'truncated', 'prefix', 'contains')
+
+
+def canonical_hostname_key(hostname: Optional[str]) -> str:
+    """
+    Canonical matching key: lowercase, before any '|' and before the first
+    dot, without surrounding whitespace.
+
+    Mirrors LOWER(BTRIM(SPLIT_PART(SPLIT_PART(hostname,'|',1),'.',1))), the
+    key refresh_hostname_index() stores in hostname_match_index.
+
+    Args:
+        hostname: Hostname as stored (can be None)
+
+    Returns:
+        str: Canonical key ('' for empty hostnames)
+    """
+    if not hostname:
+        return ''
+    return hostname.split('|')[0].split('.')[0].strip(' ').lower()
+
+
+def hostname_prefix_key(hostname: Optional[str]) -> str:
+    """
+    Canonical key cut to the NetBIOS length, used to match truncated names.
+
+    Args:
+        hostname: Hostname as stored (can be None)
+
+    Returns:
+        str: First 15 characters of the canonical key
+    """
+    return canonical_hostname_key(hostname)[:NETBIOS_LENGTH]
+
+
+def refresh_hostname_index(session: Session, vendor_id: int, snapshot_date: date) -> int:
+    """
+    Replace a vendor's index entries with the given snapshot.
+
+    Called by collectors after writing device snapshots. Snapshots older than
+    the date already indexed for the vendor are ignored so backfills do not
+    replace the latest data.
+
+    Args:
+        session: Database session (caller commits)
+        vendor_id: ID of the vendor
+        snapshot_date: Date of the snapshot just written
+
+    Returns:
+        int: Number of index rows written (0 if skipped)
+    """
+    indexed_date = session.execute(text("""
+        SELECT MAX(snapshot_date) FROM hostname_match_index WHERE vendor_id = :vendor_id
+    """), {'vendor_id': vendor_id}).scalar()
+
+    if indexed_date and indexed_date > snapshot_date:
+        return 0
+
+    session.execute(text("""
+        DELETE FROM hostname_match_index WHERE vendor_id = :vendor_id
+    """), {'vendor_id': vendor_id})
+
+    result = session.execute(text("""
+        INSERT INTO hostname_match_index (
+            vendor_id, device_identity_id, snapshot_date, hostname,
+            canonical_key, prefix_key, is_truncated, display_name, organization_name
+        )
+        SELECT
+            ds.vendor_id,
+            ds.device_identity_id,
+            ds.snapshot_date,
+            ds.hostname,
+            LOWER(BTRIM(SPLIT_PART(SPLIT_PART(ds.hostname, '|', 1), '.', 1))),
+            LEFT(LOWER(BTRIM(SPLIT_PART(SPLIT_PART(ds.hostname, '|', 1), '.', 1))), :netbios_length),
+            (v.name = 'Ninja' AND LENGTH(SPLIT_PART(ds.hostname, '.', 1)) = :netbios_length),
+            ds.display_name,
+            ds.organization_name
+        FROM device_snapshot ds
+        JOIN vendor v ON v.id = ds.vendor_id
+        WHERE ds.vendor_id = :vendor_id
+          AND ds.snapshot_date = :snapshot_date
+          AND ds.hostname IS NOT NULL
+          AND ds.hostname <> ''
+    """), {
+        'vendor_id': vendor_id,
+        'snapshot_date': snapshot_date,
+        'netbios_length': NETBIOS_LENGTH
+    })
+
+    return result.rowcount
+
+
+def _escape_like(value: str) -> str:
+    """Escape LIKE wildcards in a user-supplied term."""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_hostname_index(
+    session: Session,
+    search_term: str,
+    vendor_name: Optional[str] = None,
+    limit: int = 50,
+    after: Optional[Sequence[Any]] = None
+) -> List[Any]:
+    """
+    Find devices whose hostname matches a term, ranked by match type.
+
+    Match types, best first:
+    - exact: canonical keys are equal
+    - truncated: equal 15-character prefixes (one side truncated)
+    - prefix: canonical key starts with the term
+    - contains: canonical key contains the term
+
+    Args:
+        session: Database session
+        search_term: Hostname or partial hostname
+        vendor_name: Optional vendor name filter ('Ninja' or 'ThreatLocker')
+        limit: Maximum rows to return
+        after: Sort values (match_rank, vendor, hostname, device_identity_id)
+            of the last row of the previous page
+
+    Returns:
+        list: Rows with vendor, hostname, display_name, organization_name,
+        snapshot_date, prefix_key, is_truncated, match_type, match_rank,
+        device_identity_id
+    """
+    key = canonical_hostname_key(search_term)
+    if not key:
+        return []
+
+    query = """
+        SELECT
+            v.name as vendor,
+            h.hostname,
+            h.display_name,
+            h.organization_name,
+            h.snapshot_date,
+            h.prefix_key,
+            h.is_truncated,
+            CASE
+                WHEN h.canonical_key = :key THEN 'exact'
+                WHEN h.prefix_key = :prefix THEN 'truncated'
+                WHEN h.canonical_key LIKE :starts_with THEN 'prefix'
+                ELSE 'contains'
+            END as match_type,
+            CASE
+                WHEN h.canonical_key = :key THEN 1
+                WHEN h.prefix_key = :prefix THEN 2
+                WHEN h.canonical_key LIKE :starts_with THEN 3
+                ELSE 4
+            END as match_rank,
+            h.device_identity_id
+        FROM hostname_match_index h
+        JOIN vendor v ON v.id = h.vendor_id
+        WHERE (
+            h.canonical_key = :key
+            OR h.prefix_key = :prefix
+            OR h.canonical_key LIKE :starts_with
+            OR h.canonical_key LIKE :contains
+        )
+    """
+
+    escaped = _escape_like(key)
+    params = {
+        'key': key,
+        'prefix': key[:NETBIOS_LENGTH],
+        'starts_with': escaped + '%',
+        'contains': '%' + escaped + '%',
+        'limit': limit
+    }
+
+    if vendor_name:
+        query += " AND v.name = :vendor_name"
+        params['vendor_name'] = vendor_name
+
+    query = f"SELECT * FROM ({query}) ranked"
+    if after is not None:
+        query += """
+            WHERE (match_rank, vendor, hostname, device_identity_id)
+                > (:after_rank, :after_vendor, :after_hostname, :after_device)
+        """
+        params.update(zip(('after_rank', 'after_vendor', 'after_hostname', 'after_device'), after))
+
+    query += " ORDER BY match_rank, vendor, hostname, device_identity_id LIMIT :limit"
+
+    return session.execute(text(query), params).fetchall()
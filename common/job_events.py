@@ -0,0 +1,189 @@
+"""Job and batch change notifications.
+
+Every write that changes a job_runs or job_batches row's status, progress
+or message also calls notify_job_events(), which sends the row's new state
+on the job_events channel with pg_notify. Postgres delivers notifications
+when the transaction commits (and drops them on rollback), so listeners
+only see committed state.
+
+JobEventListener holds one LISTEN connection per process and fans the
+events out to subscriber queues; the API streams them to the dashboard
+(/api/collectors/events) instead of having it poll the run endpoints.
+"""
+
+import json
+import logging
+import os
+import queue
+import select
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+JOB_EVENTS_CHANNEL = 'job_events'
+JOB_EVENTS_MAX_CLIENTS = int(os.getenv('JOB_EVENTS_MAX_CLIENTS', '50'))
+# Idle streams send a comment this often so proxies keep them open
+JOB_EVENTS_KEEPALIVE_SECONDS = float(os.getenv('JOB_EVENTS_KEEPALIVE_SECONDS', '15'))
+# How long the listener waits for a notification before checking its connection
+LISTEN_POLL_SECONDS = 30
+RECONNECT_SECONDS = 5
+# Events buffered per subscriber before it is told to resync
+SUBSCRIBER_BUFFER = 200
+
+# Messages are truncated to keep payloads under Postgres' 8000 byte limit
+NOTIFY_JOBS_QUERY = text("""
+    SELECT pg_notify(:channel, json_build_object(
+        'type', 'job',
+        'job_id', job_id,
+        'batch_id', batch_id,
+        'job_name', job_name,
+        'status', status,
+        'progress_percent', progress_percent,
+        'message', left(message, 1000),
+        'error', left(error, 1000),
+        'updated_at', updated_at,
+        'ended_at', ended_at,
+        'duration_seconds', duration_seconds
+    )::text)
+    FROM job_runs
+    WHERE job_id = ANY(:job_ids)
+""")
+
+NOTIFY_BATCHES_QUERY = text("""
+    SELECT pg_notify(:channel, json_build_object(
+        'type', 'batch',
+        'batch_id', batch_id,
+        'status', status,
+        'progress_percent', progress_percent,
+        'message', left(message, 1000),
+        'error', left(error, 1000),
+        'ended_at', ended_at,
+        'duration_seconds', duration_seconds
+    )::text)
+    FROM job_batches
+    WHERE batch_id = ANY(:batch_ids)
+""")
+
+# Job and batch statuses after which nothing changes
+TERMINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+
+def notify_job_events(session: Session, job_ids: Iterable[str] = (),
+                      batch_ids: Iterable[str] = ()) -> None:
+    """
+    Announce the current state of jobs and batches on the job_events channel.
+
+    Call after the UPDATE/INSERT, in the same transaction.
+
+    Args:
+        session: Database session (notifications are sent when it commits)
+        job_ids: Changed job_runs rows
+        batch_ids: Changed job_batches rows
+    """
+    job_ids = [job_id for job_id in job_ids if job_id]
+    batch_ids = [batch_id for batch_id in batch_ids if batch_id]
+    if job_ids:
+        session.execute(NOTIFY_JOBS_QUERY, {'channel': JOB_EVENTS_CHANNEL, 'job_ids': job_ids})
+    if batch_ids:
+        session.execute(NOTIFY_BATCHES_QUERY, {'channel': JOB_EVENTS_CHANNEL, 'batch_ids': batch_ids})
+
+
+class JobEventListener:
+    """Process-wide LISTEN connection fanning job events out to subscribers."""
+
+    def __init__(self, max_subscribers: int = JOB_EVENTS_MAX_CLIENTS):
+        self.max_subscribers = max_subscribers
+        self._subscribers: Set[queue.Queue] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Optional[queue.Queue]:
+        """
+        Register a subscriber, starting the listener thread on first use.
+
+        Returns:
+            Queue: Receives event dicts; {'type': 'resync'} means events may
+            have been missed and the subscriber should re-read current state.
+            None if max_subscribers are already connected.
+        """
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._listen, name='job-events', daemon=True)
+                self._thread.start()
+            subscriber: queue.Queue = queue.Queue(maxsize=SUBSCRIBER_BUFFER)
+            self._subscribers.add(subscriber)
+            return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def _publish(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                # A stalled client gets a fresh snapshot instead of a backlog
+                with subscriber.mutex:
+                    subscriber.queue.clear()
+                subscriber.put_nowait({'type': 'resync'})
+
+    def _listen(self) -> None:
+        from common.db import get_engine
+
+        engine = get_engine('job-events', pool_size=1, max_overflow=0)
+        connected_before = False
+
+        while True:
+            connection = None
+            try:
+                connection = engine.raw_connection()
+                dbapi_connection = connection.driver_connection
+                dbapi_connection.autocommit = True
+                with dbapi_connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {JOB_EVENTS_CHANNEL}")
+
+                if connected_before:
+                    # Anything sent while reconnecting was lost
+                    self._publish({'type': 'resync'})
+                connected_before = True
+
+                while True:
+                    readable, _, _ = select.select([dbapi_connection], [], [], LISTEN_POLL_SECONDS)
+                    if not readable:
+                        with dbapi_connection.cursor() as cursor:
+                            cursor.execute("SELECT 1")
+                        continue
+
+                    dbapi_connection.poll()
+                    while dbapi_connection.notifies:
+                        notification = dbapi_connection.notifies.pop(0)
+                        try:
+                            self._publish(json.loads(notification.payload))
+                        except ValueError:
+                            logger.warning(f"Ignoring malformed job event: {notification.payload[:200]}")
+
+            except Exception as e:
+                logger.error(f"Job events: listener connection failed: {e}")
+                if connection is not None:
+                    try:
+                        connection.invalidate()
+                    except Exception:
+                        pass
+                time.sleep(RECONNECT_SECONDS)
+
+
+job_events = JobEventListener()
@@ -1,26 +1,93 @@
-"""Job run logging utilities for collectors."""
+"""Job run logging utilities for collectors.
 
+Besides the job_runs rows, every run is measured for the Prometheus
+metrics (common/metrics.py): duration, outcome, rows written, database
+time and the time spent in each stage. Statements are only counted when
+the metrics are published (the API's /metrics or METRICS_TEXTFILE_DIR) or
+SQL_PROFILING_ENABLED is on. Collectors mark their stages with
+mark_stage() and timed_iter(); both do nothing outside a tracked run.
+CLI runs (log_job_start/log_job_completion) write the metrics textfile
+when they finish; a run still open when the process exits is logged as
+failed. The API job queue and the nightly pipeline wrap each job in
+track_job().
+
+A run can be asked to stop (request_stop(): batch cancelled, deadline
+passed); the collector gets JobCancelled at its next mark_stage() or
+timed_iter() page, so stage boundaries are the cancellation points.
+
+Runs with a job_runs row also get a stage profile in job_run_stages:
+each stage's duration, peak memory and allocation hot spots
+(common/job_profile.py). Time before the first mark counts as 'other'.
+"""
+
+import atexit
+import logging
+import time
 import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, Generator, Iterable, Iterator, List, Optional, TypeVar
 import pytz
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from storage.schema import JobRuns, JobBatches
+from common.job_events import notify_job_events
+from common.job_profile import StageMemory, memory_sampler, save_stage_profile
+from common.metrics import Counter, Gauge, metrics_published, write_textfile
+from common.query_stats import SQL_PROFILING_ENABLED, start_tracking, stop_tracking
 
 # Database connection - lazy initialization
-from common.config import get_dsn
+from common.db import get_engine
 
-_engine = None
 _Session = None
 
-def get_engine():
-    """Get database engine, creating it if necessary."""
-    global _engine
-    if _engine is None:
-        DSN = get_dsn()
-        _engine = create_engine(DSN)
-    return _engine
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+COLLECTOR_RUNS = Counter(
+    'es_inventory_collector_runs_total',
+    'Collector and check runs by final status',
+    ['collector', 'status']
+)
+COLLECTOR_DURATION = Gauge(
+    'es_inventory_collector_last_run_duration_seconds',
+    'Duration of the last run',
+    ['collector']
+)
+COLLECTOR_LAST_SUCCESS = Gauge(
+    'es_inventory_collector_last_success_timestamp_seconds',
+    'When the last successful run finished',
+    ['collector']
+)
+COLLECTOR_ROWS_WRITTEN = Gauge(
+    'es_inventory_collector_last_run_rows_written',
+    'Rows inserted, updated or deleted by the last run',
+    ['collector']
+)
+COLLECTOR_QUERIES = Gauge(
+    'es_inventory_collector_last_run_queries',
+    'SQL statements executed by the last run',
+    ['collector']
+)
+COLLECTOR_DB_SECONDS = Gauge(
+    'es_inventory_collector_last_run_db_seconds',
+    'Time the last run spent waiting on the database',
+    ['collector']
+)
+COLLECTOR_STAGE_SECONDS = Gauge(
+    'es_inventory_collector_last_run_stage_seconds',
+    'Time the last run spent in each stage (fetch, normalize, write, post_process)',
+    ['collector', 'stage']
+)
+
+class JobCancelled(Exception):
+    """Raised at a stage boundary of a run that was asked to stop."""
+
+
+_current_run: ContextVar[Optional['JobRunStats']] = ContextVar('job_run', default=None)
+# Runs started by log_job_start(), finished by log_job_completion()
+_logged_runs: Dict[str, 'JobRunStats'] = {}
 
 def get_session():
     """Get database session."""
@@ -64,8 +131,12 @@ def log_job_start(job_name: str, message: Optional[str] = None) -> str:
             message=message
         )
         session.add(job_run)
+        session.flush()
+        notify_job_events(session, job_ids=[job_id], batch_ids=[batch_id])
         session.commit()
-        return job_id
+
+    _logged_runs[job_id] = JobRunStats(job_name, job_id)
+    return job_id
 
 
 def log_job_completion(job_run_id: str, status: str = 'completed', message: Optional[str] = None):
@@ -77,6 +148,11 @@ def log_job_completion(job_run_id: str, status: str = 'completed', message: Opti
         status: Final status ('completed', 'failed')
         message: Optional completion message
     """
+    run = _logged_runs.pop(job_run_id, None)
+    if run is not None:
+        run.finish(status)
+        write_textfile(run.job_name)
+
     with get_session() as session:
         job_run = session.query(JobRuns).filter_by(job_id=job_run_id).first()
         if job_run:
@@ -89,6 +165,8 @@ def log_job_completion(job_run_id: str, status: str = 'completed', message: Opti
             if job_run.started_at and job_run.ended_at:
                 duration = job_run.ended_at - job_run.started_at
                 job_run.duration_seconds = int(duration.total_seconds())
+            session.flush()
+            notify_job_events(session, job_ids=[job_run_id])
             session.commit()
             
             # Update batch status if this was the last job in the batch
@@ -104,6 +182,8 @@ def log_job_completion(job_run_id: str, status: str = 'completed', message: Opti
                     if batch.started_at and batch.ended_at:
                         duration = batch.ended_at - batch.started_at
                         batch.duration_seconds = int(duration.total_seconds())
+                    session.flush()
+                    notify_job_events(session, batch_ids=[batch.batch_id])
                     session.commit()
 
 
@@ -116,3 +196,176 @@ def log_job_failure(job_run_id: str, error_message: str):
         error_message: Error message describing the failure
     """
     log_job_completion(job_run_id, status='failed', message=error_message)
+
+
+@atexit.register
+def _finish_abandoned_runs() -> None:
+    """Log runs still open at exit (SystemExit, KeyboardInterrupt) as failed."""
+    for job_run_id in list(_logged_runs):
+        try:
+            log_job_completion(job_run_id, status='failed', message='Process exited before the run finished')
+        except Exception as e:
+            # The run's stats were popped and finished before the update failed
+            logger.warning(f"Could not log abandoned job run {job_run_id}: {e}")
+
+
+class JobRunStats:
+    """Duration, stage times, memory and database work of one job run."""
+
+    def __init__(self, job_name: str, job_id: Optional[str] = None):
+        self.job_name = job_name
+        self.job_id = job_id
+        self.started = time.monotonic()
+        self.stages: Dict[str, float] = {}
+        self.memory: Dict[str, StageMemory] = {}
+        self.stage: Optional[str] = None
+        self._stage_started = 0.0
+        self.stop_reason: Optional[str] = None
+        self.query_stats = start_tracking(job_name, force=metrics_published())
+        self._token = _current_run.set(self)
+        self.mark_stage('other')
+        memory_sampler.register(self)
+
+    def mark_stage(self, stage: Optional[str]) -> None:
+        """End the current stage and start the next one (None stops counting)."""
+        now = time.perf_counter()
+        if self.stage is not None:
+            self.stages[self.stage] = self.stages.get(self.stage, 0.0) + now - self._stage_started
+        if stage is not None:
+            self.memory_for(stage)
+        self.stage = stage
+        self._stage_started = now
+
+    def request_stop(self, reason: str) -> None:
+        """Ask the run to stop at its next stage boundary (safe from other threads)."""
+        self.stop_reason = reason
+
+    def check_stop(self) -> None:
+        """Raise JobCancelled if the run was asked to stop."""
+        if self.stop_reason is not None:
+            raise JobCancelled(self.stop_reason)
+
+    def memory_for(self, stage: str) -> StageMemory:
+        """Memory peaks of a stage (stages are kept in the order they were first entered)."""
+        return self.memory.setdefault(stage, StageMemory())
+
+    def stage_profile(self) -> List[Dict[str, Any]]:
+        """
+        Rows for job_run_stages, one per stage the run entered.
+
+        Returns:
+            list: Dicts with stage, position, duration_seconds, peak_rss_mb,
+                peak_traced_mb and top_allocations
+        """
+        rows = []
+        for position, (stage, memory) in enumerate(list(self.memory.items())):
+            rows.append({
+                'stage': stage,
+                'position': position,
+                'duration_seconds': round(self.stages.get(stage, 0.0), 3),
+                'peak_rss_mb': round(memory.peak_rss_mb, 1) if memory.peak_rss_mb is not None else None,
+                'peak_traced_mb': round(memory.peak_traced_mb, 1) if memory.peak_traced_mb is not None else None,
+                'top_allocations': memory.top_allocations
+            })
+        return rows
+
+    def finish(self, status: str) -> None:
+        """
+        Stop measuring and publish the run's metrics.
+
+        Args:
+            status: Final status ('completed', 'failed', 'cancelled')
+        """
+        memory_sampler.unregister(self)
+        self.mark_stage(None)
+        stop_tracking(self.query_stats)
+        if self._token is not None:
+            _current_run.reset(self._token)
+            self._token = None
+
+        collector = self.job_name
+        COLLECTOR_RUNS.inc(collector=collector, status=status)
+        COLLECTOR_DURATION.set(time.monotonic() - self.started, collector=collector)
+        if status == 'completed':
+            COLLECTOR_LAST_SUCCESS.set(time.time(), collector=collector)
+        for stage, seconds in self.stages.items():
+            COLLECTOR_STAGE_SECONDS.set(seconds, collector=collector, stage=stage)
+        if self.query_stats is not None:
+            COLLECTOR_ROWS_WRITTEN.set(self.query_stats.rows_written, collector=collector)
+            COLLECTOR_QUERIES.set(self.query_stats.count, collector=collector)
+            COLLECTOR_DB_SECONDS.set(self.query_stats.db_seconds, collector=collector)
+            if SQL_PROFILING_ENABLED:
+                self.query_stats.log_report()
+
+        if self.job_id is not None:
+            try:
+                save_stage_profile(self.job_id, self.job_name, self.stage_profile())
+            except Exception as e:
+                # The profile is diagnostic; losing it must not fail the run
+                logger.warning(f"Could not save stage profile of {self.job_name} run {self.job_id}: {e}")
+
+
+@contextmanager
+def track_job(job_name: str, job_id: Optional[str] = None) -> Generator[JobRunStats, None, None]:
+    """
+    Measure a job run executed inside the block.
+
+    The run counts as cancelled if the block raises JobCancelled and as
+    failed if it raises anything else (including SystemExit).
+
+    Args:
+        job_name: Job name, e.g. 'ninja-collector'
+        job_id: job_runs.job_id of the run; its stage profile is saved when given
+
+    Yields:
+        JobRunStats: The run being measured
+    """
+    run = JobRunStats(job_name, job_id)
+    status = 'failed'
+    try:
+        yield run
+        status = 'completed'
+    except JobCancelled:
+        status = 'cancelled'
+        raise
+    finally:
+        run.finish(status)
+
+
+def mark_stage(stage: Optional[str]) -> None:
+    """
+    Start a stage of the current run; it lasts until the next mark or the run's end.
+
+    Does nothing outside a tracked run.
+
+    Args:
+        stage: 'fetch', 'normalize', 'write' or 'post_process' (None stops counting)
+
+    Raises:
+        JobCancelled: The run was asked to stop
+    """
+    run = _current_run.get()
+    if run is not None:
+        run.check_stop()
+        run.mark_stage(stage)
+
+
+def timed_iter(iterable: Iterable[T], stage: str = 'fetch') -> Iterator[T]:
+    """
+    Iterate, counting the time spent producing each item towards a stage.
+
+    For paginated API generators, whose fetching happens at the top of a
+    loop whose body marks its own stages.
+
+    Args:
+        iterable: Items to yield
+        stage: Stage the producing time belongs to
+    """
+    iterator = iter(iterable)
+    while True:
+        mark_stage(stage)
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        yield item
@@ -0,0 +1,227 @@
+"""Memory profile of job runs.
+
+While a tracked run (common/job_logging.py) is active, a sampler thread
+reads the process's RSS every JOB_PROFILE_SAMPLE_SECONDS and charges the
+peak to the stage each run is in. The stage timings and memory are saved
+to job_run_stages when the run finishes; tools/job_profile_cli.py
+compares them across runs.
+
+With JOB_PROFILE_TRACEMALLOC=true the sampler also traces Python
+allocations. When the memory traced during a stage reaches a new high
+(10% above its last snapshot, at most every SNAPSHOT_MIN_SECONDS) it takes
+a tracemalloc snapshot and keeps the top sites of the live allocations as
+the stage's hot spots; they include data kept from earlier stages.
+Tracing slows allocation-heavy code for every thread of the process, so it
+is off by default; turn it on for a one-off CLI run when investigating
+memory growth.
+
+Memory is process-wide: runs executing concurrently in one process (the
+API job queue, the nightly pipeline) are all charged the same samples.
+"""
+
+import logging
+import os
+import resource
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.dialects.postgresql import insert
+
+from common.db import session_scope
+from storage.schema import JobRunStages
+
+logger = logging.getLogger(__name__)
+
+JOB_PROFILE_TRACEMALLOC = os.getenv('JOB_PROFILE_TRACEMALLOC', 'false').lower() == 'true'
+JOB_PROFILE_SAMPLE_SECONDS = float(os.getenv('JOB_PROFILE_SAMPLE_SECONDS', '1'))
+SNAPSHOT_MIN_SECONDS = 30
+SNAPSHOT_GROWTH = 1.1
+SNAPSHOT_MIN_MB = 1.0
+HOT_SPOTS = 10
+
+MB = 1024 * 1024
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process now (the peak so far where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / MB
+    except (OSError, IndexError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """Largest resident set size this process has had."""
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _hot_spots(snapshot: tracemalloc.Snapshot) -> List[Dict[str, Any]]:
+    """Top allocation sites of a snapshot, with paths relative to the project."""
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, '<frozen importlib*>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    ))
+    hot_spots = []
+    for stat in snapshot.statistics('lineno')[:HOT_SPOTS]:
+        if stat.size < MB / 100:
+            break
+        frame = stat.traceback[0]
+        filename = frame.filename
+        if filename.startswith(PROJECT_ROOT):
+            filename = os.path.relpath(filename, PROJECT_ROOT)
+        hot_spots.append({
+            'location': f"{filename}:{frame.lineno}",
+            'size_mb': round(stat.size / MB, 2),
+            'count': stat.count
+        })
+    return hot_spots
+
+
+class StageMemory:
+    """Memory peaks observed while a run was in one stage."""
+
+    def __init__(self):
+        self.peak_rss_mb: Optional[float] = None
+        self.peak_traced_mb: Optional[float] = None
+        self.top_allocations: Optional[List[Dict[str, Any]]] = None
+        self.snapshot_traced_mb = 0.0
+        self.snapshot_at = 0.0
+
+    def record(self, rss_mb: float, traced_mb: Optional[float]) -> None:
+        self.peak_rss_mb = max(self.peak_rss_mb or 0.0, rss_mb)
+        if traced_mb is not None:
+            self.peak_traced_mb = max(self.peak_traced_mb or 0.0, traced_mb)
+
+    def wants_snapshot(self, traced_mb: float, now: float) -> bool:
+        return (traced_mb >= SNAPSHOT_MIN_MB
+                and traced_mb > self.snapshot_traced_mb * SNAPSHOT_GROWTH
+                and now - self.snapshot_at >= SNAPSHOT_MIN_SECONDS)
+
+
+class MemorySampler:
+    """Process-wide sampler charging memory to the stages of active runs."""
+
+    def __init__(self, interval: float = JOB_PROFILE_SAMPLE_SECONDS):
+        self.interval = interval
+        self._runs: List[Any] = []
+        self._lock = threading.Lock()
+        # Held while sampling, so tracing is never stopped mid-snapshot
+        self._sample_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._owns_tracemalloc = False
+
+    def register(self, run: Any) -> None:
+        """
+        Start sampling for a run (and tracing allocations if JOB_PROFILE_TRACEMALLOC is on).
+
+        Args:
+            run: JobRunStats; must have .stage and .memory_for(stage)
+        """
+        with self._lock:
+            self._runs.append(run)
+            if JOB_PROFILE_TRACEMALLOC and not tracemalloc.is_tracing():
+                tracemalloc.start(1)
+                self._owns_tracemalloc = True
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name='job-profile', daemon=True)
+                self._thread.start()
+
+    def unregister(self, run: Any) -> None:
+        """Take a last sample for a run and stop sampling it."""
+        with self._sample_lock:
+            try:
+                self._sample([run])
+            except Exception as e:
+                logger.warning(f"Job profile: memory sample failed: {e}")
+            with self._lock:
+                if run in self._runs:
+                    self._runs.remove(run)
+                if not self._runs and self._owns_tracemalloc:
+                    tracemalloc.stop()
+                    self._owns_tracemalloc = False
+
+    def _loop(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                runs = list(self._runs)
+                if not runs:
+                    self._thread = None
+                    return
+            with self._sample_lock:
+                # Skip runs that finished while this thread slept
+                runs = [run for run in runs if run in self._runs]
+                try:
+                    self._sample(runs)
+                except Exception as e:
+                    logger.warning(f"Job profile: memory sample failed: {e}")
+
+    def _sample(self, runs: List[Any]) -> None:
+        rss_mb = current_rss_mb()
+        traced_mb = live_mb = None
+        if tracemalloc.is_tracing():
+            # The peak since the last sample, so short spikes are not missed;
+            # snapshots follow what is live now, since that is what they show
+            live, peak = tracemalloc.get_traced_memory()
+            traced_mb, live_mb = peak / MB, live / MB
+            tracemalloc.reset_peak()
+
+        now = time.monotonic()
+        needs_snapshot = []
+        for run in runs:
+            stage = run.stage
+            if stage is None:
+                continue
+            memory = run.memory_for(stage)
+            memory.record(rss_mb, traced_mb)
+            if live_mb is not None and memory.wants_snapshot(live_mb, now):
+                needs_snapshot.append(memory)
+
+        if needs_snapshot:
+            hot_spots = _hot_spots(tracemalloc.take_snapshot())
+            for memory in needs_snapshot:
+                memory.top_allocations = hot_spots
+                memory.snapshot_traced_mb = live_mb
+                memory.snapshot_at = now
+
+
+memory_sampler = MemorySampler()
+
+
+def save_stage_profile(job_id: str, job_name: str, stages: List[Dict[str, Any]]) -> None:
+    """
+    Store a run's stage profile in job_run_stages (replacing any earlier rows for its stages).
+
+    Args:
+        job_id: job_runs.job_id of the run
+        job_name: Job name, e.g. 'ninja-collector'
+        stages: Rows with stage, position, duration_seconds, peak_rss_mb,
+            peak_traced_mb and top_allocations
+    """
+    if not stages:
+        return
+
+    stmt = insert(JobRunStages).values([
+        dict(stage, job_id=job_id, job_name=job_name) for stage in stages
+    ])
+    stmt = stmt.on_conflict_do_update(
+        constraint='uq_job_run_stages_job_stage',
+        set_={
+            'position': stmt.excluded.position,
+            'duration_seconds': stmt.excluded.duration_seconds,
+            'peak_rss_mb': stmt.excluded.peak_rss_mb,
+            'peak_traced_mb': stmt.excluded.peak_traced_mb,
+            'top_allocations': stmt.excluded.top_allocations,
+            'recorded_at': stmt.excluded.recorded_at,
+        }
+    )
+    with session_scope() as session:
+        session.execute(stmt)
@@ -0,0 +1,316 @@
+"""Prometheus metrics for the API and collectors.
+
+A small in-process registry of counters, gauges and histograms rendered in
+the Prometheus text exposition format. The API serves it at /metrics
+(api/metrics_api.py). Collector processes (CLI runs and the nightly
+pipeline) are too short-lived to scrape, so they write it to
+METRICS_TEXTFILE_DIR for node_exporter's textfile collector instead
+(write_textfile()).
+
+Vendor API clients call instrument_session() on their requests.Session so
+every response is counted by vendor and status and its latency observed.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRICS_TEXTFILE_DIR = os.getenv('METRICS_TEXTFILE_DIR', '')
+
+# Set when this process serves /metrics (the API); see metrics_published()
+_served = False
+
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """Metrics rendered together, plus callbacks refreshing gauges at render time."""
+
+    def __init__(self):
+        self._metrics: List['_Metric'] = []
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: '_Metric') -> None:
+        with self._lock:
+            if any(existing.name == metric.name for existing in self._metrics):
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics.append(metric)
+
+    def add_callback(self, callback: Callable[[], None]) -> None:
+        """Run callback before every render (e.g. to copy pool statistics into gauges)."""
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def render(self, extra_labels: Optional[Dict[str, str]] = None) -> str:
+        """
+        Render every metric in the text exposition format.
+
+        Args:
+            extra_labels: Labels added to every sample
+
+        Returns:
+            str: Exposition text
+        """
+        with self._lock:
+            callbacks = list(self._callbacks)
+            metrics = list(self._metrics)
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Metrics callback {getattr(callback, '__name__', callback)} failed: {e}")
+
+        extra = list((extra_labels or {}).items())
+        lines = []
+        for metric in metrics:
+            samples = metric.samples()
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, pairs, value in samples:
+                lines.append(f"{metric.name}{suffix}{_format_labels(extra + list(pairs))} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional[Registry] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _pairs(self, key: Tuple[str, ...]) -> List[Tuple[str, str]]:
+        return list(zip(self.labelnames, key))
+
+    def clear(self) -> None:
+        """Drop every labelled series."""
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> List[Tuple[str, List[Tuple[str, str]], float]]:
+        with self._lock:
+            return [('', self._pairs(key), value) for key, value in sorted(self._values.items())]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set_total(self, value: float, **labels: Any) -> None:
+        """Mirror a count kept elsewhere (e.g. the response cache's hit counter)."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    kind = 'gauge'
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional[Registry] = None):
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def samples(self) -> List[Tuple[str, List[Tuple[str, str]], float]]:
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        samples = []
+        for key, (counts, total) in values:
+            pairs = self._pairs(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                samples.append(('_bucket', pairs + [('le', _format_value(bound))], cumulative))
+            samples.append(('_sum', pairs, total))
+            samples.append(('_count', pairs, cumulative))
+        return samples
+
+
+def render(extra_labels: Optional[Dict[str, str]] = None) -> str:
+    """Render the default registry."""
+    return REGISTRY.render(extra_labels)
+
+
+TEXTFILE_WRITTEN = Gauge(
+    'es_inventory_metrics_textfile_timestamp_seconds',
+    'When this process last wrote its metrics textfile'
+)
+
+
+def serve_metrics() -> None:
+    """Record that this process's registry is scraped (called by api/metrics_api.py)."""
+    global _served
+    _served = True
+
+
+def metrics_published() -> bool:
+    """
+    Whether this process's metrics reach Prometheus.
+
+    Returns:
+        bool: True if the registry is served at /metrics or written to
+            METRICS_TEXTFILE_DIR
+    """
+    return _served or bool(METRICS_TEXTFILE_DIR)
+
+
+def write_textfile(name: str) -> Optional[str]:
+    """
+    Write the default registry to METRICS_TEXTFILE_DIR for node_exporter.
+
+    Each process writes its own file (es_inventory_hub_<name>.prom) and its
+    samples carry a process="<name>" label, so files never collide. The
+    file is replaced atomically.
+
+    Args:
+        name: Process name, e.g. 'ninja-collector' or 'nightly-pipeline'
+
+    Returns:
+        str: Path written, or None when METRICS_TEXTFILE_DIR is not set
+    """
+    if not METRICS_TEXTFILE_DIR:
+        return None
+
+    TEXTFILE_WRITTEN.set(time.time())
+    path = os.path.join(METRICS_TEXTFILE_DIR, f"es_inventory_hub_{name}.prom")
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'w') as f:
+            f.write(render({'process': name}))
+        os.replace(temp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not write metrics textfile {path}: {e}")
+        return None
+    return path
+
+
+# Vendor API calls made by collectors
+
+VENDOR_API_REQUESTS = Counter(
+    'es_inventory_vendor_api_requests_total',
+    'Vendor API responses by HTTP status',
+    ['vendor', 'status']
+)
+VENDOR_API_LATENCY = Histogram(
+    'es_inventory_vendor_api_request_duration_seconds',
+    'Vendor API response time',
+    ['vendor']
+)
+VENDOR_API_THROTTLED = Counter(
+    'es_inventory_vendor_api_throttled_total',
+    'Vendor API requests rejected with 429 Too Many Requests',
+    ['vendor']
+)
+VENDOR_API_RETRIES = Counter(
+    'es_inventory_vendor_api_retries_total',
+    'Vendor API requests retried by the collector',
+    ['vendor']
+)
+
+
+def observe_vendor_response(vendor: str, response: Any) -> None:
+    """
+    Count a vendor API response and observe its latency.
+
+    Args:
+        vendor: Vendor name, e.g. 'ninja'
+        response: requests.Response
+    """
+    VENDOR_API_REQUESTS.inc(vendor=vendor, status=response.status_code)
+    VENDOR_API_LATENCY.observe(response.elapsed.total_seconds(), vendor=vendor)
+    if response.status_code == 429:
+        VENDOR_API_THROTTLED.inc(vendor=vendor)
+
+
+def count_vendor_retry(vendor: str) -> None:
+    """Count a request the collector is about to retry."""
+    VENDOR_API_RETRIES.inc(vendor=vendor)
+
+
+def instrument_session(session: Any, vendor: str) -> Any:
+    """
+    Record every response of a requests.Session in the vendor API metrics.
+
+    Args:
+        session: requests.Session used by a vendor API client
+        vendor: Vendor name used as the metric label
+
+    Returns:
+        The same session
+    """
+    def hook(response, *args, **kwargs):
+        observe_vendor_response(vendor, response)
+        return response
+
+    session.hooks['response'].append(hook)
+    return session
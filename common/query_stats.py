@@ -0,0 +1,190 @@
+"""Per-scope SQL statistics and N+1 detection.
+
+Every engine's before/after_cursor_execute events are hooked the first time
+a scope is tracked. Code running inside track_queries() (or between
+start_tracking() and stop_tracking()) gets a QueryStats counting its
+statements, the rows they wrote, the time spent waiting on the database
+and the slowest statements. The API tracks each request
+(api/request_profiling.py) and the cross-vendor checks track each check;
+collector runs are tracked for their run metrics whenever those metrics
+are published (common/job_logging.py). Statements count towards every
+enclosing scope.
+
+A statement run SQL_REPEATED_STATEMENT_THRESHOLD or more times in one scope
+is logged as a likely N+1: a loop issuing one query per row where a single
+set-based query would do. With profiling disabled and no published
+collector metrics nothing is hooked, so the only cost is a flag check per
+scope.
+"""
+
+import heapq
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Generator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SQL_PROFILING_ENABLED = os.getenv('SQL_PROFILING_ENABLED', 'false').lower() == 'true'
+# Scopes slower than this are logged with their slowest statements
+SQL_SLOW_REQUEST_MS = float(os.getenv('SQL_SLOW_REQUEST_MS', '500'))
+SQL_REPEATED_STATEMENT_THRESHOLD = int(os.getenv('SQL_REPEATED_STATEMENT_THRESHOLD', '10'))
+SLOWEST_STATEMENTS = 3
+STATEMENT_LOG_CHARS = 300
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+_current: ContextVar[Optional['QueryStats']] = ContextVar('query_stats', default=None)
+_install_lock = threading.Lock()
+_installed = False
+
+
+def _shorten(statement: str) -> str:
+    """Collapse whitespace and truncate a statement for the log."""
+    return ' '.join(statement.split())[:STATEMENT_LOG_CHARS]
+
+
+class QueryStats:
+    """Statements executed in one scope (a request, a check, a collector run)."""
+
+    def __init__(self, label: str, parent: Optional['QueryStats'] = None):
+        self.label = label
+        self.parent = parent
+        self.count = 0
+        self.rows_written = 0
+        self.db_seconds = 0.0
+        self.statements: Dict[str, int] = {}
+        self.slowest: List[Tuple[float, str]] = []
+        self.started = time.perf_counter()
+        self._token = None
+
+    def record(self, statement: str, seconds: float, rows_written: int = 0) -> None:
+        """Count one executed statement."""
+        self.count += 1
+        self.rows_written += rows_written
+        self.db_seconds += seconds
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+        if len(self.slowest) < SLOWEST_STATEMENTS:
+            heapq.heappush(self.slowest, (seconds, statement))
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (seconds, statement))
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return time.perf_counter() - self.started
+
+    def repeated_statements(self, threshold: int = SQL_REPEATED_STATEMENT_THRESHOLD) -> List[Tuple[str, int]]:
+        """
+        Statements run at least threshold times, most repeated first.
+
+        Returns:
+            list: (statement, times run) pairs
+        """
+        repeated = [(statement, count) for statement, count in self.statements.items() if count >= threshold]
+        return sorted(repeated, key=lambda item: item[1], reverse=True)
+
+    def server_timing(self) -> str:
+        """Server-Timing header value splitting the scope into db and app time."""
+        elapsed_ms = self.elapsed_seconds * 1000
+        db_ms = self.db_seconds * 1000
+        return (
+            f'db;dur={db_ms:.1f};desc="{self.count} queries", '
+            f'app;dur={max(elapsed_ms - db_ms, 0.0):.1f}'
+        )
+
+    def log_report(self) -> None:
+        """Log likely N+1 statements and, if the scope was slow, its slowest statements."""
+        for statement, count in self.repeated_statements():
+            logger.warning(f"Possible N+1 in {self.label}: statement ran {count} times: {_shorten(statement)}")
+
+        elapsed_ms = self.elapsed_seconds * 1000
+        if elapsed_ms >= SQL_SLOW_REQUEST_MS:
+            slowest = '; '.join(
+                f"{seconds * 1000:.0f} ms: {_shorten(statement)}"
+                for seconds, statement in sorted(self.slowest, reverse=True)
+            )
+            logger.warning(
+                f"Slow {self.label}: {elapsed_ms:.0f} ms, {self.count} queries, "
+                f"{self.db_seconds * 1000:.0f} ms in database. Slowest: {slowest or 'none'}"
+            )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info['query_started'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = conn.info.pop('query_started', None)
+    if stats is None or started is None:
+        return
+    seconds = time.perf_counter() - started
+    rows_written = 0
+    if statement.lstrip()[:6].upper() in WRITE_STATEMENTS:
+        rows_written = max(cursor.rowcount, 0)
+    while stats is not None:
+        stats.record(statement, seconds, rows_written)
+        stats = stats.parent
+
+
+def install() -> None:
+    """Hook cursor execution on every engine (idempotent)."""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _installed = True
+
+
+def start_tracking(label: str, force: bool = False) -> Optional[QueryStats]:
+    """
+    Start counting the statements run by the current thread/context.
+
+    Args:
+        label: Names the scope in log messages (e.g. "GET /api/status")
+        force: Track even when SQL_PROFILING_ENABLED is off
+
+    Returns:
+        QueryStats: Pass to stop_tracking(); None when profiling is disabled
+    """
+    if not (SQL_PROFILING_ENABLED or force):
+        return None
+    install()
+    stats = QueryStats(label, parent=_current.get())
+    stats._token = _current.set(stats)
+    return stats
+
+
+def stop_tracking(stats: Optional[QueryStats]) -> None:
+    """Stop counting statements for a scope started with start_tracking()."""
+    if stats is not None and stats._token is not None:
+        _current.reset(stats._token)
+        stats._token = None
+
+
+@contextmanager
+def track_queries(label: str) -> Generator[Optional[QueryStats], None, None]:
+    """
+    Track the statements run inside the block and log the report on exit.
+
+    Args:
+        label: Names the scope in log messages
+
+    Yields:
+        QueryStats: Statistics so far; None when profiling is disabled
+    """
+    stats = start_tracking(label)
+    try:
+        yield stats
+    finally:
+        stop_tracking(stats)
+        if stats is not None:
+            stats.log_report()
@@ -0,0 +1,156 @@
+"""Immutable on-disk archive of past-date variance reports.
+
+Reports for dates before today are rebuilt from exceptions and
+device_snapshot on every request, yet only change when a backfill re-runs
+the checks for that date. Finished reports are stored once as gzip-compressed
+JSON under REPORT_ARCHIVE_DIR/<date>/ and keyed by the date's data version
+(the latest exception change covering that date and the date's device
+snapshots), so a stale artifact is never served. Backfills call
+invalidate_reports() to remove the affected dates outright.
+"""
+
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+
+ARCHIVE_DIR = os.getenv('REPORT_ARCHIVE_DIR', '/opt/es-inventory-hub/cache/reports')
+
+# Bump when the report payload format changes to ignore existing artifacts
+REPORT_FORMAT = 1
+
+
+def report_fingerprint(session: Session, report_date: date) -> str:
+    """
+    Data version of one date's report: the latest exception change covering
+    that date and the date's device snapshots.
+
+    Every exception writer logs the dates it changed in exception_changes
+    (common/exception_changes.py), so details refreshed by the checks,
+    interval changes and manual updates all produce a new version through
+    the span index without reading the exception rows; re-collected
+    snapshots change the snapshot count or time.
+
+    Args:
+        session: Database session
+        report_date: Report date
+
+    Returns:
+        str: Short hash of the exception change id and the snapshot state
+    """
+    row = session.execute(text("""
+        SELECT
+            (SELECT MAX(id) FROM exception_changes
+             WHERE daterange(start_date, end_date, '[]') @> CAST(:report_date AS date)) AS exceptions_version,
+            s.snapshot_rows,
+            s.last_collected
+        FROM (
+            SELECT COUNT(*) AS snapshot_rows, MAX(created_at) AS last_collected
+            FROM device_snapshot
+            WHERE snapshot_date = :report_date
+        ) s
+    """), {'report_date': report_date}).fetchone()
+
+    return hashlib.sha1(repr((REPORT_FORMAT,) + tuple(row)).encode('utf-8')).hexdigest()[:12]
+
+
+def _report_path(kind: str, report_date: date, variant: str, fingerprint: str) -> str:
+    """Artifact path for one report variant."""
+    return os.path.join(ARCHIVE_DIR, report_date.isoformat(), f"{kind}-{variant}-{fingerprint}.json.gz")
+
+
+def load_report(kind: str, report_date: date, variant: str, fingerprint: str) -> Optional[bytes]:
+    """
+    Read an archived report.
+
+    Args:
+        kind: Report name (e.g. 'historical', 'variance-report')
+        report_date: Report date
+        variant: Request variant (query arguments digest)
+        fingerprint: Data version from report_fingerprint()
+
+    Returns:
+        bytes: gzip-compressed JSON, or None if not archived
+    """
+    try:
+        with open(_report_path(kind, report_date, variant, fingerprint), 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def store_report(kind: str, report_date: date, variant: str, fingerprint: str, body: bytes) -> str:
+    """
+    Archive a finished report, replacing older versions of the same variant.
+
+    The file is written to a temporary name and renamed so readers never
+    see a partial artifact.
+
+    Args:
+        kind: Report name
+        report_date: Report date
+        variant: Request variant (query arguments digest)
+        fingerprint: Data version from report_fingerprint()
+        body: Uncompressed JSON body
+
+    Returns:
+        str: Path of the archived artifact
+    """
+    path = _report_path(kind, report_date, variant, fingerprint)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(gzip.compress(body, compresslevel=6))
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    prefix = f"{kind}-{variant}-"
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and os.path.join(directory, name) != path:
+            try:
+                os.unlink(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+    return path
+
+
+def invalidate_reports(start_date: date, end_date: Optional[date] = None) -> int:
+    """
+    Delete archived reports for a date range (call when a backfill re-runs it).
+
+    Args:
+        start_date: First date to invalidate
+        end_date: Last date to invalidate (default: no upper bound)
+
+    Returns:
+        int: Number of dates removed
+    """
+    if not os.path.isdir(ARCHIVE_DIR):
+        return 0
+
+    removed = 0
+    for name in os.listdir(ARCHIVE_DIR):
+        try:
+            archived_date = date.fromisoformat(name)
+        except ValueError:
+            continue
+        if archived_date < start_date or (end_date and archived_date > end_date):
+            continue
+        shutil.rmtree(os.path.join(ARCHIVE_DIR, name), ignore_errors=True)
+        removed += 1
+
+    return removed
@@ -0,0 +1,163 @@
+"""Device count rollups maintained at snapshot ingest.
+
+daily_counts holds device counts per snapshot date, vendor, site, device
+type, billing status and organization; month_end_counts holds the same
+counts for each vendor's latest snapshot in every month. Collectors refresh
+both in the transaction that writes the snapshot, so status and QBR counts
+read a few hundred grouped rows instead of aggregating device_snapshot.
+
+variance_date_summary holds one row per date both vendors have data for,
+with device and exception counts; it is refreshed with the snapshot rollups
+and whenever exceptions change.
+"""
+
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+
+def refresh_count_rollups(session: Session, vendor_id: int, snapshot_date: date) -> int:
+    """
+    Rebuild a vendor's daily_counts for one snapshot date and, if it is the
+    vendor's latest snapshot in that month, its month_end_counts. The date's
+    variance_date_summary row is rebuilt as well.
+
+    Args:
+        session: Database session (caller commits with the snapshot)
+        vendor_id: ID of the vendor
+        snapshot_date: Date of the snapshot just written
+
+    Returns:
+        int: Number of daily_counts groups written
+    """
+    params = {'vendor_id': vendor_id, 'snapshot_date': snapshot_date}
+
+    session.execute(text("""
+        DELETE FROM daily_counts
+        WHERE vendor_id = :vendor_id AND snapshot_date = :snapshot_date
+    """), params)
+
+    result = session.execute(text("""
+        INSERT INTO daily_counts (
+            snapshot_date, vendor_id, site_id, device_type_id, billing_status_id,
+            organization_name, cnt
+        )
+        SELECT
+            snapshot_date, vendor_id, site_id, device_type_id, billing_status_id,
+            organization_name, COUNT(*)
+        FROM device_snapshot
+        WHERE vendor_id = :vendor_id AND snapshot_date = :snapshot_date
+        GROUP BY snapshot_date, vendor_id, site_id, device_type_id, billing_status_id, organization_name
+    """), params)
+
+    # Month-end counts follow the latest snapshot of the month; backfilling an
+    # earlier day of the month leaves them alone
+    later_in_month = session.execute(text("""
+        SELECT 1
+        FROM daily_counts
+        WHERE vendor_id = :vendor_id
+          AND snapshot_date > :snapshot_date
+          AND snapshot_date < date_trunc('month', CAST(:snapshot_date AS date)) + INTERVAL '1 month'
+        LIMIT 1
+    """), params).first()
+
+    if not later_in_month:
+        session.execute(text("""
+            DELETE FROM month_end_counts
+            WHERE vendor_id = :vendor_id
+              AND month_end_date >= date_trunc('month', CAST(:snapshot_date AS date))
+              AND month_end_date < date_trunc('month', CAST(:snapshot_date AS date)) + INTERVAL '1 month'
+        """), params)
+
+        session.execute(text("""
+            INSERT INTO month_end_counts (
+                month_end_date, vendor_id, site_id, device_type_id, billing_status_id,
+                organization_name, cnt
+            )
+            SELECT
+                snapshot_date, vendor_id, site_id, device_type_id, billing_status_id,
+                organization_name, cnt
+            FROM daily_counts
+            WHERE vendor_id = :vendor_id AND snapshot_date = :snapshot_date
+        """), params)
+
+    refresh_variance_date_summary(session, snapshot_date, snapshot_date)
+
+    return result.rowcount
+
+
+# Days of history shown by /api/variances/available-dates
+SUMMARY_WINDOW_DAYS = 30
+
+# Advisory lock serializing variance_date_summary rebuilds
+SUMMARY_LOCK_KEY = 7301
+
+
+def refresh_variance_date_summary(session: Session, start_date: Optional[date] = None,
+                                  end_date: Optional[date] = None) -> int:
+    """
+    Rebuild variance_date_summary rows for a date range.
+
+    Each row holds the Ninja and ThreatLocker device counts of a date both
+    vendors have data for, and the device exceptions open on that date
+    (seat reconciliation findings are not device variances). Resolving
+    an exception changes the counts of every date it spans, so exception
+    writes refresh the whole window.
+
+    Args:
+        session: Database session (caller commits)
+        start_date: First date to rebuild (default: SUMMARY_WINDOW_DAYS ago)
+        end_date: Last date to rebuild (default: today)
+
+    Returns:
+        int: Number of summary rows written
+    """
+    from collectors.checks.cross_vendor import DEVICE_EXCEPTION_TYPES
+
+    params = {
+        'start_date': start_date or date.today() - timedelta(days=SUMMARY_WINDOW_DAYS),
+        'end_date': end_date or date.today(),
+        'device_types': list(DEVICE_EXCEPTION_TYPES)
+    }
+
+    # Collectors can run concurrently; two transactions rebuilding the same
+    # dates would both insert them after the delete
+    session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': SUMMARY_LOCK_KEY})
+
+    session.execute(text("""
+        DELETE FROM variance_date_summary
+        WHERE snapshot_date BETWEEN :start_date AND :end_date
+    """), params)
+
+    result = session.execute(text("""
+        INSERT INTO variance_date_summary (
+            snapshot_date, ninja_devices, threatlocker_devices,
+            total_exceptions, unresolved_exceptions, updated_at
+        )
+        SELECT
+            d.snapshot_date,
+            d.ninja_devices,
+            d.threatlocker_devices,
+            COUNT(e.id),
+            COUNT(e.id) FILTER (WHERE e.resolved = FALSE),
+            CURRENT_TIMESTAMP
+        FROM (
+            SELECT
+                dc.snapshot_date,
+                SUM(CASE WHEN v.name = 'Ninja' THEN dc.cnt ELSE 0 END) AS ninja_devices,
+                SUM(CASE WHEN v.name = 'ThreatLocker' THEN dc.cnt ELSE 0 END) AS threatlocker_devices
+            FROM daily_counts dc
+            JOIN vendor v ON dc.vendor_id = v.id
+            WHERE dc.snapshot_date BETWEEN :start_date AND :end_date
+            GROUP BY dc.snapshot_date
+            HAVING COUNT(DISTINCT dc.vendor_id) = 2
+        ) d
+        LEFT JOIN exceptions e
+            ON e.first_seen <= d.snapshot_date AND e.last_seen >= d.snapshot_date
+            AND e.type = ANY(:device_types)
+        GROUP BY d.snapshot_date, d.ninja_devices, d.threatlocker_devices
+    """), params)
+
+    return result.rowcount
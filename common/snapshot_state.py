@@ -0,0 +1,62 @@
+"""Latest complete device snapshot per vendor.
+
+vendor_snapshot_state holds one row per vendor with the date and row count
+of its latest complete device_snapshot. Collectors record it in the
+transaction that writes the snapshot, so a partially written day is never
+"latest", and readers join on it instead of computing
+MAX(snapshot_date) over device_snapshot.
+"""
+
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+
+def record_snapshot_state(session: Session, vendor_id: int, snapshot_date: date) -> bool:
+    """
+    Record a vendor's snapshot as complete.
+
+    Snapshots older than the recorded one (backfills) leave the state alone.
+
+    Args:
+        session: Database session (caller commits with the snapshot)
+        vendor_id: ID of the vendor
+        snapshot_date: Date of the snapshot just written
+
+    Returns:
+        bool: True if the state now points at snapshot_date
+    """
+    result = session.execute(text("""
+        INSERT INTO vendor_snapshot_state (vendor_id, snapshot_date, row_count, updated_at)
+        SELECT :vendor_id, :snapshot_date, COUNT(*), CURRENT_TIMESTAMP
+        FROM device_snapshot
+        WHERE vendor_id = :vendor_id AND snapshot_date = :snapshot_date
+        ON CONFLICT (vendor_id) DO UPDATE SET
+            snapshot_date = EXCLUDED.snapshot_date,
+            row_count = EXCLUDED.row_count,
+            updated_at = EXCLUDED.updated_at
+        WHERE vendor_snapshot_state.snapshot_date <= EXCLUDED.snapshot_date
+    """), {'vendor_id': vendor_id, 'snapshot_date': snapshot_date})
+
+    return result.rowcount > 0
+
+
+def latest_snapshot_date(session: Session, vendor_name: str) -> Optional[date]:
+    """
+    Get a vendor's latest complete snapshot date.
+
+    Args:
+        session: Database session
+        vendor_name: Vendor name (e.g. 'Ninja')
+
+    Returns:
+        date: Latest complete snapshot date, or None if none recorded
+    """
+    return session.execute(text("""
+        SELECT s.snapshot_date
+        FROM vendor_snapshot_state s
+        JOIN vendor v ON s.vendor_id = v.id
+        WHERE v.name = :vendor_name
+    """), {'vendor_name': vendor_name}).scalar()
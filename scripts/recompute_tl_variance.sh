@@ -12,16 +12,14 @@ WHERE snapshot_date = CURRENT_DATE AND vendor_id = 4;"
 # 2) Recollect TL (full)
 python -m collectors.threatlocker.main
 
-# 3) Clear today's exceptions and rebuild via checks
-psql -U postgres -h localhost -d es_inventory_hub -c "
-DELETE FROM exceptions WHERE date_found = CURRENT_DATE;"
+# 3) Re-run checks (exceptions are updated in place, closed when no longer found)
 python -m collectors.threatlocker.main --limit 1
 
 # 4) Show summary + current missing list (15-char, case-insensitive, domain-stripped)
 echo -e "\n== Exception counts (today) =="
 psql -U postgres -h localhost -d es_inventory_hub -c "
 SELECT type, COUNT(*) FROM exceptions
-WHERE date_found=CURRENT_DATE GROUP BY type ORDER BY type;"
+WHERE first_seen<=CURRENT_DATE AND last_seen>=CURRENT_DATE GROUP BY type ORDER BY type;"
 
 echo -e "\n== ThreatLocker in TL but not in Ninja (today) =="
 psql -U postgres -h localhost -d es_inventory_hub -c "
@@ -0,0 +1,39 @@
+#!/bin/bash
+set -euo pipefail
+
+# Ensure log directory exists
+mkdir -p /var/log/es-inventory-hub
+
+# Log file path
+LOG_FILE="/var/log/es-inventory-hub/nightly_pipeline.log"
+
+# Function to log with timestamp
+log_message() {
+    echo "$(date '+%Y-%m-%d %H:%M:%S') - $1" | tee -a "$LOG_FILE"
+}
+
+# Log start
+log_message "Starting nightly collection pipeline"
+
+# Load environment variables
+set -a
+set +u  # Temporarily disable unset variable check (bcrypt hashes contain $2b)
+. /opt/shared-secrets/api-secrets.env
+set -u  # Re-enable
+. /opt/es-inventory-hub/.env
+set +a
+
+# Activate virtual environment
+source /opt/es-inventory-hub/.venv/bin/activate
+
+cd /opt/es-inventory-hub
+
+# Run every nightly job as one dependency graph
+if python3 -m collectors.pipeline 2>&1 | tee -a "$LOG_FILE"; then
+    log_message "Nightly pipeline finished OK"
+    exit 0
+else
+    EXIT_CODE=${PIPESTATUS[0]}
+    log_message "Nightly pipeline FAILED with exit code $EXIT_CODE"
+    exit $EXIT_CODE
+fi
@@ -48,6 +48,7 @@ session = Session()
 
 try:
     results = run_cross_vendor_checks(session, date.today())
+    session.commit()
     total_variances = sum([
         results.get('MISSING_NINJA', 0),
         results.get('DUPLICATE_TL', 0), 
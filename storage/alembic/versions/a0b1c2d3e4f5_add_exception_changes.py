@@ -0,0 +1,50 @@
+"""add_exception_changes
+
+Revision ID: a0b1c2d3e4f5
+Revises: f9a0b1c2d3e4
+Create Date: 2026-10-19
+
+Append-only log of the date spans whose open exceptions changed, written
+by every exception writer (common/exception_changes.py). MAX(id) is the
+exceptions part of the API cache's data version; the latest change
+covering a date versions that date's archived reports, found through a
+GiST index on the span.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'a0b1c2d3e4f5'
+down_revision: Union[str, None] = 'f9a0b1c2d3e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'exception_changes',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('start_date', sa.Date(), nullable=False),
+        sa.Column('end_date', sa.Date(), nullable=False),
+        sa.Column('changed_at', postgresql.TIMESTAMP(timezone=True), nullable=False,
+                  server_default=sa.text('CURRENT_TIMESTAMP'))
+    )
+    op.execute("""
+        CREATE INDEX idx_exception_changes_span
+        ON exception_changes USING gist (daterange(start_date, end_date, '[]'))
+    """)
+
+    # One change covering all existing history, so every date has a version
+    op.execute("""
+        INSERT INTO exception_changes (start_date, end_date)
+        SELECT MIN(first_seen), MAX(last_seen) FROM exceptions
+        HAVING COUNT(*) > 0
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_exception_changes_span', table_name='exception_changes')
+    op.drop_table('exception_changes')
@@ -0,0 +1,68 @@
+"""add_variance_date_summary
+
+Revision ID: a4b5c6d7e8f9
+Revises: f3a4b5c6d7e8
+Create Date: 2026-10-18
+
+Adds variance_date_summary: one row per date both vendors have data for,
+with the Ninja and ThreatLocker device counts and the exceptions open on
+that date. /api/variances/available-dates reads it instead of scanning
+device_snapshot and counting exceptions per date. Populated here from
+daily_counts for the last 30 days; kept current by common/rollups.py.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4b5c6d7e8f9'
+down_revision: Union[str, None] = 'f3a4b5c6d7e8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'variance_date_summary',
+        sa.Column('snapshot_date', sa.Date(), nullable=False),
+        sa.Column('ninja_devices', sa.Integer(), nullable=False),
+        sa.Column('threatlocker_devices', sa.Integer(), nullable=False),
+        sa.Column('total_exceptions', sa.Integer(), nullable=False),
+        sa.Column('unresolved_exceptions', sa.Integer(), nullable=False),
+        sa.Column('updated_at', postgresql.TIMESTAMP(timezone=True), nullable=False,
+                  server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('snapshot_date'),
+    )
+
+    op.execute("""
+        INSERT INTO variance_date_summary (
+            snapshot_date, ninja_devices, threatlocker_devices,
+            total_exceptions, unresolved_exceptions
+        )
+        SELECT
+            d.snapshot_date,
+            d.ninja_devices,
+            d.threatlocker_devices,
+            COUNT(e.id),
+            COUNT(e.id) FILTER (WHERE e.resolved = FALSE)
+        FROM (
+            SELECT
+                dc.snapshot_date,
+                SUM(CASE WHEN v.name = 'Ninja' THEN dc.cnt ELSE 0 END) AS ninja_devices,
+                SUM(CASE WHEN v.name = 'ThreatLocker' THEN dc.cnt ELSE 0 END) AS threatlocker_devices
+            FROM daily_counts dc
+            JOIN vendor v ON dc.vendor_id = v.id
+            WHERE dc.snapshot_date >= CURRENT_DATE - INTERVAL '30 days'
+            GROUP BY dc.snapshot_date
+            HAVING COUNT(DISTINCT dc.vendor_id) = 2
+        ) d
+        LEFT JOIN exceptions e
+            ON e.first_seen <= d.snapshot_date AND e.last_seen >= d.snapshot_date
+        GROUP BY d.snapshot_date, d.ninja_devices, d.threatlocker_devices
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('variance_date_summary')
@@ -0,0 +1,52 @@
+"""add_vendor_snapshot_state
+
+Revision ID: b5c6d7e8f9a0
+Revises: a4b5c6d7e8f9
+Create Date: 2026-10-18
+
+Adds vendor_snapshot_state: each vendor's latest complete device snapshot
+date and row count, recorded by collectors in the transaction that writes
+the snapshot (common/snapshot_state.py). Readers join on it instead of
+computing MAX(snapshot_date) over device_snapshot. Seeded here from each
+vendor's latest snapshot.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5c6d7e8f9a0'
+down_revision: Union[str, None] = 'a4b5c6d7e8f9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'vendor_snapshot_state',
+        sa.Column('vendor_id', sa.Integer(), nullable=False),
+        sa.Column('snapshot_date', sa.Date(), nullable=False),
+        sa.Column('row_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', postgresql.TIMESTAMP(timezone=True), nullable=False,
+                  server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.ForeignKeyConstraint(['vendor_id'], ['vendor.id']),
+        sa.PrimaryKeyConstraint('vendor_id'),
+    )
+
+    op.execute("""
+        INSERT INTO vendor_snapshot_state (vendor_id, snapshot_date, row_count)
+        SELECT ds.vendor_id, ds.snapshot_date, COUNT(*)
+        FROM device_snapshot ds
+        JOIN (
+            SELECT vendor_id, MAX(snapshot_date) AS snapshot_date
+            FROM device_snapshot
+            GROUP BY vendor_id
+        ) latest ON latest.vendor_id = ds.vendor_id AND latest.snapshot_date = ds.snapshot_date
+        GROUP BY ds.vendor_id, ds.snapshot_date
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('vendor_snapshot_state')
@@ -0,0 +1,53 @@
+"""add_job_queue_columns
+
+Revision ID: c6d7e8f9a0b1
+Revises: b5c6d7e8f9a0
+Create Date: 2026-10-18
+
+Turns job_runs into the queue served by the API's collector worker pool
+(api/job_queue.py). stage orders the jobs of a batch (collectors before the
+checks that read their data), claimed_by/heartbeat_at identify the worker
+running a job so jobs of a dead process can be requeued, and attempts caps
+how often that happens. Rows left queued by the old synchronous endpoint
+can never run and are cancelled here.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6d7e8f9a0b1'
+down_revision: Union[str, None] = 'b5c6d7e8f9a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('job_runs', sa.Column('stage', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('job_runs', sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('job_runs', sa.Column('claimed_by', sa.String(length=100), nullable=True))
+    op.add_column('job_runs', sa.Column('heartbeat_at', postgresql.TIMESTAMP(timezone=True), nullable=True))
+
+    op.create_index(
+        'idx_job_runs_queued', 'job_runs', ['batch_id', 'stage'],
+        postgresql_where=sa.text("status = 'queued'")
+    )
+
+    op.execute("""
+        UPDATE job_runs
+        SET status = 'cancelled',
+            message = 'Cancelled - queued before the job queue was introduced',
+            ended_at = NOW(),
+            updated_at = NOW()
+        WHERE status = 'queued'
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_job_runs_queued', table_name='job_runs')
+    op.drop_column('job_runs', 'heartbeat_at')
+    op.drop_column('job_runs', 'claimed_by')
+    op.drop_column('job_runs', 'attempts')
+    op.drop_column('job_runs', 'stage')
@@ -0,0 +1,93 @@
+"""exceptions_open_lifecycle
+
+Revision ID: c9d0e1f2a3b4
+Revises: b3c4d5e6f7g8
+Create Date: 2026-10-18
+
+Converts exceptions from one row per variance per day into one row per
+variance lifetime (first_seen .. last_seen, closed_date once it disappears).
+
+Existing daily copies are collapsed into islands of consecutive check runs
+per (type, hostname); the most recent copy of each island is kept so manual
+status fields and details survive.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9d0e1f2a3b4'
+down_revision: Union[str, None] = 'b3c4d5e6f7g8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('exceptions', sa.Column('first_seen', sa.Date(), nullable=True))
+    op.add_column('exceptions', sa.Column('last_seen', sa.Date(), nullable=True))
+    op.add_column('exceptions', sa.Column('closed_date', sa.Date(), nullable=True))
+
+    # Every distinct date_found is a day the checks ran
+    op.execute("""
+        CREATE TEMP TABLE exception_run_dates AS
+        SELECT date_found AS run_date,
+               ROW_NUMBER() OVER (ORDER BY date_found) AS run_idx
+        FROM (SELECT DISTINCT date_found FROM exceptions) d
+    """)
+
+    # Gaps-and-islands: consecutive run dates for the same variance form one row
+    op.execute("""
+        WITH ranked AS (
+            SELECT e.id, e.type, LOWER(e.hostname) AS host_key, e.date_found,
+                   rd.run_idx - DENSE_RANK() OVER (
+                       PARTITION BY e.type, LOWER(e.hostname) ORDER BY e.date_found
+                   ) AS island
+            FROM exceptions e
+            JOIN exception_run_dates rd ON rd.run_date = e.date_found
+        ),
+        islands AS (
+            SELECT MAX(id) AS keep_id,
+                   MIN(date_found) AS first_seen,
+                   MAX(date_found) AS last_seen
+            FROM ranked
+            GROUP BY type, host_key, island
+        )
+        UPDATE exceptions e
+        SET first_seen = i.first_seen,
+            last_seen = i.last_seen,
+            date_found = i.first_seen
+        FROM islands i
+        WHERE e.id = i.keep_id
+    """)
+    op.execute("DELETE FROM exceptions WHERE first_seen IS NULL")
+
+    # Close islands that ended before the latest run
+    op.execute("""
+        UPDATE exceptions e
+        SET closed_date = (
+            SELECT MIN(rd.run_date) FROM exception_run_dates rd
+            WHERE rd.run_date > e.last_seen
+        )
+    """)
+    op.execute("DROP TABLE exception_run_dates")
+
+    op.alter_column('exceptions', 'first_seen', nullable=False)
+    op.alter_column('exceptions', 'last_seen', nullable=False)
+
+    op.create_index('ix_exceptions_type_seen', 'exceptions', ['type', 'last_seen', 'first_seen'])
+    op.create_index(
+        'uq_exceptions_open_type_hostname',
+        'exceptions',
+        ['type', sa.text('lower(hostname)')],
+        unique=True,
+        postgresql_where=sa.text('closed_date IS NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_exceptions_open_type_hostname', table_name='exceptions')
+    op.drop_index('ix_exceptions_type_seen', table_name='exceptions')
+    op.drop_column('exceptions', 'closed_date')
+    op.drop_column('exceptions', 'last_seen')
+    op.drop_column('exceptions', 'first_seen')
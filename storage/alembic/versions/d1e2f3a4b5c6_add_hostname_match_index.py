@@ -0,0 +1,81 @@
+"""add_hostname_match_index
+
+Revision ID: d1e2f3a4b5c6
+Revises: c9d0e1f2a3b4
+Create Date: 2026-10-18
+
+Adds hostname_match_index: canonical hostname keys and their 15-character
+(NetBIOS) prefixes for each vendor's latest device snapshot, so truncated
+Ninja hostnames can be matched with index lookups instead of scanning
+device_snapshot. Populated here from the latest snapshots and refreshed by
+the Ninja and ThreatLocker collectors at ingest.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1e2f3a4b5c6'
+down_revision: Union[str, None] = 'c9d0e1f2a3b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.create_table(
+        'hostname_match_index',
+        sa.Column('vendor_id', sa.Integer(), sa.ForeignKey('vendor.id'), nullable=False),
+        sa.Column('device_identity_id', sa.Integer(), sa.ForeignKey('device_identity.id'), nullable=False),
+        sa.Column('snapshot_date', sa.Date(), nullable=False),
+        sa.Column('hostname', sa.String(255), nullable=False),
+        sa.Column('canonical_key', sa.String(255), nullable=False),
+        sa.Column('prefix_key', sa.String(15), nullable=False),
+        sa.Column('is_truncated', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('display_name', sa.String(255), nullable=True),
+        sa.Column('organization_name', sa.String(255), nullable=True),
+        sa.PrimaryKeyConstraint('vendor_id', 'device_identity_id'),
+    )
+    op.create_index(
+        'idx_hostname_match_canonical_key', 'hostname_match_index', ['canonical_key'],
+        postgresql_ops={'canonical_key': 'text_pattern_ops'},
+    )
+    op.create_index('idx_hostname_match_prefix_key', 'hostname_match_index', ['prefix_key'])
+    op.create_index(
+        'idx_hostname_match_canonical_trgm', 'hostname_match_index', ['canonical_key'],
+        postgresql_using='gin', postgresql_ops={'canonical_key': 'gin_trgm_ops'},
+    )
+
+    op.execute("""
+        INSERT INTO hostname_match_index (
+            vendor_id, device_identity_id, snapshot_date, hostname,
+            canonical_key, prefix_key, is_truncated, display_name, organization_name
+        )
+        SELECT
+            ds.vendor_id,
+            ds.device_identity_id,
+            ds.snapshot_date,
+            ds.hostname,
+            LOWER(BTRIM(SPLIT_PART(SPLIT_PART(ds.hostname, '|', 1), '.', 1))),
+            LEFT(LOWER(BTRIM(SPLIT_PART(SPLIT_PART(ds.hostname, '|', 1), '.', 1))), 15),
+            (v.name = 'Ninja' AND LENGTH(SPLIT_PART(ds.hostname, '.', 1)) = 15),
+            ds.display_name,
+            ds.organization_name
+        FROM device_snapshot ds
+        JOIN vendor v ON v.id = ds.vendor_id
+        JOIN (
+            SELECT vendor_id, MAX(snapshot_date) AS snapshot_date
+            FROM device_snapshot
+            GROUP BY vendor_id
+        ) latest ON latest.vendor_id = ds.vendor_id AND latest.snapshot_date = ds.snapshot_date
+        WHERE ds.hostname IS NOT NULL AND ds.hostname <> ''
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_hostname_match_canonical_trgm', table_name='hostname_match_index')
+    op.drop_index('idx_hostname_match_prefix_key', table_name='hostname_match_index')
+    op.drop_index('idx_hostname_match_canonical_key', table_name='hostname_match_index')
+    op.drop_table('hostname_match_index')
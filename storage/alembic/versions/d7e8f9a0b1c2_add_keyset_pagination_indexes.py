@@ -0,0 +1,50 @@
+"""add_keyset_pagination_indexes
+
+Revision ID: d7e8f9a0b1c2
+Revises: c6d7e8f9a0b1
+Create Date: 2026-10-18
+
+Indexes matching the sort order of the keyset-paginated list endpoints
+(api/pagination.py), so each page is read with an index range scan instead
+of sorting the whole filtered set:
+
+- /api/exceptions: last_seen DESC, type, hostname, id
+- /api/tenantsweep/audits: started_at DESC, id DESC (replaces the
+  started_at-only index)
+- /api/m365/users: per snapshot and organization, by display name
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7e8f9a0b1c2'
+down_revision: Union[str, None] = 'c6d7e8f9a0b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_exceptions_page', 'exceptions',
+        [sa.text('last_seen DESC'), 'type', 'hostname', 'id']
+    )
+
+    op.drop_index('idx_tenant_sweep_audits_started_at', table_name='tenant_sweep_audits')
+    op.create_index(
+        'idx_tenant_sweep_audits_started_at_id', 'tenant_sweep_audits',
+        [sa.text('started_at DESC'), sa.text('id DESC')]
+    )
+
+    op.create_index(
+        'idx_m365_user_snapshot_org_page', 'm365_user_snapshot',
+        ['snapshot_date', 'organization_name', sa.text("COALESCE(display_name, '')"), 'username', 'id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_m365_user_snapshot_org_page', table_name='m365_user_snapshot')
+    op.drop_index('idx_tenant_sweep_audits_started_at_id', table_name='tenant_sweep_audits')
+    op.create_index('idx_tenant_sweep_audits_started_at', 'tenant_sweep_audits', ['started_at'])
+    op.drop_index('ix_exceptions_page', table_name='exceptions')
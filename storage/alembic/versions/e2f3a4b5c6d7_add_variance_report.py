@@ -0,0 +1,38 @@
+"""add_variance_report
+
+Revision ID: e2f3a4b5c6d7
+Revises: d1e2f3a4b5c6
+Create Date: 2026-10-18
+
+Adds variance_report: the finished latest and filtered variance report
+payloads, written at the end of each cross-vendor run so the dashboard
+endpoints read one row by primary key. Rows are rebuilt on demand when
+missing, so the table starts empty.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2f3a4b5c6d7'
+down_revision: Union[str, None] = 'd1e2f3a4b5c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'variance_report',
+        sa.Column('report_kind', sa.String(32), nullable=False),
+        sa.Column('report_date', sa.Date(), nullable=False),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('generated_at', postgresql.TIMESTAMP(timezone=True), nullable=False,
+                  server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('report_kind'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('variance_report')
@@ -0,0 +1,47 @@
+"""add_job_run_stages
+
+Revision ID: e8f9a0b1c2d3
+Revises: d7e8f9a0b1c2
+Create Date: 2026-10-18
+
+Per-stage profile of each job run (common/job_profile.py): how long the
+run spent fetching, normalizing, writing and post-processing, the peak
+RSS and traced memory in each stage and its top allocation sites.
+Compared across runs with tools/job_profile_cli.py.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8f9a0b1c2d3'
+down_revision: Union[str, None] = 'd7e8f9a0b1c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'job_run_stages',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('job_id', sa.String(length=50),
+                  sa.ForeignKey('job_runs.job_id', ondelete='CASCADE'), nullable=False),
+        sa.Column('job_name', sa.String(length=50), nullable=False),
+        sa.Column('stage', sa.String(length=32), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('duration_seconds', sa.Numeric(12, 3), nullable=False),
+        sa.Column('peak_rss_mb', sa.Numeric(10, 1), nullable=True),
+        sa.Column('peak_traced_mb', sa.Numeric(10, 1), nullable=True),
+        sa.Column('top_allocations', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('recorded_at', postgresql.TIMESTAMP(timezone=True), nullable=False,
+                  server_default=sa.text('now()')),
+        sa.UniqueConstraint('job_id', 'stage', name='uq_job_run_stages_job_stage')
+    )
+    op.create_index('idx_job_run_stages_name_recorded', 'job_run_stages', ['job_name', 'recorded_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_job_run_stages_name_recorded', table_name='job_run_stages')
+    op.drop_table('job_run_stages')
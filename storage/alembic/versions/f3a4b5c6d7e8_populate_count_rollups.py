@@ -0,0 +1,84 @@
+"""populate_count_rollups
+
+Revision ID: f3a4b5c6d7e8
+Revises: e2f3a4b5c6d7
+Create Date: 2026-10-18
+
+daily_counts and month_end_counts were created with primary keys over
+nullable dimension columns and never written. This adds an
+organization_name dimension, replaces the primary keys with unique
+COALESCE indexes so devices without a site/type/billing status can be
+counted, and populates both rollups from device_snapshot. Collectors keep
+them current from here on (common/rollups.py).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a4b5c6d7e8'
+down_revision: Union[str, None] = 'e2f3a4b5c6d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ROLLUPS = (
+    ('daily_counts', 'snapshot_date'),
+    ('month_end_counts', 'month_end_date'),
+)
+
+
+def upgrade() -> None:
+    for table, date_column in ROLLUPS:
+        op.execute(f"DELETE FROM {table}")
+        op.drop_constraint(f'{table}_pkey', table, type_='primary')
+        for column in ('site_id', 'device_type_id', 'billing_status_id'):
+            op.alter_column(table, column, existing_type=sa.Integer(), nullable=True)
+        op.add_column(table, sa.Column('organization_name', sa.String(255), nullable=True))
+        op.execute(f"""
+            CREATE UNIQUE INDEX uq_{table}_dimensions ON {table} (
+                {date_column}, vendor_id,
+                COALESCE(site_id, 0), COALESCE(device_type_id, 0),
+                COALESCE(billing_status_id, 0), COALESCE(organization_name, '')
+            )
+        """)
+
+    op.execute("""
+        INSERT INTO daily_counts (
+            snapshot_date, vendor_id, site_id, device_type_id, billing_status_id,
+            organization_name, cnt
+        )
+        SELECT
+            snapshot_date, vendor_id, site_id, device_type_id, billing_status_id,
+            organization_name, COUNT(*)
+        FROM device_snapshot
+        GROUP BY snapshot_date, vendor_id, site_id, device_type_id, billing_status_id, organization_name
+    """)
+
+    op.execute("""
+        INSERT INTO month_end_counts (
+            month_end_date, vendor_id, site_id, device_type_id, billing_status_id,
+            organization_name, cnt
+        )
+        SELECT
+            dc.snapshot_date, dc.vendor_id, dc.site_id, dc.device_type_id, dc.billing_status_id,
+            dc.organization_name, dc.cnt
+        FROM daily_counts dc
+        JOIN (
+            SELECT vendor_id, MAX(snapshot_date) AS snapshot_date
+            FROM daily_counts
+            GROUP BY vendor_id, date_trunc('month', snapshot_date)
+        ) month_end ON month_end.vendor_id = dc.vendor_id AND month_end.snapshot_date = dc.snapshot_date
+    """)
+
+
+def downgrade() -> None:
+    for table, date_column in ROLLUPS:
+        op.execute(f"DELETE FROM {table}")
+        op.execute(f"DROP INDEX IF EXISTS uq_{table}_dimensions")
+        op.drop_column(table, 'organization_name')
+        op.create_primary_key(
+            f'{table}_pkey', table,
+            [date_column, 'vendor_id', 'site_id', 'device_type_id', 'billing_status_id']
+        )
@@ -0,0 +1,53 @@
+"""add_exception_check_dates
+
+Revision ID: f9a0b1c2d3e4
+Revises: e8f9a0b1c2d3
+Create Date: 2026-10-18
+
+Records the dates each exception type was checked, so a single past date
+can be re-checked and the rows around it closed, split or reopened in
+place (collectors/checks/exception_writer.py).
+
+Existing history is seeded from the exception rows' first_seen, last_seen
+and closed_date, plus every date in variance_date_summary (dates both
+vendors have snapshots for) inside each type's range.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f9a0b1c2d3e4'
+down_revision: Union[str, None] = 'e8f9a0b1c2d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'exception_check_dates',
+        sa.Column('exception_type', sa.String(length=64), primary_key=True),
+        sa.Column('check_date', sa.Date(), primary_key=True)
+    )
+
+    op.execute("""
+        INSERT INTO exception_check_dates (exception_type, check_date)
+        SELECT type, first_seen FROM exceptions
+        UNION SELECT type, last_seen FROM exceptions
+        UNION SELECT type, closed_date FROM exceptions WHERE closed_date IS NOT NULL
+        UNION
+        SELECT r.type, s.snapshot_date
+        FROM (
+            SELECT type, MIN(first_seen) AS first_date,
+                   MAX(GREATEST(last_seen, COALESCE(closed_date, last_seen))) AS last_date
+            FROM exceptions
+            GROUP BY type
+        ) r
+        JOIN variance_date_summary s
+          ON s.snapshot_date BETWEEN r.first_date AND r.last_date
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('exception_check_dates')
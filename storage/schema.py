@@ -238,8 +238,40 @@ class DeviceSnapshot(Base):
     billing_status = relationship("BillingStatus", back_populates="device_snapshots")
 
 
+class HostnameMatchIndex(Base):
+    """Hostname match index - canonical keys of each vendor's latest snapshot, refreshed at ingest"""
+    __tablename__ = 'hostname_match_index'
+    
+    vendor_id = Column(Integer, ForeignKey('vendor.id'), nullable=False, primary_key=True)
+    device_identity_id = Column(Integer, ForeignKey('device_identity.id'), nullable=False, primary_key=True)
+    snapshot_date = Column(Date, nullable=False)
+    hostname = Column(String(255), nullable=False)
+    canonical_key = Column(String(255), nullable=False)  # LOWER(BTRIM(SPLIT_PART(SPLIT_PART(hostname,'|',1),'.',1)))
+    prefix_key = Column(String(15), nullable=False)  # LEFT(canonical_key, 15) - NetBIOS length
+    is_truncated = Column(Boolean, nullable=False, default=False)
+    display_name = Column(String(255), nullable=True)
+    organization_name = Column(String(255), nullable=True)
+    
+    __table_args__ = (
+        Index('idx_hostname_match_canonical_key', 'canonical_key', postgresql_ops={'canonical_key': 'text_pattern_ops'}),
+        Index('idx_hostname_match_prefix_key', 'prefix_key'),
+        Index('idx_hostname_match_canonical_trgm', 'canonical_key',
+              postgresql_using='gin', postgresql_ops={'canonical_key': 'gin_trgm_ops'}),
+    )
+
+
+class VendorSnapshotState(Base):
+    """Vendor snapshot state - each vendor's latest complete device snapshot, recorded when a collector commits a day"""
+    __tablename__ = 'vendor_snapshot_state'
+    
+    vendor_id = Column(Integer, ForeignKey('vendor.id'), primary_key=True)
+    snapshot_date = Column(Date, nullable=False)
+    row_count = Column(Integer, nullable=False)  # device_snapshot rows for snapshot_date
+    updated_at = Column(TIMESTAMP(timezone=True), nullable=False, default=datetime.utcnow)
+
+
 class DailyCounts(Base):
-    """Daily counts table - represents daily device counts by various dimensions"""
+    """Daily counts table - device counts per snapshot by various dimensions, refreshed at ingest"""
     __tablename__ = 'daily_counts'
     
     snapshot_date = Column(Date, nullable=False, primary_key=True)
@@ -247,9 +279,16 @@ class DailyCounts(Base):
     site_id = Column(Integer, ForeignKey('site.id'), nullable=True, primary_key=True)
     device_type_id = Column(Integer, ForeignKey('device_type.id'), nullable=True, primary_key=True)
     billing_status_id = Column(Integer, ForeignKey('billing_status.id'), nullable=True, primary_key=True)
+    organization_name = Column(String(255), nullable=True, primary_key=True)
     cnt = Column(Integer, nullable=False, default=0)
     
+    # The dimension columns are nullable, so uniqueness is a COALESCE index
+    # rather than a database primary key (the ORM key above is mapping-only)
     __table_args__ = (
+        Index('uq_daily_counts_dimensions', 'snapshot_date', 'vendor_id',
+              text('COALESCE(site_id, 0)'), text('COALESCE(device_type_id, 0)'),
+              text('COALESCE(billing_status_id, 0)'), text("COALESCE(organization_name, '')"),
+              unique=True),
         Index('idx_daily_counts_date', 'snapshot_date'),
         Index('idx_daily_counts_vendor_id', 'vendor_id'),
         Index('idx_daily_counts_site_id', 'site_id'),
@@ -265,7 +304,7 @@ class DailyCounts(Base):
 
 
 class MonthEndCounts(Base):
-    """Month end counts table - represents month-end device counts by various dimensions"""
+    """Month end counts table - counts of each vendor's latest snapshot in a month (month_end_date is that snapshot's date)"""
     __tablename__ = 'month_end_counts'
     
     month_end_date = Column(Date, nullable=False, primary_key=True)
@@ -273,9 +312,16 @@ class MonthEndCounts(Base):
     site_id = Column(Integer, ForeignKey('site.id'), nullable=True, primary_key=True)
     device_type_id = Column(Integer, ForeignKey('device_type.id'), nullable=True, primary_key=True)
     billing_status_id = Column(Integer, ForeignKey('billing_status.id'), nullable=True, primary_key=True)
+    organization_name = Column(String(255), nullable=True, primary_key=True)
     cnt = Column(Integer, nullable=False, default=0)
     
+    # The dimension columns are nullable, so uniqueness is a COALESCE index
+    # rather than a database primary key (the ORM key above is mapping-only)
     __table_args__ = (
+        Index('uq_month_end_counts_dimensions', 'month_end_date', 'vendor_id',
+              text('COALESCE(site_id, 0)'), text('COALESCE(device_type_id, 0)'),
+              text('COALESCE(billing_status_id, 0)'), text("COALESCE(organization_name, '')"),
+              unique=True),
         Index('idx_month_end_counts_date', 'month_end_date'),
         Index('idx_month_end_counts_vendor_id', 'vendor_id'),
         Index('idx_month_end_counts_site_id', 'site_id'),
@@ -350,6 +396,13 @@ class JobRuns(Base):
     error = Column(Text, nullable=True)
     duration_seconds = Column(Integer, nullable=True)
     
+    # Job queue (api/job_queue.py): a batch runs its jobs in stage order;
+    # claimed_by/heartbeat_at identify the worker running a job
+    stage = Column(Integer, nullable=False, default=0, server_default='0')
+    attempts = Column(Integer, nullable=False, default=0, server_default='0')
+    claimed_by = Column(String(100), nullable=True)
+    heartbeat_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    
     # Foreign key relationship
     batch = relationship("JobBatches", backref="job_runs")
     
@@ -358,6 +411,29 @@ class JobRuns(Base):
         Index('idx_job_runs_job_name', 'job_name'),
         Index('idx_job_runs_started_at', 'started_at'),
         Index('idx_job_runs_status', 'status'),
+        Index('idx_job_runs_queued', 'batch_id', 'stage',
+              postgresql_where=text("status = 'queued'")),
+    )
+
+
+class JobRunStages(Base):
+    """Per-stage timing and memory profile of a job run (common/job_profile.py)"""
+    __tablename__ = 'job_run_stages'
+    
+    id = Column(BigInteger, primary_key=True)
+    job_id = Column(String(50), ForeignKey('job_runs.job_id', ondelete='CASCADE'), nullable=False)
+    job_name = Column(String(50), nullable=False)
+    stage = Column(String(32), nullable=False)
+    position = Column(Integer, nullable=False)
+    duration_seconds = Column(Numeric(12, 3), nullable=False)
+    peak_rss_mb = Column(Numeric(10, 1), nullable=True)
+    peak_traced_mb = Column(Numeric(10, 1), nullable=True)
+    top_allocations = Column(JSONB, nullable=True)  # [{location, size_mb, count}]
+    recorded_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+    
+    __table_args__ = (
+        UniqueConstraint('job_id', 'stage', name='uq_job_run_stages_job_stage'),
+        Index('idx_job_run_stages_name_recorded', 'job_name', 'recorded_at'),
     )
 
 
@@ -366,19 +442,70 @@ class Exceptions(Base):
     __tablename__ = 'exceptions'
     
     id = Column(BigInteger, primary_key=True)
-    date_found = Column(Date, nullable=False, default=datetime.utcnow().date())
+    date_found = Column(Date, nullable=False, default=datetime.utcnow().date())  # Same as first_seen
     type = Column(String(64), nullable=False)  # e.g. MISSING_NINJA, DUPLICATE_TL, SITE_MISMATCH, SPARE_MISMATCH
     hostname = Column(String(255), nullable=False)
     details = Column(JSONB, nullable=False, default={})
     resolved = Column(Boolean, nullable=False, default=False)
     
+    # Lifecycle: one row per variance, updated in place while it persists.
+    # The row is open on every date D with first_seen <= D <= last_seen.
+    first_seen = Column(Date, nullable=False)
+    last_seen = Column(Date, nullable=False)
+    closed_date = Column(Date, nullable=True)  # First check date the variance was no longer found
+    
     __table_args__ = (
         Index('ix_exceptions_type_date', 'type', 'date_found'),
         Index('ix_exceptions_hostname', 'hostname'),
         Index('ix_exceptions_resolved', 'resolved'),
+        Index('ix_exceptions_type_seen', 'type', 'last_seen', 'first_seen'),
+        Index('uq_exceptions_open_type_hostname', 'type', text('lower(hostname)'),
+              unique=True, postgresql_where=text('closed_date IS NULL')),
+        # Keyset order of /api/exceptions
+        Index('ix_exceptions_page', text('last_seen DESC'), 'type', 'hostname', 'id'),
     )
 
 
+class ExceptionCheckDates(Base):
+    """Exception check dates - every date each exception type was checked (collectors/checks/exception_writer.py)"""
+    __tablename__ = 'exception_check_dates'
+    
+    exception_type = Column(String(64), primary_key=True)
+    check_date = Column(Date, primary_key=True)
+
+
+class ExceptionChanges(Base):
+    """Exception changes - date spans whose open exceptions changed, logged by every exception writer (common/exception_changes.py)"""
+    __tablename__ = 'exception_changes'
+    
+    id = Column(BigInteger, primary_key=True)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    changed_at = Column(TIMESTAMP(timezone=True), nullable=False, default=datetime.utcnow)
+
+
+class VarianceReport(Base):
+    """Variance report artifacts - finished dashboard report payloads written at the end of cross-vendor runs"""
+    __tablename__ = 'variance_report'
+    
+    report_kind = Column(String(32), primary_key=True)  # latest, latest_with_resolved, filtered
+    report_date = Column(Date, nullable=False)  # Latest date both vendors had data when generated
+    payload = Column(JSONB, nullable=False)
+    generated_at = Column(TIMESTAMP(timezone=True), nullable=False, default=datetime.utcnow)
+
+
+class VarianceDateSummary(Base):
+    """Variance date summary - device and open exception counts per date both vendors have data for"""
+    __tablename__ = 'variance_date_summary'
+    
+    snapshot_date = Column(Date, primary_key=True)
+    ninja_devices = Column(Integer, nullable=False)
+    threatlocker_devices = Column(Integer, nullable=False)
+    total_exceptions = Column(Integer, nullable=False)
+    unresolved_exceptions = Column(Integer, nullable=False)
+    updated_at = Column(TIMESTAMP(timezone=True), nullable=False, default=datetime.utcnow)
+
+
 # QBR (Quarterly Business Review) Tables
 
 class Organization(Base):
@@ -733,6 +860,9 @@ class M365UserSnapshot(Base):
         Index('idx_m365_user_snapshot_tenant_id', 'tenant_id'),
         Index('idx_m365_user_snapshot_org_name', 'organization_name'),
         Index('idx_m365_user_snapshot_username', 'username'),
+        # Keyset order of /api/m365/users
+        Index('idx_m365_user_snapshot_org_page', 'snapshot_date', 'organization_name',
+              text("COALESCE(display_name, '')"), 'username', 'id'),
     )
 
 
@@ -808,7 +938,7 @@ class TenantSweepAudit(Base):
         Index('idx_tenant_sweep_audits_tenant_name', 'tenant_name'),
         Index('idx_tenant_sweep_audits_tenant_id', 'tenant_id'),
         Index('idx_tenant_sweep_audits_status', 'status'),
-        Index('idx_tenant_sweep_audits_started_at', 'started_at'),
+        Index('idx_tenant_sweep_audits_started_at_id', text('started_at DESC'), text('id DESC')),
         CheckConstraint("status IN ('running', 'completed', 'failed')", name='chk_tenant_sweep_audit_status'),
     )
 
@@ -0,0 +1,55 @@
+"""Shared fixtures: an in-memory SQLite database with the exception tables."""
+
+import os
+
+# common.db builds its engine at import; it never connects unless a test uses it
+os.environ.setdefault('DB_DSN', 'postgresql+psycopg2://test@localhost/es_inventory_test')
+
+import pytest
+from sqlalchemy import BigInteger, create_engine, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from storage.schema import ExceptionChanges, ExceptionCheckDates, Exceptions
+
+
+@compiles(JSONB, 'sqlite')
+def _jsonb_on_sqlite(type_, compiler, **kw):
+    return 'JSON'
+
+
+@compiles(BigInteger, 'sqlite')
+def _bigint_on_sqlite(type_, compiler, **kw):
+    # Only INTEGER PRIMARY KEY columns autoincrement in SQLite
+    return 'INTEGER'
+
+
+@pytest.fixture
+def session():
+    """Session on a fresh database holding exceptions, exception_check_dates and exception_changes."""
+    engine = create_engine('sqlite://')
+    Exceptions.__table__.create(engine)
+    ExceptionCheckDates.__table__.create(engine)
+    ExceptionChanges.__table__.create(engine)
+
+    with engine.begin() as connection:
+        # SQLite ignores postgresql_where; recreate the open-row index as partial
+        connection.execute(text("DROP INDEX uq_exceptions_open_type_hostname"))
+        connection.execute(text("""
+            CREATE UNIQUE INDEX uq_exceptions_open_type_hostname
+            ON exceptions (type, lower(hostname)) WHERE closed_date IS NULL
+        """))
+        # Manual status columns (migrations/add_variance_tracking.sql)
+        for column in ("variance_status VARCHAR(50) DEFAULT 'active'",
+                       "manually_updated_at TIMESTAMP",
+                       "manually_updated_by VARCHAR(255)",
+                       "resolved_by VARCHAR(255)"):
+            connection.execute(text(f"ALTER TABLE exceptions ADD COLUMN {column}"))
+
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
@@ -0,0 +1,288 @@
+"""Tests for the persistent exception lifecycle (collectors/checks/exception_writer.py)."""
+
+from datetime import date
+
+from sqlalchemy import select, text
+
+from collectors.checks.exception_writer import sync_exceptions, sync_findings
+from common.exception_changes import merge_spans
+from storage.schema import ExceptionChanges, Exceptions
+
+D1, D2, D3, D4 = date(2026, 1, 1), date(2026, 1, 2), date(2026, 1, 3), date(2026, 1, 4)
+
+
+def rows(session, hostname='host1'):
+    """(first_seen, last_seen, closed_date) of a hostname's rows, oldest first."""
+    return [
+        (row.first_seen, row.last_seen, row.closed_date)
+        for row in session.execute(
+            select(Exceptions).where(Exceptions.hostname == hostname).order_by(Exceptions.first_seen)
+        ).scalars()
+    ]
+
+
+def open_on(session, snapshot_date):
+    """Hostnames open on a date, the way the per-date views select them."""
+    return sorted(
+        row.hostname for row in session.execute(
+            select(Exceptions).where(
+                Exceptions.first_seen <= snapshot_date,
+                Exceptions.last_seen >= snapshot_date
+            )
+        ).scalars()
+    )
+
+
+def sync(session, snapshot_date, *hostnames):
+    return sync_exceptions(
+        session, 'MISSING_NINJA',
+        [(hostname, {'checked': snapshot_date.isoformat()}) for hostname in hostnames],
+        snapshot_date
+    )
+
+
+def test_new_finding_opens_a_row(session):
+    assert sync(session, D1, 'host1') == 1
+    assert rows(session) == [(D1, D1, None)]
+
+
+def test_finding_on_next_date_extends_the_row(session):
+    sync(session, D1, 'host1')
+    sync(session, D2, 'HOST1')
+
+    assert rows(session, 'HOST1') == [(D1, D2, None)]
+    details = session.execute(select(Exceptions.details)).scalar()
+    assert details == {'checked': D2.isoformat()}
+
+
+def test_missing_finding_closes_the_row(session):
+    sync(session, D1, 'host1')
+    sync(session, D2)
+
+    assert rows(session) == [(D1, D1, D2)]
+    assert open_on(session, D2) == []
+
+
+def test_reappearing_finding_opens_a_new_row(session):
+    sync(session, D1, 'host1')
+    sync(session, D2)
+    sync(session, D3, 'host1')
+
+    assert rows(session) == [(D1, D1, D2), (D3, D3, None)]
+
+
+def test_rerunning_a_date_is_idempotent(session):
+    sync(session, D1, 'host1')
+    sync(session, D2, 'host1')
+    sync(session, D2, 'host1')
+    assert rows(session) == [(D1, D2, None)]
+
+    sync(session, D2)
+    sync(session, D2)
+    assert rows(session) == [(D1, D1, D2)]
+
+    sync(session, D2, 'host1')
+    assert rows(session) == [(D1, D2, None)]
+
+
+def test_extending_to_a_new_date_clears_resolution(session):
+    sync(session, D1, 'host1')
+    session.execute(text("UPDATE exceptions SET resolved = 1"))
+    sync(session, D2, 'host1')
+
+    assert session.execute(select(Exceptions.resolved)).scalar() is False
+
+
+def test_rechecking_a_date_inside_a_closed_row_adds_nothing(session):
+    for snapshot_date in (D1, D2, D3):
+        sync(session, snapshot_date, 'host1')
+    sync(session, D4)
+
+    sync(session, D2, 'host1')
+
+    assert rows(session) == [(D1, D3, D4)]
+    assert open_on(session, D2) == ['host1']
+
+
+def test_rechecking_a_past_date_never_leaves_an_open_row(session):
+    sync(session, D1)
+    sync(session, D3)
+
+    # A variance found only on a past date is closed at the next check date
+    sync(session, D2, 'host1')
+    assert rows(session) == [(D2, D2, D3)]
+
+    sync(session, D1, 'host1')
+    assert rows(session) == [(D1, D2, D3)]
+
+
+def test_rechecking_a_past_date_splits_a_row(session):
+    for snapshot_date in (D1, D2, D3):
+        sync(session, snapshot_date, 'host1')
+    row_id = session.execute(select(Exceptions.id)).scalar()
+
+    sync(session, D2)
+
+    assert rows(session) == [(D1, D1, D2), (D3, D3, None)]
+    assert open_on(session, D2) == []
+    # The current part keeps the original row
+    assert session.execute(select(Exceptions.id).where(Exceptions.closed_date.is_(None))).scalar() == row_id
+
+
+def test_rechecking_a_gap_joins_two_rows(session):
+    sync(session, D1, 'host1')
+    sync(session, D2)
+    sync(session, D3, 'host1')
+
+    sync(session, D2, 'host1')
+
+    assert rows(session) == [(D1, D3, None)]
+
+
+def test_unchecked_dates_are_skipped_when_extending(session):
+    sync(session, D1, 'host1')
+    sync(session, D3, 'host1')
+    assert rows(session) == [(D1, D3, None)]
+
+    # Checking the unchecked date between them splits the row around it
+    sync(session, D2)
+    assert rows(session) == [(D1, D1, D2), (D3, D3, None)]
+
+
+def test_skipped_check_leaves_rows_untouched(session):
+    sync(session, D1, 'host1')
+
+    assert sync_findings(session, 'MISSING_NINJA', None, D2) == 0
+    assert rows(session) == [(D1, D1, None)]
+
+
+def test_types_are_independent(session):
+    sync(session, D1, 'host1')
+    sync_exceptions(session, 'DUPLICATE_TL', [('host1', {})], D2)
+
+    assert rows(session) == [(D1, D1, None), (D2, D2, None)]
+
+
+# Backfill (collectors/checks/main.py) re-checks a range by syncing each date in order
+
+def mark_manually_fixed(session, hostname='host1'):
+    session.execute(text("""
+        UPDATE exceptions
+        SET resolved = 1, resolved_by = 'tech', variance_status = 'manually_fixed',
+            manually_updated_by = 'tech', manually_updated_at = '2026-01-02 09:00:00'
+        WHERE hostname = :hostname AND closed_date IS NULL
+    """), {'hostname': hostname})
+
+
+def manual_fields(session, hostname='host1'):
+    return [
+        tuple(row) for row in session.execute(text("""
+            SELECT resolved, resolved_by, variance_status, manually_updated_by
+            FROM exceptions WHERE hostname = :hostname ORDER BY first_seen
+        """), {'hostname': hostname})
+    ]
+
+
+def test_replaying_a_range_keeps_manual_fields(session):
+    history = {D1: ['host1', 'host2'], D2: ['host1'], D3: ['host1'], D4: ['host1']}
+    for snapshot_date, hostnames in history.items():
+        sync(session, snapshot_date, *hostnames)
+    mark_manually_fixed(session)
+    before = (rows(session), rows(session, 'host2'), manual_fields(session))
+
+    for snapshot_date in (D2, D3):
+        sync(session, snapshot_date, *history[snapshot_date])
+
+    assert (rows(session), rows(session, 'host2'), manual_fields(session)) == before
+    assert manual_fields(session) == [(1, 'tech', 'manually_fixed', 'tech')]
+
+
+def test_replaying_a_range_with_changed_findings_keeps_later_dates(session):
+    for snapshot_date in (D1, D2, D3, D4):
+        sync(session, snapshot_date, 'host1')
+    mark_manually_fixed(session)
+
+    # A corrected check no longer finds host1 on D2 and finds host2 on D2..D3
+    sync(session, D2, 'host2')
+    sync(session, D3, 'host1', 'host2')
+
+    assert rows(session) == [(D1, D1, D2), (D3, D4, None)]
+    assert rows(session, 'host2') == [(D2, D3, D4)]
+    # The current row keeps its manual fields; the earlier part is a copy without them
+    assert manual_fields(session) == [(1, None, 'active', None), (1, 'tech', 'manually_fixed', 'tech')]
+    assert open_on(session, D4) == ['host1']
+
+
+def test_interrupted_replay_can_be_rerun(session):
+    for snapshot_date in (D1, D2, D3):
+        sync(session, snapshot_date, 'host1')
+    session.commit()
+
+    # The run fails while applying D2; its transaction is rolled back
+    sync(session, D1, 'host1')
+    session.commit()
+    sync(session, D2)
+    session.rollback()
+    assert rows(session) == [(D1, D3, None)]
+
+    sync(session, D2)
+    session.commit()
+    assert rows(session) == [(D1, D1, D2), (D3, D3, None)]
+
+
+# Changed date spans logged for the cache and report archive versions
+
+def changes(session):
+    spans = session.execute(
+        select(ExceptionChanges.start_date, ExceptionChanges.end_date).order_by(ExceptionChanges.id)
+    ).all()
+    session.execute(ExceptionChanges.__table__.delete())
+    return [tuple(span) for span in spans]
+
+
+def test_merge_spans():
+    assert merge_spans([(D3, D4), (D1, D1), (D2, D2)]) == [(D1, D4)]
+    assert merge_spans([(D1, D1), (D3, D3), (D1, D1)]) == [(D1, D1), (D3, D3)]
+
+
+def test_unchanged_rerun_logs_no_change(session):
+    sync(session, D1, 'host1')
+    assert changes(session) == [(D1, D1)]
+
+    sync(session, D1, 'host1')
+    assert changes(session) == []
+
+
+def test_extending_logs_only_the_new_dates(session):
+    sync_exceptions(session, 'MISSING_NINJA', [('host1', {'same': True})], D1)
+    changes(session)
+
+    sync_exceptions(session, 'MISSING_NINJA', [('host1', {'same': True})], D3)
+    assert changes(session) == [(D1, D3)]
+
+    sync_exceptions(session, 'MISSING_NINJA', [('host1', {'same': True})], D4)
+    assert changes(session) == [(D3, D4)]
+
+
+def test_changed_details_log_the_whole_row(session):
+    sync(session, D1, 'host1')
+    sync(session, D2, 'host1')
+    changes(session)
+
+    # sync() records the checked date in the details
+    sync(session, D3, 'host1')
+    assert changes(session) == [(D1, D3)]
+
+
+def test_closing_logs_nothing_and_splitting_logs_the_row(session):
+    for snapshot_date in (D1, D2, D3):
+        sync(session, snapshot_date, 'host1')
+    changes(session)
+
+    # The closed_date is not shown by any per-date view
+    sync(session, D4)
+    assert changes(session) == []
+
+    # Splitting changes every date the row covered
+    sync(session, D2)
+    assert changes(session) == [(D1, D3)]
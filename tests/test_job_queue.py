@@ -0,0 +1,204 @@
+"""Tests for job cancellation and timeouts in the API job queue (api/job_queue.py)."""
+
+import threading
+import time
+from collections import namedtuple
+from contextlib import nullcontext
+
+import pytest
+
+from api import job_queue
+from api.job_queue import JobQueueWorkerPool, cancel_batch
+from collectors.jobs import JobDefinition
+from common import job_logging
+from common.job_logging import JobCancelled, mark_stage
+
+Job = namedtuple('Job', 'job_id batch_id job_name stage')
+Batch = namedtuple('Batch', 'status')
+
+JOB = Job('fk_00000001', 'bc_00000001', 'fake-collector', 0)
+
+
+class Result:
+    """Canned rows for fetchone() and scalars().all()."""
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class ScriptedSession:
+    """Answers each statement with the result of the first marker found in its SQL."""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append((sql, params))
+        for marker, result in self.answers.items():
+            if marker in sql:
+                return result
+        return Result()
+
+    def batch_update(self):
+        return next(params for sql, params in self.statements if 'UPDATE job_batches' in sql)
+
+
+def batch_session(cancelled, running):
+    return ScriptedSession({
+        'FOR UPDATE': Result([Batch('running')]),
+        "SET status = 'cancelled'": Result(cancelled),
+        'SELECT job_id FROM job_runs': Result(running),
+    })
+
+
+def test_cancel_batch_cancels_queued_jobs_at_once():
+    session = batch_session(cancelled=['q1', 'q2'], running=[])
+
+    result = cancel_batch(session, JOB.batch_id)
+
+    assert result == {'batch_id': JOB.batch_id, 'status': 'cancelled',
+                      'cancelled_jobs': ['q1', 'q2'], 'running_jobs': []}
+    assert session.batch_update()['status'] == 'cancelled'
+
+
+def test_cancel_batch_waits_for_running_jobs_to_stop():
+    session = batch_session(cancelled=['q1'], running=['r1'])
+
+    result = cancel_batch(session, JOB.batch_id)
+
+    assert result['status'] == 'cancelling'
+    assert result['running_jobs'] == ['r1']
+    assert session.batch_update()['message'] == 'Cancelling - waiting for 1 running job(s) to stop'
+
+
+def test_cancel_batch_of_unknown_batch():
+    assert cancel_batch(ScriptedSession({}), 'bc_missing') is None
+
+
+def test_mark_stage_raises_once_the_run_is_asked_to_stop(monkeypatch):
+    monkeypatch.setattr(job_logging, 'save_stage_profile', lambda *args: None)
+
+    with pytest.raises(JobCancelled, match='Cancelled by request'):
+        with job_logging.track_job('fake-collector') as run:
+            mark_stage('fetch')
+            run.request_stop('Cancelled by request')
+            mark_stage('write')
+
+    # Outside a run there is nothing to stop
+    mark_stage('fetch')
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """A worker pool running fake-collector, recording job updates instead of writing them."""
+    monkeypatch.setattr(job_logging, 'save_stage_profile', lambda *args: None)
+    monkeypatch.setattr(job_queue, 'finish_batch', lambda session, batch_id: None)
+
+    pool = JobQueueWorkerPool(workers=1, timeout_seconds=60)
+    pool.updates = []
+    pool.replaced = 0
+
+    def update_job_progress(job_id, status, progress_percent=None, message=None, error=None):
+        pool.updates.append((job_id, status, message, error))
+
+    def replace_worker():
+        pool.replaced += 1
+
+    monkeypatch.setattr(job_queue, 'update_job_progress', update_job_progress)
+    monkeypatch.setattr(pool, '_session', lambda: nullcontext(None))
+    monkeypatch.setattr(pool, '_replace_worker', replace_worker)
+    return pool
+
+
+def start_job(pool, monkeypatch, run):
+    """Execute JOB with the given run function on a worker thread; returns (thread, outcome list)."""
+    monkeypatch.setattr(job_queue, 'JOBS', {
+        JOB.job_name: JobDefinition(JOB.job_name, 'fk', 0, 'Fake collector', run)
+    })
+    outcome = []
+    thread = threading.Thread(target=lambda: outcome.append(pool._execute(JOB)), daemon=True)
+    thread.start()
+    return thread, outcome
+
+
+def test_running_job_stops_at_its_next_stage_when_cancelled(pool, monkeypatch):
+    started = threading.Event()
+
+    def run():
+        started.set()
+        while True:
+            mark_stage('fetch')
+            time.sleep(0.01)
+
+    thread, outcome = start_job(pool, monkeypatch, run)
+    assert started.wait(5)
+
+    pool._stop_cancelled_jobs([JOB.job_id])
+    thread.join(5)
+
+    assert outcome == [True]
+    assert pool.updates[-1] == (JOB.job_id, 'cancelled', 'Cancelled by request', None)
+    assert pool._running == {}
+
+
+def test_stop_requested_before_the_run_started_is_honoured(pool, monkeypatch):
+    def run():
+        mark_stage('fetch')
+        return 'Fake collector completed'
+
+    # The job is registered before its run exists; the stop must carry over
+    monkeypatch.setattr(pool, '_earlier_stage_succeeded', lambda job: True)
+    original = job_queue.update_job_progress
+
+    def update_job_progress(job_id, status, *args, **kwargs):
+        if status == 'running':
+            pool._stop_cancelled_jobs([job_id])
+        original(job_id, status, *args, **kwargs)
+
+    monkeypatch.setattr(job_queue, 'update_job_progress', update_job_progress)
+    thread, outcome = start_job(pool, monkeypatch, run)
+    thread.join(5)
+
+    assert outcome == [True]
+    assert pool.updates[-1][1:3] == ('cancelled', 'Cancelled by request')
+
+
+def test_overdue_job_is_failed_and_its_worker_replaced(pool, monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+
+    def run():
+        started.set()
+        release.wait(5)
+        mark_stage('write')
+        return 'Fake collector completed'
+
+    pool.timeout_seconds = 0
+    thread, outcome = start_job(pool, monkeypatch, run)
+    assert started.wait(5)
+
+    assert pool._fail_overdue_jobs() == [JOB.job_id]
+    assert pool.updates[-1] == (JOB.job_id, 'failed', 'Fake collector timed out after 0s', 'timeout')
+    assert pool.replaced == 1
+    # Already failed: not failed again on the next heartbeat
+    assert pool._fail_overdue_jobs() == []
+
+    release.set()
+    thread.join(5)
+
+    # The late return neither records an outcome nor keeps the thread working
+    assert outcome == [False]
+    assert pool.updates[-1][1] == 'failed'
+    assert pool._running == {}
+
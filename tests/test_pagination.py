@@ -0,0 +1,136 @@
+"""Tests for keyset pagination and cursors (api/pagination.py)."""
+
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from api.pagination import (
+    PaginationError, decode_cursor, encode_cursor, keyset_condition, order_by_clause, page_changes,
+    split_page
+)
+
+ORDER_BY = [('last_seen', 'DESC'), ('hostname', 'ASC'), ('id', 'DESC')]
+
+ROWS = [
+    (1, 'alpha', '2026-01-05'),
+    (2, 'alpha', '2026-01-05'),
+    (3, 'bravo', '2026-01-05'),
+    (4, 'alpha', '2026-01-04'),
+    (5, 'charlie', '2026-01-04'),
+    (6, 'bravo', '2026-01-03'),
+]
+
+
+def test_keyset_condition_single_column():
+    condition, params = keyset_condition([('id', 'ASC')], [42])
+
+    assert condition == '((id > :cursor_0))'
+    assert params == {'cursor_0': 42}
+
+
+def test_keyset_condition_mixes_directions_per_column():
+    condition, params = keyset_condition(ORDER_BY, ['2026-01-05', 'alpha', 1], prefix='after')
+
+    assert condition == (
+        '((last_seen < :after_0)'
+        ' OR (last_seen = :after_0 AND hostname > :after_1)'
+        ' OR (last_seen = :after_0 AND hostname = :after_1 AND id < :after_2))'
+    )
+    assert params == {'after_0': '2026-01-05', 'after_1': 'alpha', 'after_2': 1}
+
+
+def test_keyset_pages_match_the_full_ordering():
+    engine = create_engine('sqlite://')
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, hostname TEXT, last_seen TEXT)"))
+        connection.execute(text("INSERT INTO t VALUES (:id, :hostname, :last_seen)"),
+                           [{'id': i, 'hostname': h, 'last_seen': d} for i, h, d in ROWS])
+
+        def sort_key(row):
+            return [row.last_seen, row.hostname, row.id]
+
+        expected = connection.execute(text(f"SELECT * FROM t ORDER BY {order_by_clause(ORDER_BY)}")).fetchall()
+
+        pages, cursor = [], None
+        while True:
+            condition, params = ('1 = 1', {})
+            if cursor:
+                condition, params = keyset_condition(ORDER_BY, decode_cursor(cursor, len(ORDER_BY)))
+            rows = connection.execute(text(
+                f"SELECT * FROM t WHERE {condition} ORDER BY {order_by_clause(ORDER_BY)} LIMIT 3"
+            ), params).fetchall()
+            page, cursor = split_page(rows, 2, sort_key)
+            pages.append([row.id for row in page])
+            if cursor is None:
+                break
+
+    assert [row.id for row in expected] == [2, 1, 3, 4, 5, 6]
+    assert pages == [[2, 1], [3, 4], [5, 6]]
+
+
+def test_cursor_round_trip_with_dates():
+    values = [date(2026, 1, 5), datetime(2026, 1, 5, 13, 30), 'alpha', 7]
+
+    cursor = encode_cursor(values)
+
+    assert '=' not in cursor
+    assert decode_cursor(cursor, 4) == ['2026-01-05', '2026-01-05T13:30:00', 'alpha', 7]
+
+
+@pytest.mark.parametrize('cursor', [
+    'not a cursor!',
+    encode_cursor(['alpha', 7])[:-3],   # truncated
+    'eyJhIjogMX0',                     # a JSON object, not a list
+    encode_cursor(['alpha']),          # wrong number of values
+])
+def test_malformed_cursor_raises_pagination_error(cursor):
+    with pytest.raises(PaginationError, match='Invalid cursor'):
+        decode_cursor(cursor, 2)
+
+
+CHANGES = {
+    'added': [{'name': 'a1'}, {'name': 'a2'}, {'name': 'a3'}],
+    'removed': [],
+    'changed': [{'name': 'c1'}, {'name': 'c2'}],
+}
+
+
+def names(page):
+    return {change_type: [detail['name'] for detail in details] for change_type, details in page.items()}
+
+
+def test_page_changes_crosses_change_types():
+    first, cursor = page_changes(CHANGES, 2, None)
+    assert names(first) == {'added': ['a1', 'a2'], 'removed': [], 'changed': []}
+
+    second, cursor = page_changes(CHANGES, 2, cursor)
+    assert names(second) == {'added': ['a3'], 'removed': [], 'changed': ['c1']}
+
+    third, cursor = page_changes(CHANGES, 2, cursor)
+    assert names(third) == {'added': [], 'removed': [], 'changed': ['c2']}
+    assert cursor is None
+
+
+def test_page_changes_skips_empty_types_at_a_boundary():
+    page, cursor = page_changes(CHANGES, 3, None)
+
+    assert names(page)['added'] == ['a1', 'a2', 'a3']
+    assert decode_cursor(cursor, 2) == ['changed', 0]
+
+
+def test_page_changes_ends_without_cursor_on_the_last_detail():
+    page, cursor = page_changes(CHANGES, 5, None)
+
+    assert sum(len(details) for details in page.values()) == 5
+    assert cursor is None
+
+
+@pytest.mark.parametrize('cursor', [
+    encode_cursor(['unknown', 0]),
+    encode_cursor(['added', -1]),
+    encode_cursor(['added', '1']),
+])
+def test_page_changes_rejects_foreign_cursors(cursor):
+    with pytest.raises(PaginationError):
+        page_changes(CHANGES, 2, cursor)
@@ -0,0 +1,102 @@
+"""Tests for the per-organization reconciliation rules (collectors/checks/reconciliation.py)."""
+
+from collections import namedtuple
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from collectors.checks import reconciliation
+from collectors.checks.reconciliation import (
+    RECONCILIATION_RULES, find_reconciliation_variances, run_reconciliations, seat_count_differs
+)
+from storage.schema import Exceptions
+
+SNAPSHOT_DATE = date(2026, 1, 5)
+
+Row = namedtuple('Row', 'org_name seat_count reference_org_name reference_count reference_orgs')
+
+
+class FakeSession:
+    """Returns canned aggregate rows and keeps the SQL it was given."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        self.statements.append((str(statement), params))
+        return self
+
+    def fetchall(self):
+        return self.rows
+
+
+def test_seat_count_differs_uses_the_larger_tolerance():
+    compare = seat_count_differs(tolerance_pct=10.0, tolerance_abs=2)
+
+    assert not compare(12, 10)      # within the absolute tolerance
+    assert compare(13, 10)
+    assert not compare(108, 100)    # within 10%
+    assert compare(111, 100)
+    assert compare(1, None)         # missing from the reference
+
+
+@pytest.mark.parametrize('rule', RECONCILIATION_RULES, ids=lambda rule: rule.exception_type)
+def test_rule_reports_organizations_outside_tolerance(rule):
+    session = FakeSession([
+        Row('Acme Corp', 30, 'ACME Corp.', 20, 3),
+        Row('Beta LLC', 21, 'Beta LLC', 20, 3),
+        Row('Gamma Inc', 5, None, None, 3),
+    ])
+
+    findings = find_reconciliation_variances(session, rule, SNAPSHOT_DATE)
+
+    assert [org for org, _ in findings] == ['Acme Corp', 'Gamma Inc']
+    acme = findings[0][1]
+    assert acme['vendor'] == rule.source.vendor
+    assert acme['reference_vendor'] == rule.reference.vendor
+    assert (acme['vendor_count'], acme['reference_count'], acme['difference']) == (30, 20, 10)
+    assert acme['note'] == rule.description
+    assert findings[1][1]['note'] == f'Organization not found in {rule.reference.vendor}'
+
+    sql, params = session.statements[0]
+    assert rule.source.from_clause in sql and rule.reference.from_clause in sql
+    assert rule.source.where in sql
+    assert params == {'snapshot_date': SNAPSHOT_DATE}
+
+
+@pytest.mark.parametrize('rule', RECONCILIATION_RULES, ids=lambda rule: rule.exception_type)
+def test_rule_is_skipped_without_reference_data(rule):
+    assert find_reconciliation_variances(FakeSession([]), rule, SNAPSHOT_DATE) is None
+    assert find_reconciliation_variances(
+        FakeSession([Row('Acme Corp', 30, None, None, 0)]), rule, SNAPSHOT_DATE
+    ) is None
+
+
+def test_run_reconciliations_syncs_each_rule(session, monkeypatch):
+    def find(session, rule, snapshot_date):
+        if rule.source.vendor == 'Dropsuite':
+            return None
+        return [(f'{rule.source.vendor} Org', {'vendor': rule.source.vendor})]
+
+    monkeypatch.setattr(reconciliation, 'find_reconciliation_variances', find)
+
+    results = run_reconciliations(session, SNAPSHOT_DATE)
+
+    assert results == {'DUO_SEAT_MISMATCH': 1, 'M365_SEAT_MISMATCH': 1, 'VADESECURE_SEAT_MISMATCH': 1}
+    stored = {
+        (row.type, row.hostname)
+        for row in session.execute(select(Exceptions.type, Exceptions.hostname))
+    }
+    assert stored == {
+        ('DUO_SEAT_MISMATCH', 'Duo Org'),
+        ('M365_SEAT_MISMATCH', 'M365 Org'),
+        ('VADESECURE_SEAT_MISMATCH', 'VadeSecure Org'),
+    }
+
+
+def test_run_reconciliations_filters_by_vendor(session, monkeypatch):
+    monkeypatch.setattr(reconciliation, 'find_reconciliation_variances', lambda *args: [])
+
+    assert run_reconciliations(session, SNAPSHOT_DATE, vendors=['Duo']) == {'DUO_SEAT_MISMATCH': 0}
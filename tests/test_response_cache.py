@@ -0,0 +1,313 @@
+"""Tests for the API response cache, ETags and request coalescing (api/response_cache.py)."""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask, jsonify
+
+from api import response_cache
+from api.response_cache import ResponseCache, SingleFlight, cached_response, conditional_response
+
+
+def wait_until(condition, timeout=5.0):
+    """Poll condition() until it holds; fail the test after timeout seconds."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            pytest.fail('condition not reached')
+        time.sleep(0.005)
+
+
+def start(target):
+    """Run target on a thread; returns the thread and a list receiving its result or exception."""
+    outcome = []
+
+    def run():
+        try:
+            outcome.append(target())
+        except Exception as e:
+            outcome.append(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread, outcome
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A settable monotonic clock for the cache's TTLs."""
+    now = [1000.0]
+    monkeypatch.setattr(response_cache, 'time', SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_entries_expire_after_their_ttl(clock):
+    cache = ResponseCache(max_entries=4, ttl_seconds=300)
+    cache.set(('a',), 'body')
+
+    clock[0] += 300
+    assert cache.get(('a',)) == 'body'
+    clock[0] += 1
+    assert cache.get(('a',)) is None
+    assert cache.stats()['entries'] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ResponseCache(max_entries=2, ttl_seconds=300)
+    cache.set(('a',), 'a')
+    cache.set(('b',), 'b')
+
+    assert cache.get(('a',)) == 'a'     # a is now the most recently used
+    cache.set(('c',), 'c')
+
+    assert cache.get(('b',)) is None
+    assert cache.get(('a',)) == 'a'
+    assert cache.get(('c',)) == 'c'
+
+
+def test_setting_an_entry_again_refreshes_its_ttl_and_position(clock):
+    cache = ResponseCache(max_entries=2, ttl_seconds=300)
+    cache.set(('a',), 'old')
+    cache.set(('b',), 'b')
+
+    clock[0] += 200
+    cache.set(('a',), 'new')
+    cache.set(('c',), 'c')              # evicts b, not the re-set a
+    clock[0] += 200
+
+    assert cache.get(('a',)) == 'new'
+    assert cache.get(('b',)) is None
+
+
+def test_clear_drops_every_entry(clock):
+    cache = ResponseCache(max_entries=2, ttl_seconds=300)
+    cache.set(('a',), 'a')
+    cache.clear()
+
+    assert cache.get(('a',)) is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight(wait_seconds=5)
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append('leader')
+        release.wait(5)
+        return 'report'
+
+    leader, leader_outcome = start(lambda: flights.do(('/api/status',), compute))
+    wait_until(lambda: calls)
+    follower, follower_outcome = start(lambda: flights.do(('/api/status',), lambda: calls.append('follower')))
+    wait_until(lambda: flights.stats()['coalesced'] == 1)
+
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert calls == ['leader']
+    assert leader_outcome == [('report', False)]
+    assert follower_outcome == [('report', True)]
+    assert flights.stats() == {'in_flight': 0, 'coalesced': 1}
+
+
+def test_leader_exception_is_raised_in_followers():
+    flights = SingleFlight(wait_seconds=5)
+    release = threading.Event()
+    started = threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise RuntimeError('database unavailable')
+
+    leader, leader_outcome = start(lambda: flights.do(('/api/status',), fail))
+    assert started.wait(5)
+    follower, follower_outcome = start(lambda: flights.do(('/api/status',), lambda: 'not called'))
+    wait_until(lambda: flights.stats()['coalesced'] == 1)
+
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert isinstance(leader_outcome[0], RuntimeError)
+    assert follower_outcome[0] is leader_outcome[0]
+    # The failed flight is gone; the next caller runs again
+    assert flights.do(('/api/status',), lambda: 'retried') == ('retried', False)
+
+
+def test_follower_runs_its_own_call_after_the_wait_times_out():
+    flights = SingleFlight(wait_seconds=0.05)
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return 'slow'
+
+    leader, leader_outcome = start(lambda: flights.do(('/api/status',), slow))
+    assert started.wait(5)
+
+    assert flights.do(('/api/status',), lambda: 'own') == ('own', False)
+
+    release.set()
+    leader.join(5)
+    assert leader_outcome == [('slow', False)]
+
+
+def test_different_keys_do_not_wait_on_each_other():
+    flights = SingleFlight(wait_seconds=5)
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return 'slow'
+
+    leader, _ = start(lambda: flights.do(('/api/status',), slow))
+    assert started.wait(5)
+
+    assert flights.do(('/api/variance-report/latest',), lambda: 'fast') == ('fast', False)
+    release.set()
+    leader.join(5)
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """A Flask app with one cached view, on a fixed data version."""
+    monkeypatch.setattr(response_cache, 'get_data_version', lambda force=False: 'v1')
+    response_cache.response_cache.clear()
+
+    app = Flask(__name__)
+    app.view_calls = []
+    app.release = threading.Event()
+    app.release.set()
+
+    @app.route('/report')
+    @cached_response
+    def report():
+        app.view_calls.append(1)
+        app.release.wait(5)
+        return jsonify({'rows': len(app.view_calls)})
+
+    @app.route('/metrics-report')
+    @conditional_response
+    def metrics_report():
+        app.view_calls.append(1)
+        return jsonify({'rows': len(app.view_calls)})
+
+    @app.route('/missing')
+    @cached_response
+    def missing():
+        app.view_calls.append(1)
+        return jsonify({'error': 'not found'}), 404
+
+    yield app
+    response_cache.response_cache.clear()
+
+
+def test_identical_requests_render_the_view_once(app):
+    app.release.clear()
+    coalesced = response_cache.request_flights.stats()['coalesced']
+
+    first, first_outcome = start(lambda: app.test_client().get('/report'))
+    wait_until(lambda: app.view_calls)
+    second, second_outcome = start(lambda: app.test_client().get('/report'))
+    wait_until(lambda: response_cache.request_flights.stats()['coalesced'] == coalesced + 1)
+
+    app.release.set()
+    first.join(5)
+    second.join(5)
+
+    assert len(app.view_calls) == 1
+    assert first_outcome[0].get_json() == second_outcome[0].get_json() == {'rows': 1}
+    assert second_outcome[0].status_code == 200
+
+
+def test_repeat_request_is_served_from_memory(app):
+    client = app.test_client()
+
+    first = client.get('/report')
+    second = client.get('/report')
+
+    assert first.headers['X-Cache'] == 'MISS'
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.get_json() == {'rows': 1}
+    assert len(app.view_calls) == 1
+
+
+def test_matching_etag_gets_304_without_running_the_view(app):
+    client = app.test_client()
+    etag = client.get('/report').headers['ETag']
+
+    response = client.get('/report', headers={'If-None-Match': etag})
+
+    assert etag.startswith('W/"')
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+    assert len(app.view_calls) == 1
+
+
+def test_etag_changes_with_the_data_version(app, monkeypatch):
+    client = app.test_client()
+    old_etag = client.get('/report').headers['ETag']
+
+    monkeypatch.setattr(response_cache, 'get_data_version', lambda force=False: 'v2')
+    response = client.get('/report', headers={'If-None-Match': old_etag})
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != old_etag
+    assert response.headers['X-Cache'] == 'MISS'
+    assert len(app.view_calls) == 2
+
+
+def test_etag_depends_on_the_query_arguments(app):
+    client = app.test_client()
+    etag = client.get('/report?date=2026-01-05').headers['ETag']
+
+    response = client.get('/report?date=2026-01-06', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+
+
+def test_conditional_response_revalidates_without_caching(app):
+    client = app.test_client()
+    first = client.get('/metrics-report')
+    again = client.get('/metrics-report')
+
+    assert 'X-Cache' not in first.headers
+    assert again.get_json() == {'rows': 2}
+    assert client.get('/metrics-report', headers={'If-None-Match': again.headers['ETag']}).status_code == 304
+    assert len(app.view_calls) == 2
+
+
+def test_errors_are_neither_cached_nor_tagged(app):
+    client = app.test_client()
+
+    first = client.get('/missing')
+    second = client.get('/missing')
+
+    assert first.status_code == second.status_code == 404
+    assert 'ETag' not in second.headers
+    assert len(app.view_calls) == 2
+
+
+def test_unavailable_data_version_bypasses_the_cache(app, monkeypatch):
+    def unavailable(force=False):
+        raise RuntimeError('database unavailable')
+
+    monkeypatch.setattr(response_cache, 'get_data_version', unavailable)
+    response = app.test_client().get('/report')
+
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+    assert 'X-Cache' not in response.headers
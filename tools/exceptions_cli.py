@@ -19,6 +19,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from common.db import session_scope
+from common.exception_changes import record_exception_changes
 from storage.schema import Exceptions
 
 
@@ -32,7 +33,7 @@ def list_exceptions(
     
     Args:
         exception_type: Filter by exception type (e.g., 'MISSING_NINJA')
-        filter_date: Filter by date found (YYYY-MM-DD format)
+        filter_date: Only exceptions open on this date (YYYY-MM-DD format)
         unresolved_only: Only show unresolved exceptions
         
     Returns:
@@ -46,13 +47,18 @@ def list_exceptions(
             query = query.filter(Exceptions.type == exception_type)
         
         if filter_date:
-            query = query.filter(Exceptions.date_found == filter_date)
+            query = query.filter(
+                and_(
+                    Exceptions.first_seen <= filter_date,
+                    Exceptions.last_seen >= filter_date
+                )
+            )
         
         if unresolved_only:
             query = query.filter(Exceptions.resolved == False)
         
-        # Order by date_found descending, then by id descending
-        query = query.order_by(desc(Exceptions.date_found), desc(Exceptions.id))
+        # Order by last_seen descending, then by id descending
+        query = query.order_by(desc(Exceptions.last_seen), desc(Exceptions.id))
         
         return query.all()
 
@@ -75,12 +81,13 @@ def resolve_exception(exception_type: str, hostname: str) -> bool:
                 Exceptions.type == exception_type,
                 Exceptions.hostname == hostname
             )
-        ).order_by(desc(Exceptions.date_found), desc(Exceptions.id)).first()
+        ).order_by(desc(Exceptions.last_seen), desc(Exceptions.id)).first()
         
         if not exception:
             return False
         
         exception.resolved = True
+        record_exception_changes(session, [(exception.first_seen, exception.last_seen)])
         return True
 
 
@@ -102,12 +109,13 @@ def unresolve_exception(exception_type: str, hostname: str) -> bool:
                 Exceptions.type == exception_type,
                 Exceptions.hostname == hostname
             )
-        ).order_by(desc(Exceptions.date_found), desc(Exceptions.id)).first()
+        ).order_by(desc(Exceptions.last_seen), desc(Exceptions.id)).first()
         
         if not exception:
             return False
         
         exception.resolved = False
+        record_exception_changes(session, [(exception.first_seen, exception.last_seen)])
         return True
 
 
@@ -128,13 +136,15 @@ def format_exceptions_table(exceptions: List[Exceptions]) -> str:
     table_data = []
     for exc in exceptions:
         table_data.append([
-            exc.date_found.strftime('%Y-%m-%d'),
+            exc.first_seen.strftime('%Y-%m-%d'),
+            exc.last_seen.strftime('%Y-%m-%d'),
+            exc.closed_date.strftime('%Y-%m-%d') if exc.closed_date else '',
             exc.type,
             exc.hostname,
             'Yes' if exc.resolved else 'No'
         ])
     
-    headers = ['date_found', 'type', 'hostname', 'resolved']
+    headers = ['first_seen', 'last_seen', 'closed', 'type', 'hostname', 'resolved']
     return tabulate(table_data, headers=headers, tablefmt='grid')
 
 
@@ -167,7 +177,7 @@ Examples:
   %(prog)s list                                    # List all exceptions
   %(prog)s list --type MISSING_NINJA              # List MISSING_NINJA exceptions
   %(prog)s list --unresolved-only                 # List only unresolved exceptions
-  %(prog)s list --date 2024-01-15                 # List exceptions from specific date
+  %(prog)s list --date 2024-01-15                 # List exceptions open on a specific date
   %(prog)s resolve --type MISSING_NINJA --hostname EXCHANGE
   %(prog)s unresolve --type MISSING_NINJA --hostname EXCHANGE
         """
@@ -184,7 +194,7 @@ Examples:
     list_parser.add_argument(
         '--date', 
         type=parse_date,
-        help='Filter by date found (YYYY-MM-DD format)'
+        help='Only exceptions open on this date (YYYY-MM-DD format)'
     )
     list_parser.add_argument(
         '--unresolved-only', 
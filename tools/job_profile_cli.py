@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+CLI tool for comparing the stage profiles of job runs.
+
+Every tracked collector run records how long it spent in each stage
+(fetch, normalize, write, post_process, other) and the peak memory of
+each stage in job_run_stages (common/job_profile.py), plus allocation hot
+spots for runs made with JOB_PROFILE_TRACEMALLOC=true. This tool lists them per run and compares the
+latest run with the runs before it.
+"""
+
+import argparse
+import statistics
+import sys
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from tabulate import tabulate
+
+# Add the project root to the Python path
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.db import session_scope
+
+STAGE_ORDER = ('other', 'fetch', 'normalize', 'write', 'post_process')
+
+JOBS_QUERY = text("""
+    SELECT job_name, COUNT(DISTINCT job_id) AS runs, MAX(recorded_at) AS last_recorded
+    FROM job_run_stages
+    GROUP BY job_name
+    ORDER BY job_name
+""")
+
+RUN_STAGES_QUERY = text("""
+    WITH runs AS (
+        SELECT jr.job_id, jr.started_at, jr.status
+        FROM job_runs jr
+        WHERE jr.job_name = :job_name
+          AND EXISTS (SELECT 1 FROM job_run_stages s WHERE s.job_id = jr.job_id)
+        ORDER BY jr.started_at DESC
+        LIMIT :runs
+    )
+    SELECT runs.job_id, runs.started_at, runs.status,
+           s.stage, s.position, s.duration_seconds, s.peak_rss_mb, s.peak_traced_mb
+    FROM runs
+    JOIN job_run_stages s ON s.job_id = runs.job_id
+    ORDER BY runs.started_at DESC, s.position
+""")
+
+RUN_DETAIL_QUERY = text("""
+    SELECT s.job_name, s.stage, s.duration_seconds, s.peak_rss_mb, s.peak_traced_mb,
+           s.top_allocations, jr.started_at, jr.status
+    FROM job_run_stages s
+    JOIN job_runs jr ON jr.job_id = s.job_id
+    WHERE s.job_id = :job_id
+    ORDER BY s.position
+""")
+
+
+def load_runs(job_name: str, runs: int) -> List[Dict[str, Any]]:
+    """
+    Load the stage profiles of a job's most recent runs.
+
+    Args:
+        job_name: Job name, e.g. 'ninja-collector'
+        runs: Number of runs to load
+
+    Returns:
+        list: Runs, newest first, each with job_id, started_at, status and
+            stages ({stage: {duration, rss, traced}})
+    """
+    loaded: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+    with session_scope() as session:
+        for row in session.execute(RUN_STAGES_QUERY, {'job_name': job_name, 'runs': runs}):
+            run = loaded.setdefault(row.job_id, {
+                'job_id': row.job_id,
+                'started_at': row.started_at,
+                'status': row.status,
+                'stages': OrderedDict()
+            })
+            run['stages'][row.stage] = {
+                'duration': float(row.duration_seconds),
+                'rss': float(row.peak_rss_mb) if row.peak_rss_mb is not None else None,
+                'traced': float(row.peak_traced_mb) if row.peak_traced_mb is not None else None
+            }
+    return list(loaded.values())
+
+
+def _stages(runs: List[Dict[str, Any]]) -> List[str]:
+    """Stages seen in any run, in pipeline order."""
+    seen = {stage for run in runs for stage in run['stages']}
+    ordered = [stage for stage in STAGE_ORDER if stage in seen]
+    return ordered + sorted(seen - set(ordered))
+
+
+def _peak_rss(run: Dict[str, Any]) -> Optional[float]:
+    values = [stage['rss'] for stage in run['stages'].values() if stage['rss'] is not None]
+    return max(values) if values else None
+
+
+def _change(latest: Optional[float], baseline: Optional[float]) -> str:
+    if latest is None or not baseline:
+        return ''
+    return f"{(latest - baseline) / baseline * 100:+.0f}%"
+
+
+def _fmt(value: Optional[float], digits: int = 1) -> str:
+    return '' if value is None else f"{value:.{digits}f}"
+
+
+def format_runs_table(runs: List[Dict[str, Any]]) -> str:
+    """
+    Format one row per run with each stage's duration and the run's peak RSS.
+
+    Args:
+        runs: Runs from load_runs()
+
+    Returns:
+        Formatted table string
+    """
+    stages = _stages(runs)
+    table_data = []
+    for run in runs:
+        durations = [run['stages'][stage]['duration'] if stage in run['stages'] else None for stage in stages]
+        table_data.append(
+            [run['started_at'].strftime('%Y-%m-%d %H:%M'), run['job_id'], run['status']]
+            + [_fmt(duration) for duration in durations]
+            + [_fmt(sum(d for d in durations if d is not None)), _fmt(_peak_rss(run))]
+        )
+
+    headers = ['started', 'job_id', 'status'] + [f"{stage} (s)" for stage in stages] + ['total (s)', 'peak RSS (MB)']
+    return tabulate(table_data, headers=headers, tablefmt='grid')
+
+
+def format_comparison_table(runs: List[Dict[str, Any]]) -> str:
+    """
+    Compare the latest run with the median of the runs before it, per stage.
+
+    Args:
+        runs: Runs from load_runs(), newest first
+
+    Returns:
+        Formatted table string
+    """
+    latest, previous = runs[0], runs[1:]
+
+    def median(values: List[Optional[float]]) -> Optional[float]:
+        values = [value for value in values if value is not None]
+        return statistics.median(values) if values else None
+
+    table_data = []
+    for stage in _stages(runs):
+        current = latest['stages'].get(stage, {})
+        duration = current.get('duration')
+        rss = current.get('rss')
+        baseline_duration = median([run['stages'].get(stage, {}).get('duration') for run in previous])
+        baseline_rss = median([run['stages'].get(stage, {}).get('rss') for run in previous])
+        table_data.append([
+            stage,
+            _fmt(duration), _fmt(baseline_duration), _change(duration, baseline_duration),
+            _fmt(rss), _fmt(baseline_rss), _change(rss, baseline_rss)
+        ])
+
+    headers = ['stage', 'latest (s)', 'median (s)', 'change', 'latest RSS (MB)', 'median RSS (MB)', 'change']
+    return tabulate(table_data, headers=headers, tablefmt='grid')
+
+
+def show_run(job_id: str) -> Optional[str]:
+    """
+    Format a run's stages and the allocation hot spots of each.
+
+    Args:
+        job_id: job_runs.job_id
+
+    Returns:
+        Formatted report, or None if the run has no profile
+    """
+    with session_scope() as session:
+        rows = session.execute(RUN_DETAIL_QUERY, {'job_id': job_id}).fetchall()
+    if not rows:
+        return None
+
+    first = rows[0]
+    lines = [
+        f"{first.job_name} run {job_id} ({first.status}, started {first.started_at:%Y-%m-%d %H:%M})",
+        tabulate(
+            [[row.stage, _fmt(float(row.duration_seconds), 3),
+              _fmt(float(row.peak_rss_mb) if row.peak_rss_mb is not None else None),
+              _fmt(float(row.peak_traced_mb) if row.peak_traced_mb is not None else None)]
+             for row in rows],
+            headers=['stage', 'duration (s)', 'peak RSS (MB)', 'peak traced (MB)'],
+            tablefmt='grid'
+        )
+    ]
+    for row in rows:
+        if not row.top_allocations:
+            continue
+        lines.append(f"\nHot spots during {row.stage}:")
+        lines.append(tabulate(
+            [[spot['location'], spot['size_mb'], spot['count']] for spot in row.top_allocations],
+            headers=['location', 'size (MB)', 'blocks'],
+            tablefmt='grid'
+        ))
+    return '\n'.join(lines)
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(
+        description='Compare stage timing and memory of job runs',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s jobs                                    # Jobs with recorded profiles
+  %(prog)s compare --job ninja-collector           # Last 10 runs, latest vs median
+  %(prog)s compare --job m365-collector --runs 30
+  %(prog)s show legacy_1a2b3c4d                    # Stages and hot spots of one run
+        """
+    )
+
+    subparsers = parser.add_subparsers(dest='command', help='Available commands')
+
+    subparsers.add_parser('jobs', help='List jobs with recorded profiles')
+
+    compare_parser = subparsers.add_parser('compare', help='Compare the recent runs of a job')
+    compare_parser.add_argument(
+        '--job',
+        required=True,
+        help='Job name (e.g., ninja-collector, threatlocker-collector)'
+    )
+    compare_parser.add_argument(
+        '--runs',
+        type=int,
+        default=10,
+        help='Number of recent runs to compare (default: 10)'
+    )
+
+    show_parser = subparsers.add_parser('show', help='Show the stages and hot spots of one run')
+    show_parser.add_argument('job_id', help='job_runs.job_id of the run')
+
+    args = parser.parse_args()
+
+    if args.command is None:
+        parser.print_help()
+        sys.exit(1)
+
+    try:
+        if args.command == 'jobs':
+            with session_scope() as session:
+                rows = session.execute(JOBS_QUERY).fetchall()
+            if not rows:
+                print("No job profiles recorded.")
+            else:
+                print(tabulate(
+                    [[row.job_name, row.runs, row.last_recorded.strftime('%Y-%m-%d %H:%M')] for row in rows],
+                    headers=['job', 'runs', 'last recorded'],
+                    tablefmt='grid'
+                ))
+
+        elif args.command == 'compare':
+            runs = load_runs(args.job, args.runs)
+            if not runs:
+                print(f"No profiled runs found for {args.job}")
+                sys.exit(1)
+            print(format_runs_table(runs))
+            if len(runs) > 1:
+                print(f"\nLatest run vs median of the previous {len(runs) - 1}:")
+                print(format_comparison_table(runs))
+
+        elif args.command == 'show':
+            report = show_run(args.job_id)
+            if report is None:
+                print(f"No profile found for run {args.job_id}")
+                sys.exit(1)
+            print(report)
+
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()